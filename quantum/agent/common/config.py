@@ -29,6 +29,9 @@ LOG = logging.getLogger(__name__)
 ROOT_HELPER_OPTS = [
     cfg.StrOpt('root_helper', default='sudo',
                help=_('Root helper application.')),
+    cfg.StrOpt('root_helper_daemon',
+               help=_('Command starting a root helper daemon which runs '
+                      'the commands otherwise run through root_helper.')),
 ]
 
 AGENT_STATE_OPTS = [
@@ -236,6 +236,9 @@ class IptablesManager(object):
         self.root_helper = root_helper
         self.namespace = namespace
         self.iptables_apply_deferred = False
+        # The chains and rules last applied to each table, keyed by
+        # (command, table name)
+        self.applied_tables = {}
 
         self.ipv4 = {'filter': IptablesTable()}
         self.ipv6 = {'filter': IptablesTable()}
@@ -313,9 +316,12 @@ class IptablesManager(object):
     def _apply(self):
         """Apply the current in-memory set of iptables rules.
 
-        This will blow away any rules left over from previous runs of the
-        same component of Nova, and replace them with our current set of
-        rules. This happens atomically, thanks to iptables-restore.
+        The first time a table is applied, this will blow away any rules left
+        over from previous runs of the same component of Nova, and replace
+        them with our current set of rules. Afterwards only the wrapped
+        chains which changed since the last apply are rewritten, unless
+        shared chains changed too, and tables which did not change are left
+        alone. This happens atomically, thanks to iptables-restore.
 
         """
         s = [('iptables', self.ipv4)]
@@ -324,22 +330,118 @@ class IptablesManager(object):
 
         for cmd, tables in s:
             for table in tables:
-                args = ['%s-save' % cmd, '-t', table]
-                if self.namespace:
-                    args = ['ip', 'netns', 'exec', self.namespace] + args
-                current_table = (self.execute(args,
-                                 root_helper=self.root_helper))
-                current_lines = current_table.split('\n')
-                new_filter = self._modify_rules(current_lines,
-                                                tables[table])
-                args = ['%s-restore' % (cmd)]
-                if self.namespace:
-                    args = ['ip', 'netns', 'exec', self.namespace] + args
-                self.execute(args,
-                             process_input='\n'.join(new_filter),
-                             root_helper=self.root_helper)
+                state = self._get_table_state(tables[table])
+                applied = self.applied_tables.get((cmd, table))
+                if state == applied:
+                    continue
+                if not (applied and
+                        self._apply_table_changes(cmd, table, applied,
+                                                  state)):
+                    self._apply_table(cmd, table, tables[table])
+                self.applied_tables[(cmd, table)] = state
         LOG.debug(_("IPTablesManager.apply completed with success"))
 
+    def _apply_table(self, cmd, table, iptables_table):
+        args = ['%s-save' % cmd, '-t', table]
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        current_table = (self.execute(args,
+                         root_helper=self.root_helper))
+        current_lines = current_table.split('\n')
+        new_filter = self._modify_rules(current_lines, iptables_table)
+        args = ['%s-restore' % (cmd)]
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        self.execute(args,
+                     process_input='\n'.join(new_filter),
+                     root_helper=self.root_helper)
+
+    def _apply_table_changes(self, cmd, table, applied, state):
+        """Apply the difference between two states of a table.
+
+        Returns False if the table has to be applied as a whole instead.
+        """
+        changes = self._get_table_changes(applied, state)
+        if changes is None:
+            return False
+
+        args = ['%s-restore' % cmd, '--noflush']
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        try:
+            self.execute(args,
+                         process_input='\n'.join(['*%s' % table] + changes +
+                                                 ['COMMIT', '']),
+                         root_helper=self.root_helper)
+        except RuntimeError:
+            LOG.warn(_('Unable to apply the changes to the %(cmd)s %(table)s '
+                       'table, applying the whole table instead'),
+                     {'cmd': cmd, 'table': table})
+            return False
+        return True
+
+    def _get_table_state(self, table):
+        """Return the chains and rules of a table as they get applied.
+
+        The state is a tuple of the declared unwrapped chains and of the
+        rules of the wrapped and unwrapped chains, each mapping a chain to
+        the tuple of its rules. Like _modify_rules, the last occurrence of
+        a duplicated rule wins.
+        """
+        chains = dict(('%s-%s' % (binary_name, name), [])
+                      for name in table.chains)
+        unwrapped_chains = dict((name, []) for name in table.unwrapped_chains)
+        for rule in table.rules:
+            if rule.wrap:
+                chain = '%s-%s' % (binary_name, rule.chain)
+                chains.setdefault(chain, []).append(rule.rule)
+            else:
+                unwrapped_chains.setdefault(rule.chain, []).append(rule.rule)
+
+        def _weed_out_duplicates(rules):
+            seen_rules = set()
+            unique_rules = []
+            for rule in reversed(rules):
+                if rule.strip() not in seen_rules:
+                    seen_rules.add(rule.strip())
+                    unique_rules.append(rule)
+            unique_rules.reverse()
+            return tuple(unique_rules)
+
+        return (frozenset(table.unwrapped_chains),
+                dict((name, _weed_out_duplicates(rules))
+                     for name, rules in chains.iteritems()),
+                dict((name, _weed_out_duplicates(rules))
+                     for name, rules in unwrapped_chains.iteritems()))
+
+    def _get_table_changes(self, applied, state):
+        """Return the iptables-restore --noflush lines for a table change.
+
+        Returns None if the change from applied to state cannot be expressed
+        that way. Wrapped chains belong to us, so the changed ones are
+        declared, which flushes them, and filled again. Unwrapped chains are
+        shared with others, such as other managers in the same namespace,
+        so where our rules sit in them is only known to _modify_rules from
+        the saved table: their changes are applied with the whole table.
+        """
+        old_unwrapped, old_chains, old_unwrapped_rules = applied
+        new_unwrapped, new_chains, new_unwrapped_rules = state
+        if (old_unwrapped != new_unwrapped or
+                old_unwrapped_rules != new_unwrapped_rules):
+            return None
+
+        changed_chains = sorted(name for name, rules in new_chains.iteritems()
+                                if old_chains.get(name) != rules)
+        removed_chains = sorted(name for name in old_chains
+                                if name not in new_chains)
+
+        changes = [':%s - [0:0]' % name
+                   for name in changed_chains + removed_chains]
+        for name in changed_chains:
+            changes += ['-A %s %s' % (name, rule) for rule in new_chains[name]]
+        changes += ['-X %s' % name for name in removed_chains]
+        return changes
+
     def _modify_rules(self, current_lines, table, binary=None):
         unwrapped_chains = table.unwrapped_chains
         chains = table.chains
@@ -360,15 +462,18 @@ class IptablesManager(object):
                     break
 
         our_rules = []
+        top_rules = set()
         for rule in rules:
             rule_str = str(rule)
             if rule.top:
                 # rule.top == True means we want this rule to be at the top.
                 # Further down, we weed out duplicates from the bottom of the
                 # list, so here we remove the dupes ahead of time.
-                new_filter = filter(lambda s: s.strip() != rule_str.strip(),
-                                    new_filter)
+                top_rules.add(rule_str.strip())
             our_rules += [rule_str]
+        if top_rules:
+            new_filter = filter(lambda s: s.strip() not in top_rules,
+                                new_filter)
 
         new_filter[rules_index:rules_index] = our_rules
 
@@ -19,12 +19,17 @@
 # @author: Dave Lapsley, Nicira Networks, Inc.
 
 import re
+import threading
 
+from quantum.agent.linux import ovsdb_monitor
 from quantum.agent.linux import utils
+from quantum.openstack.common import jsonutils
 from quantum.openstack.common import log as logging
 
 LOG = logging.getLogger(__name__)
 
+INTERFACE_COLUMNS = ['name', 'ofport', 'external_ids']
+
 
 class VifPort:
     def __init__(self, port_name, ofport, vif_id, vif_mac, switch):
@@ -46,6 +51,11 @@ class OVSBridge:
         self.br_name = br_name
         self.root_helper = root_helper
         self.re_id = self.re_compile_id()
+        # DB edits and flow changes queued by defer_apply_on(), kept per
+        # thread (green thread once monkey patched) so that concurrent
+        # callers, such as the RPC handlers and the agent loop, neither
+        # queue into nor flush the batch of one another
+        self._deferred = threading.local()
 
     def re_compile_id(self):
         external = 'external_ids\s*'
@@ -80,16 +90,19 @@ class OVSBridge:
 
     def set_db_attribute(self, table_name, record, column, value):
         args = ["set", table_name, record, "%s=%s" % (column, value)]
-        self.run_vsctl(args)
+        self._apply_vsctl(args)
 
     def clear_db_attribute(self, table_name, record, column):
         args = ["clear", table_name, record, column]
-        self.run_vsctl(args)
+        self._apply_vsctl(args)
 
-    def run_ofctl(self, cmd, args):
+    def run_ofctl(self, cmd, args, process_input=None):
         full_args = ["ovs-ofctl", cmd, self.br_name] + args
         try:
-            return utils.execute(full_args, root_helper=self.root_helper)
+            if process_input is None:
+                return utils.execute(full_args, root_helper=self.root_helper)
+            return utils.execute(full_args, root_helper=self.root_helper,
+                                 process_input=process_input)
         except Exception, e:
             LOG.error(_("Unable to execute %(cmd)s. Exception: %(exception)s"),
                       {'cmd': full_args, 'exception': e})
@@ -149,7 +162,18 @@ class OVSBridge:
         flow_expr_arr = self._build_flow_expr_arr(**kwargs)
         flow_expr_arr.append("actions=%s" % (kwargs["actions"]))
         flow_str = ",".join(flow_expr_arr)
-        self.run_ofctl("add-flow", [flow_str])
+        self._apply_flow("add", flow_str)
+
+    def mod_flow(self, **kwargs):
+        if "actions" not in kwargs:
+            raise Exception(_("Must specify one or more actions"))
+        # Flows are modified without --strict, i.e. matched like they are
+        # on deletion
+        kwargs['delete'] = True
+        flow_expr_arr = self._build_flow_expr_arr(**kwargs)
+        flow_expr_arr.append("actions=%s" % (kwargs["actions"]))
+        flow_str = ",".join(flow_expr_arr)
+        self._apply_flow("mod", flow_str)
 
     def delete_flows(self, **kwargs):
         kwargs['delete'] = True
@@ -157,23 +181,107 @@ class OVSBridge:
         if "actions" in kwargs:
             flow_expr_arr.append("actions=%s" % (kwargs["actions"]))
         flow_str = ",".join(flow_expr_arr)
-        self.run_ofctl("del-flows", [flow_str])
+        self._apply_flow("del", flow_str)
+
+    def _get_deferred_ops(self):
+        return getattr(self._deferred, 'ops', None)
+
+    def _apply_vsctl(self, args):
+        deferred_ops = self._get_deferred_ops()
+        if deferred_ops is None:
+            self.run_vsctl(args)
+        else:
+            deferred_ops.append(("vsctl", args))
+
+    def _apply_flow(self, action, flow_str):
+        deferred_ops = self._get_deferred_ops()
+        if deferred_ops is None:
+            cmd = action == "add" and "add-flow" or "%s-flows" % action
+            self.run_ofctl(cmd, [flow_str])
+        else:
+            deferred_ops.append((action, flow_str))
+
+    def defer_apply_on(self):
+        """Queue DB edits and flow changes until defer_apply_off().
+
+        set_db_attribute(), clear_db_attribute(), add_flow(), mod_flow()
+        and delete_flows() are queued instead of being run one command at
+        a time. Only the calls made from the calling thread are queued.
+        """
+        if self._get_deferred_ops() is None:
+            self._deferred.ops = []
+
+    def defer_apply_off(self):
+        """Apply the queued DB edits and flow changes, and stop queuing.
+
+        The DB edits are applied first, in a single ovs-vsctl transaction.
+        When it fails, e.g. because one of the ports was deleted meanwhile,
+        the DB edits are applied again one at a time, so that the others
+        are not lost along with it. The flow changes are then applied in
+        order, with one ovs-ofctl command reading the flows from its stdin
+        for each run of changes of the same kind. When such a command fails,
+        its flow changes are applied again one at a time, so that a bad flow
+        does not take the others of its batch down with it.
+        """
+        deferred_ops = self._get_deferred_ops()
+        self._deferred.ops = None
+        if not deferred_ops:
+            return
+        vsctl_edits = []
+        flow_batches = []
+        for action, arg in deferred_ops:
+            if action == "vsctl":
+                vsctl_edits.append(arg)
+            elif flow_batches and flow_batches[-1][0] == action:
+                flow_batches[-1][1].append(arg)
+            else:
+                flow_batches.append((action, [arg]))
+        if vsctl_edits:
+            full_args = ["ovs-vsctl", "--timeout=2"]
+            for args in vsctl_edits:
+                full_args += ["--"] + args
+            try:
+                utils.execute(full_args, root_helper=self.root_helper)
+            except Exception, e:
+                # NOTE: the transaction was aborted as a whole, so none of
+                #       its DB edits were applied.
+                LOG.warning(_("Unable to execute %(cmd)s, applying its "
+                              "%(num)d DB edits one at a time. Exception: "
+                              "%(exception)s"),
+                            {'cmd': full_args, 'num': len(vsctl_edits),
+                             'exception': e})
+                for args in vsctl_edits:
+                    self.run_vsctl(args)
+        for action, flow_strs in flow_batches:
+            full_args = ["ovs-ofctl", "%s-flows" % action, self.br_name, "-"]
+            try:
+                utils.execute(full_args, root_helper=self.root_helper,
+                              process_input="\n".join(flow_strs))
+            except Exception, e:
+                # NOTE: adding, modifying and deleting flows are idempotent,
+                #       so the flows of the batch already applied can be
+                #       applied again.
+                LOG.warning(_("Unable to execute %(cmd)s, applying its "
+                              "%(num)d flows one at a time. Exception: "
+                              "%(exception)s"),
+                            {'cmd': full_args, 'num': len(flow_strs),
+                             'exception': e})
+                for flow_str in flow_strs:
+                    self._apply_flow(action, flow_str)
 
     def add_tunnel_port(self, port_name, remote_ip):
-        self.run_vsctl(["add-port", self.br_name, port_name])
-        self.set_db_attribute("Interface", port_name, "type", "gre")
-        self.set_db_attribute("Interface", port_name, "options:remote_ip",
-                              remote_ip)
-        self.set_db_attribute("Interface", port_name, "options:in_key", "flow")
-        self.set_db_attribute("Interface", port_name, "options:out_key",
-                              "flow")
+        self.run_vsctl(["--", "--may-exist", "add-port", self.br_name,
+                        port_name,
+                        "--", "set", "Interface", port_name, "type=gre",
+                        "options:remote_ip=%s" % remote_ip,
+                        "options:in_key=flow", "options:out_key=flow"])
         return self.get_port_ofport(port_name)
 
     def add_patch_port(self, local_name, remote_name):
-        self.run_vsctl(["add-port", self.br_name, local_name])
-        self.set_db_attribute("Interface", local_name, "type", "patch")
-        self.set_db_attribute("Interface", local_name, "options:peer",
-                              remote_name)
+        self.run_vsctl(["--", "--may-exist", "add-port", self.br_name,
+                        local_name,
+                        "--", "set", "Interface", local_name, "type=patch",
+                        "options:peer=%s" % remote_name])
         return self.get_port_ofport(local_name)
 
     def db_get_map(self, table, record, column):
@@ -188,6 +296,22 @@ class OVSBridge:
         if output:
             return output.rstrip("\n\r")
 
+    def db_list(self, table, columns):
+        """Return the given columns of all the records of a table.
+
+        The records are read with a single command, and returned as dicts
+        of python values by column name.
+        """
+        output = self.run_vsctl(["--format=json", "--",
+                                 "--columns=%s" % ",".join(columns),
+                                 "list", table])
+        if not output:
+            return []
+        result = jsonutils.loads(output)
+        return [dict((heading, ovsdb_monitor.val_to_py(value))
+                     for heading, value in zip(result['headings'], row))
+                for row in result['data']]
+
     def db_str_to_map(self, full_str):
         list = full_str.strip("{}").split(", ")
         ret = {}
@@ -216,43 +340,76 @@ class OVSBridge:
             LOG.error(_("Unable to execute %(cmd)s. Exception: %(exception)s"),
                       {'cmd': args, 'exception': e})
 
+    def get_interfaces(self):
+        """Return the name, ofport and external ids of the interfaces of
+        the ports of the bridge, as rows of the Interface table.
+        """
+        port_names = set(self.get_port_name_list())
+        return [iface for iface in self.db_list("Interface", INTERFACE_COLUMNS)
+                if iface['name'] in port_names]
+
+    def _get_vif_id(self, external_ids):
+        if "iface-id" in external_ids and "attached-mac" in external_ids:
+            return external_ids['iface-id']
+        elif ("xs-vif-uuid" in external_ids and
+              "attached-mac" in external_ids):
+            # if this is a xenserver and iface-id is not automatically
+            # synced to OVS from XAPI, we grab it from XAPI directly
+            return self.get_xapi_iface_id(external_ids["xs-vif-uuid"])
+
     # returns a VIF object for each VIF port
     def get_vif_ports(self):
         edge_ports = []
-        port_names = self.get_port_name_list()
-        for name in port_names:
-            external_ids = self.db_get_map("Interface", name, "external_ids")
-            ofport = self.db_get_val("Interface", name, "ofport")
-            if "iface-id" in external_ids and "attached-mac" in external_ids:
-                p = VifPort(name, ofport, external_ids["iface-id"],
-                            external_ids["attached-mac"], self)
-                edge_ports.append(p)
-            elif ("xs-vif-uuid" in external_ids and
-                  "attached-mac" in external_ids):
-                # if this is a xenserver and iface-id is not automatically
-                # synced to OVS from XAPI, we grab it from XAPI directly
-                iface_id = self.get_xapi_iface_id(external_ids["xs-vif-uuid"])
-                p = VifPort(name, ofport, iface_id,
+        for iface in self.get_interfaces():
+            external_ids = iface['external_ids']
+            vif_id = self._get_vif_id(external_ids)
+            if vif_id is not None:
+                p = VifPort(iface['name'], iface['ofport'], vif_id,
                             external_ids["attached-mac"], self)
                 edge_ports.append(p)
 
         return edge_ports
 
-    def get_vif_port_set(self):
+    def get_vif_port_set(self, interfaces=None):
+        """Return the ids of the VIFs of the ports of the bridge.
+
+        :param interfaces: rows of the Interface table, as kept by an
+            ovsdb_monitor.InterfaceMonitor. The interfaces of the ports are
+            read from the database if not given.
+        """
+        if interfaces is None:
+            interfaces = self.get_interfaces()
+        else:
+            port_names = set(self.get_port_name_list())
+            interfaces = [iface for iface in interfaces
+                          if iface['name'] in port_names]
         edge_ports = set()
-        port_names = self.get_port_name_list()
-        for name in port_names:
-            external_ids = self.db_get_map("Interface", name, "external_ids")
-            if "iface-id" in external_ids and "attached-mac" in external_ids:
-                edge_ports.add(external_ids['iface-id'])
-            elif ("xs-vif-uuid" in external_ids and
-                  "attached-mac" in external_ids):
-                # if this is a xenserver and iface-id is not automatically
-                # synced to OVS from XAPI, we grab it from XAPI directly
-                iface_id = self.get_xapi_iface_id(external_ids["xs-vif-uuid"])
-                edge_ports.add(iface_id)
+        for iface in interfaces:
+            vif_id = self._get_vif_id(iface['external_ids'])
+            if vif_id is not None:
+                edge_ports.add(vif_id)
         return edge_ports
 
+    def get_vif_ports_by_ids(self, port_ids):
+        """Return the VIF ports of the given ids, by id.
+
+        This is the bulk version of get_vif_port_by_id(): the interfaces
+        are all read with a single command. Ports that are not found are
+        left out of the result.
+        """
+        port_ids = set(port_ids)
+        vif_ports = {}
+        for iface in self.db_list("Interface", INTERFACE_COLUMNS):
+            external_ids = iface['external_ids']
+            vif_id = external_ids.get('iface-id')
+            if (vif_id in port_ids and "attached-mac" in external_ids and
+                    isinstance(iface['ofport'], int)):
+                vif_ports[vif_id] = VifPort(iface['name'], iface['ofport'],
+                                            vif_id,
+                                            external_ids["attached-mac"],
+                                            self)
+        return vif_ports
+
     def get_vif_port_by_id(self, port_id):
         args = ['--', '--columns=external_ids,name,ofport',
                 'find', 'Interface',
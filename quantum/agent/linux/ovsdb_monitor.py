@@ -0,0 +1,183 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Monitoring of the Interface table of the Open vSwitch database.
+
+A long-lived ovsdb-client process streams the changes of the table, which
+are applied to an in-memory copy of it as soon as they are received. The
+agents read interfaces from the copy instead of querying the database
+with a command per interface, and can wake up on changes instead of
+waiting for their next polling interval.
+"""
+
+import eventlet
+from eventlet import queue
+
+from quantum.agent.linux import utils
+from quantum.openstack.common import jsonutils
+from quantum.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+COLUMNS = ['name', 'ofport', 'external_ids']
+
+# Actions of the rows of the updates sent by ovsdb-client
+ACTION_INITIAL = 'initial'
+ACTION_INSERT = 'insert'
+ACTION_DELETE = 'delete'
+ACTION_OLD = 'old'
+ACTION_NEW = 'new'
+
+
+def val_to_py(value):
+    """Convert a value of the JSON notation of OVSDB to python.
+
+    Maps become dicts, sets become lists and uuids become strings.
+    """
+    if isinstance(value, list) and len(value) == 2:
+        if value[0] == 'map':
+            return dict((key, val_to_py(val)) for key, val in value[1])
+        if value[0] == 'set':
+            return [val_to_py(val) for val in value[1]]
+        if value[0] == 'uuid':
+            return value[1]
+    return value
+
+
+class InterfaceMonitor(object):
+    """Keeps a copy of the Interface table, updated by ovsdb-client.
+
+    The copy is only usable while is_active() is true, i.e. after the
+    current content of the table has been received and as long as the
+    ovsdb-client process runs. The process is respawned after
+    respawn_interval seconds when it exits.
+    """
+
+    def __init__(self, root_helper, respawn_interval=30):
+        self.root_helper = root_helper
+        self.respawn_interval = respawn_interval
+        # Rows of the table by uuid
+        self.interfaces = {}
+        self._active = False
+        self._process = None
+        self._thread = None
+        self._changes = queue.LightQueue()
+
+    def start(self):
+        if not self._thread:
+            self._thread = eventlet.spawn(self._run)
+
+    def stop(self):
+        if self._thread:
+            self._thread.kill()
+            self._thread = None
+        self._kill_process()
+
+    def is_active(self):
+        return self._active
+
+    def has_changes(self):
+        """Return whether the table changed since the last call."""
+        changed = False
+        while not self._changes.empty():
+            self._changes.get()
+            changed = True
+        return changed
+
+    def wait(self, timeout):
+        """Wait for a change of the table for up to timeout seconds.
+
+        The change is left to be returned by has_changes().
+        """
+        try:
+            self._changes.put(self._changes.get(timeout=timeout))
+        except queue.Empty:
+            pass
+
+    def _get_pid_to_kill(self):
+        pid = str(self._process.pid)
+        if self.root_helper:
+            # The process is the root helper, which runs ovsdb-client in a
+            # child of its own.
+            children = utils.find_child_pids(pid)
+            while children:
+                pid = children[0]
+                children = utils.find_child_pids(pid)
+        return pid
+
+    def _kill_process(self):
+        if not self._process:
+            return
+        try:
+            if self._process.poll() is None:
+                pid = self._get_pid_to_kill()
+                if self.root_helper:
+                    # ovsdb-client runs as root
+                    utils.execute(['kill', '-9', pid],
+                                  root_helper=self.root_helper)
+                else:
+                    self._process.kill()
+            self._process.wait()
+        except Exception:
+            LOG.exception(_("Unable to kill ovsdb-client"))
+        self._process = None
+
+    def _run(self):
+        cmd = ['ovsdb-client', 'monitor', 'Interface', ','.join(COLUMNS),
+               '--format=json']
+        while True:
+            try:
+                self._process, cmd_args = utils.create_process(
+                    cmd, root_helper=self.root_helper)
+                for line in iter(self._process.stdout.readline, ''):
+                    self._apply_update(line)
+                LOG.error(_("%(cmd)s exited: %(stderr)s"),
+                          {'cmd': cmd_args,
+                           'stderr': self._process.stderr.read()})
+            except Exception:
+                LOG.exception(_("Error monitoring the Interface table"))
+            self._active = False
+            self._kill_process()
+            self.interfaces.clear()
+            self._notify()
+            eventlet.sleep(self.respawn_interval)
+
+    def _apply_update(self, line):
+        update = jsonutils.loads(line)
+        headings = update['headings']
+        uuid = None
+        for values in update['data']:
+            row = dict(zip(headings, values))
+            action = row['action']
+            # The "new" row of a modification follows its "old" row and
+            # only the latter has the uuid.
+            uuid = row['row'] or uuid
+            if action == ACTION_DELETE:
+                self.interfaces.pop(uuid, None)
+            elif action != ACTION_OLD:
+                # Rows of other actions hold all the columns
+                self.interfaces[uuid] = {
+                    'name': row['name'],
+                    'ofport': val_to_py(row['ofport']),
+                    'external_ids': val_to_py(row['external_ids'])}
+        self._active = True
+        self._notify()
+
+    def _notify(self):
+        if self._changes.empty():
+            self._changes.put(None)
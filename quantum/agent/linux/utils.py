@@ -25,16 +25,24 @@ import struct
 import tempfile
 
 from eventlet.green import subprocess
+from oslo.config import cfg
 
 from quantum.common import utils
 from quantum.openstack.common import log as logging
+from quantum.rootwrap import client
 
 
 LOG = logging.getLogger(__name__)
 
+_daemon_clients = {}
 
-def execute(cmd, root_helper=None, process_input=None, addl_env=None,
-            check_exit_code=True, return_stderr=False):
+
+def create_process(cmd, root_helper=None, addl_env=None):
+    """Create a process object for the given command.
+
+    The return value will be a tuple of the process object and the
+    list of command arguments used to create it.
+    """
     if root_helper:
         cmd = shlex.split(root_helper) + cmd
     cmd = map(str, cmd)
@@ -48,16 +56,45 @@ def execute(cmd, root_helper=None, process_input=None, addl_env=None,
                                  stdout=subprocess.PIPE,
                                  stderr=subprocess.PIPE,
                                  env=env)
+    return obj, cmd
+
 
-    _stdout, _stderr = (process_input and
-                        obj.communicate(process_input) or
-                        obj.communicate())
-    obj.stdin.close()
+def get_daemon_client():
+    """Return the root helper daemon client if one is configured."""
+    try:
+        daemon_cmd = cfg.CONF.AGENT.root_helper_daemon
+    except (cfg.NoSuchOptError, cfg.NoSuchGroupError):
+        return None
+    if not daemon_cmd:
+        return None
+    if daemon_cmd not in _daemon_clients:
+        _daemon_clients[daemon_cmd] = client.Client(daemon_cmd)
+    return _daemon_clients[daemon_cmd]
+
+
+def execute(cmd, root_helper=None, process_input=None, addl_env=None,
+            check_exit_code=True, return_stderr=False):
+    # The daemon runs commands in its own environment, so commands
+    # needing extra environment variables still go through root_helper
+    daemon_client = root_helper and not addl_env and get_daemon_client()
+    if daemon_client:
+        cmd = map(str, cmd)
+        LOG.debug(_("Running command through root helper daemon: %s"), cmd)
+        returncode, _stdout, _stderr = daemon_client.execute(cmd,
+                                                             process_input)
+    else:
+        obj, cmd = create_process(cmd, root_helper=root_helper,
+                                  addl_env=addl_env)
+        _stdout, _stderr = (process_input and
+                            obj.communicate(process_input) or
+                            obj.communicate())
+        obj.stdin.close()
+        returncode = obj.returncode
     m = _("\nCommand: %(cmd)s\nExit code: %(code)s\nStdout: %(stdout)r\n"
-          "Stderr: %(stderr)r") % {'cmd': cmd, 'code': obj.returncode,
+          "Stderr: %(stderr)r") % {'cmd': cmd, 'code': returncode,
                                    'stdout': _stdout, 'stderr': _stderr}
     LOG.debug(m)
-    if obj.returncode and check_exit_code:
+    if returncode and check_exit_code:
         raise RuntimeError(m)
 
     return return_stderr and (_stdout, _stderr) or _stdout
@@ -89,3 +126,10 @@ def replace_file(file_name, data):
     tmp_file.close()
     os.chmod(tmp_file.name, 0644)
     os.rename(tmp_file.name, file_name)
+
+
+def find_child_pids(pid):
+    """Return the pids of the children of a process."""
+    raw_pids = execute(['ps', '--ppid', pid, '-o', 'pid='],
+                       check_exit_code=False)
+    return [x.strip() for x in raw_pids.split('\n') if x.strip()]
@@ -30,6 +30,9 @@ from quantum.openstack.common import uuidutils
 
 LOG = logging.getLogger(__name__)
 
+# Maximum number of devices sent to the plugin in one bulk device call
+DEVICES_CHUNK_SIZE = 100
+
 
 def create_consumers(dispatcher, prefix, topic_details):
     """Create agent RPC consumers.
@@ -50,6 +53,13 @@ def create_consumers(dispatcher, prefix, topic_details):
     return connection
 
 
+def chunk_devices(devices):
+    """Split devices into lists of at most DEVICES_CHUNK_SIZE devices."""
+    devices = list(devices)
+    return [devices[i:i + DEVICES_CHUNK_SIZE]
+            for i in xrange(0, len(devices), DEVICES_CHUNK_SIZE)]
+
+
 class PluginReportStateAPI(proxy.RpcProxy):
     BASE_RPC_API_VERSION = '1.0'
 
@@ -71,10 +81,13 @@ class PluginApi(proxy.RpcProxy):
 
     API version history:
         1.0 - Initial version.
+        1.2 - get_devices_details_list and update_devices_down.
+              (1.1 is used by the security group RPC API)
 
     '''
 
     BASE_RPC_API_VERSION = '1.0'
+    DEVICES_RPC_VERSION = '1.2'
 
     def __init__(self, topic):
         super(PluginApi, self).__init__(
@@ -92,6 +105,20 @@ class PluginApi(proxy.RpcProxy):
                                        agent_id=agent_id),
                          topic=self.topic)
 
+    def get_devices_details_list(self, context, devices, agent_id):
+        return self.call(context,
+                         self.make_msg('get_devices_details_list',
+                                       devices=devices, agent_id=agent_id),
+                         topic=self.topic,
+                         version=self.DEVICES_RPC_VERSION)
+
+    def update_devices_down(self, context, devices, agent_id):
+        return self.call(context,
+                         self.make_msg('update_devices_down',
+                                       devices=devices, agent_id=agent_id),
+                         topic=self.topic,
+                         version=self.DEVICES_RPC_VERSION)
+
     def update_device_up(self, context, device, agent_id):
         return self.call(context,
                          self.make_msg('update_device_up', device=device,
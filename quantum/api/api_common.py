@@ -15,6 +15,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import itertools
 import urllib
 
 from oslo.config import cfg
@@ -205,17 +207,23 @@ class PaginationEmulatedHelper(PaginationHelper):
             fields_to_add.append(self.primary_key)
 
     def paginate(self, items):
+        """Return the page of items, reading them only up to its end."""
         if not self.limit:
             return items
-        i = -1
+        items = iter(items)
+        if self.page_reverse:
+            # The items before the marker, or the last ones without marker
+            page = collections.deque(maxlen=self.limit)
+            for item in items:
+                if self.marker and item[self.primary_key] == self.marker:
+                    return list(page)
+                page.append(item)
+            return [] if self.marker else list(page)
         if self.marker:
             for item in items:
-                i = i + 1
                 if item[self.primary_key] == self.marker:
                     break
-        if self.page_reverse:
-            return items[i - self.limit:i]
-        return items[i + 1:i + self.limit + 1]
+        return list(itertools.islice(items, self.limit))
 
     def get_links(self, items):
         return get_pagination_links(
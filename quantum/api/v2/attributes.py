@@ -21,7 +21,6 @@ import re
 from quantum.common import constants
 from quantum.common import exceptions as q_exc
 from quantum.openstack.common import log as logging
-from quantum.openstack.common import uuidutils
 
 
 LOG = logging.getLogger(__name__)
@@ -103,6 +102,9 @@ def _validate_no_whitespace(data):
 
 
 def _validate_mac_address(data, valid_values=None):
+    if isinstance(data, basestring) and _MAC_RE.match(data):
+        # Spare netaddr the parsing of the common notation
+        return
     try:
         netaddr.EUI(_validate_no_whitespace(data))
     except Exception:
@@ -112,6 +114,9 @@ def _validate_mac_address(data, valid_values=None):
 
 
 def _validate_ip_address(data, valid_values=None):
+    if isinstance(data, basestring) and _IPV4_RE.match(data):
+        # Spare netaddr the parsing of dotted quads
+        return
     try:
         netaddr.IPAddress(_validate_no_whitespace(data))
     except Exception:
@@ -258,7 +263,8 @@ def _validate_regex(data, valid_values=None):
 
 
 def _validate_uuid(data, valid_values=None):
-    if not uuidutils.is_uuid_like(data):
+    # Same as uuidutils.is_uuid_like, without building a UUID object
+    if not (isinstance(data, basestring) and _UUID_RE.match(data)):
         msg = _("'%s' is not a valid UUID") % data
         LOG.debug(msg)
         return msg
@@ -437,6 +443,14 @@ UUID_PATTERN = '-'.join([HEX_ELEM + '{8}', HEX_ELEM + '{4}',
 # must be even.
 MAC_PATTERN = "^%s[aceACE02468](:%s{2}){5}$" % (HEX_ELEM, HEX_ELEM)
 
+# Patterns matching values in their canonical notation only, which are
+# known to be valid without further parsing
+_UUID_RE = re.compile('-'.join(['[0-9a-f]{8}', '[0-9a-f]{4}', '[0-9a-f]{4}',
+                                '[0-9a-f]{4}', '[0-9a-f]{12}']) + r'\Z')
+_MAC_RE = re.compile(r'%s{2}(:%s{2}){5}\Z' % (HEX_ELEM, HEX_ELEM))
+_IPV4_OCTET = '(25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])'
+_IPV4_RE = re.compile(r'\.'.join([_IPV4_OCTET] * 4) + r'\Z')
+
 # Dictionary that maintains a list of validation functions
 validators = {'type:dict': _validate_dict,
               'type:dict_or_none': _validate_dict_or_none,
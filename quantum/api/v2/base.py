@@ -43,6 +43,93 @@ FAULT_MAP = {exceptions.NotFound: webob.exc.HTTPNotFound,
              }
 
 
+def _get_validator(rule):
+    if rule in attributes.validators:
+        return attributes.validators[rule]
+    # The validator might be registered later on
+    return lambda data, params: attributes.validators[rule](data, params)
+
+
+def _distinct(values):
+    """Yield values once, leaving unhashable ones as they are."""
+    seen = set()
+    for value in values:
+        try:
+            # Compare the types too, so that e.g. 1 and True are not mixed
+            key = (type(value), value)
+            if key in seen:
+                continue
+            seen.add(key)
+        except TypeError:
+            pass
+        yield value
+
+
+class _RequestBodyPlan(object):
+    """Checks of request bodies compiled from an attribute map.
+
+    The attribute map is walked once, resolving the converters and
+    validators of the attributes, instead of once per request item.
+    """
+
+    def __init__(self, attr_info):
+        self.post_checks = [(attr, attr_vals.get('allow_post'),
+                             'default' in attr_vals, attr_vals.get('default'))
+                            for attr, attr_vals in attr_info.iteritems()]
+        self.read_only = [attr for attr, attr_vals in attr_info.iteritems()
+                          if not attr_vals.get('allow_put')]
+        self.conversions = []
+        for attr, attr_vals in attr_info.iteritems():
+            validators = [(_get_validator(rule), params) for rule, params
+                          in attr_vals.get('validate', {}).iteritems()]
+            if 'convert_to' in attr_vals or validators:
+                self.conversions.append(
+                    (attr, attr_vals.get('convert_to'), validators))
+
+    def check_post(self, res_dict):
+        for attr, allow_post, has_default, default in self.post_checks:
+            if allow_post:
+                if not has_default and attr not in res_dict:
+                    msg = _("Failed to parse request. Required "
+                            "attribute '%s' not specified") % attr
+                    raise webob.exc.HTTPBadRequest(msg)
+                res_dict.setdefault(attr, default)
+            elif attr in res_dict:
+                msg = _("Attribute '%s' not allowed in POST") % attr
+                raise webob.exc.HTTPBadRequest(msg)
+
+    def check_put(self, res_dict):
+        for attr in self.read_only:
+            if attr in res_dict:
+                msg = _("Cannot update read-only attribute %s") % attr
+                raise webob.exc.HTTPBadRequest(msg)
+
+    def convert_and_validate(self, res_dicts):
+        """Convert and validate the values of items attribute by attribute.
+
+        Values repeated across the items are validated once.
+        """
+        for attr, convert_to, validators in self.conversions:
+            values = []
+            for res_dict in res_dicts:
+                value = res_dict.get(attr, attributes.ATTR_NOT_SPECIFIED)
+                if value is attributes.ATTR_NOT_SPECIFIED:
+                    continue
+                # Convert values if necessary
+                if convert_to:
+                    value = res_dict[attr] = convert_to(value)
+                values.append(value)
+            # Check that configured values are correct
+            for validator, params in validators:
+                for value in _distinct(values):
+                    res = validator(value, params)
+                    if res:
+                        msg_dict = dict(attr=attr, reason=res)
+                        msg = _("Invalid input for %(attr)s. "
+                                "Reason: %(reason)s.") % msg_dict
+                        raise webob.exc.HTTPBadRequest(msg)
+
+
 class Controller(object):
     LIST = 'list'
     SHOW = 'show'
@@ -67,6 +154,7 @@ class Controller(object):
         self._native_sorting = self._is_native_sorting_supported()
         self._policy_attrs = [name for (name, info) in self._attr_info.items()
                               if info.get('required_by_policy')]
+        self._body_plan = _RequestBodyPlan(self._attr_info)
         self._publisher_id = notifier_api.publisher_id('network')
         self._dhcp_agent_notifier = dhcp_rpc_agent_api.DhcpAgentNotifyAPI()
         self._member_actions = member_actions
@@ -188,13 +276,22 @@ class Controller(object):
         pagination_helper.update_fields(original_fields, fields_to_add)
         if parent_id:
             kwargs[self._parent_id_name] = parent_id
-        obj_getter = getattr(self._plugin, self._plugin_handlers[self.LIST])
-        obj_list = obj_getter(request.context, **kwargs)
-        obj_list = sorting_helper.sort(obj_list)
-        obj_list = pagination_helper.paginate(obj_list)
+        conditions = True
+        if do_authz:
+            conditions = policy.get_conditions(
+                request.context, self._plugin_handlers[self.SHOW])
+            if not self._add_policy_filters(filters, conditions):
+                conditions = False
+        obj_list = []
+        if conditions is not False:
+            obj_getter = getattr(self._plugin,
+                                 self._plugin_handlers[self.LIST])
+            obj_list = obj_getter(request.context, **kwargs)
+            obj_list = sorting_helper.sort(obj_list)
+            obj_list = pagination_helper.paginate(obj_list)
 
         # Check authz
-        if do_authz:
+        if conditions is None:
             # FIXME(salvatore-orlando): obj_getter might return references to
             # other resources. Must check authZ on them too.
             # Omit items from list that should not be visible
@@ -203,6 +300,9 @@ class Controller(object):
                                         self._plugin_handlers[self.SHOW],
                                         obj,
                                         plugin=self._plugin)]
+        elif conditions is not True:
+            obj_list = [obj for obj in obj_list
+                        if policy.match_conditions(conditions, obj)]
         collection = {self._collection:
                       [self._view(obj,
                                   fields_to_strip=fields_to_add)
@@ -213,6 +313,24 @@ class Controller(object):
 
         return collection
 
+    def _add_policy_filters(self, filters, conditions):
+        """Filter the items on the conditions of the policy, if possible.
+
+        A single condition is added to the filters, so that the plugin does
+        not return items which are not allowed. Returns False if no item
+        can match both the filters and the condition.
+        """
+        if not isinstance(conditions, list) or len(conditions) != 1:
+            return True
+        for field, value in conditions[0].iteritems():
+            if field not in self._attr_info:
+                continue
+            values = [v for v in filters.get(field, [value]) if v == value]
+            if not values:
+                return False
+            filters[field] = values
+        return True
+
     def _item(self, request, id, do_authz=False, field_list=None,
               parent_id=None):
         """Retrieves and formats a single element of the requested entity"""
@@ -301,7 +419,8 @@ class Controller(object):
                             body)
         body = Controller.prepare_request_body(request.context, body, True,
                                                self._resource, self._attr_info,
-                                               allow_bulk=self._allow_bulk)
+                                               allow_bulk=self._allow_bulk,
+                                               plan=self._body_plan)
         action = self._plugin_handlers[self.CREATE]
         # Check authz
         if self._collection in body:
@@ -312,6 +431,9 @@ class Controller(object):
         else:
             items = [body]
             bulk = False
+        # Nothing is created before all the items are checked, so the
+        # resources of a tenant are counted once
+        counts = {}
         for item in items:
             self._validate_network_tenant_ownership(request,
                                                     item[self._resource])
@@ -321,9 +443,11 @@ class Controller(object):
                            plugin=self._plugin)
             try:
                 tenant_id = item[self._resource]['tenant_id']
-                count = quota.QUOTAS.count(request.context, self._resource,
-                                           self._plugin, self._collection,
-                                           tenant_id)
+                if tenant_id not in counts:
+                    counts[tenant_id] = quota.QUOTAS.count(
+                        request.context, self._resource, self._plugin,
+                        self._collection, tenant_id)
+                count = counts[tenant_id]
                 if bulk:
                     delta = deltas.get(tenant_id, 0) + 1
                     deltas[tenant_id] = delta
@@ -420,7 +544,8 @@ class Controller(object):
                             payload)
         body = Controller.prepare_request_body(request.context, body, False,
                                                self._resource, self._attr_info,
-                                               allow_bulk=self._allow_bulk)
+                                               allow_bulk=self._allow_bulk,
+                                               plan=self._body_plan)
         action = self._plugin_handlers[self.UPDATE]
         # Load object to check authz
         # but pass only attributes in the original body and required
@@ -479,7 +604,7 @@ class Controller(object):
 
     @staticmethod
     def prepare_request_body(context, body, is_create, resource, attr_info,
-                             allow_bulk=False):
+                             allow_bulk=False, plan=None):
         """ verifies required attributes are in request body, and that
             an attribute is only specified if it is allowed for the given
             operation (create/update).
@@ -487,74 +612,45 @@ class Controller(object):
             optional.
 
             body argument must be the deserialized body
+            plan is the _RequestBodyPlan of attr_info, compiled if not given
         """
         collection = resource + "s"
         if not body:
             raise webob.exc.HTTPBadRequest(_("Resource body required"))
 
-        prep_req_body = lambda x: Controller.prepare_request_body(
-            context,
-            x if resource in x else {resource: x},
-            is_create,
-            resource,
-            attr_info,
-            allow_bulk)
         if collection in body:
             if not allow_bulk:
                 raise webob.exc.HTTPBadRequest(_("Bulk operation "
                                                  "not supported"))
-            bulk_body = [prep_req_body(item) for item in body[collection]]
-            if not bulk_body:
+            bodies = [item if resource in item else {resource: item}
+                      for item in body[collection]]
+            if not bodies:
                 raise webob.exc.HTTPBadRequest(_("Resources required"))
-            return {collection: bulk_body}
-
-        res_dict = body.get(resource)
-        if res_dict is None:
-            msg = _("Unable to find '%s' in request body") % resource
-            raise webob.exc.HTTPBadRequest(msg)
+        else:
+            bodies = [body]
+
+        plan = plan or _RequestBodyPlan(attr_info)
+        res_dicts = []
+        for item in bodies:
+            res_dict = item.get(resource)
+            if res_dict is None:
+                msg = _("Unable to find '%s' in request body") % resource
+                raise webob.exc.HTTPBadRequest(msg)
 
-        Controller._populate_tenant_id(context, res_dict, is_create)
+            Controller._populate_tenant_id(context, res_dict, is_create)
 
-        Controller._verify_attributes(res_dict, attr_info)
+            Controller._verify_attributes(res_dict, attr_info)
 
-        if is_create:  # POST
-            for attr, attr_vals in attr_info.iteritems():
-                if attr_vals['allow_post']:
-                    if ('default' not in attr_vals and
-                        attr not in res_dict):
-                        msg = _("Failed to parse request. Required "
-                                "attribute '%s' not specified") % attr
-                        raise webob.exc.HTTPBadRequest(msg)
-                    res_dict[attr] = res_dict.get(attr,
-                                                  attr_vals.get('default'))
-                else:
-                    if attr in res_dict:
-                        msg = _("Attribute '%s' not allowed in POST") % attr
-                        raise webob.exc.HTTPBadRequest(msg)
-        else:  # PUT
-            for attr, attr_vals in attr_info.iteritems():
-                if attr in res_dict and not attr_vals['allow_put']:
-                    msg = _("Cannot update read-only attribute %s") % attr
-                    raise webob.exc.HTTPBadRequest(msg)
+            if is_create:  # POST
+                plan.check_post(res_dict)
+            else:  # PUT
+                plan.check_put(res_dict)
+            res_dicts.append(res_dict)
 
-        for attr, attr_vals in attr_info.iteritems():
-            if (attr not in res_dict or
-                res_dict[attr] is attributes.ATTR_NOT_SPECIFIED):
-                continue
-            # Convert values if necessary
-            if 'convert_to' in attr_vals:
-                res_dict[attr] = attr_vals['convert_to'](res_dict[attr])
-            # Check that configured values are correct
-            if 'validate' not in attr_vals:
-                continue
-            for rule in attr_vals['validate']:
-                res = attributes.validators[rule](res_dict[attr],
-                                                  attr_vals['validate'][rule])
-                if res:
-                    msg_dict = dict(attr=attr, reason=res)
-                    msg = _("Invalid input for %(attr)s. "
-                            "Reason: %(reason)s.") % msg_dict
-                    raise webob.exc.HTTPBadRequest(msg)
+        # Bulk bodies are converted and validated attribute by attribute
+        plan.convert_and_validate(res_dicts)
+        if collection in body:
+            return {collection: bodies}
         return body
 
     @staticmethod
@@ -55,6 +55,14 @@ core_opts = [
                help=_("The base MAC address Quantum will use for VIFs")),
     cfg.IntOpt('mac_generation_retries', default=16,
                help=_("How many times Quantum will retry MAC generation")),
+    cfg.IntOpt('mac_block_lease_duration', default=600,
+               help=_("Seconds a server leases a block of MAC addresses "
+                      "for. MAC addresses are generated from a block "
+                      "during the first half of its lease")),
+    cfg.StrOpt('ipam_backend',
+               default='quantum.db.ipam.BitmapIpamBackend',
+               help=_("The backend keeping track of the available IP "
+                      "addresses of subnets")),
     cfg.BoolOpt('allow_bulk', default=True,
                 help=_("Allow the usage of the bulk API")),
     cfg.BoolOpt('allow_pagination', default=False,
@@ -201,6 +201,17 @@ def clear_db(base=BASE):
     _ENGINE = None
 
 
+def dispose():
+    """Close the idle connections of the engine, if any.
+
+    The engine opens new connections when they are needed again, so this
+    can be called at any time, e.g. before forking a process that must not
+    share them.
+    """
+    if _ENGINE:
+        _ENGINE.dispose()
+
+
 def get_session(autocommit=True, expire_on_commit=False):
     """Helper method to grab session"""
     global _MAKER, _ENGINE
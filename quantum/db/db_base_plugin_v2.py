@@ -16,10 +16,10 @@
 #    under the License.
 
 import datetime
-import random
 
 import netaddr
 from oslo.config import cfg
+from sqlalchemy import exc as sql_exc
 from sqlalchemy import orm
 from sqlalchemy.orm import exc
 
@@ -27,6 +27,8 @@ from quantum.api.v2 import attributes
 from quantum.common import constants
 from quantum.common import exceptions as q_exc
 from quantum.db import api as db
+from quantum.db import ipam
+from quantum.db import mac_allocator
 from quantum.db import models_v2
 from quantum.db import sqlalchemyutils
 from quantum.openstack.common import log as logging
@@ -70,6 +72,17 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
     # To this aim, the register_model_query_hook and unregister_query_hook
     # from this class should be invoked
     _model_query_hooks = {}
+    # Relationships read by the _make_<resource>_dict methods, as
+    # {model: {field: relationship}}. Collection queries load them with
+    # the rows when the field is requested, and the dict methods skip them
+    # otherwise. Mixins add theirs with register_dict_relationship().
+    _dict_relationships = {
+        models_v2.Network: {'subnets': 'subnets'},
+        models_v2.Subnet: {'allocation_pools': 'allocation_pools',
+                           'dns_nameservers': 'dns_nameservers',
+                           'host_routes': 'routes'},
+        models_v2.Port: {'fixed_ips': 'fixed_ips'},
+    }
 
     def __init__(self):
         # NOTE(jkoelker) This is an incomlete implementation. Subclasses
@@ -142,6 +155,11 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
         model_hooks[name] = {'query': query_hook, 'filter': filter_hook,
                              'result_filters': result_filters}
 
+    @classmethod
+    def register_dict_relationship(cls, model, field, relationship):
+        """Register a relationship read for a field of a resource dict."""
+        cls._dict_relationships.setdefault(model, {})[field] = relationship
+
     def _get_by_id(self, context, model, id):
         query = self._model_query(context, model)
         return query.filter(model.id == id).one()
@@ -217,11 +235,51 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                     query = result_filter(self, query, filters)
         return query
 
+    def _apply_eager_loading(self, query, model, fields):
+        """Load the relationships needed for the fields with the query."""
+        relationships = self._dict_relationships.get(model, {})
+        for field, relationship in relationships.iteritems():
+            if fields and field not in fields:
+                continue
+            prop = orm.class_mapper(model).get_property(relationship)
+            # Collections are loaded with one query for all the rows
+            loader = orm.subqueryload if prop.uselist else orm.joinedload
+            query = query.options(loader(relationship))
+        return query
+
+    def _get_dict_columns(self, model, dict_func, fields):
+        """Return the columns of the fields, if the dicts can be read as rows.
+
+        When all the fields are columns of the model and the dicts are built
+        by the method of this class, the rows are read without loading the
+        model objects. Dicts built by subclasses may hold more fields.
+        """
+        if not fields:
+            return
+        base = getattr(QuantumDbPluginV2, dict_func.__name__, None)
+        if (base is None or
+                getattr(dict_func, 'im_func', None) is not base.im_func):
+            return
+        mapper = orm.class_mapper(model)
+        for field in fields:
+            if not (mapper.has_property(field) and
+                    isinstance(mapper.get_property(field),
+                               orm.ColumnProperty)):
+                return
+        return [getattr(model, field) for field in fields]
+
+    def _get_dicts(self, query, dict_func, fields, columns=None):
+        if columns:
+            query = query.with_entities(*columns)
+            return [dict(zip(fields, row)) for row in query]
+        return [dict_func(c, fields) for c in query.all()]
+
     def _get_collection_query(self, context, model, filters=None,
                               sorts=None, limit=None, marker_obj=None,
-                              page_reverse=False):
+                              page_reverse=False, fields=None):
         collection = self._model_query(context, model)
         collection = self._apply_filters_to_query(collection, model, filters)
+        collection = self._apply_eager_loading(collection, model, fields)
         if limit and page_reverse and sorts:
             sorts = [(s[0], not s[1]) for s in sorts]
         collection = sqlalchemyutils.paginate_query(collection, model, limit,
@@ -236,8 +294,10 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                                            sorts=sorts,
                                            limit=limit,
                                            marker_obj=marker_obj,
-                                           page_reverse=page_reverse)
-        items = [dict_func(c, fields) for c in query.all()]
+                                           page_reverse=page_reverse,
+                                           fields=fields)
+        columns = self._get_dict_columns(model, dict_func, fields)
+        items = self._get_dicts(query, dict_func, fields, columns)
         if limit and page_reverse:
             items.reverse()
         return items
@@ -247,28 +307,27 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
 
     @staticmethod
     def _generate_mac(context, network_id):
-        base_mac = cfg.CONF.base_mac.split(':')
-        max_retries = cfg.CONF.mac_generation_retries
-        for i in range(max_retries):
-            mac = [int(base_mac[0], 16), int(base_mac[1], 16),
-                   int(base_mac[2], 16), random.randint(0x00, 0xff),
-                   random.randint(0x00, 0xff), random.randint(0x00, 0xff)]
-            if base_mac[3] != '00':
-                mac[3] = int(base_mac[3], 16)
-            mac_address = ':'.join(map(lambda x: "%02x" % x, mac))
-            if QuantumDbPluginV2._check_unique_mac(context, network_id,
-                                                   mac_address):
-                LOG.debug(_("Generated mac for network %(network_id)s "
-                            "is %(mac_address)s"), locals())
-                return mac_address
-            else:
-                LOG.debug(_("Generated mac %(mac_address)s exists. Remaining "
-                            "attempts %(max_retries)s."),
-                          {'mac_address': mac_address,
-                           'max_retries': max_retries - (i + 1)})
-        LOG.error(_("Unable to generate mac address after %s attempts"),
-                  max_retries)
-        raise q_exc.MacAddressGenerationFailure(net_id=network_id)
+        mac_address = mac_allocator.get_allocator().allocate(context,
+                                                             network_id)
+        LOG.debug(_("Generated mac for network %(network_id)s "
+                    "is %(mac_address)s"), locals())
+        return mac_address
+
+    @staticmethod
+    def _insert_port(context, port, generated_mac):
+        """Insert a port added to the session.
+
+        MAC addresses are unique on a network in the database. The allocator
+        of a server does not know of the ones specified by other servers
+        after it leased a block, so a generated one may be in use.
+        """
+        try:
+            context.session.flush()
+        except sql_exc.IntegrityError:
+            if generated_mac:
+                raise q_exc.MacAddressGenerationFailure(net_id=port.network_id)
+            raise q_exc.MacAddressInUse(net_id=port.network_id,
+                                        mac=port.mac_address)
 
     @staticmethod
     def _check_unique_mac(context, network_id, mac_address):
@@ -330,81 +389,20 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
         """Return an IP address to the pool of free IP's on the network
         subnet.
         """
-        # Grab all allocation pools for the subnet
-        pool_qry = context.session.query(
-            models_v2.IPAllocationPool).with_lockmode('update')
-        allocation_pools = pool_qry.filter_by(subnet_id=subnet_id).all()
         # Find the allocation pool for the IP to recycle
-        pool_id = None
+        pool_qry = context.session.query(models_v2.IPAllocationPool)
+        allocation_pools = pool_qry.filter_by(subnet_id=subnet_id).all()
         for allocation_pool in allocation_pools:
             allocation_pool_range = netaddr.IPRange(
                 allocation_pool['first_ip'],
                 allocation_pool['last_ip'])
             if netaddr.IPAddress(ip_address) in allocation_pool_range:
-                pool_id = allocation_pool['id']
                 break
-        if not pool_id:
+        else:
             error_message = _("No allocation pool found for "
                               "ip address:%s") % ip_address
             raise q_exc.InvalidInput(error_message=error_message)
-        # Two requests will be done on the database. The first will be to
-        # search if an entry starts with ip_address + 1 (r1). The second
-        # will be to see if an entry ends with ip_address -1 (r2).
-        # If 1 of the above holds true then the specific entry will be
-        # modified. If both hold true then the two ranges will be merged.
-        # If there are no entries then a single entry will be added.
-        range_qry = context.session.query(
-            models_v2.IPAvailabilityRange).with_lockmode('update')
-        ip_first = str(netaddr.IPAddress(ip_address) + 1)
-        ip_last = str(netaddr.IPAddress(ip_address) - 1)
-        LOG.debug(_("Recycle %s"), ip_address)
-        try:
-            r1 = range_qry.filter_by(allocation_pool_id=pool_id,
-                                     first_ip=ip_first).one()
-            LOG.debug(_("Recycle: first match for %(first_ip)s-%(last_ip)s"),
-                      {'first_ip': r1['first_ip'], 'last_ip': r1['last_ip']})
-        except exc.NoResultFound:
-            r1 = []
-        try:
-            r2 = range_qry.filter_by(allocation_pool_id=pool_id,
-                                     last_ip=ip_last).one()
-            LOG.debug(_("Recycle: last match for %(first_ip)s-%(last_ip)s"),
-                      {'first_ip': r2['first_ip'], 'last_ip': r2['last_ip']})
-        except exc.NoResultFound:
-            r2 = []
-
-        if r1 and r2:
-            # Merge the two ranges
-            ip_range = models_v2.IPAvailabilityRange(
-                allocation_pool_id=pool_id,
-                first_ip=r2['first_ip'],
-                last_ip=r1['last_ip'])
-            context.session.add(ip_range)
-            LOG.debug(_("Recycle: merged %(first_ip1)s-%(last_ip1)s and "
-                        "%(first_ip2)s-%(last_ip2)s"),
-                      {'first_ip1': r2['first_ip'], 'last_ip1': r2['last_ip'],
-                       'first_ip2': r1['first_ip'], 'last_ip2': r1['last_ip']})
-            context.session.delete(r1)
-            context.session.delete(r2)
-        elif r1:
-            # Update the range with matched first IP
-            r1['first_ip'] = ip_address
-            LOG.debug(_("Recycle: updated first %(first_ip)s-%(last_ip)s"),
-                      {'first_ip': r1['first_ip'], 'last_ip': r1['last_ip']})
-        elif r2:
-            # Update the range with matched last IP
-            r2['last_ip'] = ip_address
-            LOG.debug(_("Recycle: updated last %(first_ip)s-%(last_ip)s"),
-                      {'first_ip': r2['first_ip'], 'last_ip': r2['last_ip']})
-        else:
-            # Create a new range
-            ip_range = models_v2.IPAvailabilityRange(
-                allocation_pool_id=pool_id,
-                first_ip=ip_address,
-                last_ip=ip_address)
-            context.session.add(ip_range)
-            LOG.debug(_("Recycle: created new %(first_ip)s-%(last_ip)s"),
-                      {'first_ip': ip_address, 'last_ip': ip_address})
+        ipam.get_backend().release_ip(context, allocation_pool, ip_address)
         QuantumDbPluginV2._delete_ip_allocation(context, network_id, subnet_id,
                                                 ip_address)
 
@@ -450,66 +448,21 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
         The IP address will be generated from one of the subnets defined on
         the network.
         """
-        range_qry = context.session.query(
-            models_v2.IPAvailabilityRange).join(
-                models_v2.IPAllocationPool).with_lockmode('update')
+        backend = ipam.get_backend()
         for subnet in subnets:
-            range = range_qry.filter_by(subnet_id=subnet['id']).first()
-            if not range:
-                LOG.debug(_("All IP's from subnet %(subnet_id)s (%(cidr)s) "
-                            "allocated"),
-                          {'subnet_id': subnet['id'], 'cidr': subnet['cidr']})
-                continue
-            ip_address = range['first_ip']
-            LOG.debug(_("Allocated IP - %(ip_address)s from %(first_ip)s "
-                        "to %(last_ip)s"),
-                      {'ip_address': ip_address,
-                       'first_ip': range['first_ip'],
-                       'last_ip': range['last_ip']})
-            if range['first_ip'] == range['last_ip']:
-                # No more free indices on subnet => delete
-                LOG.debug(_("No more free IP's in slice. Deleting allocation "
-                            "pool."))
-                context.session.delete(range)
-            else:
-                # increment the first free
-                range['first_ip'] = str(netaddr.IPAddress(ip_address) + 1)
-            return {'ip_address': ip_address, 'subnet_id': subnet['id']}
+            ip_address = backend.generate_ip(context, subnet)
+            if ip_address:
+                return {'ip_address': ip_address, 'subnet_id': subnet['id']}
+            LOG.debug(_("All IP's from subnet %(subnet_id)s (%(cidr)s) "
+                        "allocated"),
+                      {'subnet_id': subnet['id'], 'cidr': subnet['cidr']})
         raise q_exc.IpAddressGenerationFailure(net_id=subnets[0]['network_id'])
 
     @staticmethod
     def _allocate_specific_ip(context, subnet_id, ip_address):
         """Allocate a specific IP address on the subnet."""
-        ip = int(netaddr.IPAddress(ip_address))
-        range_qry = context.session.query(
-            models_v2.IPAvailabilityRange,
-            models_v2.IPAllocationPool).join(
-                models_v2.IPAllocationPool).with_lockmode('update')
-        results = range_qry.filter_by(subnet_id=subnet_id).all()
-        for (range, pool) in results:
-            first = int(netaddr.IPAddress(range['first_ip']))
-            last = int(netaddr.IPAddress(range['last_ip']))
-            if first <= ip <= last:
-                if first == last:
-                    context.session.delete(range)
-                    return
-                elif first == ip:
-                    range['first_ip'] = str(netaddr.IPAddress(ip_address) + 1)
-                    return
-                elif last == ip:
-                    range['last_ip'] = str(netaddr.IPAddress(ip_address) - 1)
-                    return
-                else:
-                    # Split into two ranges
-                    new_first = str(netaddr.IPAddress(ip_address) + 1)
-                    new_last = range['last_ip']
-                    range['last_ip'] = str(netaddr.IPAddress(ip_address) - 1)
-                    ip_range = models_v2.IPAvailabilityRange(
-                        allocation_pool_id=pool['id'],
-                        first_ip=new_first,
-                        last_ip=new_last)
-                    context.session.add(ip_range)
-                    return
+        ipam.get_backend().allocate_specific_ip(context, subnet_id,
+                                                ip_address)
 
     @staticmethod
     def _check_unique_ip(context, network_id, subnet_id, ip_address):
@@ -561,13 +514,18 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                 return True
         return False
 
-    def _test_fixed_ips_for_port(self, context, network_id, fixed_ips):
+    def _test_fixed_ips_for_port(self, context, network_id, fixed_ips,
+                                 network_subnets=None, check_unique=True):
         """Test fixed IPs for port.
 
         Check that configured subnets are valid prior to allocating any
         IPs. Include the subnet_id in the result if only an IP address is
         configured.
 
+        :param network_subnets: the subnets of the network, if they are
+                                already loaded.
+        :param check_unique: whether to check that the IP addresses are
+                             not in use.
         :raises: InvalidInput, IpAddressInUse
         """
         fixed_ip_set = []
@@ -578,8 +536,10 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                     msg = _('IP allocation requires subnet_id or ip_address')
                     raise q_exc.InvalidInput(error_message=msg)
 
-                filter = {'network_id': [network_id]}
-                subnets = self.get_subnets(context, filters=filter)
+                subnets = network_subnets
+                if subnets is None:
+                    filter = {'network_id': [network_id]}
+                    subnets = self.get_subnets(context, filters=filter)
                 for subnet in subnets:
                     if QuantumDbPluginV2._check_subnet_ip(subnet['cidr'],
                                                           fixed['ip_address']):
@@ -591,7 +551,13 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                             'networks subnets') % fixed['ip_address']
                     raise q_exc.InvalidInput(error_message=msg)
             else:
-                subnet = self._get_subnet(context, fixed['subnet_id'])
+                subnet = None
+                for network_subnet in network_subnets or []:
+                    if network_subnet['id'] == fixed['subnet_id']:
+                        subnet = network_subnet
+                        break
+                if subnet is None:
+                    subnet = self._get_subnet(context, fixed['subnet_id'])
                 if subnet['network_id'] != network_id:
                     msg = (_("Failed to create port on network %(network_id)s"
                              ", because fixed_ips included invalid subnet "
@@ -603,9 +569,10 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
 
             if 'ip_address' in fixed:
                 # Ensure that the IP's are unique
-                if not QuantumDbPluginV2._check_unique_ip(context, network_id,
-                                                          subnet_id,
-                                                          fixed['ip_address']):
+                if (check_unique and
+                    not QuantumDbPluginV2._check_unique_ip(
+                        context, network_id, subnet_id,
+                        fixed['ip_address'])):
                     raise q_exc.IpAddressInUse(net_id=network_id,
                                                ip_address=fixed['ip_address'])
 
@@ -715,19 +682,22 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                                 'subnet_id': result['subnet_id']})
         return ips
 
-    def _validate_subnet_cidr(self, context, network, new_subnet_cidr):
+    def _validate_subnet_cidr(self, context, network, new_subnet_cidr,
+                              subnet_list=None):
         """Validate the CIDR for a subnet.
 
         Verifies the specified CIDR does not overlap with the ones defined
         for the other subnets specified for this network, or with any other
-        CIDR if overlapping IPs are disabled.
+        CIDR if overlapping IPs are disabled. Those subnets are looked up
+        unless given in subnet_list.
 
         """
         new_subnet_ipset = netaddr.IPSet([new_subnet_cidr])
-        if cfg.CONF.allow_overlapping_ips:
-            subnet_list = network.subnets
-        else:
-            subnet_list = self._get_all_subnets(context)
+        if subnet_list is None:
+            if cfg.CONF.allow_overlapping_ips:
+                subnet_list = network.subnets
+            else:
+                subnet_list = self._get_all_subnets(context)
         for subnet in subnet_list:
             if (netaddr.IPSet([subnet.cidr]) & new_subnet_ipset):
                 # don't give out details of the overlapping subnet
@@ -880,10 +850,9 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                'tenant_id': network['tenant_id'],
                'admin_state_up': network['admin_state_up'],
                'status': network['status'],
-               'shared': network['shared'],
-               'subnets': [subnet['id']
-                           for subnet in network['subnets']]}
-
+               'shared': network['shared']}
+        if not fields or 'subnets' in fields:
+            res['subnets'] = [subnet['id'] for subnet in network['subnets']]
         return self._fields(res, fields)
 
     def _make_subnet_dict(self, subnet, fields=None):
@@ -893,18 +862,21 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                'network_id': subnet['network_id'],
                'ip_version': subnet['ip_version'],
                'cidr': subnet['cidr'],
-               'allocation_pools': [{'start': pool['first_ip'],
-                                     'end': pool['last_ip']}
-                                    for pool in subnet['allocation_pools']],
                'gateway_ip': subnet['gateway_ip'],
                'enable_dhcp': subnet['enable_dhcp'],
-               'dns_nameservers': [dns['address']
-                                   for dns in subnet['dns_nameservers']],
-               'host_routes': [{'destination': route['destination'],
-                                'nexthop': route['nexthop']}
-                               for route in subnet['routes']],
                'shared': subnet['shared']
                }
+        if not fields or 'allocation_pools' in fields:
+            res['allocation_pools'] = [{'start': pool['first_ip'],
+                                        'end': pool['last_ip']}
+                                       for pool in subnet['allocation_pools']]
+        if not fields or 'dns_nameservers' in fields:
+            res['dns_nameservers'] = [dns['address']
+                                      for dns in subnet['dns_nameservers']]
+        if not fields or 'host_routes' in fields:
+            res['host_routes'] = [{'destination': route['destination'],
+                                   'nexthop': route['nexthop']}
+                                  for route in subnet['routes']]
         return self._fields(res, fields)
 
     def _make_port_dict(self, port, fields=None):
@@ -915,11 +887,12 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                "mac_address": port["mac_address"],
                "admin_state_up": port["admin_state_up"],
                "status": port["status"],
-               "fixed_ips": [{'subnet_id': ip["subnet_id"],
-                              'ip_address': ip["ip_address"]}
-                             for ip in port["fixed_ips"]],
                "device_id": port["device_id"],
                "device_owner": port["device_owner"]}
+        if not fields or 'fixed_ips' in fields:
+            res['fixed_ips'] = [{'subnet_id': ip["subnet_id"],
+                                 'ip_address': ip["ip_address"]}
+                                for ip in port["fixed_ips"]]
         return self._fields(res, fields)
 
     def _create_bulk(self, resource, context, request_items):
@@ -939,14 +912,332 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
             raise e
         return objects
 
+    def _has_native_create(self, resource):
+        """Whether create_<resource> is the one of this class.
+
+        Subclasses extending create_<resource> rely on it being called for
+        every item, so their bulk requests go through _create_bulk.
+        """
+        method = getattr(self, 'create_%s' % resource)
+        base = getattr(QuantumDbPluginV2, 'create_%s' % resource)
+        return getattr(method, 'im_func', None) is base.im_func
+
+    def _get_networks_by_ids(self, context, ids):
+        query = self._model_query(context, models_v2.Network)
+        query = query.filter(models_v2.Network.id.in_(ids))
+        networks = dict((network.id, network) for network in query)
+        for id in ids:
+            if id not in networks:
+                raise q_exc.NetworkNotFound(net_id=id)
+        return networks
+
+    def _create_networks_native(self, context, networks):
+        """Create the networks of a bulk request in one flush."""
+        items = [item['network'] for item in networks['networks']]
+        tenant_ids = [self._get_tenant_id_for_create(context, n)
+                      for n in items]
+        results = []
+        with context.session.begin(subtransactions=True):
+            for n, tenant_id in zip(items, tenant_ids):
+                args = self._get_network_args(n, tenant_id)
+                context.session.add(models_v2.Network(**args))
+                results.append(self._make_network_dict(dict(args,
+                                                            subnets=[])))
+        return results
+
+    def _create_subnets_native(self, context, subnets):
+        """Create the subnets of a bulk request in one flush.
+
+        The CIDRs are checked against the subnets read once for the whole
+        batch, and against each other.
+        """
+        items = [item['subnet'] for item in subnets['subnets']]
+        for s in items:
+            self._prepare_subnet(context, s)
+        tenant_ids = [self._get_tenant_id_for_create(context, s)
+                      for s in items]
+        backend = ipam.get_backend()
+        results = []
+        with context.session.begin(subtransactions=True):
+            networks = self._get_networks_by_ids(
+                context, set(s['network_id'] for s in items))
+            subnet_query = context.session.query(models_v2.Subnet)
+            if cfg.CONF.allow_overlapping_ips:
+                subnet_query = subnet_query.filter(
+                    models_v2.Subnet.network_id.in_(networks.keys()))
+            subnet_list = subnet_query.all()
+            for s, tenant_id in zip(items, tenant_ids):
+                network = networks[s['network_id']]
+                self._validate_subnet_cidr(
+                    context, network, s['cidr'],
+                    [subnet for subnet in subnet_list
+                     if (not cfg.CONF.allow_overlapping_ips or
+                         subnet.network_id == network.id)])
+                subnet = models_v2.Subnet(
+                    tenant_id=tenant_id,
+                    id=s.get('id') or uuidutils.generate_uuid(),
+                    name=s['name'],
+                    network_id=s['network_id'],
+                    ip_version=s['ip_version'],
+                    cidr=s['cidr'],
+                    enable_dhcp=s['enable_dhcp'],
+                    gateway_ip=s['gateway_ip'],
+                    shared=network.shared)
+                context.session.add(subnet)
+                subnet_list.append(subnet)
+                res = dict(subnet, allocation_pools=[], dns_nameservers=[],
+                           routes=[])
+                if s['dns_nameservers'] is not attributes.ATTR_NOT_SPECIFIED:
+                    for addr in s['dns_nameservers']:
+                        ns = models_v2.DNSNameServer(address=addr,
+                                                     subnet_id=subnet.id)
+                        context.session.add(ns)
+                        res['dns_nameservers'].append(ns)
+                if s['host_routes'] is not attributes.ATTR_NOT_SPECIFIED:
+                    for rt in s['host_routes']:
+                        route = models_v2.SubnetRoute(
+                            subnet_id=subnet.id,
+                            destination=rt['destination'],
+                            nexthop=rt['nexthop'])
+                        context.session.add(route)
+                        res['routes'].append(route)
+                for pool in s['allocation_pools']:
+                    ip_pool = models_v2.IPAllocationPool(
+                        id=uuidutils.generate_uuid(),
+                        subnet_id=subnet.id,
+                        first_ip=pool['start'],
+                        last_ip=pool['end'])
+                    context.session.add(ip_pool)
+                    backend.create_pool(context, ip_pool)
+                    res['allocation_pools'].append(ip_pool)
+                results.append(self._make_subnet_dict(res))
+        return results
+
+    def _test_macs_for_ports(self, context, items):
+        """Check that the MAC addresses given to the ports are unique."""
+        macs = set()
+        for p in items:
+            if p['mac_address'] is attributes.ATTR_NOT_SPECIFIED:
+                continue
+            key = (p['network_id'], p['mac_address'])
+            if key in macs:
+                raise q_exc.MacAddressInUse(net_id=p['network_id'],
+                                            mac=p['mac_address'])
+            macs.add(key)
+        if not macs:
+            return
+        mac_qry = context.session.query(models_v2.Port.network_id,
+                                        models_v2.Port.mac_address)
+        mac_qry = mac_qry.filter(
+            models_v2.Port.mac_address.in_(set(mac for net, mac in macs)),
+            models_v2.Port.network_id.in_(set(net for net, mac in macs)))
+        for network_id, mac_address in mac_qry:
+            if (network_id, mac_address) in macs:
+                raise q_exc.MacAddressInUse(net_id=network_id,
+                                            mac=mac_address)
+
+    def _test_ips_for_ports(self, context, fixed_ip_sets):
+        """Check that the IP addresses given to the ports are unique.
+
+        :param fixed_ip_sets: (network_id, fixed_ips) pairs, the fixed IPs
+                              being results of _test_fixed_ips_for_port().
+        """
+        ips = set()
+        for network_id, fixed_ips in fixed_ip_sets:
+            for fixed in fixed_ips:
+                if 'ip_address' not in fixed:
+                    continue
+                key = (network_id, fixed['subnet_id'], fixed['ip_address'])
+                if key in ips:
+                    raise q_exc.IpAddressInUse(net_id=network_id,
+                                               ip_address=fixed['ip_address'])
+                ips.add(key)
+        if not ips:
+            return
+        ip_qry = context.session.query(models_v2.IPAllocation.network_id,
+                                       models_v2.IPAllocation.subnet_id,
+                                       models_v2.IPAllocation.ip_address)
+        ip_qry = ip_qry.filter(
+            models_v2.IPAllocation.ip_address.in_(
+                set(ip for net, subnet, ip in ips)),
+            models_v2.IPAllocation.subnet_id.in_(
+                set(subnet for net, subnet, ip in ips)))
+        for network_id, subnet_id, ip_address in ip_qry:
+            if (network_id, subnet_id, ip_address) in ips:
+                raise q_exc.IpAddressInUse(net_id=network_id,
+                                           ip_address=ip_address)
+
+    @staticmethod
+    def _generate_ips(context, subnets, count):
+        """Generate count IP addresses from the subnets, in order."""
+        backend = ipam.get_backend()
+        ips = []
+        for subnet in subnets:
+            ips.extend({'ip_address': ip_address, 'subnet_id': subnet['id']}
+                       for ip_address in backend.generate_ips(
+                           context, subnet, count - len(ips)))
+            if len(ips) == count:
+                return ips
+            LOG.debug(_("All IP's from subnet %(subnet_id)s (%(cidr)s) "
+                        "allocated"),
+                      {'subnet_id': subnet['id'], 'cidr': subnet['cidr']})
+        raise q_exc.IpAddressGenerationFailure(net_id=subnets[0]['network_id'])
+
+    def _create_ports_native(self, context, ports):
+        """Create the ports of a bulk request in one flush.
+
+        All the ports are validated before anything is allocated, with one
+        query per check for the whole batch. The MAC addresses are then
+        leased for the batch at once, and the IP addresses are generated
+        in one pass per set of subnets they are taken from.
+        """
+        items = [item['port'] for item in ports['ports']]
+        tenant_ids = [self._get_tenant_id_for_create(context, p)
+                      for p in items]
+        backend = ipam.get_backend()
+        allocator = mac_allocator.get_allocator()
+        results = []
+        with context.session.begin(subtransactions=True):
+            network_ids = set(p['network_id'] for p in items)
+            for network_id in network_ids:
+                self._recycle_expired_ip_allocations(context, network_id)
+            self._get_networks_by_ids(context, network_ids)
+            subnet_qry = self._model_query(context, models_v2.Subnet)
+            subnet_qry = subnet_qry.filter(
+                models_v2.Subnet.network_id.in_(network_ids))
+            network_subnets = dict((network_id, [])
+                                   for network_id in network_ids)
+            subnets_by_id = {}
+            for subnet in subnet_qry:
+                network_subnets[subnet.network_id].append(subnet)
+                subnets_by_id[subnet.id] = subnet
+
+            # Validate the whole batch
+            self._test_macs_for_ports(context, items)
+            fixed_ip_sets = []
+            for p in items:
+                if p['fixed_ips'] is attributes.ATTR_NOT_SPECIFIED:
+                    fixed_ip_sets.append((p['network_id'], None))
+                    continue
+                fixed_ip_sets.append((p['network_id'],
+                                      self._test_fixed_ips_for_port(
+                                          context, p['network_id'],
+                                          p['fixed_ips'],
+                                          network_subnets[p['network_id']],
+                                          check_unique=False)))
+            self._test_ips_for_ports(
+                context, [(network_id, fixed_ips)
+                          for network_id, fixed_ips in fixed_ip_sets
+                          if fixed_ips])
+
+            # Allocate the MAC addresses. The specified ones are discarded
+            # before any is generated, so that none of them is generated
+            # for another port of the batch.
+            generated = [p for p in items
+                         if p['mac_address'] is attributes.ATTR_NOT_SPECIFIED]
+            specified = set(
+                p['mac_address'].lower() for p in items
+                if p['mac_address'] is not attributes.ATTR_NOT_SPECIFIED)
+            if generated:
+                allocator.reserve(context, generated[0]['network_id'],
+                                  len(generated))
+            for mac_address in specified:
+                allocator.discard(mac_address)
+            macs = []
+            for p in items:
+                if p['mac_address'] is attributes.ATTR_NOT_SPECIFIED:
+                    mac_address = allocator.allocate(context, p['network_id'])
+                    # NOTE: a block leased while allocating was not
+                    #       discarded from.
+                    while mac_address in specified:
+                        mac_address = allocator.allocate(context,
+                                                         p['network_id'])
+                    macs.append(mac_address)
+                else:
+                    macs.append(p['mac_address'])
+
+            # Allocate the IP addresses. The ones to generate are grouped
+            # by the subnets they are taken from, as
+            # [(subnets, [ip dict to fill])].
+            port_ips = []
+            to_generate = {}
+            for network_id, fixed_ips in fixed_ip_sets:
+                ips = []
+                if fixed_ips is None:
+                    subnets = network_subnets[network_id]
+                    for version in (4, 6):
+                        version_subnets = [subnet for subnet in subnets
+                                           if subnet['ip_version'] == version]
+                        if version_subnets:
+                            ips.append({})
+                            to_generate.setdefault(
+                                tuple(subnet['id']
+                                      for subnet in version_subnets),
+                                (version_subnets, []))[1].append(ips[-1])
+                else:
+                    for fixed in fixed_ips:
+                        if 'ip_address' in fixed:
+                            backend.allocate_specific_ip(
+                                context, fixed['subnet_id'],
+                                fixed['ip_address'])
+                            ips.append(dict(fixed))
+                        else:
+                            subnet = subnets_by_id[fixed['subnet_id']]
+                            ips.append({})
+                            to_generate.setdefault(
+                                (subnet['id'],),
+                                ([subnet], []))[1].append(ips[-1])
+                port_ips.append(ips)
+            for subnets, slots in to_generate.itervalues():
+                for slot, ip in zip(slots, self._generate_ips(
+                        context, subnets, len(slots))):
+                    slot.update(ip)
+
+            expiration = self._default_allocation_expiration()
+            for p, tenant_id, mac_address, ips in zip(items, tenant_ids, macs,
+                                                      port_ips):
+                port = models_v2.Port(
+                    tenant_id=tenant_id,
+                    name=p['name'],
+                    id=p.get('id') or uuidutils.generate_uuid(),
+                    network_id=p['network_id'],
+                    mac_address=mac_address,
+                    admin_state_up=p['admin_state_up'],
+                    status=p.get('status', constants.PORT_STATUS_ACTIVE),
+                    device_id=p['device_id'],
+                    device_owner=p['device_owner'])
+                context.session.add(port)
+                self._insert_port(context, port, p['mac_address'] is
+                                  attributes.ATTR_NOT_SPECIFIED)
+                for ip in ips:
+                    context.session.add(models_v2.IPAllocation(
+                        network_id=port.network_id,
+                        port_id=port.id,
+                        ip_address=ip['ip_address'],
+                        subnet_id=ip['subnet_id'],
+                        expiration=expiration))
+                results.append(self._make_port_dict(dict(port,
+                                                         fixed_ips=ips)))
+        return results
+
     def _get_marker_obj(self, context, resource, limit, marker):
         if limit and marker:
             return getattr(self, '_get_%s' % resource)(context, marker)
         return None
 
     def create_network_bulk(self, context, networks):
+        if self._has_native_create('network'):
+            return self._create_networks_native(context, networks)
         return self._create_bulk('network', context, networks)
 
+    def _get_network_args(self, n, tenant_id):
+        return {'tenant_id': tenant_id,
+                'id': n.get('id') or uuidutils.generate_uuid(),
+                'name': n['name'],
+                'admin_state_up': n['admin_state_up'],
+                'shared': n['shared'],
+                'status': constants.NET_STATUS_ACTIVE}
+
     def create_network(self, context, network):
         """ handle creation of a single network """
         # single request processing
@@ -955,12 +1246,7 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
         #                unneeded db action if the operation raises
         tenant_id = self._get_tenant_id_for_create(context, n)
         with context.session.begin(subtransactions=True):
-            args = {'tenant_id': tenant_id,
-                    'id': n.get('id') or uuidutils.generate_uuid(),
-                    'name': n['name'],
-                    'admin_state_up': n['admin_state_up'],
-                    'shared': n['shared'],
-                    'status': constants.NET_STATUS_ACTIVE}
+            args = self._get_network_args(n, tenant_id)
             network = models_v2.Network(**args)
             context.session.add(network)
         return self._make_network_dict(network)
@@ -1023,6 +1309,8 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                                           filters=filters)
 
     def create_subnet_bulk(self, context, subnets):
+        if self._has_native_create('subnet'):
+            return self._create_subnets_native(context, subnets)
         return self._create_bulk('subnet', context, subnets)
 
     def _validate_ip_version(self, ip_version, addr, name):
@@ -1089,9 +1377,8 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                     pool=pool_range,
                     ip_address=gateway_ip)
 
-    def create_subnet(self, context, subnet):
-
-        s = subnet['subnet']
+    def _prepare_subnet(self, context, s):
+        """Fill in the defaults of a subnet spec and validate it."""
         net = netaddr.IPNetwork(s['cidr'])
 
         if s['gateway_ip'] is attributes.ATTR_NOT_SPECIFIED:
@@ -1107,6 +1394,11 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
 
         self._validate_subnet(s)
 
+    def create_subnet(self, context, subnet):
+
+        s = subnet['subnet']
+        self._prepare_subnet(context, s)
+
         tenant_id = self._get_tenant_id_for_create(context, s)
         with context.session.begin(subtransactions=True):
             network = self._get_network(context, s["network_id"])
@@ -1144,11 +1436,7 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                                                      first_ip=pool['start'],
                                                      last_ip=pool['end'])
                 context.session.add(ip_pool)
-                ip_range = models_v2.IPAvailabilityRange(
-                    ipallocationpool=ip_pool,
-                    first_ip=pool['start'],
-                    last_ip=pool['end'])
-                context.session.add(ip_range)
+                ipam.get_backend().create_pool(context, ip_pool)
 
         return self._make_subnet_dict(subnet)
 
@@ -1258,6 +1546,15 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                                           filters=filters)
 
     def create_port_bulk(self, context, ports):
+        if self._has_native_create('port'):
+            return self._create_ports_native(context, ports)
+        # Lease the MAC addresses of the whole batch at once
+        generated = [item['port'] for item in ports['ports']
+                     if item['port'].get('mac_address') in
+                     (None, attributes.ATTR_NOT_SPECIFIED)]
+        if generated:
+            mac_allocator.get_allocator().reserve(
+                context, generated[0]['network_id'], len(generated))
         return self._create_bulk('port', context, ports)
 
     def create_port(self, context, port):
@@ -1275,7 +1572,8 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
 
             # Ensure that a MAC address is defined and it is unique on the
             # network
-            if mac_address is attributes.ATTR_NOT_SPECIFIED:
+            generated = mac_address is attributes.ATTR_NOT_SPECIFIED
+            if generated:
                 mac_address = QuantumDbPluginV2._generate_mac(context,
                                                               network_id)
             else:
@@ -1285,6 +1583,7 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                                                            mac_address):
                     raise q_exc.MacAddressInUse(net_id=network_id,
                                                 mac=mac_address)
+                mac_allocator.get_allocator().discard(mac_address)
 
             # Returns the IP's for the port
             ips = self._allocate_ips_for_port(context, network, port)
@@ -1304,6 +1603,7 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                                   device_id=p['device_id'],
                                   device_owner=p['device_owner'])
             context.session.add(port)
+            self._insert_port(context, port, generated)
 
             # Update the allocated IP's
             if ips:
@@ -1349,6 +1649,8 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                         ip_address=ip['ip_address'], subnet_id=ip['subnet_id'],
                         expiration=self._default_allocation_expiration())
                     context.session.add(allocated)
+                # The allocations were changed without the port
+                context.session.expire(port, ['fixed_ips'])
 
             port.update(p)
 
@@ -1388,6 +1690,8 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                     msg = _("%(address)s (%(subnet_id)s) is not "
                             "recycled") % msg_dict
                     LOG.debug(msg)
+            # The allocations were changed without the port
+            context.session.expire(port, ['fixed_ips'])
 
         context.session.delete(port)
 
@@ -1396,7 +1700,7 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
         return self._make_port_dict(port, fields)
 
     def _get_ports_query(self, context, filters=None, sorts=None, limit=None,
-                         marker_obj=None, page_reverse=False):
+                         marker_obj=None, page_reverse=False, fields=None):
         Port = models_v2.Port
         IPAllocation = models_v2.IPAllocation
 
@@ -1416,6 +1720,7 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                 query = query.filter(IPAllocation.subnet_id.in_(subnet_ids))
 
         query = self._apply_filters_to_query(query, Port, filters)
+        query = self._apply_eager_loading(query, Port, fields)
         if limit and page_reverse and sorts:
             sorts = [(s[0], not s[1]) for s in sorts]
         query = sqlalchemyutils.paginate_query(query, Port, limit,
@@ -1426,11 +1731,17 @@ class QuantumDbPluginV2(quantum_plugin_base_v2.QuantumPluginBaseV2):
                   sorts=None, limit=None, marker=None,
                   page_reverse=False):
         marker_obj = self._get_marker_obj(context, 'port', limit, marker)
+        columns = None
+        # Rows are not unique when joined with the fixed IPs
+        if not (filters and filters.get('fixed_ips')):
+            columns = self._get_dict_columns(models_v2.Port,
+                                             self._make_port_dict, fields)
         query = self._get_ports_query(context, filters=filters,
                                       sorts=sorts, limit=limit,
                                       marker_obj=marker_obj,
-                                      page_reverse=page_reverse)
-        items = [self._make_port_dict(c, fields) for c in query.all()]
+                                      page_reverse=page_reverse,
+                                      fields=fields)
+        items = self._get_dicts(query, self._make_port_dict, fields, columns)
         if limit and page_reverse:
             items.reverse()
         return items
@@ -0,0 +1,439 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""IP address management backends of QuantumDbPluginV2.
+
+QuantumDbPluginV2 records the allocated addresses in IPAllocation. The
+backend set by the ipam_backend option keeps track of the addresses of the
+allocation pools which are available.
+"""
+
+from abc import ABCMeta, abstractmethod
+import random
+
+import netaddr
+from oslo.config import cfg
+from sqlalchemy.orm import exc
+
+from quantum.db import models_v2
+from quantum.openstack.common import importutils
+from quantum.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+IPS_PER_CHUNK = 256
+FULL_CHUNK = (1 << IPS_PER_CHUNK) - 1
+# Larger allocation pools, e.g. the default pools of IPv6 subnets, are
+# kept as ranges.
+MAX_BITMAP_POOL_SIZE = 65536
+# Optimistic updates of chunks tried before locking one
+MAX_OPTIMISTIC_ATTEMPTS = 3
+
+_backends = {}
+
+
+def get_backend():
+    """Return the backend set by the ipam_backend option."""
+    name = cfg.CONF.ipam_backend
+    if name not in _backends:
+        _backends[name] = importutils.import_object(name)
+    return _backends[name]
+
+
+class IpamBackend(object):
+    """Keeps track of the available addresses of allocation pools.
+
+    The backend is called in the transaction of the plugin, which checks
+    that the addresses given to allocate_specific_ip() and release_ip()
+    are respectively free and allocated.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def create_pool(self, context, ip_pool):
+        """Make all the addresses of a new allocation pool available."""
+        pass
+
+    @abstractmethod
+    def generate_ip(self, context, subnet):
+        """Take an available address of the subnet.
+
+        :returns: the address, or None if none is available.
+        """
+        pass
+
+    def generate_ips(self, context, subnet, count):
+        """Take up to count available addresses of the subnet.
+
+        :returns: the addresses taken, fewer than count if the subnet runs
+                  out of addresses.
+        """
+        ips = []
+        while len(ips) < count:
+            ip_address = self.generate_ip(context, subnet)
+            if not ip_address:
+                break
+            ips.append(ip_address)
+        return ips
+
+    @abstractmethod
+    def allocate_specific_ip(self, context, subnet_id, ip_address):
+        """Take the given address, if it is in an allocation pool."""
+        pass
+
+    @abstractmethod
+    def release_ip(self, context, ip_pool, ip_address):
+        """Make an address of the allocation pool available again."""
+        pass
+
+
+class RangeIpamBackend(IpamBackend):
+    """Keeps the available addresses as IPAvailabilityRange rows.
+
+    Addresses are taken from the start of the first range of the subnet,
+    which is locked until the end of the transaction.
+    """
+
+    def create_pool(self, context, ip_pool):
+        ip_range = models_v2.IPAvailabilityRange(
+            ipallocationpool=ip_pool,
+            first_ip=ip_pool['first_ip'],
+            last_ip=ip_pool['last_ip'])
+        context.session.add(ip_range)
+
+    def generate_ip(self, context, subnet):
+        range_qry = context.session.query(
+            models_v2.IPAvailabilityRange).join(
+                models_v2.IPAllocationPool).with_lockmode('update')
+        range = range_qry.filter_by(subnet_id=subnet['id']).first()
+        if not range:
+            return
+        ip_address = range['first_ip']
+        LOG.debug(_("Allocated IP - %(ip_address)s from %(first_ip)s "
+                    "to %(last_ip)s"),
+                  {'ip_address': ip_address,
+                   'first_ip': range['first_ip'],
+                   'last_ip': range['last_ip']})
+        if range['first_ip'] == range['last_ip']:
+            # No more free indices on subnet => delete
+            LOG.debug(_("No more free IP's in slice. Deleting allocation "
+                        "pool."))
+            context.session.delete(range)
+        else:
+            # increment the first free
+            range['first_ip'] = str(netaddr.IPAddress(ip_address) + 1)
+        return ip_address
+
+    def generate_ips(self, context, subnet, count):
+        range_qry = context.session.query(
+            models_v2.IPAvailabilityRange).join(
+                models_v2.IPAllocationPool).with_lockmode('update')
+        ips = []
+        for range in range_qry.filter_by(subnet_id=subnet['id']).all():
+            if len(ips) == count:
+                break
+            first = netaddr.IPAddress(range['first_ip'])
+            size = int(netaddr.IPAddress(range['last_ip'])) - int(first) + 1
+            taken = min(count - len(ips), size)
+            ips.extend(str(first + i) for i in xrange(taken))
+            LOG.debug(_("Allocated %(count)s IPs from %(first_ip)s to "
+                        "%(last_ip)s"),
+                      {'count': taken,
+                       'first_ip': range['first_ip'],
+                       'last_ip': range['last_ip']})
+            if taken == size:
+                context.session.delete(range)
+            else:
+                range['first_ip'] = str(first + taken)
+        return ips
+
+    def allocate_specific_ip(self, context, subnet_id, ip_address):
+        ip = int(netaddr.IPAddress(ip_address))
+        range_qry = context.session.query(
+            models_v2.IPAvailabilityRange,
+            models_v2.IPAllocationPool).join(
+                models_v2.IPAllocationPool).with_lockmode('update')
+        results = range_qry.filter_by(subnet_id=subnet_id).all()
+        for (range, pool) in results:
+            first = int(netaddr.IPAddress(range['first_ip']))
+            last = int(netaddr.IPAddress(range['last_ip']))
+            if first <= ip <= last:
+                if first == last:
+                    context.session.delete(range)
+                    return
+                elif first == ip:
+                    range['first_ip'] = str(netaddr.IPAddress(ip_address) + 1)
+                    return
+                elif last == ip:
+                    range['last_ip'] = str(netaddr.IPAddress(ip_address) - 1)
+                    return
+                else:
+                    # Split into two ranges
+                    new_first = str(netaddr.IPAddress(ip_address) + 1)
+                    new_last = range['last_ip']
+                    range['last_ip'] = str(netaddr.IPAddress(ip_address) - 1)
+                    ip_range = models_v2.IPAvailabilityRange(
+                        allocation_pool_id=pool['id'],
+                        first_ip=new_first,
+                        last_ip=new_last)
+                    context.session.add(ip_range)
+                    return
+
+    def release_ip(self, context, ip_pool, ip_address):
+        pool_id = ip_pool['id']
+        # Two requests will be done on the database. The first will be to
+        # search if an entry starts with ip_address + 1 (r1). The second
+        # will be to see if an entry ends with ip_address -1 (r2).
+        # If 1 of the above holds true then the specific entry will be
+        # modified. If both hold true then the two ranges will be merged.
+        # If there are no entries then a single entry will be added.
+        range_qry = context.session.query(
+            models_v2.IPAvailabilityRange).with_lockmode('update')
+        ip_first = str(netaddr.IPAddress(ip_address) + 1)
+        ip_last = str(netaddr.IPAddress(ip_address) - 1)
+        LOG.debug(_("Recycle %s"), ip_address)
+        try:
+            r1 = range_qry.filter_by(allocation_pool_id=pool_id,
+                                     first_ip=ip_first).one()
+            LOG.debug(_("Recycle: first match for %(first_ip)s-%(last_ip)s"),
+                      {'first_ip': r1['first_ip'], 'last_ip': r1['last_ip']})
+        except exc.NoResultFound:
+            r1 = []
+        try:
+            r2 = range_qry.filter_by(allocation_pool_id=pool_id,
+                                     last_ip=ip_last).one()
+            LOG.debug(_("Recycle: last match for %(first_ip)s-%(last_ip)s"),
+                      {'first_ip': r2['first_ip'], 'last_ip': r2['last_ip']})
+        except exc.NoResultFound:
+            r2 = []
+
+        if r1 and r2:
+            # Merge the two ranges
+            ip_range = models_v2.IPAvailabilityRange(
+                allocation_pool_id=pool_id,
+                first_ip=r2['first_ip'],
+                last_ip=r1['last_ip'])
+            context.session.add(ip_range)
+            LOG.debug(_("Recycle: merged %(first_ip1)s-%(last_ip1)s and "
+                        "%(first_ip2)s-%(last_ip2)s"),
+                      {'first_ip1': r2['first_ip'], 'last_ip1': r2['last_ip'],
+                       'first_ip2': r1['first_ip'], 'last_ip2': r1['last_ip']})
+            context.session.delete(r1)
+            context.session.delete(r2)
+        elif r1:
+            # Update the range with matched first IP
+            r1['first_ip'] = ip_address
+            LOG.debug(_("Recycle: updated first %(first_ip)s-%(last_ip)s"),
+                      {'first_ip': r1['first_ip'], 'last_ip': r1['last_ip']})
+        elif r2:
+            # Update the range with matched last IP
+            r2['last_ip'] = ip_address
+            LOG.debug(_("Recycle: updated last %(first_ip)s-%(last_ip)s"),
+                      {'first_ip': r2['first_ip'], 'last_ip': r2['last_ip']})
+        else:
+            # Create a new range
+            ip_range = models_v2.IPAvailabilityRange(
+                allocation_pool_id=pool_id,
+                first_ip=ip_address,
+                last_ip=ip_address)
+            context.session.add(ip_range)
+            LOG.debug(_("Recycle: created new %(first_ip)s-%(last_ip)s"),
+                      {'first_ip': ip_address, 'last_ip': ip_address})
+
+
+class BitmapIpamBackend(RangeIpamBackend):
+    """Keeps the available addresses as IPAvailabilityChunk bitmaps.
+
+    Taking or releasing an address updates a single chunk row. Addresses
+    are generated from a chunk of the first allocation pool picked at
+    random, so that concurrent allocations on a large pool update
+    different rows. The chunk is read without a lock and updated only if
+    its version did not change; on conflict another chunk is tried, and
+    the chunk is locked once MAX_OPTIMISTIC_ATTEMPTS are exhausted.
+
+    Pools larger than MAX_BITMAP_POOL_SIZE, as well as the pools created
+    by RangeIpamBackend, are kept as ranges.
+    """
+
+    def create_pool(self, context, ip_pool):
+        first = int(netaddr.IPAddress(ip_pool['first_ip']))
+        size = int(netaddr.IPAddress(ip_pool['last_ip'])) - first + 1
+        if size > MAX_BITMAP_POOL_SIZE:
+            return super(BitmapIpamBackend, self).create_pool(context,
+                                                              ip_pool)
+        for index, offset in enumerate(xrange(0, size, IPS_PER_CHUNK)):
+            count = min(IPS_PER_CHUNK, size - offset)
+            # Addresses past the end of the pool are never available
+            bitmap = FULL_CHUNK & ~((1 << count) - 1)
+            context.session.add(models_v2.IPAvailabilityChunk(
+                ipallocationpool=ip_pool, chunk=index,
+                bitmap=_to_hex(bitmap), free=count, version=0))
+
+    def _chunks_query(self, context):
+        # NOTE: chunks are read as columns, as they are updated with
+        #       queries which the instances in the session would miss.
+        return context.session.query(
+            models_v2.IPAvailabilityChunk.allocation_pool_id,
+            models_v2.IPAvailabilityChunk.chunk,
+            models_v2.IPAvailabilityChunk.bitmap,
+            models_v2.IPAvailabilityChunk.free,
+            models_v2.IPAvailabilityChunk.version)
+
+    def _update_chunk(self, context, chunk, bitmap, free, check_version):
+        query = context.session.query(models_v2.IPAvailabilityChunk)
+        query = query.filter_by(allocation_pool_id=chunk.allocation_pool_id,
+                                chunk=chunk.chunk)
+        if check_version:
+            query = query.filter_by(version=chunk.version)
+        return query.update({'bitmap': _to_hex(bitmap),
+                             'free': free,
+                             'version': chunk.version + 1},
+                            synchronize_session=False)
+
+    def _take_lowest_ip(self, context, chunk, pool_first_ip, check_version):
+        bitmap = int(chunk.bitmap, 16)
+        available = ~bitmap & FULL_CHUNK
+        bit = _lowest_bit(available)
+        if not self._update_chunk(context, chunk, bitmap | (1 << bit),
+                                  chunk.free - 1, check_version):
+            return
+        return str(netaddr.IPAddress(pool_first_ip) +
+                   chunk.chunk * IPS_PER_CHUNK + bit)
+
+    def _generate_ip_from_chunks(self, context, subnet):
+        query = self._chunks_query(context).add_columns(
+            models_v2.IPAllocationPool.first_ip)
+        query = query.join(models_v2.IPAllocationPool)
+        query = query.filter(
+            models_v2.IPAllocationPool.subnet_id == subnet['id'],
+            models_v2.IPAvailabilityChunk.free > 0)
+        conflicts = set()
+        for attempt in xrange(MAX_OPTIMISTIC_ATTEMPTS):
+            chunks = [row for row in query.all()
+                      if (row.allocation_pool_id, row.chunk) not in conflicts]
+            if not chunks:
+                if not conflicts:
+                    return
+                break
+            first_pool = min(int(netaddr.IPAddress(row.first_ip))
+                             for row in chunks)
+            chunk = random.choice(
+                [row for row in chunks
+                 if int(netaddr.IPAddress(row.first_ip)) == first_pool])
+            ip_address = self._take_lowest_ip(context, chunk, chunk.first_ip,
+                                              True)
+            if ip_address:
+                LOG.debug(_("Allocated IP - %(ip_address)s from chunk "
+                            "%(chunk)s of %(pool)s"),
+                          {'ip_address': ip_address, 'chunk': chunk.chunk,
+                           'pool': chunk.allocation_pool_id})
+                return ip_address
+            conflicts.add((chunk.allocation_pool_id, chunk.chunk))
+        LOG.debug(_("Chunks of subnet %s updated concurrently, locking one"),
+                  subnet['id'])
+        chunk = query.with_lockmode('update').first()
+        if chunk:
+            return self._take_lowest_ip(context, chunk, chunk.first_ip, False)
+
+    def _get_chunk_for_ip(self, context, ip_pool, ip_address):
+        offset = (int(netaddr.IPAddress(ip_address)) -
+                  int(netaddr.IPAddress(ip_pool['first_ip'])))
+        query = self._chunks_query(context).with_lockmode('update')
+        chunk = query.filter_by(allocation_pool_id=ip_pool['id'],
+                                chunk=offset // IPS_PER_CHUNK).first()
+        return chunk, 1 << (offset % IPS_PER_CHUNK)
+
+    def generate_ip(self, context, subnet):
+        ip_address = self._generate_ip_from_chunks(context, subnet)
+        if ip_address:
+            return ip_address
+        return super(BitmapIpamBackend, self).generate_ip(context, subnet)
+
+    def generate_ips(self, context, subnet, count):
+        # NOTE: the chunks are locked, as a batch would conflict with most
+        #       concurrent allocations anyway.
+        query = self._chunks_query(context).add_columns(
+            models_v2.IPAllocationPool.first_ip)
+        query = query.join(models_v2.IPAllocationPool)
+        query = query.filter(
+            models_v2.IPAllocationPool.subnet_id == subnet['id'],
+            models_v2.IPAvailabilityChunk.free > 0).with_lockmode('update')
+        chunks = sorted(query.all(),
+                        key=lambda row: (int(netaddr.IPAddress(row.first_ip)),
+                                         row.chunk))
+        ips = []
+        for chunk in chunks:
+            if len(ips) == count:
+                break
+            bitmap = int(chunk.bitmap, 16)
+            available = ~bitmap & FULL_CHUNK
+            first_ip = (netaddr.IPAddress(chunk.first_ip) +
+                        chunk.chunk * IPS_PER_CHUNK)
+            taken = 0
+            while available and len(ips) < count:
+                bit = available & -available
+                available ^= bit
+                bitmap |= bit
+                ips.append(str(first_ip + _lowest_bit(bit)))
+                taken += 1
+            self._update_chunk(context, chunk, bitmap, chunk.free - taken,
+                               False)
+        if len(ips) < count:
+            ips.extend(super(BitmapIpamBackend, self).generate_ips(
+                context, subnet, count - len(ips)))
+        return ips
+
+    def allocate_specific_ip(self, context, subnet_id, ip_address):
+        ip = netaddr.IPAddress(ip_address)
+        pool_qry = context.session.query(models_v2.IPAllocationPool)
+        for ip_pool in pool_qry.filter_by(subnet_id=subnet_id):
+            if ip in netaddr.IPRange(ip_pool['first_ip'],
+                                     ip_pool['last_ip']):
+                break
+        else:
+            return
+        chunk, mask = self._get_chunk_for_ip(context, ip_pool, ip_address)
+        if not chunk:
+            return super(BitmapIpamBackend, self).allocate_specific_ip(
+                context, subnet_id, ip_address)
+        bitmap = int(chunk.bitmap, 16)
+        if not bitmap & mask:
+            self._update_chunk(context, chunk, bitmap | mask, chunk.free - 1,
+                               False)
+
+    def release_ip(self, context, ip_pool, ip_address):
+        chunk, mask = self._get_chunk_for_ip(context, ip_pool, ip_address)
+        if not chunk:
+            return super(BitmapIpamBackend, self).release_ip(
+                context, ip_pool, ip_address)
+        LOG.debug(_("Recycle %s"), ip_address)
+        bitmap = int(chunk.bitmap, 16)
+        if bitmap & mask:
+            self._update_chunk(context, chunk, bitmap & ~mask, chunk.free + 1,
+                               False)
+
+
+def _to_hex(bitmap):
+    return '%064x' % bitmap
+
+
+def _lowest_bit(bitmap):
+    """Return the index of the lowest bit set in a non-zero bitmap."""
+    # NOTE: int.bit_length() is not available on python 2.6
+    return len(bin(bitmap & -bitmap)) - 3
@@ -115,6 +115,9 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
         _network_filter_hook,
         _network_result_filter_hook)
 
+    db_base_plugin_v2.QuantumDbPluginV2.register_dict_relationship(
+        Router, 'external_gateway_info', 'gw_port')
+
     def _get_router(self, context, id):
         try:
             router = self._get_by_id(context, Router, id)
@@ -130,11 +133,12 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
                'name': router['name'],
                'tenant_id': router['tenant_id'],
                'admin_state_up': router['admin_state_up'],
-               'status': router['status'],
-               'external_gateway_info': None}
-        if router['gw_port_id']:
-            nw_id = router.gw_port['network_id']
-            res['external_gateway_info'] = {'network_id': nw_id}
+               'status': router['status']}
+        if not fields or 'external_gateway_info' in fields:
+            res['external_gateway_info'] = None
+            if router['gw_port_id']:
+                nw_id = router.gw_port['network_id']
+                res['external_gateway_info'] = {'network_id': nw_id}
         return self._fields(res, fields)
 
     def create_router(self, context, router):
@@ -757,8 +761,7 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
                                        DEVICE_OWNER_FLOATINGIP]:
             # Raise port in use only if the port has IP addresses
             # Otherwise it's a stale port that can be removed
-            fixed_ips = port_db['fixed_ips'].all()
-            if fixed_ips:
+            if port_db['fixed_ips']:
                 raise l3.L3PortInUse(port_id=port_id,
                                      device_owner=port_db['device_owner'])
             else:
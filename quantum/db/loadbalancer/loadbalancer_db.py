@@ -28,6 +28,7 @@ from quantum.common import exceptions as q_exc
 from quantum.db import db_base_plugin_v2
 from quantum.db import model_base
 from quantum.db import models_v2
+from quantum.db import sqlalchemyutils
 from quantum.extensions import loadbalancer
 from quantum.extensions.loadbalancer import LoadBalancerPluginBase
 from quantum import manager
@@ -197,7 +198,19 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
                         fields=None, sorts=None, limit=None, marker_obj=None,
                         page_reverse=False):
         query = self._get_collection_query(context, model, filters)
-        return [dict_func(c, fields) for c in query.all()]
+        if limit and page_reverse and sorts:
+            sorts = [(s[0], not s[1]) for s in sorts]
+        query = sqlalchemyutils.paginate_query(query, model, limit, sorts,
+                                               marker_obj=marker_obj)
+        items = [dict_func(c, fields) for c in query.all()]
+        if limit and page_reverse:
+            items.reverse()
+        return items
+
+    def _get_marker_obj(self, context, model, limit, marker):
+        if limit and marker:
+            return self._get_resource(context, model, marker)
+        return None
 
     def _get_collection_count(self, context, model, filters=None):
         return self._get_collection_query(context, model, filters).count()
@@ -476,10 +489,16 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
         vip = self._get_resource(context, Vip, id)
         return self._make_vip_dict(vip, fields)
 
-    def get_vips(self, context, filters=None, fields=None):
+    def get_vips(self, context, filters=None, fields=None,
+                 sorts=None, limit=None, marker=None,
+                 page_reverse=False):
+        marker_obj = self._get_marker_obj(context, Vip, limit, marker)
         return self._get_collection(context, Vip,
                                     self._make_vip_dict,
-                                    filters=filters, fields=fields)
+                                    filters=filters, fields=fields,
+                                    sorts=sorts, limit=limit,
+                                    marker_obj=marker_obj,
+                                    page_reverse=page_reverse)
 
     ########################################################
     # Pool DB access
@@ -572,11 +591,16 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
         pool = self._get_resource(context, Pool, id)
         return self._make_pool_dict(pool, fields)
 
-    def get_pools(self, context, filters=None, fields=None):
-        collection = self._model_query(context, Pool)
-        collection = self._apply_filters_to_query(collection, Pool, filters)
-        return [self._make_pool_dict(c, fields)
-                for c in collection.all()]
+    def get_pools(self, context, filters=None, fields=None,
+                  sorts=None, limit=None, marker=None,
+                  page_reverse=False):
+        marker_obj = self._get_marker_obj(context, Pool, limit, marker)
+        return self._get_collection(context, Pool,
+                                    self._make_pool_dict,
+                                    filters=filters, fields=fields,
+                                    sorts=sorts, limit=limit,
+                                    marker_obj=marker_obj,
+                                    page_reverse=page_reverse)
 
     def stats(self, context, pool_id):
         with context.session.begin(subtransactions=True):
@@ -700,10 +724,16 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
         member = self._get_resource(context, Member, id)
         return self._make_member_dict(member, fields)
 
-    def get_members(self, context, filters=None, fields=None):
+    def get_members(self, context, filters=None, fields=None,
+                    sorts=None, limit=None, marker=None,
+                    page_reverse=False):
+        marker_obj = self._get_marker_obj(context, Member, limit, marker)
         return self._get_collection(context, Member,
                                     self._make_member_dict,
-                                    filters=filters, fields=fields)
+                                    filters=filters, fields=fields,
+                                    sorts=sorts, limit=limit,
+                                    marker_obj=marker_obj,
+                                    page_reverse=page_reverse)
 
     ########################################################
     # HealthMonitor DB access
@@ -767,7 +797,14 @@ class LoadBalancerPluginDb(LoadBalancerPluginBase):
         healthmonitor = self._get_resource(context, HealthMonitor, id)
         return self._make_health_monitor_dict(healthmonitor, fields)
 
-    def get_health_monitors(self, context, filters=None, fields=None):
+    def get_health_monitors(self, context, filters=None, fields=None,
+                            sorts=None, limit=None, marker=None,
+                            page_reverse=False):
+        marker_obj = self._get_marker_obj(context, HealthMonitor, limit,
+                                          marker)
         return self._get_collection(context, HealthMonitor,
                                     self._make_health_monitor_dict,
-                                    filters=filters, fields=fields)
+                                    filters=filters, fields=fields,
+                                    sorts=sorts, limit=limit,
+                                    marker_obj=marker_obj,
+                                    page_reverse=page_reverse)
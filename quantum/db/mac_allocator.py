@@ -0,0 +1,215 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Allocation of the MAC addresses of ports from leased blocks.
+
+The MAC addresses available under base_mac are split in blocks of 256. A
+server process leases a block in the database, reads once which of its MAC
+addresses are in use, and hands out the others from memory. A block is
+leased by a single process at a time, so the MAC addresses handed out are
+unique without any query per port. A MAC address specified for a port by
+another process after a block was leased is not seen by its holder: the
+unique constraint on the MAC addresses of the ports of a network fails the
+insert of the second of these ports.
+"""
+
+import datetime
+import os
+import random
+
+from eventlet import semaphore
+from oslo.config import cfg
+import sqlalchemy as sa
+from sqlalchemy import exc as sql_exc
+
+from quantum.common import exceptions as q_exc
+from quantum.db import api as db
+from quantum.db import model_base
+from quantum.db import models_v2
+from quantum.openstack.common import log as logging
+from quantum.openstack.common import timeutils
+from quantum.openstack.common import uuidutils
+
+
+LOG = logging.getLogger(__name__)
+
+MACS_PER_BLOCK = 256
+
+_allocators = {}
+
+
+class MacAddressBlock(model_base.BASEV2):
+    """Represents the lease of a block of MAC addresses by a server."""
+    first_mac = sa.Column(sa.String(32), primary_key=True)
+    holder = sa.Column(sa.String(36), nullable=False)
+    expires_at = sa.Column(sa.DateTime, nullable=False)
+
+
+def get_allocator():
+    """Return the allocator of this process.
+
+    Allocators are not shared with forked processes, which must lease
+    blocks of their own.
+    """
+    pid = os.getpid()
+    if pid not in _allocators:
+        _allocators.clear()
+        _allocators[pid] = MacAllocator()
+    return _allocators[pid]
+
+
+def _mac_to_str(mac):
+    return ':'.join('%02x' % ((mac >> shift) & 0xff)
+                    for shift in xrange(40, -8, -8))
+
+
+class _LeasedBlock(object):
+
+    def __init__(self, base_mac, first_mac, free, usable_until):
+        self.base_mac = base_mac
+        self.first_mac = first_mac
+        # MAC addresses not in use, handed out in ascending order
+        self.free = sorted(free, reverse=True)
+        self.usable_until = usable_until
+
+    def is_usable(self, base_mac, now):
+        return (self.free and self.base_mac == base_mac and
+                now < self.usable_until)
+
+
+class MacAllocator(object):
+    """Hands out MAC addresses from the blocks leased by this process.
+
+    A block is leased for mac_block_lease_duration seconds, and MAC
+    addresses are handed out from it during the first half of the lease
+    only, so that the ports created with them are committed before another
+    process can lease the block.
+    """
+
+    def __init__(self):
+        self.holder = uuidutils.generate_uuid()
+        self.blocks = []
+        self._lock = semaphore.Semaphore()
+
+    def _get_base(self):
+        base_mac = cfg.CONF.base_mac.split(':')
+        # The fourth octet is part of the base if it is set
+        fixed_octets = 4 if base_mac[3] != '00' else 3
+        base = 0
+        for octet in base_mac[:fixed_octets]:
+            base = (base << 8) | int(octet, 16)
+        block_bits = 8 * (6 - fixed_octets) - 8
+        return base << (block_bits + 8), block_bits
+
+    def _get_lease_session(self, context):
+        # NOTE: leases are committed on their own, so that other servers
+        #       see them right away. SQLite allows a single writer, the
+        #       transaction of the caller, so they are written in it.
+        if context.session.bind.dialect.name == 'sqlite':
+            return context.session
+        return db.get_session()
+
+    def _lease(self, context, session, first_mac, now):
+        expires_at = now + datetime.timedelta(
+            seconds=cfg.CONF.mac_block_lease_duration)
+        query = session.query(MacAddressBlock).filter_by(first_mac=first_mac)
+        try:
+            with session.begin(subtransactions=True):
+                if query.filter(MacAddressBlock.expires_at < now).update(
+                        {'holder': self.holder, 'expires_at': expires_at},
+                        synchronize_session=False):
+                    return True
+                if query.first():
+                    return False
+                session.add(MacAddressBlock(first_mac=first_mac,
+                                            holder=self.holder,
+                                            expires_at=expires_at))
+        except sql_exc.IntegrityError:
+            # Leased concurrently by another server
+            if session is context.session:
+                # The transaction of the caller was rolled back with it
+                raise
+            return False
+        return True
+
+    def _get_macs_in_use(self, session, first_mac):
+        first = _mac_to_str(first_mac)
+        last = _mac_to_str(first_mac + MACS_PER_BLOCK - 1)
+        query = session.query(models_v2.Port.mac_address)
+        query = query.filter(sa.or_(
+            models_v2.Port.mac_address.between(first, last),
+            models_v2.Port.mac_address.between(first.upper(), last.upper())))
+        return set(int(mac.replace(':', ''), 16) for mac, in query)
+
+    def _lease_block(self, context, network_id):
+        base_mac = cfg.CONF.base_mac
+        base, block_bits = self._get_base()
+        session = self._get_lease_session(context)
+        for i in xrange(cfg.CONF.mac_generation_retries):
+            now = timeutils.utcnow()
+            first_mac = base | (random.getrandbits(block_bits) << 8)
+            if not self._lease(context, session, _mac_to_str(first_mac),
+                               now):
+                LOG.debug(_("MAC address block %s is leased"),
+                          _mac_to_str(first_mac))
+                continue
+            in_use = self._get_macs_in_use(session, first_mac)
+            free = [mac for mac in xrange(first_mac,
+                                          first_mac + MACS_PER_BLOCK)
+                    if mac not in in_use]
+            if not free:
+                continue
+            LOG.debug(_("Leased MAC address block %(block)s with %(free)s "
+                        "free addresses"),
+                      {'block': _mac_to_str(first_mac), 'free': len(free)})
+            lease_time = datetime.timedelta(
+                seconds=cfg.CONF.mac_block_lease_duration)
+            return _LeasedBlock(base_mac, first_mac, free,
+                                now + lease_time / 2)
+        LOG.error(_("Unable to lease a block of MAC addresses after %s "
+                    "attempts"), cfg.CONF.mac_generation_retries)
+        raise q_exc.MacAddressGenerationFailure(net_id=network_id)
+
+    def _get_usable_blocks(self):
+        base_mac = cfg.CONF.base_mac
+        now = timeutils.utcnow()
+        self.blocks = [block for block in self.blocks
+                       if block.is_usable(base_mac, now)]
+        return self.blocks
+
+    def reserve(self, context, network_id, count):
+        """Lease blocks until count MAC addresses can be handed out."""
+        with self._lock:
+            while (sum(len(block.free) for block in self._get_usable_blocks())
+                   < count):
+                self.blocks.append(self._lease_block(context, network_id))
+
+    def allocate(self, context, network_id):
+        """Hand out a MAC address."""
+        with self._lock:
+            blocks = self._get_usable_blocks()
+            if not blocks:
+                blocks.append(self._lease_block(context, network_id))
+            return _mac_to_str(blocks[0].free.pop())
+
+    def discard(self, mac_address):
+        """Stop handing out a MAC address used by a port."""
+        mac = int(mac_address.replace(':', ''), 16)
+        for block in self.blocks:
+            if block.first_mac <= mac < block.first_mac + MACS_PER_BLOCK:
+                if mac in block.free:
+                    block.free.remove(mac)
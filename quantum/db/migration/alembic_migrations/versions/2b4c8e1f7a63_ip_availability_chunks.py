@@ -0,0 +1,67 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add bitmaps of the available IPs of allocation pools
+
+Revision ID: 2b4c8e1f7a63
+Revises: 4a1d7e5c3b82
+Create Date: 2013-08-19 11:26:05.730914
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2b4c8e1f7a63'
+down_revision = '4a1d7e5c3b82'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = ['*']
+
+from alembic import op
+import sqlalchemy as sa
+
+
+from quantum.db import migration
+
+
+def upgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    # NOTE: the existing allocation pools are left as ranges, which the
+    #       bitmap backend keeps using for them.
+    op.create_table(
+        'ipavailabilitychunks',
+        sa.Column('allocation_pool_id', sa.String(length=36),
+                  nullable=False),
+        sa.Column('chunk', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.Column('bitmap', sa.String(length=64), nullable=False),
+        sa.Column('free', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['allocation_pool_id'],
+                                ['ipallocationpools.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('allocation_pool_id', 'chunk')
+    )
+
+
+def downgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    op.drop_table('ipavailabilitychunks')
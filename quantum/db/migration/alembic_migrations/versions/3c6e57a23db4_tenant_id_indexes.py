@@ -0,0 +1,56 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Index the tenant of networks, subnets and ports
+
+Revision ID: 3c6e57a23db4
+Revises: 5e2d9a7c4b18
+Create Date: 2013-08-27 11:05:23.618204
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3c6e57a23db4'
+down_revision = '5e2d9a7c4b18'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = ['*']
+
+from alembic import op
+
+
+from quantum.db import migration
+
+
+TABLES = ['networks', 'subnets', 'ports']
+
+
+def upgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    for table in TABLES:
+        op.create_index('ix_%s_tenant_id' % table, table, ['tenant_id'])
+
+
+def downgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    for table in TABLES:
+        op.drop_index('ix_%s_tenant_id' % table, table)
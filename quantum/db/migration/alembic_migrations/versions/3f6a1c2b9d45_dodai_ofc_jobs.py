@@ -0,0 +1,70 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add the OFC job queue of the Dodai plugin
+
+Revision ID: 3f6a1c2b9d45
+Revises: 1c43d4b6c069
+Create Date: 2013-08-05 10:12:31.482115
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3f6a1c2b9d45'
+down_revision = '1c43d4b6c069'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = [
+    'quantum.plugins.dodai.dodai_plugin.DodaiL2EPlugin'
+]
+
+from alembic import op
+import sqlalchemy as sa
+
+
+from quantum.db import migration
+
+
+def upgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    op.create_table(
+        'dodai_ofc_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('region_name', sa.String(length=36), nullable=False),
+        sa.Column('action', sa.String(length=36), nullable=False),
+        sa.Column('params', sa.Text(), nullable=True),
+        sa.Column('resource', sa.String(length=16), nullable=True),
+        sa.Column('resource_id', sa.String(length=36), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_dodai_ofc_jobs_region_name', 'dodai_ofc_jobs',
+                    ['region_name'])
+
+
+def downgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    op.drop_index('ix_dodai_ofc_jobs_region_name', 'dodai_ofc_jobs')
+    op.drop_table('dodai_ofc_jobs')
@@ -0,0 +1,54 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Index dodai_networks by vlan_id
+
+Revision ID: 4a1d7e5c3b82
+Revises: 3f6a1c2b9d45
+Create Date: 2013-08-12 14:03:47.219631
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4a1d7e5c3b82'
+down_revision = '3f6a1c2b9d45'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = [
+    'quantum.plugins.dodai.dodai_plugin.DodaiL2EPlugin'
+]
+
+from alembic import op
+
+
+from quantum.db import migration
+
+
+def upgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    op.create_index('ix_dodai_networks_vlan_id', 'dodai_networks',
+                    ['vlan_id'])
+
+
+def downgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    op.drop_index('ix_dodai_networks_vlan_id', 'dodai_networks')
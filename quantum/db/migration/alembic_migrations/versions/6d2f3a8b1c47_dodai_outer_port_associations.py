@@ -0,0 +1,71 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Record the outer port associations set on the OFC by the Dodai plugin
+
+Revision ID: 6d2f3a8b1c47
+Revises: 3c6e57a23db4
+Create Date: 2013-09-03 16:21:08.530914
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '6d2f3a8b1c47'
+down_revision = '3c6e57a23db4'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = [
+    'quantum.plugins.dodai.dodai_plugin.DodaiL2EPlugin'
+]
+
+from alembic import op
+import sqlalchemy as sa
+
+
+from quantum.db import migration
+
+
+def upgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    op.create_table(
+        'dodai_outer_port_associations',
+        sa.Column('dpid', sa.String(length=64), nullable=False),
+        sa.Column('outer_port', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.Column('outer_vlan_id', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.Column('region_name', sa.String(length=36), nullable=False),
+        sa.PrimaryKeyConstraint('dpid', 'outer_port', 'outer_vlan_id')
+    )
+    # NOTE: regions of networks with a vlan got an association for every
+    #       outer port when they were created, assume they still have it.
+    op.execute("INSERT INTO dodai_outer_port_associations "
+               "(dpid, outer_port, outer_vlan_id, region_name) "
+               "SELECT p.dpid, p.outer_port, n.vlan_id, "
+               "REPLACE(n.network_id, '-', '') "
+               "FROM dodai_outer_ports p, dodai_networks n "
+               "WHERE n.vlan_id IS NOT NULL")
+
+
+def downgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    op.drop_table('dodai_outer_port_associations')
@@ -0,0 +1,53 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Make the MAC addresses of ports unique per network
+
+Revision ID: 8c4f2d6e1a93
+Revises: 6d2f3a8b1c47
+Create Date: 2013-09-10 11:27:36.402718
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8c4f2d6e1a93'
+down_revision = '6d2f3a8b1c47'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = ['*']
+
+from alembic import op
+
+
+from quantum.db import migration
+
+
+def upgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    op.create_unique_constraint('uniq_ports0network_id0mac_address', 'ports',
+                                ['network_id', 'mac_address'])
+
+
+def downgrade(active_plugin=None, options=None):
+    if not migration.should_run(active_plugin, migration_for_plugins):
+        return
+
+    op.drop_constraint('uniq_ports0network_id0mac_address', 'ports',
+                       type='unique')
@@ -59,6 +59,30 @@ class IPAvailabilityRange(model_base.BASEV2):
         return "%s - %s" % (self.first_ip, self.last_ip)
 
 
+class IPAvailabilityChunk(model_base.BASEV2):
+    """Internal representation of available IPs as bitmaps.
+
+    The addresses of an allocation pool are split in chunks of 256
+    consecutive addresses. A bit set in the bitmap of a chunk is an address
+    which is not available. The version is incremented by every update of
+    the chunk, so that concurrent updates can be detected without locking.
+
+    """
+    allocation_pool_id = sa.Column(sa.String(36),
+                                   sa.ForeignKey('ipallocationpools.id',
+                                                 ondelete="CASCADE"),
+                                   nullable=False,
+                                   primary_key=True)
+    chunk = sa.Column(sa.Integer, primary_key=True, autoincrement=False)
+    bitmap = sa.Column(sa.String(64), nullable=False)
+    free = sa.Column(sa.Integer, nullable=False)
+    version = sa.Column(sa.Integer, nullable=False)
+
+    def __repr__(self):
+        return "%s:%s (%s free)" % (self.allocation_pool_id, self.chunk,
+                                    self.free)
+
+
 class IPAllocationPool(model_base.BASEV2, HasId):
     """Representation of an allocation pool in a Quantum subnet."""
 
@@ -71,6 +95,10 @@ class IPAllocationPool(model_base.BASEV2, HasId):
                                         backref='ipallocationpool',
                                         lazy="dynamic",
                                         cascade='delete')
+    available_chunks = orm.relationship(IPAvailabilityChunk,
+                                        backref='ipallocationpool',
+                                        lazy="dynamic",
+                                        cascade='delete')
 
     def __repr__(self):
         return "%s - %s" % (self.first_ip, self.last_ip)
@@ -107,10 +135,16 @@ class SubnetRoute(model_base.BASEV2, Route):
 
 class Port(model_base.BASEV2, HasId, HasTenant):
     """Represents a port on a quantum v2 network."""
+    __table_args__ = (sa.Index('ix_ports_tenant_id', 'tenant_id'),
+                      sa.UniqueConstraint(
+                          'network_id', 'mac_address',
+                          name='uniq_ports0network_id0mac_address'),
+                      model_base.BASEV2.__table_args__)
+
     name = sa.Column(sa.String(255))
     network_id = sa.Column(sa.String(36), sa.ForeignKey("networks.id"),
                            nullable=False)
-    fixed_ips = orm.relationship(IPAllocation, backref='ports', lazy="dynamic")
+    fixed_ips = orm.relationship(IPAllocation, backref='ports')
     mac_address = sa.Column(sa.String(32), nullable=False)
     admin_state_up = sa.Column(sa.Boolean(), nullable=False)
     status = sa.Column(sa.String(16), nullable=False)
@@ -133,6 +167,9 @@ class Subnet(model_base.BASEV2, HasId, HasTenant):
     When a subnet is created the first and last entries will be created. These
     are used for the IP allocation.
     """
+    __table_args__ = (sa.Index('ix_subnets_tenant_id', 'tenant_id'),
+                      model_base.BASEV2.__table_args__)
+
     name = sa.Column(sa.String(255))
     network_id = sa.Column(sa.String(36), sa.ForeignKey('networks.id'))
     ip_version = sa.Column(sa.Integer, nullable=False)
@@ -140,7 +177,6 @@ class Subnet(model_base.BASEV2, HasId, HasTenant):
     gateway_ip = sa.Column(sa.String(64))
     allocation_pools = orm.relationship(IPAllocationPool,
                                         backref='subnet',
-                                        lazy="dynamic",
                                         cascade='delete')
     enable_dhcp = sa.Column(sa.Boolean())
     dns_nameservers = orm.relationship(DNSNameServer,
@@ -154,6 +190,9 @@ class Subnet(model_base.BASEV2, HasId, HasTenant):
 
 class Network(model_base.BASEV2, HasId, HasTenant):
     """Represents a v2 quantum network."""
+    __table_args__ = (sa.Index('ix_networks_tenant_id', 'tenant_id'),
+                      model_base.BASEV2.__table_args__)
+
     name = sa.Column(sa.String(255))
     ports = orm.relationship(Port, backref='networks')
     subnets = orm.relationship(Subnet, backref='networks')
@@ -22,6 +22,7 @@ from sqlalchemy.orm import exc
 from sqlalchemy.orm import scoped_session
 
 from quantum.api.v2 import attributes as attr
+from quantum.db import db_base_plugin_v2
 from quantum.db import model_base
 from quantum.db import models_v2
 from quantum.extensions import securitygroup as ext_sg
@@ -80,6 +81,9 @@ class SecurityGroupDbMixin(ext_sg.SecurityGroupPluginBase):
 
     __native_bulk_support = True
 
+    db_base_plugin_v2.QuantumDbPluginV2.register_dict_relationship(
+        SecurityGroup, 'security_group_rules', 'rules')
+
     def create_security_group_bulk(self, context, security_group_rule):
         return self._create_bulk('security_group', context,
                                  security_group_rule)
@@ -193,8 +197,10 @@ class SecurityGroupDbMixin(ext_sg.SecurityGroupPluginBase):
                'name': security_group['name'],
                'tenant_id': security_group['tenant_id'],
                'description': security_group['description']}
-        res['security_group_rules'] = [self._make_security_group_rule_dict(r)
-                                       for r in security_group.rules]
+        if not fields or 'security_group_rules' in fields:
+            res['security_group_rules'] = [
+                self._make_security_group_rule_dict(r)
+                for r in security_group.rules]
         return self._fields(res, fields)
 
     def _make_security_group_binding_dict(self, security_group, fields=None):
@@ -100,6 +100,14 @@ def paginate_query(query, model, limit, sorts, marker_obj=None):
             criteria_list.append(criteria)
 
         f = sqlalchemy.sql.or_(*criteria_list)
+        # The criteria are also bounded by the value of the first sort key,
+        # so that the rows before the marker are skipped with an index
+        if marker_values[0] is not None:
+            first_attr = getattr(model, sorts[0][0])
+            if sorts[0][1]:
+                f = sqlalchemy.sql.and_(first_attr >= marker_values[0], f)
+            else:
+                f = sqlalchemy.sql.and_(first_attr <= marker_values[0], f)
         query = query.filter(f)
 
     if limit:
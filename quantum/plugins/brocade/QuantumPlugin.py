@@ -80,10 +80,11 @@ class BridgeRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
                          sg_db_rpc.SecurityGroupServerRpcCallbackMixin):
     """Agent callback."""
 
-    RPC_API_VERSION = '1.1'
+    RPC_API_VERSION = '1.2'
     # Device names start with "tap"
     # history
     #   1.1 Support Security Group RPC
+    #   1.2 Support get_devices_details_list and update_devices_down
     TAP_PREFIX_LEN = 3
 
     def create_rpc_dispatcher(self):
@@ -120,6 +121,47 @@ class BridgeRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
             port['binding:vif_type'] = 'bridge'
         return port
 
+    def _get_devices_details(self, rpc_context, devices):
+        ports = brocade_db.get_ports_by_ids(
+            rpc_context, [device[self.TAP_PREFIX_LEN:] for device in devices])
+        entries = []
+        for device in devices:
+            port = ports.get(device[self.TAP_PREFIX_LEN:])
+            if port:
+                entry = {'device': device,
+                         'vlan_id': port.vlan_id,
+                         'network_id': port.network_id,
+                         'port_id': port.port_id,
+                         'physical_network': port.physical_interface,
+                         'admin_state_up': port.admin_state_up
+                         }
+
+            else:
+                entry = {'device': device}
+                LOG.debug(_("%s can not be found in database"), device)
+            entries.append(entry)
+        return entries
+
+    def _update_devices_down(self, rpc_context, devices):
+        ports = brocade_db.get_ports_by_ids(
+            rpc_context, [device[self.TAP_PREFIX_LEN:] for device in devices])
+        entries = []
+        port_ids = []
+        for device in devices:
+            port = ports.get(device[self.TAP_PREFIX_LEN:])
+            if port:
+                entry = {'device': device,
+                         'exists': True}
+                port_ids.append(port['port_id'])
+            else:
+                entry = {'device': device,
+                         'exists': False}
+                LOG.debug(_("%s can not be found in database"), device)
+            entries.append(entry)
+        # Set port status to DOWN
+        brocade_db.update_ports_state(rpc_context, port_ids, False)
+        return entries
+
     def get_device_details(self, rpc_context, **kwargs):
         """Agent requests device details."""
 
@@ -127,37 +169,28 @@ class BridgeRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
         device = kwargs.get('device')
         LOG.debug(_("Device %(device)s details requested from %(agent_id)s"),
                   locals())
-        port = brocade_db.get_port(rpc_context, device[self.TAP_PREFIX_LEN:])
-        if port:
-            entry = {'device': device,
-                     'vlan_id': port.vlan_id,
-                     'network_id': port.network_id,
-                     'port_id': port.port_id,
-                     'physical_network': port.physical_interface,
-                     'admin_state_up': port.admin_state_up
-                     }
-
-        else:
-            entry = {'device': device}
-            LOG.debug(_("%s can not be found in database"), device)
-        return entry
+        return self._get_devices_details(rpc_context, [device])[0]
+
+    def get_devices_details_list(self, rpc_context, **kwargs):
+        """Agent requests the details of several devices."""
+
+        agent_id = kwargs.get('agent_id')
+        devices = kwargs.get('devices')
+        LOG.debug(_("Devices %(devices)s details requested from "
+                    "%(agent_id)s"), locals())
+        return self._get_devices_details(rpc_context, devices)
 
     def update_device_down(self, rpc_context, **kwargs):
         """Device no longer exists on agent."""
 
         device = kwargs.get('device')
-        port = self.get_port_from_device(device)
-        if port:
-            entry = {'device': device,
-                     'exists': True}
-            # Set port status to DOWN
-            port_id = port['port_id']
-            brocade_db.update_port_state(rpc_context, port_id, False)
-        else:
-            entry = {'device': device,
-                     'exists': False}
-            LOG.debug(_("%s can not be found in database"), device)
-        return entry
+        return self._update_devices_down(rpc_context, [device])[0]
+
+    def update_devices_down(self, rpc_context, **kwargs):
+        """Devices no longer exist on agent."""
+
+        devices = kwargs.get('devices')
+        return self._update_devices_down(rpc_context, devices)
 
 
 class AgentNotifierApi(proxy.RpcProxy,
@@ -116,6 +116,18 @@ def get_port(context, port_id):
     return port
 
 
+def get_ports_by_ids(context, port_ids):
+    """get the brocade specific ports of the given ids, by truncated id."""
+
+    port_ids = [port_id[0:11] for port_id in port_ids]
+    if not port_ids:
+        return {}
+    session = context.session
+    ports = (session.query(BrocadePort).
+             filter(BrocadePort.port_id.in_(port_ids)).all())
+    return dict((port.port_id, port) for port in ports)
+
+
 def get_ports(context, network_id=None):
     """get a brocade specific port."""
 
@@ -150,3 +162,15 @@ def update_port_state(context, port_id, admin_state_up):
     session = context.session
     session.query(BrocadePort).filter_by(
         port_id=port_id).update({'admin_state_up': admin_state_up})
+
+
+def update_ports_state(context, port_ids, admin_state_up):
+    """Update the state of several ports."""
+
+    port_ids = [port_id[0:11] for port_id in port_ids]
+    if not port_ids:
+        return
+    session = context.session
+    session.query(BrocadePort).filter(
+        BrocadePort.port_id.in_(port_ids)).update(
+            {'admin_state_up': admin_state_up}, synchronize_session='fetch')
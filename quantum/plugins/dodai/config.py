@@ -29,6 +29,65 @@ ofc_opts = [
                 default=[],
                 help="The name list of the networks that have no need to send "
                      "requests to OFC."),
+    cfg.IntOpt('ofc_client_pool_size',
+               default=10,
+               help='Maximum number of SOAP clients kept open to OFC.'),
+    cfg.IntOpt('ofc_client_timeout',
+               default=30,
+               help='Timeout in seconds of HTTP requests to OFC.'),
+    cfg.IntOpt('ofc_client_idle_timeout',
+               default=60,
+               help='Seconds after which an idle SOAP client is reconnected. '
+                    '0 disables the check.'),
+    cfg.StrOpt('ofc_wsdl_cache_dir',
+               default=None,
+               help='Directory to cache the parsed WSDL of OFC in. If not '
+                    'set, the WSDL is only cached in memory.'),
+    cfg.IntOpt('ofc_topology_cache_ttl',
+               default=60,
+               help='Seconds the regions and server ports read from OFC are '
+                    'cached for. 0 disables the cache.'),
+    cfg.IntOpt('ofc_fanout_workers',
+               default=8,
+               help='Maximum number of outer port association settings sent '
+                    'to OFC concurrently.'),
+    cfg.IntOpt('ofc_fanout_per_switch',
+               default=2,
+               help='Maximum number of outer port association settings sent '
+                    'to OFC concurrently for the same switch.'),
+    cfg.BoolOpt('ofc_async',
+                default=False,
+                help='Queue OFC operations in the database and apply them '
+                     'in the background instead of during API requests.'),
+    cfg.IntOpt('ofc_job_workers',
+               default=4,
+               help='Number of regions whose queued OFC operations are '
+                    'applied concurrently.'),
+    cfg.IntOpt('ofc_job_poll_interval',
+               default=5,
+               help='Seconds between two scans of the OFC job queue.'),
+    cfg.IntOpt('ofc_job_max_retries',
+               default=5,
+               help='Number of attempts after which a queued OFC operation '
+                    'is given up.'),
+    cfg.IntOpt('ofc_job_retry_interval',
+               default=2,
+               help='Seconds before the first retry of a failed OFC '
+                    'operation. The interval doubles on each retry.'),
+    cfg.IntOpt('ofc_job_max_retry_interval',
+               default=60,
+               help='Maximum seconds between two retries of a failed OFC '
+                    'operation.'),
+    cfg.IntOpt('ofc_job_timeout',
+               default=300,
+               help='Seconds after which a running OFC operation is assumed '
+                    'to belong to a dead worker and is run again.'),
+    cfg.IntOpt('ofc_reconcile_interval',
+               default=0,
+               help='Seconds between two reconciliations of OFC with the '
+                    'database. A difference is corrected once two '
+                    'consecutive reconciliations found it. 0 disables the '
+                    'periodic reconciliation.'),
 ]
 
 nova_opts = [
@@ -37,6 +96,9 @@ nova_opts = [
                secret=True),
     cfg.StrOpt('tenant_name', help=_("Nova admin tenant name")),
     cfg.StrOpt('auth_url', help=_("Authentication URL")),
+    cfg.IntOpt('baremetal_cache_ttl', default=300,
+               help=_("Seconds bare-metal nodes read from Nova are cached "
+                      "for. 0 disables the cache.")),
 ]
 
 CONF = cfg.CONF
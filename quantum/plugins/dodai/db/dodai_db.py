@@ -23,6 +23,7 @@ from quantum.db import api as db
 from quantum.db import l3_db
 from quantum.db import models_v2
 from quantum.openstack.common import log
+from quantum.openstack.common import timeutils
 from quantum.plugins.dodai.db import dodai_models
 from quantum.plugins.dodai import exceptions as d_exc
 
@@ -157,3 +158,118 @@ def get_all_dodai_outer_ports(session):
         session = db.get_session()
     return (session.query(dodai_models.DodaiOuterPort).
                           all())
+
+
+def get_outer_port_associations(session):
+    """
+    Get the outer port associations set on the OFC as
+    {(dpid, outer_port, outer_vlan_id): region_name}.
+    """
+    if not session:
+        session = db.get_session()
+    model = dodai_models.DodaiOuterPortAssociation
+    return dict(((dpid, outer_port, outer_vlan_id), region_name)
+                for dpid, outer_port, outer_vlan_id, region_name in
+                session.query(model.dpid, model.outer_port,
+                              model.outer_vlan_id, model.region_name))
+
+
+def update_outer_port_associations(session, added, removed):
+    """
+    Records the outer port associations set on and cleared from the OFC.
+
+    added is a list of (dpid, outer_port, outer_vlan_id, region_name),
+    removed a list of (dpid, outer_port, outer_vlan_id).
+    """
+    if not session:
+        session = db.get_session()
+    model = dodai_models.DodaiOuterPortAssociation
+    with session.begin(subtransactions=True):
+        for dpid, outer_port, outer_vlan_id in removed:
+            (session.query(model).
+             filter_by(dpid=dpid, outer_port=outer_port,
+                       outer_vlan_id=outer_vlan_id).
+             delete(synchronize_session=False))
+        for dpid, outer_port, outer_vlan_id, region_name in added:
+            session.merge(model(dpid, outer_port, outer_vlan_id,
+                                region_name))
+
+
+def create_ofc_job(session, region_name, action, params, status,
+                   resource=None, resource_id=None):
+    """
+    Queues an OFC job.
+    """
+    if not session:
+        session = db.get_session()
+    with session.begin(subtransactions=True):
+        job = dodai_models.DodaiOFCJob(region_name, action, params, resource,
+                                       resource_id, status,
+                                       timeutils.utcnow())
+        session.add(job)
+    return job
+
+
+def get_ofc_jobs(session, statuses, region_name=None):
+    """
+    Get OFC job records with one of statuses, in queued order.
+    """
+    if not session:
+        session = db.get_session()
+    query = (session.query(dodai_models.DodaiOFCJob).
+             filter(dodai_models.DodaiOFCJob.status.in_(statuses)))
+    if region_name is not None:
+        query = query.filter_by(region_name=region_name)
+    return query.order_by(dodai_models.DodaiOFCJob.id).all()
+
+
+def claim_ofc_job(session, job, status):
+    """
+    Moves an OFC job to status unless another worker changed it since it
+    was read. Returns whether the job was claimed.
+    """
+    if not session:
+        session = db.get_session()
+    now = timeutils.utcnow()
+    with session.begin(subtransactions=True):
+        count = (session.query(dodai_models.DodaiOFCJob).
+                 filter_by(id=job.id, status=job.status,
+                           updated_at=job.updated_at).
+                 update({'status': status, 'updated_at': now},
+                        synchronize_session=False))
+    if count:
+        job.status = status
+        job.updated_at = now
+    return bool(count)
+
+
+def update_ofc_job(session, id, **values):
+    if not session:
+        session = db.get_session()
+    values['updated_at'] = timeutils.utcnow()
+    with session.begin(subtransactions=True):
+        (session.query(dodai_models.DodaiOFCJob).
+         filter_by(id=id).
+         update(values, synchronize_session=False))
+
+
+def delete_ofc_job(session, id):
+    if not session:
+        session = db.get_session()
+    with session.begin(subtransactions=True):
+        (session.query(dodai_models.DodaiOFCJob).
+         filter_by(id=id).
+         delete(synchronize_session=False))
+
+
+def update_resource_status(session, resource, id, status):
+    """
+    Sets the status of a network or a port, if it still exists.
+    """
+    if not session:
+        session = db.get_session()
+    model = {'network': models_v2.Network, 'port': models_v2.Port}[resource]
+    with session.begin(subtransactions=True):
+        (session.query(model).
+         filter_by(id=id).
+         update({'status': status}, synchronize_session=False))
@@ -14,7 +14,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import (Boolean, Column, DateTime, ForeignKey, Integer,
+                        String, Text)
 
 from quantum.db import models_v2
 from quantum.db.models_v2 import model_base
@@ -24,7 +25,7 @@ class DodaiNetwork(model_base.BASEV2):
     __tablename__ = 'dodai_networks'
 
     network_id = Column(String(36), nullable=False, primary_key=True)
-    vlan_id = Column(Integer)
+    vlan_id = Column(Integer, index=True)
 
     def __init__(self, network_id, vlan_id):
         self.network_id = network_id
@@ -49,3 +50,60 @@ class DodaiOuterPort(model_base.BASEV2):
     def __repr__(self):
         return "<DodaiOuterPort(%d, %s, %d)>" % (self.id, self.dpid,
                                                  self.outer_port)
+
+
+class DodaiOuterPortAssociation(model_base.BASEV2):
+    """An outer port association the plugin has set on the OFC.
+
+    The OFC offers no way to read the associations back, so this is the
+    state the reconciler compares the expected associations with.
+    """
+    __tablename__ = 'dodai_outer_port_associations'
+
+    dpid = Column(String(64), nullable=False, primary_key=True)
+    outer_port = Column(Integer, nullable=False, primary_key=True,
+                        autoincrement=False)
+    outer_vlan_id = Column(Integer, nullable=False, primary_key=True,
+                           autoincrement=False)
+    region_name = Column(String(36), nullable=False)
+
+    def __init__(self, dpid, outer_port, outer_vlan_id, region_name):
+        self.dpid = dpid
+        self.outer_port = outer_port
+        self.outer_vlan_id = outer_vlan_id
+        self.region_name = region_name
+
+    def __repr__(self):
+        return "<DodaiOuterPortAssociation(%s, %s, %s, %s)>" % (
+            self.dpid, self.outer_port, self.outer_vlan_id, self.region_name)
+
+
+class DodaiOFCJob(model_base.BASEV2):
+    """An OFC operation queued to be applied asynchronously."""
+    __tablename__ = 'dodai_ofc_jobs'
+
+    id = Column(Integer, nullable=False, primary_key=True, autoincrement=True)
+    region_name = Column(String(36), nullable=False, index=True)
+    action = Column(String(36), nullable=False)
+    params = Column(Text)
+    resource = Column(String(16))
+    resource_id = Column(String(36))
+    status = Column(String(16), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime)
+    updated_at = Column(DateTime, nullable=False)
+
+    def __init__(self, region_name, action, params, resource, resource_id,
+                 status, updated_at):
+        self.region_name = region_name
+        self.action = action
+        self.params = params
+        self.resource = resource
+        self.resource_id = resource_id
+        self.status = status
+        self.attempts = 0
+        self.updated_at = updated_at
+
+    def __repr__(self):
+        return "<DodaiOFCJob(%s, %s, %s, %s)>" % (self.id, self.region_name,
+                                                  self.action, self.status)
@@ -16,39 +16,37 @@
 
 import netaddr
 import os
-import re
 import webob.exc
 
-from novaclient import extension as nc_ext
-from novaclient.v1_1 import client as nova_client
-from novaclient.v1_1.contrib import baremetal
 from oslo.config import cfg
 
 import quantum
 from quantum.api.v2 import attributes as attr
+from quantum.common import constants
+from quantum.common import exceptions as q_exc
 from quantum.db import api as db
 from quantum.db import db_base_plugin_v2
 from quantum.db import l3_db
 from quantum.db import models_v2
+from quantum.db import sqlalchemyutils
 from quantum.extensions import l3
-from quantum.openstack.common import jsonutils
 from quantum.openstack.common import log
+from quantum.openstack.common import loopingcall
 # NOTE (yokose): this import is needed for config init
 from quantum.plugins.dodai import config
 from quantum.plugins.dodai.db import dodai_db
 from quantum.plugins.dodai.db import dodai_models
 from quantum.plugins.dodai import exceptions
+from quantum.plugins.dodai import floating_ip_metadata
+from quantum.plugins.dodai import nova_cache
+from quantum.plugins.dodai import ofc_job_worker
 from quantum.plugins.dodai import ofc_manager
+from quantum.plugins.dodai import reconciler
 
 
 LOG = log.getLogger(__name__)
 CONF = cfg.CONF
-NOVACLIENT_EXTENSIONS = [
-    nc_ext.Extension(baremetal.__name__.split('.')[-1], baremetal),
-    ]
-ACTIVE_STATES = ("ACTIVE",)
 DEVICE_OWNER_COMPUTE_PREFIX = 'compute:'
-METAKEY_FLOATING_IP_PREFIX = 'floating_ip_'
 
 
 class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
@@ -58,6 +56,10 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
     # NOTE(yokose): 'router' is needed for '--router:external' option
     supported_extension_aliases = ['router', 'dodai-outer-port']
 
+    __native_bulk_support = True
+    __native_pagination_support = True
+    __native_sorting_support = True
+
     def __init__(self):
         attr.RESOURCE_ATTRIBUTE_MAP['networks'].update({
                 'vlan_id': {'allow_post': True,
@@ -72,23 +74,81 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
                                            'plugins/dodai/extensions'))
         db.configure_db()
         self.ofc = ofc_manager.OFCManager()
+        self.bm_cache = nova_cache.BareMetalCache(
+            CONF.NOVA.baremetal_cache_ttl)
+        self.ofc_worker = None
+        if CONF.OFC.ofc_async:
+            self.ofc_worker = ofc_job_worker.OFCJobWorker(self)
+            self.ofc_worker.start()
+        if CONF.OFC.ofc_reconcile_interval:
+            self.reconciler = reconciler.OFCReconciler(self.ofc,
+                                                       self.bm_cache)
+            interval = CONF.OFC.ofc_reconcile_interval
+            self.reconcile_loop = loopingcall.LoopingCall(
+                self.reconciler.periodic_reconcile)
+            self.reconcile_loop.start(interval=interval,
+                                      initial_delay=interval)
 
     def create_network(self, context, network):
         LOG.debug("#DodaiPlugin.create_network() called.")
         LOG.debug("#network=%s" % network)
+        session = context.session
+        self._validate_vlan_ids(session, [network['network']['vlan_id']])
+
+        with session.begin(subtransactions=True):
+            net, vlan_id = self._create_network_db(context, network)
+            # create region
+            self._create_regions(context, [(net, vlan_id)])
+        if self.ofc_worker:
+            self.ofc_worker.wakeup()
+
+        # format response
+        net = self._make_dodai_network_dict(net, None, vlan_id)
+        LOG.info(_("Network created successfully."))
+        return net
+
+    def create_network_bulk(self, context, networks):
+        LOG.debug("#DodaiPlugin.create_network_bulk() called.")
+        LOG.debug("#networks=%s" % networks)
+        session = context.session
+        items = networks['networks']
+        self._validate_vlan_ids(session, [item['network']['vlan_id']
+                                          for item in items])
+
+        with session.begin(subtransactions=True):
+            nets = [self._create_network_db(context, item) for item in items]
+            # create regions, in a single batch
+            self._create_regions(context, nets)
+        if self.ofc_worker:
+            self.ofc_worker.wakeup()
+
+        # format response
+        nets = [self._make_dodai_network_dict(net, None, vlan_id)
+                for net, vlan_id in nets]
+        LOG.info(_("Networks created successfully."))
+        return nets
+
+    def _validate_vlan_ids(self, session, vlan_ids):
+        seen = set()
+        for vlan_id in vlan_ids:
+            # check vlan id
+            res = _validate_non_negative_or_none(vlan_id)
+            if res:
+                msg = (_("Invalid input for %(attr)s. Reason: %(reason)s.") %
+                       dict(attr='vlan_id', reason=res))
+                raise webob.exc.HTTPBadRequest(msg)
+            if not vlan_id:
+                continue
+            if (vlan_id in seen or
+                    dodai_db.get_dodai_network_by_vlan_id(session, vlan_id)):
+                raise exceptions.InvalidVlanId(vlan_id=vlan_id)
+            seen.add(vlan_id)
+
+    def _create_network_db(self, context, network):
         session = context.session
         vlan_id = network['network']['vlan_id']
-        # check vlan id
-        res = _validate_non_negative_or_none(vlan_id)
-        if res:
-            msg = _("Invalid input for %(attr)s. Reason: %(reason)s.")\
-                  % dict(attr='vlan_id', reason=res)
-            raise webob.exc.HTTPBadRequest(msg)
-        if vlan_id and dodai_db.get_dodai_network_by_vlan_id(session, vlan_id):
-            raise exceptions.InvalidVlanId(vlan_id=vlan_id)
         # NOTE(yokose): router:external is always true
         network['network'][l3.EXTERNAL] = True
-
         with session.begin(subtransactions=True):
             # create networks
             net = super(DodaiL2EPlugin, self).create_network(context, network)
@@ -98,20 +158,28 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
             # create externalnetworks
             self._process_l3_create(context, network['network'], net['id'])
             self._extend_network_dict_l3(context, net)
-            # create region
-            if self._is_ofc_controlled_network(context, net['id']):
-                region_name = _uuid_to_region_name(net['id'])
-                try:
-                    if not self.ofc.has_region(region_name):
-                        self.ofc.create_region(region_name, vlan_id)
-                except Exception as e:
-                    LOG.error(_("Error occurred in ofc.create_region: %s") % e)
-                    raise e
-
-        # format response
-        net = self._make_dodai_network_dict(net, None, vlan_id)
-        LOG.info(_("Network created successfully."))
-        return net
+        return net, vlan_id
+
+    def _create_regions(self, context, nets):
+        regions = []
+        for net, vlan_id in nets:
+            if not _is_ofc_controlled_network_name(net['name']):
+                continue
+            region_name = _uuid_to_region_name(net['id'])
+            if self.ofc_worker:
+                self._enqueue_ofc_job(context, region_name, 'create_region',
+                                      {'vlan_id': vlan_id},
+                                      'network', net['id'])
+                net['status'] = constants.NET_STATUS_BUILD
+            else:
+                regions.append((region_name, vlan_id))
+        if not regions:
+            return
+        try:
+            self.ofc.create_regions(regions)
+        except Exception as e:
+            LOG.error(_("Error occurred in ofc.create_region: %s") % e)
+            raise e
 
     def update_network(self, context, id, network):
         LOG.debug("#DodaiPlugin.update_network() called.")
@@ -130,45 +198,57 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
         LOG.info(_("Network updated successfully."))
         return self.get_network(context, id)
 
-    def get_network(self, context, id, fields=None):
+    def _get_dodai_networks_query(self, context, filters=None):
+        # NOTE: externalnetworks is already outer joined by the l3 model
+        #       query hook, so the external flags and the vlan ids of all
+        #       the networks are loaded by this single query.
         query = self._model_query(context, models_v2.Network)
         query = query.outerjoin(dodai_models.DodaiNetwork,
-                                models_v2.Network.id ==\
-                                    dodai_models.DodaiNetwork.network_id)
-        query = query.add_columns(dodai_models.DodaiNetwork.vlan_id)
-        net, vlan_id = query.filter(models_v2.Network.id == id).first()
+                                models_v2.Network.id ==
+                                dodai_models.DodaiNetwork.network_id)
+        query = query.add_columns(dodai_models.DodaiNetwork.vlan_id,
+                                  l3_db.ExternalNetwork.network_id)
+        if filters:
+            query = self._apply_filters_to_query(query, models_v2.Network,
+                                                 filters)
+            if filters.get('vlan_id'):
+                query = query.filter(dodai_models.DodaiNetwork.vlan_id.in_(
+                    filters['vlan_id']))
+        return query
+
+    def get_network(self, context, id, fields=None):
+        query = self._get_dodai_networks_query(context)
+        result = query.filter(models_v2.Network.id == id).first()
+        if result is None:
+            raise q_exc.NetworkNotFound(net_id=id)
+        net, vlan_id, external_id = result
 
         # format response
-        net[l3.EXTERNAL] = self._network_is_external(context, id)
-        net = self._make_dodai_network_dict(net, fields, vlan_id)
-        return net
+        return self._make_dodai_network_dict(net, fields, vlan_id,
+                                             external_id is not None)
 
     def get_networks(self, context, filters=None, fields=None,
                      sorts=None, limit=None, marker=None, page_reverse=False):
-        query = self._model_query(context, models_v2.Network)
-        query = query.outerjoin(dodai_models.DodaiNetwork,
-                                models_v2.Network.id ==\
-                                    dodai_models.DodaiNetwork.network_id)
-        query = query.add_columns(dodai_models.DodaiNetwork.vlan_id)
-        if filters:
-            query = self._apply_filters_to_query(query, models_v2.Network,
-                                                 filters)
-            for key, value in filters.iteritems():
-                if key == 'vlan_id':
-                    column = dodai_models.DodaiNetwork.vlan_id
-                else:
-                    column = getattr(models_v2.Network, key, None)
-                if column:
-                    query = query.filter(column.in_(value))
+        marker_obj = self._get_marker_obj(context, 'network', limit, marker)
+        query = self._get_dodai_networks_query(context, filters)
+        query = self._apply_eager_loading(query, models_v2.Network, fields)
+        if limit and page_reverse and sorts:
+            sorts = [(s[0], not s[1]) for s in sorts]
+        query = sqlalchemyutils.paginate_query(query, models_v2.Network,
+                                               limit, sorts,
+                                               marker_obj=marker_obj)
 
         # format response
-        nets = []
-        for net, vlan_id in query.all():
-            net[l3.EXTERNAL] = self._network_is_external(context, id)
-            net = self._make_dodai_network_dict(net, fields, vlan_id)
-            nets.append(net)
+        nets = [self._make_dodai_network_dict(net, fields, vlan_id,
+                                              external_id is not None)
+                for net, vlan_id, external_id in query.all()]
+        if limit and page_reverse:
+            nets.reverse()
         return nets
 
+    def get_networks_count(self, context, filters=None):
+        return self._get_dodai_networks_query(context, filters).count()
+
     def delete_network(self, context, id):
         LOG.debug("#DodaiPlugin.delete_network() called.")
         LOG.debug("#id=%s" % id)
@@ -179,65 +259,117 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
                 region_name = _uuid_to_region_name(id)
                 dodai_net = dodai_db.get_dodai_network(session, id)
                 vlan_id = dodai_net['vlan_id'] if dodai_net else None
-                try:
-                    self.ofc.remove_region(region_name, vlan_id)
-                except Exception as e:
-                    LOG.error(_("Error occurred in ofc.remove_region: %s") % e)
-                    raise e
+                if self.ofc_worker:
+                    self._enqueue_ofc_job(context, region_name,
+                                          'remove_region',
+                                          {'vlan_id': vlan_id})
+                else:
+                    try:
+                        self.ofc.remove_region(region_name, vlan_id)
+                    except Exception as e:
+                        LOG.error(_("Error occurred in ofc.remove_region: "
+                                    "%s") % e)
+                        raise e
             # delete dodai_networks
             dodai_db.delete_dodai_network(session, id)
             # delete networks
             super(DodaiL2EPlugin, self).delete_network(context, id)
+        if self.ofc_worker:
+            self.ofc_worker.wakeup()
 
         LOG.info(_("Network deleted successfully."))
 
-    def _make_dodai_network_dict(self, network, fields=None, vlan_id=None):
+    def _make_dodai_network_dict(self, network, fields=None, vlan_id=None,
+                                 external=None):
+        if external is None:
+            external = network[l3.EXTERNAL]
         res = {'id': network['id'],
                'name': network['name'],
                'tenant_id': network['tenant_id'],
                'admin_state_up': network['admin_state_up'],
                'status': network['status'],
                'shared': network['shared'],
-               'subnets': [subnet['id']
-                           for subnet in network['subnets']],
-               l3.EXTERNAL: network[l3.EXTERNAL],
+               l3.EXTERNAL: external,
                'vlan_id': vlan_id}
+        # NOTE: only load the subnets of the network when they are wanted.
+        if not fields or 'subnets' in fields:
+            res['subnets'] = [subnet['id'] for subnet in network['subnets']]
 
         return self._fields(res, fields)
 
     def create_port(self, context, port):
         LOG.debug("#DodaiPlugin.create_port() called.")
         LOG.debug("#port=%s" % port)
-        device_owner = port['port']['device_owner']
-        # create ports
-        db_port = super(DodaiL2EPlugin, self).create_port(context, port)
+        db_port = self._create_ports(context, [port])[0]
+        LOG.info(_("Port created successfully."))
+        return db_port
 
-        # NOTE(yokose): If this method is called from run_instance,
-        #               device_owner is set as 'compute:None'.
-        if device_owner.startswith(DEVICE_OWNER_COMPUTE_PREFIX):
-            net_id = port['port']['network_id']
-            if self._is_ofc_controlled_network(context, net_id):
-                region_name = _uuid_to_region_name(net_id)
-                tenant_id = port['port']['tenant_id']
-                device_id = port['port']['device_id']
-                mac_address = port['port']['mac_address']
-                bm_interface = self._get_bm_interface_by_port(
-                                            tenant_id, device_id, mac_address)
-                port_no = bm_interface['port_no']
-                dpid = bm_interface['datapath_id']
-                # set server port
-                try:
-                    self.ofc.update_for_run_instance(region_name,
-                                                     port_no, dpid)
-                except Exception as e:
-                    LOG.error(_("Error occurred in "
-                                "ofc.update_for_run_instance: %s") % e)
+    def create_port_bulk(self, context, ports):
+        LOG.debug("#DodaiPlugin.create_port_bulk() called.")
+        LOG.debug("#ports=%s" % ports)
+        db_ports = self._create_ports(context, ports['ports'])
+        LOG.info(_("Ports created successfully."))
+        return db_ports
+
+    def _create_ports(self, context, ports):
+        """Create ports, and their server ports on OFC in a single batch."""
+        session = context.session
+        controlled = {}
+        db_ports = []
+        server_ports = []
+        with session.begin(subtransactions=True):
+            for port in ports:
+                device_owner = port['port']['device_owner']
+                net_id = port['port']['network_id']
+                # NOTE(yokose): If this method is called from run_instance,
+                #               device_owner is set as 'compute:None'.
+                run_instance = device_owner.startswith(
+                    DEVICE_OWNER_COMPUTE_PREFIX)
+                if run_instance:
+                    if net_id not in controlled:
+                        controlled[net_id] = self._is_ofc_controlled_network(
+                            context, net_id)
+                    run_instance = controlled[net_id]
+                if run_instance and self.ofc_worker:
+                    port['port']['status'] = constants.PORT_STATUS_BUILD
+                # create ports
+                db_port = super(DodaiL2EPlugin, self).create_port(context,
+                                                                  port)
+                db_ports.append(db_port)
+                if not run_instance:
+                    continue
+                if self.ofc_worker:
+                    params = {'tenant_id': db_port['tenant_id'],
+                              'device_id': db_port['device_id'],
+                              'mac_address': db_port['mac_address']}
+                    self._enqueue_ofc_job(context,
+                                          _uuid_to_region_name(net_id),
+                                          'run_instance', params,
+                                          'port', db_port['id'])
+                else:
+                    server_ports.append(db_port)
+        if self.ofc_worker:
+            self.ofc_worker.wakeup()
+        if not server_ports:
+            return db_ports
+
+        # set server ports
+        try:
+            bm_interfaces = self._get_bm_interfaces_by_ports(server_ports)
+            self.ofc.update_for_run_instances(
+                [(_uuid_to_region_name(server_port['network_id']),
+                  bm_interfaces[server_port['id']]['port_no'],
+                  bm_interfaces[server_port['id']]['datapath_id'])
+                 for server_port in server_ports])
+        except Exception as e:
+            LOG.error(_("Error occurred in "
+                        "ofc.update_for_run_instance: %s") % e)
+            with session.begin(subtransactions=True):
+                for db_port in db_ports:
                     super(DodaiL2EPlugin,
                           self).delete_port(context, db_port['id'])
-                    raise e
-
-        LOG.info(_("Port created successfully."))
-        return db_port
+            raise e
+        return db_ports
 
     def delete_port(self, context, id):
         LOG.debug("#DodaiPlugin.delete_port() called.")
@@ -261,13 +393,21 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
                 port_no = bm_interface['port_no']
                 dpid = bm_interface['datapath_id']
                 # clear server port, remove region
-                try:
-                    self.ofc.update_for_terminate_instance(
-                                 region_name, port_no, dpid, vlan_id)
-                except Exception as e:
-                    LOG.error(_("Error occurred in "
-                                "ofc.update_for_terminate_instance: %s") % e)
-                    raise e
+                if self.ofc_worker:
+                    self._enqueue_ofc_job(context, region_name,
+                                          'terminate_instance',
+                                          {'server_port': port_no,
+                                           'dpid': dpid,
+                                           'vlan_id': vlan_id})
+                else:
+                    try:
+                        self.ofc.update_for_terminate_instance(
+                            region_name, port_no, dpid, vlan_id)
+                    except Exception as e:
+                        LOG.error(_("Error occurred in "
+                                    "ofc.update_for_terminate_instance: %s")
+                                  % e)
+                        raise e
 
         with session.begin(subtransactions=True):
         # set null to floatingips.fixed_port_id, fixed_ip_address
@@ -277,8 +417,10 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
             session.query(l3_db.FloatingIP).filter_by(
                     fixed_port_id=id).update({'fixed_port_id': None,
                                               'fixed_ip_address': None})
-        # delete ports
-        super(DodaiL2EPlugin, self).delete_port(context, id)
+            # delete ports
+            super(DodaiL2EPlugin, self).delete_port(context, id)
+        if self.ofc_worker:
+            self.ofc_worker.wakeup()
 
         LOG.info(_("Port deleted successfully."))
 
@@ -354,13 +496,7 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
         LOG.info(_("Floating IP deleted successfully."))
 
     def _get_nova_client(self, tenant_id):
-        nc = nova_client.Client(CONF.NOVA.username,
-                                CONF.NOVA.password,
-                                CONF.NOVA.tenant_name,
-                                CONF.NOVA.auth_url,
-                                extensions=NOVACLIENT_EXTENSIONS,
-                                no_cache=True)
-        return nc
+        return nova_cache.get_client()
 
     def _get_instance_by_uuid(self, tenant_id, uuid):
         nc = self._get_nova_client(tenant_id)
@@ -368,11 +504,7 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
         return instance
 
     def _get_bm_node_by_uuid(self, tenant_id, uuid):
-        nc = self._get_nova_client(tenant_id)
-        bm_nodes = [n for n in nc.baremetal.list() if n.uuid == uuid]
-        if not bm_nodes:
-            return None
-        return bm_nodes[0]
+        return self.bm_cache.get_node(uuid)
 
     def _get_bm_interface_by_port(self, tenant_id, device_id, mac_address):
         instance = self._get_instance_by_uuid(tenant_id, device_id)
@@ -380,17 +512,47 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
             LOG.warning(_("Error occurred:"))
             raise Exception("plugin raised exception, check logs")
         node_uuid = instance.__getattr__('OS-EXT-SRV-ATTR:hypervisor_hostname')
+        # NOTE: the node is being (un)assigned to an instance, refresh it
+        #       instead of trusting what was cached before.
+        if node_uuid:
+            self.bm_cache.invalidate(node_uuid)
         bm_node = self._get_bm_node_by_uuid(tenant_id, node_uuid)
         if not bm_node:
             LOG.warning(_("Error occurred:"))
             raise Exception("plugin raised exception, check logs")
-        for bm_interface in bm_node.interfaces:
-            if mac_address == bm_interface['address']:
-                LOG.debug("#bm_interface=%s" % bm_interface)
-                return bm_interface
-        else:
+        bm_interface = self.bm_cache.get_interface(node_uuid, mac_address)
+        if not bm_interface:
             LOG.warning(_("Error occurred. bm_interface does not exist."))
             raise Exception("plugin raised exception, check logs")
+        LOG.debug("#bm_interface=%s" % bm_interface)
+        return bm_interface
+
+    def _get_bm_interfaces_by_ports(self, ports):
+        """Return {port id: bm_interface}, with one Nova lookup per
+        instance."""
+        bm_interfaces = {}
+        node_uuids = {}
+        for port in ports:
+            device_id = port['device_id']
+            if device_id not in node_uuids:
+                instance = self._get_instance_by_uuid(port['tenant_id'],
+                                                      device_id)
+                if not instance:
+                    LOG.warning(_("Error occurred:"))
+                    raise Exception("plugin raised exception, check logs")
+                node_uuids[device_id] = instance.__getattr__(
+                    'OS-EXT-SRV-ATTR:hypervisor_hostname')
+                # NOTE: the node is being assigned to the instance, refresh
+                #       it instead of trusting what was cached before.
+                if node_uuids[device_id]:
+                    self.bm_cache.invalidate(node_uuids[device_id])
+            bm_interface = self.bm_cache.get_interface(node_uuids[device_id],
+                                                       port['mac_address'])
+            if not bm_interface:
+                LOG.warning(_("Error occurred. bm_interface does not exist."))
+                raise Exception("plugin raised exception, check logs")
+            bm_interfaces[port['id']] = bm_interface
+        return bm_interfaces
 
     def _get_subnet_from_floating_ip(self, context, fip):
         # NOTE(yokose): identify subnet by ipallocations
@@ -405,50 +567,19 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
     def _set_metadata_object_into_floating_ip_metadata(self, tenant_id,
                                                        instance_uuid,
                                                        new_meta_obj):
-        floating_ip_metadata = self._get_floating_ip_metadata(tenant_id,
-                                                              instance_uuid)
-        max_num = 0
-        for key, value in floating_ip_metadata.iteritems():
-            LOG.debug("#key=%s" % key)
-            LOG.debug("#value=%s" % value)
-            match = re.match('^' + METAKEY_FLOATING_IP_PREFIX + '(\d+)$', key)
-            if match is not None:
-                num = int(match.group(1))
-                meta_obj = jsonutils.loads(value)
-                LOG.debug("#num=%s" % str(num))
-                LOG.debug("#new_meta_obj=%s" % new_meta_obj)
-                LOG.debug("#meta_obj=%s" % meta_obj)
-                if new_meta_obj['ip_address'] == meta_obj['ip_address']:
-                    self._set_instance_metadata(tenant_id, instance_uuid,
-                                    key, jsonutils.dumps(new_meta_obj))
-                    return
-                if max_num < num:
-                    max_num = num
-        else:
-            LOG.debug("#max_num=%s" % str(max_num))
-            self._set_instance_metadata(tenant_id, instance_uuid,
-                         METAKEY_FLOATING_IP_PREFIX + unicode(max_num + 1),
-                         jsonutils.dumps(new_meta_obj))
+        nc = self._get_nova_client(tenant_id)
+        metadata = floating_ip_metadata.FloatingIPMetadata(nc, instance_uuid)
+        metadata.set(new_meta_obj)
+        metadata.apply()
 
     def _delete_metadata_object_into_floating_ip_metadata(self, tenant_id,
                                                           instance_uuid,
                                                           floating_ip_address):
-        floating_ip_metadata = self._get_floating_ip_metadata(tenant_id,
-                                                              instance_uuid)
-        for key, value in floating_ip_metadata.iteritems():
-            match = re.match('^' + METAKEY_FLOATING_IP_PREFIX + '(\d+)$', key)
-            if match is not None:
-                meta_obj = jsonutils.loads(value)
-                if floating_ip_address == meta_obj['ip_address']:
-                    LOG.debug("Tring to delete metadata from instance.")
-                    LOG.debug("#tenant_id=%s" % tenant_id)
-                    LOG.debug("#instance_uuid=%s" % instance_uuid)
-                    LOG.debug("#key=%s" % key)
-                    self._delete_instance_metadata(tenant_id,
-                                                   instance_uuid, key)
-                    return
-        else:
+        nc = self._get_nova_client(tenant_id)
+        metadata = floating_ip_metadata.FloatingIPMetadata(nc, instance_uuid)
+        if not metadata.delete(floating_ip_address):
             LOG.warn("Instance metadata has already been deleted.")
+        metadata.apply()
 
     def _create_metadata_object(self, context, floatingip_id, fixed_port_id):
         fixed_port = self._get_port(context, fixed_port_id)
@@ -469,47 +600,22 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
                     'dnsnameservers': dnss}
         return meta_obj
 
-    def _get_floating_ip_metadata(self, tenant_id, instance_uuid):
-        metadata = self._get_instance_metadata(tenant_id, instance_uuid)
-        floating_ip_metadata = {}
-        for key, value in metadata.iteritems():
-            match = re.match('^' + METAKEY_FLOATING_IP_PREFIX + '(\d+)$', key)
-            if match is not None:
-                floating_ip_metadata.update({key: value})
-        return floating_ip_metadata
-
-    def _get_instance_metadata(self, tenant_id, instance_uuid):
-        nc = self._get_nova_client(tenant_id)
-        result = nc.servers.get(instance_uuid)
-        return result.metadata
-
-    def _set_instance_metadata(self, tenant_id, instance_uuid, key, value):
-        nc = self._get_nova_client(tenant_id)
-        # NOTE(yokose): check if instance is in-service to set_meta
-        self._health_check_instance(tenant_id, instance_uuid)
-        result = nc.servers.set_meta(instance_uuid, {key: value})
-        return result
-
-    def _delete_instance_metadata(self, tenant_id, instance_uuid, key):
-        nc = self._get_nova_client(tenant_id)
-        # NOTE(yokose): check if instance is in-service to delete_meta
-        self._health_check_instance(tenant_id, instance_uuid)
-        nc.servers.delete_meta(instance_uuid, [key])
-
-    def _health_check_instance(self, tenant_id, instance_uuid):
-        nc = self._get_nova_client(tenant_id)
-        instance = nc.servers.get(instance_uuid)
-        task_state = getattr(instance, "OS-EXT-STS:task_state", None)
-        if instance.status not in ACTIVE_STATES or task_state is not None:
-            msg = _("Instance is not in-service. status: %s, task_state: %s")\
-                  % (instance.status, task_state)
-            raise webob.exc.HTTPBadRequest(msg)
+    def _enqueue_ofc_job(self, context, region_name, action, params,
+                         resource=None, resource_id=None):
+        LOG.debug("#DodaiPlugin queuing OFC job %s for region %s" %
+                  (action, region_name))
+        ofc_job_worker.enqueue(context.session, region_name, action, params,
+                               resource, resource_id)
+        if resource == 'network':
+            dodai_db.update_resource_status(context.session, resource,
+                                            resource_id,
+                                            constants.NET_STATUS_BUILD)
 
     def _is_ofc_controlled_network(self, context, network_id):
         # NOTE(yokose): Whether send request to OFC or not depends on
         #               the name of network.
         net = self._get_network(context, network_id)
-        return net['name'] not in CONF.OFC.ofc_uncontrolled_network_names
+        return _is_ofc_controlled_network_name(net['name'])
 
     """
     Not supported API
@@ -541,6 +647,10 @@ class DodaiL2EPlugin(db_base_plugin_v2.QuantumDbPluginV2,
         raise webob.exc.HTTPNotFound("The resource could not be found.")
 
 
+def _is_ofc_controlled_network_name(name):
+    return name not in CONF.OFC.ofc_uncontrolled_network_names
+
+
 def _uuid_to_region_name(uuid):
     if uuid is None:
         return uuid
@@ -14,8 +14,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import hashlib
 import logging
+import os
+import StringIO
+import time
+
+from eventlet import pools
+from eventlet import semaphore
+import httplib2
+import suds
+from suds import cache as suds_cache
 from suds.client import Client
+from suds import transport as suds_transport
 
 from oslo.config import cfg
 
@@ -29,9 +41,160 @@ LOG = log.getLogger(__name__)
 CONF = cfg.CONF
 
 
+class KeepAliveTransport(suds_transport.Transport):
+    """suds transport that keeps the HTTP connection to the OFC open."""
+
+    def __init__(self, timeout=None):
+        suds_transport.Transport.__init__(self)
+        self.timeout = timeout
+        self.http = httplib2.Http(timeout=timeout)
+
+    def __deepcopy__(self, memo):
+        # NOTE: suds deep-copies the options (and thus the transport) of a
+        #       client on clone(). Give every clone its own connection
+        #       instead of trying to copy an open socket.
+        return KeepAliveTransport(self.timeout)
+
+    def open(self, request):
+        resp, content = self.http.request(request.url, 'GET',
+                                          headers=request.headers)
+        if resp.status >= 300:
+            raise suds_transport.TransportError(resp.reason, resp.status,
+                                                StringIO.StringIO(content))
+        return StringIO.StringIO(content)
+
+    def send(self, request):
+        resp, content = self.http.request(request.url, 'POST',
+                                          body=request.message,
+                                          headers=request.headers)
+        if resp.status in (202, 204):
+            return None
+        if resp.status >= 300:
+            raise suds_transport.TransportError(resp.reason, resp.status,
+                                                StringIO.StringIO(content))
+        return suds_transport.Reply(resp.status, resp, content)
+
+    def close(self):
+        for conn in self.http.connections.values():
+            conn.close()
+        self.http.connections.clear()
+
+
+def _get_wsdl_etag(url):
+    try:
+        resp, _content = httplib2.Http(
+            timeout=CONF.OFC.ofc_client_timeout).request(url, 'HEAD')
+        return resp.get('etag', '')
+    except Exception as ex:
+        LOG.debug("#Failed to get the ETag of %s: %s" % (url, ex))
+        return ''
+
+
+def _get_wsdl_cache(url):
+    """Return the on-disk cache of the parsed WSDL, or a NoCache.
+
+    A NoCache is returned when ofc_wsdl_cache_dir is not set. The cache
+    directory is keyed by the URL and the ETag of the WSDL, so a WSDL
+    changed on the OFC side is parsed again instead of being reused.
+    """
+    if not CONF.OFC.ofc_wsdl_cache_dir:
+        return suds_cache.NoCache()
+    key = hashlib.md5(url + _get_wsdl_etag(url)).hexdigest()
+    location = os.path.join(CONF.OFC.ofc_wsdl_cache_dir, key)
+    return suds_cache.ObjectCache(location=location, days=1)
+
+
+class ClientPool(pools.Pool):
+    """Pool of SOAP clients sharing a single parsed WSDL."""
+
+    def __init__(self, url, *args, **kwargs):
+        self.url = url
+        self.prototype = None
+        self._prototype_sem = semaphore.Semaphore()
+        kwargs.setdefault("max_size", CONF.OFC.ofc_client_pool_size)
+        kwargs.setdefault("order_as_stack", True)
+        super(ClientPool, self).__init__(*args, **kwargs)
+
+    def _get_prototype(self):
+        with self._prototype_sem:
+            if self.prototype is None:
+                LOG.debug(_("Loading WSDL from %s"), self.url)
+                transport = KeepAliveTransport(CONF.OFC.ofc_client_timeout)
+                self.prototype = Client(self.url,
+                                        cache=_get_wsdl_cache(self.url),
+                                        cachingpolicy=1,
+                                        transport=transport)
+                transport.close()
+        return self.prototype
+
+    def create(self):
+        # NOTE: clone() shares the parsed WSDL, so only the first client
+        #       created in this process pays for fetching and parsing it.
+        client = self._get_prototype().clone()
+        client.last_used = time.time()
+        return client
+
+    def get(self):
+        client = super(ClientPool, self).get()
+        idle_timeout = CONF.OFC.ofc_client_idle_timeout
+        if idle_timeout and time.time() - client.last_used > idle_timeout:
+            # The OFC has most likely dropped the idle connection.
+            self.discard(client)
+            client = self.create()
+        return client
+
+    def put(self, client):
+        client.last_used = time.time()
+        super(ClientPool, self).put(client)
+
+    def discard(self, client):
+        try:
+            client.options.transport.close()
+        except Exception:
+            pass
+
+    def evict(self, client):
+        """Replace a broken client by a fresh one."""
+        LOG.debug(_("Evicting a broken OFC client"))
+        self.discard(client)
+        self.put(self.create())
+
+    def empty(self):
+        while self.free_items:
+            self.discard(self.free_items.popleft())
+            self.current_size -= 1
+        self.prototype = None
+
+
+_pools = {}
+_pool_create_sem = semaphore.Semaphore()
+
+
+def get_client_pool():
+    url = CONF.OFC.ofc_service_url + "?wsdl"
+    with _pool_create_sem:
+        # Make sure only one thread tries to create the client pool.
+        if url not in _pools:
+            _pools[url] = ClientPool(url)
+    return _pools[url]
+
+
+@contextlib.contextmanager
 def get_client():
-    client = Client(CONF.OFC.ofc_service_url + "?wsdl")
-    return client
+    """Check a SOAP client out of the process-wide pool."""
+    pool = get_client_pool()
+    client = pool.get()
+    try:
+        yield client
+    except suds.WebFault:
+        # The OFC answered with a SOAP fault, the connection is healthy.
+        pool.put(client)
+        raise
+    except Exception:
+        pool.evict(client)
+        raise
+    else:
+        pool.put(client)
 
 
 class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
@@ -44,8 +207,8 @@ class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
         LOG.debug("#DodaiL2EVNCV2Driver.create_region() called.")
         LOG.debug("#region_name=%s" % region_name)
         try:
-            client = get_client()
-            response = client.service.createRegion(region_name)
+            with get_client() as client:
+                response = client.service.createRegion(region_name)
             LOG.debug("#DodaiL2EVNCV2Driver.create_region() response is (%s)" %
                       response)
         except Exception as ex:
@@ -58,8 +221,8 @@ class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
         LOG.debug("#DodaiL2EVNCV2Driver.destroy_region() called.")
         LOG.debug("#region_name=%s" % region_name)
         try:
-            client = get_client()
-            response = client.service.destroyRegion(region_name)
+            with get_client() as client:
+                response = client.service.destroyRegion(region_name)
             LOG.debug("#DodaiL2EVNCV2Driver.destroy_region() response is (%s)"
                       % response)
         except Exception as ex:
@@ -71,8 +234,8 @@ class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
     def show_region(self):
         LOG.debug("#DodaiL2EVNCV2Driver.show_region() called.")
         try:
-            client = get_client()
-            response = client.service.showRegion()
+            with get_client() as client:
+                response = client.service.showRegion()
             LOG.debug("#DodaiL2EVNCV2Driver.show_region() response is (%s)" %
                       response)
             return response
@@ -88,9 +251,9 @@ class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
         LOG.debug("#server_port=%s" % server_port)
         LOG.debug("#region_name=%s" % region_name)
         try:
-            client = get_client()
-            response = client.service.setServerPort(dpid, server_port,
-                                                    region_name)
+            with get_client() as client:
+                response = client.service.setServerPort(dpid, server_port,
+                                                        region_name)
             LOG.debug("#DodaiL2EVNCV2Driver.set_server_port() response is (%s)"
                       % response)
         except Exception as ex:
@@ -104,8 +267,8 @@ class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
         LOG.debug("#dpid=%s" % dpid)
         LOG.debug("#server_port=%s" % server_port)
         try:
-            client = get_client()
-            response = client.service.clearServerPort(dpid, server_port)
+            with get_client() as client:
+                response = client.service.clearServerPort(dpid, server_port)
             LOG.debug("#DodaiL2EVNCV2Driver.clear_server_port() response is "
                       "(%s)" % response)
         except Exception as ex:
@@ -117,8 +280,8 @@ class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
     def show_switch_datapath_id(self):
         LOG.debug("#DodaiL2EVNCV2Driver.show_switch_datapath_id() called.")
         try:
-            client = get_client()
-            response = client.service.showDatapathId()
+            with get_client() as client:
+                response = client.service.showDatapathId()
             LOG.debug("#DodaiL2EVNCV2Driver.show_switch_datapath_id() "
                       "response is (%s)" % response)
             return response
@@ -132,8 +295,8 @@ class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
         LOG.debug("#DodaiL2EVNCV2Driver.show_ports() called.")
         LOG.debug("#dpid=%s" % dpid)
         try:
-            client = get_client()
-            response = client.service.showPorts(dpid)
+            with get_client() as client:
+                response = client.service.showPorts(dpid)
             LOG.debug("#DodaiL2EVNCV2Driver.show_ports() response is (%s)"
                       % response)
             return response
@@ -154,10 +317,10 @@ class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
         LOG.debug("#inner_vlan_id=%s" % inner_vlan_id)
         LOG.debug("#region_name=%s" % region_name)
         try:
-            client = get_client()
-            response = client.service.setOuterPortAssociationSetting(
-                dpid, outer_port, outer_vlan_id,
-                inner_vlan_id, region_name)
+            with get_client() as client:
+                response = client.service.setOuterPortAssociationSetting(
+                    dpid, outer_port, outer_vlan_id,
+                    inner_vlan_id, region_name)
             LOG.debug("#DodaiL2EVNCV2Driver.set_outer_port_association_setting"
                       "() response is (%s)" % response)
         except Exception as ex:
@@ -175,9 +338,9 @@ class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
         LOG.debug("#outer_port=%s" % outer_port)
         LOG.debug("#outer_vlan_id=%s" % outer_vlan_id)
         try:
-            client = get_client()
-            response = client.service.clearOuterPortAssociationSetting(
-                dpid, outer_port, outer_vlan_id)
+            with get_client() as client:
+                response = client.service.clearOuterPortAssociationSetting(
+                    dpid, outer_port, outer_vlan_id)
             LOG.debug("#DodaiL2EVNCV2Driver."
                       "clear_outer_port_association_setting() response is (%s)"
                       % response)
@@ -192,8 +355,8 @@ class DodaiL2EVNCV2Driver(ofc_driver_base.OFCDriverBase):
     def save(self):
         LOG.debug("#DodaiL2EVNCV2Driver.save() called.")
         try:
-            client = get_client()
-            response = client.service.save()
+            with get_client() as client:
+                response = client.service.save()
             LOG.debug("#DodaiL2EVNCV2Driver.save() response is (%s)" %
                       response)
         except Exception as ex:
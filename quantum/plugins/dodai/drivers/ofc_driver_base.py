@@ -16,6 +16,8 @@
 
 from abc import ABCMeta, abstractmethod
 
+from quantum.plugins.dodai import exceptions
+
 
 class OFCDriverBase(object):
     """
@@ -66,3 +68,20 @@ class OFCDriverBase(object):
     @abstractmethod
     def save(self):
         pass
+
+    def execute_batch(self, operations):
+        """
+        Applies queued mutations to the OFC in order, without saving.
+
+        operations is a list of (method name, args) tuples naming the
+        mutating methods of this driver. If an operation fails, the ones
+        before it stay applied and OFCBatchFailed carrying the index of the
+        failed operation is raised. Drivers for controllers that accept
+        pipelined requests may override this.
+        """
+        for index, (method, args) in enumerate(operations):
+            try:
+                getattr(self, method)(*args)
+            except Exception as ex:
+                raise exceptions.OFCBatchFailed(operation=method,
+                                                index=index, reason=ex)
@@ -47,3 +47,16 @@ class OFCRegionCreationFailed(q_exc.QuantumException):
 class OFCRegionSettingOuterPortAssocFailed(q_exc.QuantumException):
     message = _("It failed set outer port association for region "
                 "%(region_name)s and vlan id %(vlan_id)s.")
+
+
+class OFCBatchFailed(q_exc.QuantumException):
+    message = _("OFC operation %(operation)s (#%(index)s in the batch) "
+                "failed: %(reason)s")
+
+    def __init__(self, **kwargs):
+        super(OFCBatchFailed, self).__init__(**kwargs)
+        self.index = kwargs['index']
+
+
+class OFCReconcileFailed(q_exc.QuantumException):
+    message = _("%(failed)s of %(total)s OFC corrections failed: %(reason)s")
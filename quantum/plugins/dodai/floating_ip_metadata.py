@@ -0,0 +1,105 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import re
+
+import webob.exc
+
+from quantum.openstack.common import jsonutils
+from quantum.openstack.common import log
+
+
+LOG = log.getLogger(__name__)
+
+ACTIVE_STATES = ("ACTIVE",)
+METAKEY_FLOATING_IP_PREFIX = 'floating_ip_'
+METAKEY_FLOATING_IP_RE = re.compile('^' + METAKEY_FLOATING_IP_PREFIX +
+                                    '(\d+)$')
+
+
+class FloatingIPMetadata(object):
+    """The floating IP metadata of an instance.
+
+    Floating IPs are stored in the instance metadata as JSON objects under
+    the keys floating_ip_<n>. The instance is read once, its metadata is
+    indexed by floating IP address, and the changes made with set() and
+    delete() are written back by apply() with at most one set_meta and one
+    delete_meta call. The health of the instance is checked against the
+    same read, before anything is written.
+    """
+
+    def __init__(self, nova_client, instance_uuid):
+        self.nc = nova_client
+        self.instance_uuid = instance_uuid
+        self.instance = nova_client.servers.get(instance_uuid)
+        # {ip_address: key}
+        self.keys = {}
+        self.max_num = 0
+        for key, value in self.instance.metadata.iteritems():
+            match = METAKEY_FLOATING_IP_RE.match(key)
+            if match is None:
+                continue
+            self.max_num = max(self.max_num, int(match.group(1)))
+            self.keys[jsonutils.loads(value)['ip_address']] = key
+        self._to_set = {}
+        self._to_delete = set()
+
+    def set(self, meta_obj):
+        """Add or replace the metadata object of a floating IP."""
+        ip_address = meta_obj['ip_address']
+        key = self.keys.get(ip_address)
+        if key is None:
+            self.max_num += 1
+            key = METAKEY_FLOATING_IP_PREFIX + unicode(self.max_num)
+            self.keys[ip_address] = key
+        self._to_delete.discard(key)
+        self._to_set[key] = jsonutils.dumps(meta_obj)
+
+    def delete(self, ip_address):
+        """Remove the metadata object of a floating IP, if any.
+
+        Returns whether there was one.
+        """
+        key = self.keys.pop(ip_address, None)
+        if key is None:
+            return False
+        self._to_set.pop(key, None)
+        self._to_delete.add(key)
+        return True
+
+    def check_health(self):
+        task_state = getattr(self.instance, "OS-EXT-STS:task_state", None)
+        if self.instance.status not in ACTIVE_STATES or task_state is not None:
+            msg = (_("Instance is not in-service. status: %s, task_state: "
+                     "%s") % (self.instance.status, task_state))
+            raise webob.exc.HTTPBadRequest(msg)
+
+    def apply(self):
+        if not self._to_set and not self._to_delete:
+            return
+        # NOTE(yokose): check if instance is in-service to set/delete_meta
+        self.check_health()
+        if self._to_set:
+            LOG.debug("#set_meta %s on %s" % (self._to_set,
+                                              self.instance_uuid))
+            self.nc.servers.set_meta(self.instance_uuid, self._to_set)
+        if self._to_delete:
+            LOG.debug("#delete_meta %s on %s" % (list(self._to_delete),
+                                                 self.instance_uuid))
+            self.nc.servers.delete_meta(self.instance_uuid,
+                                        list(self._to_delete))
+        self._to_set = {}
+        self._to_delete = set()
@@ -0,0 +1,157 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+from eventlet import semaphore
+from novaclient import extension as nc_ext
+from novaclient.v1_1 import client as nova_client
+from novaclient.v1_1.contrib import baremetal
+from oslo.config import cfg
+
+from quantum.openstack.common import log
+
+
+LOG = log.getLogger(__name__)
+CONF = cfg.CONF
+NOVACLIENT_EXTENSIONS = [
+    nc_ext.Extension(baremetal.__name__.split('.')[-1], baremetal),
+]
+
+_client = None
+_client_sem = semaphore.Semaphore()
+
+
+def get_client():
+    """Return the novaclient shared by the whole process.
+
+    novaclient authenticates on the first request, reuses the token for
+    the following ones and authenticates again when Nova answers 401, so
+    sharing one client avoids a token fetch per call.
+    """
+    global _client
+    with _client_sem:
+        if _client is None:
+            _client = nova_client.Client(CONF.NOVA.username,
+                                         CONF.NOVA.password,
+                                         CONF.NOVA.tenant_name,
+                                         CONF.NOVA.auth_url,
+                                         extensions=NOVACLIENT_EXTENSIONS,
+                                         no_cache=True)
+    return _client
+
+
+class _NodeEntry(object):
+
+    def __init__(self, node):
+        self.node = node
+        self.interfaces = dict((iface['address'], iface)
+                               for iface in node.interfaces)
+        self.loaded_at = time.time()
+
+
+class BareMetalCache(object):
+    """TTL cache of bare-metal nodes indexed by uuid, and of their
+    interfaces indexed by MAC address.
+
+    An unknown uuid reloads the whole node list once, and is then known
+    to be missing until the ttl expires. An expired node the id of which
+    is known is refreshed with a single node fetch instead. A ttl of 0
+    disables caching.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._sem = semaphore.Semaphore()
+        self._nodes = {}
+        # {node uuid: time the node was found missing}
+        self._misses = {}
+
+    def invalidate(self, node_uuid=None):
+        """Expire one node, or forget every node if node_uuid is None.
+
+        An expired node is refreshed with a single node fetch on its next
+        lookup.
+        """
+        if node_uuid is None:
+            self._nodes = {}
+            self._misses = {}
+            return
+        self._misses.pop(node_uuid, None)
+        entry = self._nodes.get(node_uuid)
+        if entry is not None:
+            entry.loaded_at = 0
+
+    def _expired(self, entry):
+        return not self.ttl or time.time() - entry.loaded_at > self.ttl
+
+    def _known_missing(self, node_uuid):
+        missed_at = self._misses.get(node_uuid)
+        return (missed_at is not None and self.ttl and
+                time.time() - missed_at <= self.ttl)
+
+    def _load_all(self):
+        LOG.debug("#BareMetalCache loading all bare-metal nodes.")
+        self._nodes = dict((node.uuid, _NodeEntry(node))
+                           for node in get_client().baremetal.list())
+        self._misses = {}
+
+    def _load_one(self, entry):
+        try:
+            node = get_client().baremetal.get(entry.node.id)
+        except Exception as e:
+            LOG.debug("#BareMetalCache failed to fetch node %s: %s" %
+                      (entry.node.uuid, e))
+            return False
+        if node.uuid != entry.node.uuid:
+            return False
+        self._nodes[node.uuid] = _NodeEntry(node)
+        return True
+
+    def _get_entry(self, node_uuid):
+        with self._sem:
+            entry = self._nodes.get(node_uuid)
+            if entry is not None and self._expired(entry):
+                if not self._load_one(entry):
+                    self._load_all()
+            elif entry is None:
+                if self._known_missing(node_uuid):
+                    return None
+                self._load_all()
+            entry = self._nodes.get(node_uuid)
+            if entry is None:
+                self._misses[node_uuid] = time.time()
+            return entry
+
+    def get_node(self, node_uuid):
+        entry = self._get_entry(node_uuid)
+        return entry.node if entry else None
+
+    def get_interface(self, node_uuid, mac_address):
+        """Return the interface of a node with a MAC address, or None.
+
+        A miss on a cached node refreshes that node once, in case its
+        interfaces have changed since it was loaded.
+        """
+        entry = self._get_entry(node_uuid)
+        if entry is None:
+            return None
+        if mac_address not in entry.interfaces:
+            entry.loaded_at = 0
+            entry = self._get_entry(node_uuid)
+            if entry is None:
+                return None
+        return entry.interfaces.get(mac_address)
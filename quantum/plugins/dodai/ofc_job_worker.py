@@ -0,0 +1,190 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import eventlet
+from oslo.config import cfg
+
+from quantum.common import constants
+from quantum.db import api as db
+from quantum.openstack.common import jsonutils
+from quantum.openstack.common import log
+from quantum.openstack.common import loopingcall
+from quantum.openstack.common import timeutils
+from quantum.plugins.dodai.db import dodai_db
+
+
+LOG = log.getLogger(__name__)
+CONF = cfg.CONF
+
+JOB_PENDING = 'PENDING'
+JOB_RUNNING = 'RUNNING'
+JOB_FAILED = 'FAILED'
+
+# resource: (status on success, status on failure)
+RESOURCE_STATUSES = {
+    'network': (constants.NET_STATUS_ACTIVE, constants.NET_STATUS_ERROR),
+    'port': (constants.PORT_STATUS_ACTIVE, constants.PORT_STATUS_ERROR),
+}
+
+
+def enqueue(session, region_name, action, params, resource=None,
+            resource_id=None):
+    """Queue an OFC job in the caller's transaction."""
+    return dodai_db.create_ofc_job(session, region_name, action,
+                                   jsonutils.dumps(params), JOB_PENDING,
+                                   resource, resource_id)
+
+
+class OFCJobWorker(object):
+    """Applies the queued OFC jobs of the Dodai plugin.
+
+    Jobs of the same region are applied one after the other in queued
+    order, jobs of different regions concurrently on a green thread pool.
+    A failed job is retried with exponential backoff and blocks the jobs
+    queued after it in its region until it succeeds or runs out of
+    retries. The network or port a job provisions becomes ACTIVE when the
+    job succeeds and ERROR when it is given up.
+
+    Jobs are claimed through the database, so several quantum-server
+    processes may run a worker on the same queue.
+    """
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.pool = eventlet.GreenPool(CONF.OFC.ofc_job_workers)
+        self.regions_in_progress = set()
+        self._loop = None
+
+    def start(self):
+        self._loop = loopingcall.LoopingCall(self.process_jobs)
+        self._loop.start(interval=CONF.OFC.ofc_job_poll_interval)
+
+    def stop(self):
+        if self._loop:
+            self._loop.stop()
+            self._loop = None
+
+    def wakeup(self):
+        """Process queued jobs now instead of at the next poll."""
+        eventlet.spawn_n(self.process_jobs)
+
+    def _is_runnable(self, job, now):
+        if job.status == JOB_RUNNING:
+            timeout = datetime.timedelta(seconds=CONF.OFC.ofc_job_timeout)
+            # NOTE: a job RUNNING for too long belongs to a dead worker.
+            return job.updated_at + timeout < now
+        return job.next_attempt_at is None or job.next_attempt_at <= now
+
+    def process_jobs(self):
+        try:
+            jobs = dodai_db.get_ofc_jobs(None, [JOB_PENDING, JOB_RUNNING])
+        except Exception:
+            LOG.exception(_("Failed to read the OFC job queue"))
+            return
+        now = timeutils.utcnow()
+        seen = set()
+        for job in jobs:
+            # Only the head job of each region may run.
+            if job.region_name in seen:
+                continue
+            seen.add(job.region_name)
+            if (job.region_name in self.regions_in_progress or
+                    not self._is_runnable(job, now)):
+                continue
+            self.regions_in_progress.add(job.region_name)
+            self.pool.spawn_n(self._process_region, job.region_name)
+
+    def _process_region(self, region_name):
+        session = db.get_session()
+        try:
+            while True:
+                jobs = dodai_db.get_ofc_jobs(session,
+                                             [JOB_PENDING, JOB_RUNNING],
+                                             region_name)
+                if not jobs or not self._is_runnable(jobs[0],
+                                                     timeutils.utcnow()):
+                    return
+                job = jobs[0]
+                if not dodai_db.claim_ofc_job(session, job, JOB_RUNNING):
+                    return
+                if not self._run_job(session, job):
+                    return
+        except Exception:
+            LOG.exception(_("Failed to process the OFC jobs of region %s"),
+                          region_name)
+        finally:
+            self.regions_in_progress.discard(region_name)
+
+    def _run_job(self, session, job):
+        """Apply a claimed job. Returns whether the region may go on."""
+        LOG.debug("#OFCJobWorker running %s" % job)
+        try:
+            params = jsonutils.loads(job.params)
+            getattr(self, '_apply_%s' % job.action)(job.region_name, params)
+        except Exception as e:
+            attempts = job.attempts + 1
+            if attempts >= CONF.OFC.ofc_job_max_retries:
+                LOG.error(_("Giving up OFC job %(job)s after %(attempts)s "
+                            "attempts: %(error)s"),
+                          {'job': job, 'attempts': attempts, 'error': e})
+                dodai_db.update_ofc_job(session, job.id, status=JOB_FAILED,
+                                        attempts=attempts)
+                self._set_resource_status(session, job, False)
+                return True
+            delay = min(CONF.OFC.ofc_job_retry_interval * 2 ** (attempts - 1),
+                        CONF.OFC.ofc_job_max_retry_interval)
+            LOG.warning(_("OFC job %(job)s failed, retrying in %(delay)s "
+                          "seconds: %(error)s"),
+                        {'job': job, 'delay': delay, 'error': e})
+            next_attempt_at = (timeutils.utcnow() +
+                               datetime.timedelta(seconds=delay))
+            dodai_db.update_ofc_job(session, job.id, status=JOB_PENDING,
+                                    attempts=attempts,
+                                    next_attempt_at=next_attempt_at)
+            return False
+        with session.begin(subtransactions=True):
+            dodai_db.delete_ofc_job(session, job.id)
+            self._set_resource_status(session, job, True)
+        return True
+
+    def _set_resource_status(self, session, job, succeeded):
+        if job.resource:
+            active, error = RESOURCE_STATUSES[job.resource]
+            dodai_db.update_resource_status(session, job.resource,
+                                            job.resource_id,
+                                            active if succeeded else error)
+
+    def _apply_create_region(self, region_name, params):
+        if not self.plugin.ofc.has_region(region_name):
+            self.plugin.ofc.create_region(region_name, params['vlan_id'])
+
+    def _apply_remove_region(self, region_name, params):
+        self.plugin.ofc.remove_region(region_name, params['vlan_id'])
+
+    def _apply_run_instance(self, region_name, params):
+        bm_interface = self.plugin._get_bm_interface_by_port(
+            params['tenant_id'], params['device_id'], params['mac_address'])
+        self.plugin.ofc.update_for_run_instance(region_name,
+                                                bm_interface['port_no'],
+                                                bm_interface['datapath_id'])
+
+    def _apply_terminate_instance(self, region_name, params):
+        self.plugin.ofc.update_for_terminate_instance(region_name,
+                                                      params['server_port'],
+                                                      params['dpid'],
+                                                      params['vlan_id'])
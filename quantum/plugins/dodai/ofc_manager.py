@@ -16,87 +16,317 @@
 
 import logging
 
+import eventlet
+from eventlet import semaphore
 from oslo.config import cfg
 
+from quantum.openstack.common import excutils
 from quantum.openstack.common import importutils
+from quantum.openstack.common import log
 from quantum.plugins.dodai import exceptions
 from quantum.plugins.dodai.db import dodai_db
+from quantum.plugins.dodai import topology_cache
 
 
 logging.getLogger('suds').setLevel(logging.INFO)
 
+LOG = log.getLogger(__name__)
 CONF = cfg.CONF
 
 
+class OFCOperation(object):
+    """A mutation queued in an OFCTransaction"""
+
+    def __init__(self, method, args, rollback=None, ignore_errors=False,
+                 parallel=False):
+        self.method = method
+        self.args = args
+        # (method, args) undoing this operation, if any
+        self.rollback = rollback
+        self.ignore_errors = ignore_errors
+        # NOTE: consecutive parallel operations are independent of each
+        #       other and are fanned out concurrently. Their first argument
+        #       is the dpid of the switch they apply to.
+        self.parallel = parallel
+
+
+class OFCTransaction(object):
+    """Unit of work that queues OFC mutations.
+
+    Queued mutations are sent to the driver as one batch on commit() and
+    saved with a single save(). Runs of consecutive parallel operations
+    are fanned out on a green thread pool instead, with at most
+    ofc_fanout_per_switch concurrent operations per switch. If the batch
+    fails, the operations already applied are undone in reverse order and
+    saved before the error is re-raised.
+
+    After a successful commit(), applied holds the operations applied to
+    the OFC and failures the (operation, error) of the ignored failures.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.operations = []
+        self.applied = []
+        self.failures = []
+
+    def queue(self, method, args, rollback=None, ignore_errors=False,
+              parallel=False):
+        self.operations.append(OFCOperation(method, args, rollback,
+                                            ignore_errors, parallel))
+
+    def create_region(self, region_name):
+        self.queue('create_region', (region_name,),
+                   rollback=('destroy_region', (region_name,)))
+
+    def destroy_region(self, region_name):
+        self.queue('destroy_region', (region_name,))
+
+    def set_server_port(self, dpid, server_port, region_name):
+        self.queue('set_server_port', (dpid, server_port, region_name),
+                   rollback=('clear_server_port', (dpid, server_port)))
+
+    def clear_server_port(self, dpid, server_port):
+        self.queue('clear_server_port', (dpid, server_port))
+
+    def set_outer_port_association_setting(self, dpid, outer_port,
+                                           outer_vlan_id, inner_vlan_id,
+                                           region_name):
+        self.queue('set_outer_port_association_setting',
+                   (dpid, outer_port, outer_vlan_id, inner_vlan_id,
+                    region_name),
+                   rollback=('clear_outer_port_association_setting',
+                             (dpid, outer_port, outer_vlan_id)),
+                   parallel=True)
+
+    def clear_outer_port_association_setting(self, dpid, outer_port,
+                                             outer_vlan_id,
+                                             ignore_errors=False):
+        self.queue('clear_outer_port_association_setting',
+                   (dpid, outer_port, outer_vlan_id),
+                   ignore_errors=ignore_errors, parallel=True)
+
+    def commit(self):
+        pending = self.operations
+        self.operations = []
+        self.applied = []
+        self.failures = []
+        if not pending:
+            return
+        applied = []
+        offset = 0
+        for segment in self._split(pending):
+            try:
+                if segment[0].parallel:
+                    self._execute_parallel(segment, offset, applied)
+                else:
+                    self._execute_serial(segment, offset, applied)
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    self._rollback(applied)
+            offset += len(segment)
+        try:
+            self.driver.save()
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self._rollback(applied)
+        self.applied = applied
+
+    def _split(self, operations):
+        """Split operations into runs of serial and of parallel ones."""
+        segments = []
+        for op in operations:
+            if segments and segments[-1][0].parallel == op.parallel:
+                segments[-1].append(op)
+            else:
+                segments.append([op])
+        return segments
+
+    def _execute_serial(self, segment, offset, applied):
+        pending = segment
+        while pending:
+            try:
+                self.driver.execute_batch([(op.method, op.args)
+                                           for op in pending])
+                applied.extend(pending)
+                return
+            except exceptions.OFCBatchFailed as e:
+                applied.extend(pending[:e.index])
+                failed = pending[e.index]
+                if not failed.ignore_errors:
+                    raise exceptions.OFCBatchFailed(
+                        operation=failed.method,
+                        index=offset + segment.index(failed), reason=e)
+                LOG.warning(_("Ignored the failure of a queued OFC "
+                              "operation: %s"), e)
+                self.failures.append((failed, e))
+                pending = pending[e.index + 1:]
+
+    def _execute_parallel(self, segment, offset, applied):
+        switch_sems = {}
+        for op in segment:
+            if op.args[0] not in switch_sems:
+                switch_sems[op.args[0]] = semaphore.Semaphore(
+                    CONF.OFC.ofc_fanout_per_switch)
+
+        def _execute(op):
+            with switch_sems[op.args[0]]:
+                try:
+                    self.driver.execute_batch([(op.method, op.args)])
+                    return None
+                except Exception as e:
+                    return e
+
+        pool = eventlet.GreenPool(CONF.OFC.ofc_fanout_workers)
+        errors = []
+        for index, (op, error) in enumerate(
+                zip(segment, pool.imap(_execute, segment))):
+            if error is None:
+                applied.append(op)
+            elif op.ignore_errors:
+                LOG.warning(_("Ignored the failure of a queued OFC "
+                              "operation: %s"), error)
+                self.failures.append((op, error))
+            else:
+                errors.append((index, op, error))
+        if errors:
+            index, op, _error = errors[0]
+            reason = '; '.join('%s%s: %s' % (failed.method, failed.args,
+                                             error)
+                               for _index, failed, error in errors)
+            raise exceptions.OFCBatchFailed(operation=op.method,
+                                            index=offset + index,
+                                            reason=reason)
+
+    def _rollback(self, applied):
+        undo = [op.rollback for op in reversed(applied) if op.rollback]
+        if not undo:
+            return
+        LOG.debug("#OFCTransaction rolling back %s" % undo)
+        while undo:
+            try:
+                self.driver.execute_batch(undo)
+                undo = []
+            except exceptions.OFCBatchFailed as e:
+                LOG.error(_("Failed to roll back an OFC operation: %s"), e)
+                undo = undo[e.index + 1:]
+        try:
+            self.driver.save()
+        except Exception as e:
+            LOG.error(_("Failed to save the rolled back OFC: %s"), e)
+
+
 class OFCManager():
     """This class manages an OpenFlow Controller"""
 
     def __init__(self):
         self.ofc_driver = importutils.import_object(CONF.OFC.ofc_driver)
+        self.topology = topology_cache.TopologyCache(
+            self.ofc_driver, CONF.OFC.ofc_topology_cache_ttl)
+
+    def begin(self):
+        """Start a unit of work committed with a single save()."""
+        return OFCTransaction(self.ofc_driver)
+
+    def commit(self, txn):
+        """Commit txn and record the outer port associations it changed."""
+        try:
+            txn.commit()
+        except Exception:
+            # NOTE: the state of the OFC is unknown after a failed commit.
+            self.topology.invalidate()
+            raise
+        self._record_outer_port_associations(txn.applied)
+
+    def _record_outer_port_associations(self, operations):
+        # NOTE: the OFC cannot be asked for its outer port associations,
+        #       so the reconciler relies on what is recorded here.
+        added = [op.args[:3] + op.args[4:] for op in operations
+                 if op.method == 'set_outer_port_association_setting']
+        removed = [op.args for op in operations
+                   if op.method == 'clear_outer_port_association_setting']
+        if not (added or removed):
+            return
+        try:
+            dodai_db.update_outer_port_associations(None, added, removed)
+        except Exception:
+            LOG.exception(_("Failed to record the outer port associations "
+                            "set on the OFC"))
 
     def update_for_run_instance(self, region_name, server_port, dpid):
-        self.ofc_driver.set_server_port(dpid, server_port, region_name)
-        self.ofc_driver.save()
+        self.update_for_run_instances([(region_name, server_port, dpid)])
+
+    def update_for_run_instances(self, server_ports):
+        """Set [(region_name, server_port, dpid)] with a single save()."""
+        txn = self.begin()
+        for region_name, server_port, dpid in server_ports:
+            txn.set_server_port(dpid, server_port, region_name)
+        self.commit(txn)
+        self.topology.invalidate_server_ports()
 
     def update_for_terminate_instance(self, region_name, server_port, dpid,
                                       vlan_id):
-        self.ofc_driver.clear_server_port(dpid, server_port)
-        self.ofc_driver.save()
-
-        dpid_datas = self.ofc_driver.show_switch_datapath_id()
-        for dpid_data in dpid_datas:
-            ports = self.ofc_driver.show_ports(dpid_data.dpid)
-            for port in ports:
-                if port.type != 'ServerPort':
-                    continue
-
-                if port.regionName == region_name:
-                    return
+        txn = self.begin()
+        txn.clear_server_port(dpid, server_port)
+        self.commit(txn)
+        self.topology.invalidate_server_ports()
 
     def create_region(self, region_name, vlan_id):
-        try:
-            self.ofc_driver.create_region(region_name)
-            self.ofc_driver.save()
-        except:
-            raise exceptions.OFCRegionCreationFailed(region_name=region_name)
+        self.create_regions([(region_name, vlan_id)])
 
-        # NOTE(yokose): If vlan is not specified,
-        #               set_outer_port_association_setting is skipped
-        if vlan_id:
-            try:
+    def create_regions(self, regions):
+        """Create the missing regions of [(region_name, vlan_id)] with a
+        single save()."""
+        txn = self.begin()
+        # index of the first operation of each region in the batch
+        starts = []
+        dodai_outer_ports = None
+        for region_name, vlan_id in regions:
+            if self.has_region(region_name):
+                continue
+            starts.append((len(txn.operations), region_name, vlan_id))
+            txn.create_region(region_name)
+            # NOTE(yokose): If vlan is not specified,
+            #               set_outer_port_association_setting is skipped
+            if not vlan_id:
+                continue
+            if dodai_outer_ports is None:
                 dodai_outer_ports = dodai_db.get_all_dodai_outer_ports(None)
-                for dodai_outer_port in dodai_outer_ports:
-                    self.ofc_driver.set_outer_port_association_setting(
-                            dodai_outer_port['dpid'],
-                            dodai_outer_port['outer_port'],
-                            vlan_id, 65535, region_name)
-
-                self.ofc_driver.save()
-            except:
-                self.ofc_driver.destroy_region(region_name)
-                self.ofc_driver.save()
-                raise exceptions.OFCRegionSettingOuterPortAssocFailed(
-                                region_name=region_name, vlan_id=vlan_id)
+            for dodai_outer_port in dodai_outer_ports:
+                txn.set_outer_port_association_setting(
+                    dodai_outer_port['dpid'],
+                    dodai_outer_port['outer_port'],
+                    vlan_id, 65535, region_name)
+        try:
+            self.commit(txn)
+        except exceptions.OFCBatchFailed as e:
+            start, region_name, vlan_id = [x for x in starts
+                                           if x[0] <= e.index][-1]
+            if e.index == start:
+                raise exceptions.OFCRegionCreationFailed(
+                    region_name=region_name)
+            raise exceptions.OFCRegionSettingOuterPortAssocFailed(
+                region_name=region_name, vlan_id=vlan_id)
+        except Exception:
+            raise exceptions.OFCRegionCreationFailed(
+                region_name=','.join(x[1] for x in starts))
+        for start, region_name, vlan_id in starts:
+            self.topology.add_region(region_name)
 
     def remove_region(self, region_name, vlan_id):
+        txn = self.begin()
         # NOTE(yokose): If vlan is not specified,
         #               clear_outer_port_association_setting is skipped
         if vlan_id:
-            try:
-                dodai_outer_ports = dodai_db.get_all_dodai_outer_ports(None)
-                for dodai_outer_port in dodai_outer_ports:
-                    self.ofc_driver.clear_outer_port_association_setting(
-                            dodai_outer_port['dpid'],
-                            dodai_outer_port['outer_port'],
-                            vlan_id)
-
-                self.ofc_driver.save()
-            except:
-                pass
-
-        self.ofc_driver.destroy_region(region_name)
-        self.ofc_driver.save()
+            dodai_outer_ports = dodai_db.get_all_dodai_outer_ports(None)
+            for dodai_outer_port in dodai_outer_ports:
+                txn.clear_outer_port_association_setting(
+                    dodai_outer_port['dpid'],
+                    dodai_outer_port['outer_port'],
+                    vlan_id, ignore_errors=True)
+        txn.destroy_region(region_name)
+        self.commit(txn)
+        self.topology.remove_region(region_name)
 
     def has_region(self, region_name):
-        return region_name in [x.regionName for x
-                               in self.ofc_driver.show_region()]
+        return self.topology.has_region(region_name)
@@ -0,0 +1,361 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import re
+import sys
+import time
+
+from oslo.config import cfg
+
+from quantum.common import config
+from quantum.db import api as db
+from quantum.db import models_v2
+from quantum.openstack.common import log
+# NOTE (yokose): this import is needed for config init
+from quantum.plugins.dodai import config as dodai_config
+from quantum.plugins.dodai.db import dodai_db
+from quantum.plugins.dodai.db import dodai_models
+from quantum.plugins.dodai import exceptions
+from quantum.plugins.dodai import nova_cache
+from quantum.plugins.dodai import ofc_job_worker
+from quantum.plugins.dodai import ofc_manager
+
+
+LOG = log.getLogger(__name__)
+CONF = cfg.CONF
+
+DEVICE_OWNER_COMPUTE_PREFIX = 'compute:'
+HYPERVISOR_HOSTNAME = 'OS-EXT-SRV-ATTR:hypervisor_hostname'
+# NOTE: regions are named after the uuid of their network without dashes.
+#       Regions not named so were not made by Quantum and are left alone.
+REGION_NAME_RE = re.compile('^[0-9a-f]{32}$')
+
+
+class OFCDiff(object):
+    """Corrections needed to bring the OFC in line with the database"""
+
+    FIELDS = ('regions_to_create', 'regions_to_remove',
+              'server_ports_to_set', 'unexpected_server_ports',
+              'associations_to_set', 'associations_to_clear')
+
+    def __init__(self):
+        # [(region_name, vlan_id)]
+        self.regions_to_create = []
+        # [region_name]
+        self.regions_to_remove = []
+        # [(dpid, port_no, region_name)]
+        self.server_ports_to_set = []
+        # [(dpid, region_name, number of ports)] of the server ports the
+        # database does not expect. showPorts does not tell which ports
+        # they are, so they are only reported.
+        self.unexpected_server_ports = []
+        # [(dpid, outer_port, outer_vlan_id, region_name)]
+        self.associations_to_set = []
+        # [(dpid, outer_port, outer_vlan_id)]
+        self.associations_to_clear = []
+
+    def __nonzero__(self):
+        return any(getattr(self, field) for field in self.FIELDS)
+
+    def intersection(self, other):
+        """Return the corrections found in both self and other."""
+        diff = OFCDiff()
+        for field in self.FIELDS:
+            found = set(getattr(other, field))
+            setattr(diff, field, [x for x in getattr(self, field)
+                                  if x in found])
+        return diff
+
+    def __repr__(self):
+        return ("<OFCDiff(create regions %s, remove regions %s, "
+                "set server ports %s, unexpected server ports %s, "
+                "set outer port associations %s, "
+                "clear outer port associations %s)>" %
+                (self.regions_to_create, self.regions_to_remove,
+                 self.server_ports_to_set, self.unexpected_server_ports,
+                 self.associations_to_set, self.associations_to_clear))
+
+
+class OFCReconciler(object):
+    """Brings the OFC in line with the Quantum database.
+
+    The state of the OFC is read with a single scan of its regions and
+    ports, the state expected from the database with one query per table
+    and one Nova listing, and the two are compared as sets. Server ports
+    are compared by their number per datapath and region, which is all
+    showPorts is relied on for. The OFC cannot report its outer port
+    associations, so those are compared with the ones recorded by the
+    OFCManager when it set them. Only the
+    differences are sent to the OFC, in one batch committed with a single
+    save(). Regions with OFC jobs still queued are skipped.
+
+    A request may change the database and the OFC between the two reads,
+    so a correction is only made once two consecutive scans found it.
+    """
+
+    def __init__(self, ofc, bm_cache):
+        self.ofc = ofc
+        self.bm_cache = bm_cache
+        # corrections found by the previous scan
+        self._previous = OFCDiff()
+
+    def _get_expected_regions(self, session):
+        """Return ({region_name: vlan_id} of the OFC controlled networks,
+        region names of the other networks)."""
+        query = session.query(models_v2.Network.id, models_v2.Network.name,
+                              dodai_models.DodaiNetwork.vlan_id)
+        query = query.outerjoin(dodai_models.DodaiNetwork,
+                                models_v2.Network.id ==
+                                dodai_models.DodaiNetwork.network_id)
+        regions = {}
+        uncontrolled = set()
+        for net_id, name, vlan_id in query:
+            region_name = _uuid_to_region_name(net_id)
+            if name in CONF.OFC.ofc_uncontrolled_network_names:
+                uncontrolled.add(region_name)
+            else:
+                regions[region_name] = vlan_id
+        return regions, uncontrolled
+
+    def _get_expected_associations(self, session, regions):
+        """Return {(dpid, outer_port, outer_vlan_id): region_name} of
+        regions, a {region_name: vlan_id}."""
+        regions = [(name, vlan_id) for name, vlan_id in regions.iteritems()
+                   if vlan_id]
+        if not regions:
+            return {}
+        associations = {}
+        for outer_port in dodai_db.get_all_dodai_outer_ports(session):
+            for region_name, vlan_id in regions:
+                key = (outer_port['dpid'], outer_port['outer_port'], vlan_id)
+                associations[key] = region_name
+        return associations
+
+    def _get_instance_hosts(self):
+        """Return {instance uuid: bare-metal node uuid} of all instances."""
+        nc = nova_cache.get_client()
+        servers = nc.servers.list(search_opts={'all_tenants': 1})
+        return dict((server.id, getattr(server, HYPERVISOR_HOSTNAME, None))
+                    for server in servers)
+
+    def _get_expected_server_ports(self, session, regions):
+        """Return ({(dpid, port_no): region_name}, unresolved regions)."""
+        query = session.query(models_v2.Port.network_id,
+                              models_v2.Port.device_id,
+                              models_v2.Port.mac_address)
+        query = query.filter(models_v2.Port.device_owner.startswith(
+            DEVICE_OWNER_COMPUTE_PREFIX))
+        ports = [(_uuid_to_region_name(net_id), device_id, mac_address)
+                 for net_id, device_id, mac_address in query
+                 if _uuid_to_region_name(net_id) in regions]
+        server_ports = {}
+        unresolved = set()
+        if not ports:
+            return server_ports, unresolved
+        hosts = self._get_instance_hosts()
+        for region_name, device_id, mac_address in ports:
+            node_uuid = hosts.get(device_id)
+            bm_interface = (node_uuid and
+                            self.bm_cache.get_interface(node_uuid,
+                                                        mac_address))
+            if not bm_interface:
+                LOG.warning(_("Unable to find the bare-metal interface of "
+                              "%(mac)s on instance %(instance)s"),
+                            {'mac': mac_address, 'instance': device_id})
+                unresolved.add(region_name)
+                continue
+            key = (bm_interface['datapath_id'], int(bm_interface['port_no']))
+            server_ports[key] = region_name
+        return server_ports, unresolved
+
+    def compute_diff(self, session=None):
+        if not session:
+            session = db.get_session()
+        busy = set(job.region_name for job in dodai_db.get_ofc_jobs(
+            session, [ofc_job_worker.JOB_PENDING, ofc_job_worker.JOB_RUNNING]))
+        expected_regions, uncontrolled = self._get_expected_regions(session)
+        expected_ports, unresolved = self._get_expected_server_ports(
+            session, expected_regions)
+
+        self.ofc.topology.invalidate()
+        actual_regions = set(name for name in self.ofc.topology.get_regions()
+                             if REGION_NAME_RE.match(name))
+        # {(dpid, region_name): number of server ports}
+        actual_ports = self.ofc.topology.get_all_server_ports()
+
+        diff = OFCDiff()
+        diff.regions_to_create = sorted(
+            (name, vlan_id) for name, vlan_id in expected_regions.iteritems()
+            if name not in actual_regions and name not in busy)
+        diff.regions_to_remove = sorted(
+            actual_regions - set(expected_regions) - busy)
+        expected_port_nos = {}
+        for (dpid, port_no), region_name in expected_ports.iteritems():
+            expected_port_nos.setdefault((dpid, region_name),
+                                         []).append(port_no)
+        for key, port_nos in sorted(expected_port_nos.iteritems()):
+            dpid, region_name = key
+            if region_name in busy:
+                continue
+            # NOTE: the missing ports cannot be told from the others, so
+            #       all the ports expected on the datapath are set again.
+            if actual_ports.get(key, 0) < len(port_nos):
+                diff.server_ports_to_set.extend(
+                    (dpid, port_no, region_name)
+                    for port_no in sorted(port_nos))
+        for key, count in sorted(actual_ports.iteritems()):
+            dpid, region_name = key
+            if (region_name not in actual_regions or region_name in busy or
+                    region_name in unresolved):
+                continue
+            unexpected = count - len(expected_port_nos.get(key, ()))
+            if unexpected > 0:
+                diff.unexpected_server_ports.append(key + (unexpected,))
+
+        # NOTE: associations of regions missing from the OFC are only
+        #       expected once the region is created again.
+        creating = set(name for name, vlan_id in diff.regions_to_create)
+        expected_associations = self._get_expected_associations(
+            session, dict((name, vlan_id)
+                          for name, vlan_id in expected_regions.iteritems()
+                          if name not in busy and
+                          (name in actual_regions or name in creating)))
+        actual_associations = dodai_db.get_outer_port_associations(session)
+        for key, region_name in sorted(actual_associations.iteritems()):
+            if region_name in busy or region_name in uncontrolled:
+                continue
+            if expected_associations.get(key) != region_name:
+                diff.associations_to_clear.append(key)
+        for key, region_name in sorted(expected_associations.iteritems()):
+            if actual_associations.get(key) in busy:
+                continue
+            if (region_name in creating or
+                    actual_associations.get(key) != region_name):
+                diff.associations_to_set.append(key + (region_name,))
+        return diff
+
+    def _queue_corrections(self, txn, diff):
+        for dpid, outer_port, vlan_id in diff.associations_to_clear:
+            txn.queue('clear_outer_port_association_setting',
+                      (dpid, outer_port, vlan_id), ignore_errors=True)
+        for region_name in diff.regions_to_remove:
+            txn.queue('destroy_region', (region_name,), ignore_errors=True)
+        for region_name, vlan_id in diff.regions_to_create:
+            txn.queue('create_region', (region_name,), ignore_errors=True)
+        for dpid, outer_port, vlan_id, region_name in (
+                diff.associations_to_set):
+            txn.queue('set_outer_port_association_setting',
+                      (dpid, outer_port, vlan_id, 65535, region_name),
+                      ignore_errors=True)
+        for dpid, port_no, region_name in diff.server_ports_to_set:
+            txn.queue('set_server_port', (dpid, port_no, region_name),
+                      ignore_errors=True)
+
+    def reconcile(self, dry_run=False):
+        """Correct the OFC and return the corrections made.
+
+        Only the corrections also found by the previous call are made.
+        """
+        found = self.compute_diff()
+        diff = found.intersection(self._previous)
+        self._previous = found
+        if not diff:
+            if found:
+                LOG.debug("#OFCReconciler waits for the next scan to "
+                          "confirm %s", found)
+            else:
+                LOG.debug("#OFCReconciler found the OFC in sync.")
+            return diff
+        LOG.info(_("OFC is out of sync: %s"), diff)
+        for dpid, region_name, count in diff.unexpected_server_ports:
+            LOG.warning(_("%(count)s server ports of region %(region)s on "
+                          "%(dpid)s are not expected and must be cleared "
+                          "by hand"),
+                        {'count': count, 'region': region_name,
+                         'dpid': dpid})
+        if dry_run:
+            return diff
+        # NOTE: the corrections change the OFC, start confirming afresh.
+        self._previous = OFCDiff()
+        txn = self.ofc.begin()
+        self._queue_corrections(txn, diff)
+        total = len(txn.operations)
+        try:
+            self.ofc.commit(txn)
+        finally:
+            self.ofc.topology.invalidate()
+        if txn.failures:
+            reason = '; '.join('%s%s: %s' % (op.method, op.args, error)
+                               for op, error in txn.failures)
+            raise exceptions.OFCReconcileFailed(failed=len(txn.failures),
+                                                total=total, reason=reason)
+        LOG.info(_("OFC reconciled successfully."))
+        return diff
+
+    def periodic_reconcile(self):
+        try:
+            self.reconcile()
+        except Exception:
+            LOG.exception(_("Failed to reconcile the OFC"))
+
+
+def _uuid_to_region_name(uuid):
+    if uuid is None:
+        return uuid
+    return uuid.replace('-', '')
+
+
+def main():
+    """Reconcile the OFC of the Dodai plugin with the Quantum database."""
+    opts = [
+        cfg.BoolOpt('dry_run',
+                    default=False,
+                    help=_('Only report the corrections the OFC needs.')),
+        cfg.IntOpt('confirm_delay',
+                   default=10,
+                   help=_('Seconds between the two scans a correction '
+                          'must be found by.')),
+    ]
+    CONF.register_cli_opts(opts)
+    CONF(project='quantum')
+    config.setup_logging(CONF)
+    db.configure_db()
+
+    reconciler = OFCReconciler(ofc_manager.OFCManager(),
+                               nova_cache.BareMetalCache(
+                                   CONF.NOVA.baremetal_cache_ttl))
+    reconciler.reconcile(dry_run=True)
+    time.sleep(CONF.confirm_delay)
+    try:
+        diff = reconciler.reconcile(dry_run=CONF.dry_run)
+    except exceptions.OFCReconcileFailed as e:
+        print e
+        sys.exit(1)
+    for region_name, vlan_id in diff.regions_to_create:
+        print "create region %s (vlan %s)" % (region_name, vlan_id)
+    for region_name in diff.regions_to_remove:
+        print "remove region %s" % region_name
+    for dpid, port_no, region_name in diff.server_ports_to_set:
+        print "set server port %s/%s in %s" % (dpid, port_no, region_name)
+    for dpid, region_name, count in diff.unexpected_server_ports:
+        print "unexpected server ports %s in %s: %s (clear them by hand)" % (
+            dpid, region_name, count)
+    for dpid, outer_port, vlan_id, region_name in diff.associations_to_set:
+        print "set outer port association %s/%s vlan %s in %s" % (
+            dpid, outer_port, vlan_id, region_name)
+    for dpid, outer_port, vlan_id in diff.associations_to_clear:
+        print "clear outer port association %s/%s vlan %s" % (
+            dpid, outer_port, vlan_id)
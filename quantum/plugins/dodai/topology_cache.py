@@ -0,0 +1,116 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+from eventlet import semaphore
+
+from quantum.openstack.common import log
+
+
+LOG = log.getLogger(__name__)
+
+SERVER_PORT_TYPE = 'ServerPort'
+
+
+class TopologyCache(object):
+    """In-process view of the regions and server ports of an OFC.
+
+    Regions and server ports are loaded lazily from the driver, each with
+    a single scan, and expire after ttl seconds. The OFCManager keeps the
+    regions up to date by writing its own mutations through, drops the
+    server ports when it changes them, and invalidates everything when the
+    state of the OFC is unknown (e.g. after a failed commit). A ttl of 0
+    disables caching.
+
+    Server ports are only known by the datapath and the region they are
+    in, the attributes of the showPorts results the plugin relies on, so
+    they are counted per (dpid, region_name).
+    """
+
+    def __init__(self, driver, ttl):
+        self.driver = driver
+        self.ttl = ttl
+        self._sem = semaphore.Semaphore()
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop everything, the next lookup reloads from the OFC."""
+        self._regions = None
+        self._regions_loaded_at = 0
+        self.invalidate_server_ports()
+
+    def invalidate_server_ports(self):
+        """Drop the server ports, the next lookup reloads them."""
+        # {region_name: {dpid: number of server ports}}
+        self._server_ports = None
+        self._ports_loaded_at = 0
+
+    def _expired(self, loaded_at):
+        return not self.ttl or time.time() - loaded_at > self.ttl
+
+    def _load_regions(self):
+        with self._sem:
+            if self._regions is None or self._expired(self._regions_loaded_at):
+                LOG.debug("#TopologyCache loading regions.")
+                self._regions = set(x.regionName
+                                    for x in self.driver.show_region())
+                self._regions_loaded_at = time.time()
+        return self._regions
+
+    def _load_server_ports(self):
+        with self._sem:
+            if (self._server_ports is None or
+                    self._expired(self._ports_loaded_at)):
+                LOG.debug("#TopologyCache loading server ports.")
+                server_ports = {}
+                for dpid_data in self.driver.show_switch_datapath_id():
+                    dpid = dpid_data.dpid
+                    for port in self.driver.show_ports(dpid):
+                        if port.type != SERVER_PORT_TYPE:
+                            continue
+                        counts = server_ports.setdefault(port.regionName, {})
+                        counts[dpid] = counts.get(dpid, 0) + 1
+                self._server_ports = server_ports
+                self._ports_loaded_at = time.time()
+        return self._server_ports
+
+    def has_region(self, region_name):
+        return region_name in self._load_regions()
+
+    def get_regions(self):
+        return set(self._load_regions())
+
+    def get_all_server_ports(self):
+        """Return {(dpid, region_name): number of server ports}."""
+        return dict(((dpid, region_name), count)
+                    for region_name, counts in
+                    self._load_server_ports().iteritems()
+                    for dpid, count in counts.iteritems())
+
+    def get_server_ports(self, region_name):
+        """Return {dpid: number of server ports} of a region."""
+        return dict(self._load_server_ports().get(region_name, {}))
+
+    def add_region(self, region_name):
+        if self._regions is not None:
+            self._regions.add(region_name)
+
+    def remove_region(self, region_name):
+        if self._regions is not None:
+            self._regions.discard(region_name)
+        if self._server_ports is not None:
+            self._server_ports.pop(region_name, None)
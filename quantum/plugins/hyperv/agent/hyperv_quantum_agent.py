@@ -244,46 +244,50 @@ class HyperVQuantumAgent(object):
 
     def _treat_devices_added(self, devices):
         resync = False
-        for device in devices:
-            LOG.info(_("Adding port %s") % device)
+        for chunk in agent_rpc.chunk_devices(devices):
             try:
-                device_details = self.plugin_rpc.get_device_details(
+                devices_details = self.plugin_rpc.get_devices_details_list(
                     self.context,
-                    device,
+                    chunk,
                     self.agent_id)
             except Exception as e:
                 LOG.debug(_(
-                    "Unable to get port details for device %s: %s"),
-                    device, e)
+                    "Unable to get port details for devices %s: %s"),
+                    chunk, e)
                 resync = True
                 continue
-            if 'port_id' in device_details:
-                LOG.info(_(
-                    "Port %(device)s updated. Details: %(device_details)s") %
-                    locals())
-                self._treat_vif_port(
-                    device_details['port_id'],
-                    device_details['network_id'],
-                    device_details['network_type'],
-                    device_details['physical_network'],
-                    device_details['segmentation_id'],
-                    device_details['admin_state_up'])
+            for device_details in devices_details:
+                device = device_details['device']
+                LOG.info(_("Adding port %s") % device)
+                if 'port_id' in device_details:
+                    LOG.info(_(
+                        "Port %(device)s updated. "
+                        "Details: %(device_details)s") % locals())
+                    self._treat_vif_port(
+                        device_details['port_id'],
+                        device_details['network_id'],
+                        device_details['network_type'],
+                        device_details['physical_network'],
+                        device_details['segmentation_id'],
+                        device_details['admin_state_up'])
         return resync
 
     def _treat_devices_removed(self, devices):
         resync = False
-        for device in devices:
-            LOG.info(_("Removing port %s"), device)
+        for chunk in agent_rpc.chunk_devices(devices):
             try:
-                self.plugin_rpc.update_device_down(self.context,
-                                                   device,
-                                                   self.agent_id)
+                devices_details = self.plugin_rpc.update_devices_down(
+                    self.context,
+                    chunk,
+                    self.agent_id)
             except Exception as e:
-                LOG.debug(_("Removing port failed for device %s: %s"),
-                          device, e)
+                LOG.debug(_("Removing ports failed for devices %s: %s"),
+                          chunk, e)
                 resync = True
                 continue
-            self._port_unbound(device)
+            for device_details in devices_details:
+                LOG.info(_("Removing port %s"), device_details['device'])
+                self._port_unbound(device_details['device'])
         return resync
 
     def _process_network_ports(self, port_info):
@@ -104,6 +104,30 @@ class HyperVPluginDB(object):
             port = None
         return port
 
+    def get_ports_and_bindings(self, port_ids):
+        """Return the ports of the given ids with their network bindings.
+
+        The (port, binding) tuples are returned by port id, and are read
+        with one query.
+        """
+        if not port_ids:
+            return {}
+        session = db_api.get_session()
+        query = session.query(models_v2.Port, hyperv_model.NetworkBinding)
+        query = query.join(hyperv_model.NetworkBinding,
+                           models_v2.Port.network_id ==
+                           hyperv_model.NetworkBinding.network_id)
+        query = query.filter(models_v2.Port.id.in_(port_ids))
+        return dict((port.id, (port, binding)) for port, binding in query)
+
+    def get_ports(self, port_ids):
+        if not port_ids:
+            return {}
+        session = db_api.get_session()
+        query = session.query(models_v2.Port)
+        query = query.filter(models_v2.Port.id.in_(port_ids))
+        return dict((port.id, port) for port in query)
+
     def get_network_binding(self, session, network_id):
         session = session or db_api.get_session()
         try:
@@ -123,6 +147,15 @@ class HyperVPluginDB(object):
         except exc.NoResultFound:
             raise q_exc.PortNotFound(port_id=port_id)
 
+    def set_ports_status(self, port_ids, status):
+        if not port_ids:
+            return
+        session = db_api.get_session()
+        with session.begin(subtransactions=True):
+            query = session.query(models_v2.Port)
+            query = query.filter(models_v2.Port.id.in_(port_ids))
+            query.update({'status': status}, synchronize_session=False)
+
     def release_vlan(self, session, physical_network, vlan_id):
         with session.begin(subtransactions=True):
             try:
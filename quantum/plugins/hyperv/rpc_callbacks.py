@@ -31,8 +31,10 @@ class HyperVRpcCallbacks(
         dhcp_rpc_base.DhcpRpcCallbackMixin,
         l3_rpc_base.L3RpcCallbackMixin):
 
-    # Set RPC API version to 1.0 by default.
-    RPC_API_VERSION = '1.0'
+    # history
+    #   1.0 Initial version
+    #   1.2 Support get_devices_details_list and update_devices_down
+    RPC_API_VERSION = '1.2'
 
     def __init__(self, notifier):
         self.notifier = notifier
@@ -46,28 +48,63 @@ class HyperVRpcCallbacks(
         '''
         return q_rpc.PluginRpcDispatcher([self])
 
+    def _get_devices_details(self, devices):
+        ports = self._db.get_ports_and_bindings(devices)
+        entries = []
+        port_ids = []
+        for device in devices:
+            if device in ports:
+                port, binding = ports[device]
+                entry = {'device': device,
+                         'network_id': port['network_id'],
+                         'port_id': port['id'],
+                         'admin_state_up': port['admin_state_up'],
+                         'network_type': binding.network_type,
+                         'segmentation_id': binding.segmentation_id,
+                         'physical_network': binding.physical_network}
+                port_ids.append(port['id'])
+            else:
+                entry = {'device': device}
+                LOG.debug(_("%s can not be found in database"), device)
+            entries.append(entry)
+        # Set the port status to UP
+        self._db.set_ports_status(port_ids, q_const.PORT_STATUS_ACTIVE)
+        return entries
+
+    def _update_devices_down(self, devices):
+        ports = self._db.get_ports(devices)
+        entries = []
+        port_ids = []
+        for device in devices:
+            port = ports.get(device)
+            if port:
+                entry = {'device': device,
+                         'exists': True}
+                port_ids.append(port['id'])
+            else:
+                entry = {'device': device,
+                         'exists': False}
+                LOG.debug(_("%s can not be found in database"), device)
+            entries.append(entry)
+        # Set port status to DOWN
+        self._db.set_ports_status(port_ids, q_const.PORT_STATUS_DOWN)
+        return entries
+
     def get_device_details(self, rpc_context, **kwargs):
         """Agent requests device details"""
         agent_id = kwargs.get('agent_id')
         device = kwargs.get('device')
         LOG.debug(_("Device %(device)s details requested from %(agent_id)s"),
                   locals())
-        port = self._db.get_port(device)
-        if port:
-            binding = self._db.get_network_binding(None, port['network_id'])
-            entry = {'device': device,
-                     'network_id': port['network_id'],
-                     'port_id': port['id'],
-                     'admin_state_up': port['admin_state_up'],
-                     'network_type': binding.network_type,
-                     'segmentation_id': binding.segmentation_id,
-                     'physical_network': binding.physical_network}
-            # Set the port status to UP
-            self._db.set_port_status(port['id'], q_const.PORT_STATUS_ACTIVE)
-        else:
-            entry = {'device': device}
-            LOG.debug(_("%s can not be found in database"), device)
-        return entry
+        return self._get_devices_details([device])[0]
+
+    def get_devices_details_list(self, rpc_context, **kwargs):
+        """Agent requests the details of several devices"""
+        agent_id = kwargs.get('agent_id')
+        devices = kwargs.get('devices')
+        LOG.debug(_("Devices %(devices)s details requested from "
+                    "%(agent_id)s"), locals())
+        return self._get_devices_details(devices)
 
     def update_device_down(self, rpc_context, **kwargs):
         """Device no longer exists on agent"""
@@ -76,17 +113,15 @@ class HyperVRpcCallbacks(
         device = kwargs.get('device')
         LOG.debug(_("Device %(device)s no longer exists on %(agent_id)s"),
                   locals())
-        port = self._db.get_port(device)
-        if port:
-            entry = {'device': device,
-                     'exists': True}
-            # Set port status to DOWN
-            self._db.set_port_status(port['id'], q_const.PORT_STATUS_DOWN)
-        else:
-            entry = {'device': device,
-                     'exists': False}
-            LOG.debug(_("%s can not be found in database"), device)
-        return entry
+        return self._update_devices_down([device])[0]
+
+    def update_devices_down(self, rpc_context, **kwargs):
+        """Devices no longer exist on agent"""
+        agent_id = kwargs.get('agent_id')
+        devices = kwargs.get('devices')
+        LOG.debug(_("Devices %(devices)s no longer exist on %(agent_id)s"),
+                  locals())
+        return self._update_devices_down(devices)
 
     def tunnel_sync(self, rpc_context, **kwargs):
         """Dummy function for ovs agent running on Linux to
@@ -542,51 +542,55 @@ class LinuxBridgeQuantumAgentRPC(sg_rpc.SecurityGroupAgentRpcMixin):
     def treat_devices_added(self, devices):
         resync = False
         self.prepare_devices_filter(devices)
-        for device in devices:
-            LOG.debug(_("Port %s added"), device)
+        for chunk in agent_rpc.chunk_devices(devices):
             try:
-                details = self.plugin_rpc.get_device_details(self.context,
-                                                             device,
-                                                             self.agent_id)
+                devices_details = self.plugin_rpc.get_devices_details_list(
+                    self.context, chunk, self.agent_id)
             except Exception as e:
                 LOG.debug(_("Unable to get port details for "
-                            "%(device)s: %(e)s"), locals())
+                            "%(devices)s: %(e)s"),
+                          {'devices': chunk, 'e': e})
                 resync = True
                 continue
-            if 'port_id' in details:
-                LOG.info(_("Port %(device)s updated. Details: %(details)s"),
-                         locals())
-                if details['admin_state_up']:
-                    # create the networking for the port
-                    self.br_mgr.add_interface(details['network_id'],
-                                              details['physical_network'],
-                                              details['vlan_id'],
-                                              details['port_id'])
+            for details in devices_details:
+                device = details['device']
+                LOG.debug(_("Port %s added"), device)
+                if 'port_id' in details:
+                    LOG.info(_("Port %(device)s updated. Details: "
+                               "%(details)s"), locals())
+                    if details['admin_state_up']:
+                        # create the networking for the port
+                        self.br_mgr.add_interface(details['network_id'],
+                                                  details['physical_network'],
+                                                  details['vlan_id'],
+                                                  details['port_id'])
+                    else:
+                        self.remove_port_binding(details['network_id'],
+                                                 details['port_id'])
                 else:
-                    self.remove_port_binding(details['network_id'],
-                                             details['port_id'])
-            else:
-                LOG.info(_("Device %s not defined on plugin"), device)
+                    LOG.info(_("Device %s not defined on plugin"), device)
         return resync
 
     def treat_devices_removed(self, devices):
         resync = False
         self.remove_devices_filter(devices)
-        for device in devices:
-            LOG.info(_("Attachment %s removed"), device)
+        for chunk in agent_rpc.chunk_devices(devices):
             try:
-                details = self.plugin_rpc.update_device_down(self.context,
-                                                             device,
-                                                             self.agent_id)
+                devices_details = self.plugin_rpc.update_devices_down(
+                    self.context, chunk, self.agent_id)
             except Exception as e:
-                LOG.debug(_("port_removed failed for %(device)s: %(e)s"),
-                          locals())
+                LOG.debug(_("port_removed failed for %(devices)s: %(e)s"),
+                          {'devices': chunk, 'e': e})
                 resync = True
-            if details['exists']:
-                LOG.info(_("Port %s updated."), device)
-                # Nothing to do regarding local networking
-            else:
-                LOG.debug(_("Device %s not defined on plugin"), device)
+                continue
+            for details in devices_details:
+                device = details['device']
+                LOG.info(_("Attachment %s removed"), device)
+                if details['exists']:
+                    LOG.info(_("Port %s updated."), device)
+                    # Nothing to do regarding local networking
+                else:
+                    LOG.debug(_("Device %s not defined on plugin"), device)
         return resync
 
     def daemon_loop(self):
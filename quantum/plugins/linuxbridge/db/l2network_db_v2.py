@@ -14,6 +14,7 @@
 # limitations under the License.
 
 
+import sqlalchemy as sa
 from sqlalchemy.orm import exc
 
 from quantum.common import exceptions as q_exc
@@ -221,6 +222,46 @@ def get_port_from_device(device):
     return port_dict
 
 
+def _get_by_devices(query, devices):
+    if not devices:
+        return {}
+    devices = set(devices)
+    query = query.filter(sa.or_(*[models_v2.Port.id.startswith(device)
+                                  for device in devices]))
+    lengths = set(len(device) for device in devices)
+    results = {}
+    for row in query:
+        port = isinstance(row, models_v2.Port) and row or row[0]
+        for length in lengths:
+            if port.id[:length] in devices:
+                results[port.id[:length]] = row
+    return results
+
+
+def get_ports_from_devices(devices):
+    """Return the ports of the given devices, by device.
+
+    :param devices: leading characters of the ids of the ports, as found in
+                    the names of their devices.
+    """
+    session = db.get_session()
+    return _get_by_devices(session.query(models_v2.Port), devices)
+
+
+def get_ports_and_bindings_from_devices(devices):
+    """Return the ports of the given devices with their network bindings.
+
+    The (port, binding) tuples are returned by device, and are read with
+    one query.
+    """
+    session = db.get_session()
+    query = session.query(models_v2.Port, l2network_models_v2.NetworkBinding)
+    query = query.join(l2network_models_v2.NetworkBinding,
+                       models_v2.Port.network_id ==
+                       l2network_models_v2.NetworkBinding.network_id)
+    return _get_by_devices(query, devices)
+
+
 def set_port_status(port_id, status):
     """Set the port status"""
     LOG.debug(_("set_port_status as %s called"), status)
@@ -232,3 +273,15 @@ def set_port_status(port_id, status):
         session.flush()
     except exc.NoResultFound:
         raise q_exc.PortNotFound(port_id=port_id)
+
+
+def set_ports_status(port_ids, status):
+    """Set the status of the given ports with one update."""
+    LOG.debug(_("set_ports_status as %s called"), status)
+    if not port_ids:
+        return
+    session = db.get_session()
+    with session.begin(subtransactions=True):
+        query = session.query(models_v2.Port)
+        query = query.filter(models_v2.Port.id.in_(port_ids))
+        query.update({'status': status}, synchronize_session=False)
@@ -28,7 +28,6 @@ from quantum.common import topics
 from quantum.common import utils
 from quantum.db import agents_db
 from quantum.db import agentschedulers_db
-from quantum.db import api as db_api
 from quantum.db import db_base_plugin_v2
 from quantum.db import dhcp_rpc_base
 from quantum.db import extraroute_db
@@ -58,7 +57,8 @@ class LinuxBridgeRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
 
     # history
     #   1.1 Support Security Group RPC
-    RPC_API_VERSION = '1.1'
+    #   1.2 Support get_devices_details_list and update_devices_down
+    RPC_API_VERSION = '1.2'
     # Device names start with "tap"
     TAP_PREFIX_LEN = 3
 
@@ -78,30 +78,70 @@ class LinuxBridgeRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
             port['device'] = device
         return port
 
+    def _get_devices_details(self, devices):
+        ports = db.get_ports_and_bindings_from_devices(
+            [device[self.TAP_PREFIX_LEN:] for device in devices])
+        entries = []
+        ports_by_status = {}
+        for device in devices:
+            if device[self.TAP_PREFIX_LEN:] in ports:
+                port, binding = ports[device[self.TAP_PREFIX_LEN:]]
+                entry = {'device': device,
+                         'physical_network': binding.physical_network,
+                         'vlan_id': binding.vlan_id,
+                         'network_id': port['network_id'],
+                         'port_id': port['id'],
+                         'admin_state_up': port['admin_state_up']}
+                new_status = (q_const.PORT_STATUS_ACTIVE
+                              if port['admin_state_up']
+                              else q_const.PORT_STATUS_DOWN)
+                if port['status'] != new_status:
+                    ports_by_status.setdefault(new_status, []).append(
+                        port['id'])
+            else:
+                entry = {'device': device}
+                LOG.debug(_("%s can not be found in database"), device)
+            entries.append(entry)
+        for status, port_ids in ports_by_status.iteritems():
+            db.set_ports_status(port_ids, status)
+        return entries
+
+    def _update_devices_down(self, devices):
+        ports = db.get_ports_from_devices(
+            [device[self.TAP_PREFIX_LEN:] for device in devices])
+        entries = []
+        port_ids = []
+        for device in devices:
+            port = ports.get(device[self.TAP_PREFIX_LEN:])
+            if port:
+                entry = {'device': device,
+                         'exists': True}
+                if port['status'] != q_const.PORT_STATUS_DOWN:
+                    port_ids.append(port['id'])
+            else:
+                entry = {'device': device,
+                         'exists': False}
+                LOG.debug(_("%s can not be found in database"), device)
+            entries.append(entry)
+        # Set port status to DOWN
+        db.set_ports_status(port_ids, q_const.PORT_STATUS_DOWN)
+        return entries
+
     def get_device_details(self, rpc_context, **kwargs):
         """Agent requests device details"""
         agent_id = kwargs.get('agent_id')
         device = kwargs.get('device')
         LOG.debug(_("Device %(device)s details requested from %(agent_id)s"),
                   locals())
-        port = self.get_port_from_device(device)
-        if port:
-            binding = db.get_network_binding(db_api.get_session(),
-                                             port['network_id'])
-            entry = {'device': device,
-                     'physical_network': binding.physical_network,
-                     'vlan_id': binding.vlan_id,
-                     'network_id': port['network_id'],
-                     'port_id': port['id'],
-                     'admin_state_up': port['admin_state_up']}
-            new_status = (q_const.PORT_STATUS_ACTIVE if port['admin_state_up']
-                          else q_const.PORT_STATUS_DOWN)
-            if port['status'] != new_status:
-                db.set_port_status(port['id'], new_status)
-        else:
-            entry = {'device': device}
-            LOG.debug(_("%s can not be found in database"), device)
-        return entry
+        return self._get_devices_details([device])[0]
+
+    def get_devices_details_list(self, rpc_context, **kwargs):
+        """Agent requests the details of several devices"""
+        agent_id = kwargs.get('agent_id')
+        devices = kwargs.get('devices')
+        LOG.debug(_("Devices %(devices)s details requested from "
+                    "%(agent_id)s"), locals())
+        return self._get_devices_details(devices)
 
     def update_device_down(self, rpc_context, **kwargs):
         """Device no longer exists on agent"""
@@ -110,18 +150,15 @@ class LinuxBridgeRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
         device = kwargs.get('device')
         LOG.debug(_("Device %(device)s no longer exists on %(agent_id)s"),
                   locals())
-        port = self.get_port_from_device(device)
-        if port:
-            entry = {'device': device,
-                     'exists': True}
-            if port['status'] != q_const.PORT_STATUS_DOWN:
-                # Set port status to DOWN
-                db.set_port_status(port['id'], q_const.PORT_STATUS_DOWN)
-        else:
-            entry = {'device': device,
-                     'exists': False}
-            LOG.debug(_("%s can not be found in database"), device)
-        return entry
+        return self._update_devices_down([device])[0]
+
+    def update_devices_down(self, rpc_context, **kwargs):
+        """Devices no longer exist on agent"""
+        agent_id = kwargs.get('agent_id')
+        devices = kwargs.get('devices')
+        LOG.debug(_("Devices %(devices)s no longer exist on %(agent_id)s"),
+                  locals())
+        return self._update_devices_down(devices)
 
     def update_device_up(self, rpc_context, **kwargs):
         """Device is up on agent"""
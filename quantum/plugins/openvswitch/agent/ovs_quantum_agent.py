@@ -28,6 +28,7 @@ from oslo.config import cfg
 
 from quantum.agent.linux import ip_lib
 from quantum.agent.linux import ovs_lib
+from quantum.agent.linux import ovsdb_monitor
 from quantum.agent.linux import utils
 from quantum.agent import rpc as agent_rpc
 from quantum.agent import securitygroups_rpc as sg_rpc
@@ -152,7 +153,8 @@ class OVSQuantumAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
 
     def __init__(self, integ_br, tun_br, local_ip,
                  bridge_mappings, root_helper,
-                 polling_interval, enable_tunneling):
+                 polling_interval, enable_tunneling, minimize_polling=False,
+                 ovsdb_monitor_respawn_interval=30):
         '''Constructor.
 
         :param integ_br: name of the integration bridge.
@@ -162,6 +164,10 @@ class OVSQuantumAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
         :param root_helper: utility to use when running shell cmds.
         :param polling_interval: interval (secs) to poll DB.
         :param enable_tunneling: if True enable GRE networks.
+        :param minimize_polling: if True monitor ovsdb for port changes
+               instead of polling for them.
+        :param ovsdb_monitor_respawn_interval: interval (secs) to wait
+               before respawning the ovsdb monitor.
         '''
         self.root_helper = root_helper
         self.available_local_vlans = set(
@@ -172,6 +178,12 @@ class OVSQuantumAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
         self.local_vlan_map = {}
 
         self.polling_interval = polling_interval
+        self.interface_monitor = None
+        if minimize_polling:
+            self.interface_monitor = ovsdb_monitor.InterfaceMonitor(
+                root_helper, respawn_interval=ovsdb_monitor_respawn_interval)
+            self.interface_monitor.start()
+        self.vif_ports = None
 
         self.enable_tunneling = enable_tunneling
         self.local_ip = local_ip
@@ -195,7 +207,7 @@ class OVSQuantumAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
     def _report_state(self):
         try:
             # How many devices are likely used by a VM
-            ports = self.int_br.get_vif_port_set()
+            ports = self.get_vif_port_set()
             num_devices = len(ports)
             self.agent_state.get('configurations')['devices'] = num_devices
             self.state_rpc.report_state(self.context,
@@ -257,9 +269,13 @@ class OVSQuantumAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
         network_type = kwargs.get('network_type')
         segmentation_id = kwargs.get('segmentation_id')
         physical_network = kwargs.get('physical_network')
-        self.treat_vif_port(vif_port, port['id'], port['network_id'],
-                            network_type, physical_network,
-                            segmentation_id, port['admin_state_up'])
+        self.defer_apply_on()
+        try:
+            self.treat_vif_port(vif_port, port['id'], port['network_id'],
+                                network_type, physical_network,
+                                segmentation_id, port['admin_state_up'])
+        finally:
+            self.defer_apply_off()
         if port['admin_state_up']:
             # update plugin about port status
             self.plugin_rpc.update_device_up(self.context, port['id'],
@@ -575,8 +591,28 @@ class OVSQuantumAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
             int_veth.link.set_up()
             phys_veth.link.set_up()
 
+    def _is_monitoring(self):
+        return bool(self.interface_monitor and
+                    self.interface_monitor.is_active())
+
+    def get_vif_port_set(self):
+        if not self._is_monitoring():
+            # Fall back to polling the ports of the bridge
+            self.vif_ports = None
+            return self.int_br.get_vif_port_set()
+        if self.interface_monitor.has_changes() or self.vif_ports is None:
+            self.vif_ports = self.int_br.get_vif_port_set(
+                self.interface_monitor.interfaces.values())
+        return set(self.vif_ports)
+
+    def wait_for_port_changes(self, timeout):
+        if self._is_monitoring():
+            self.interface_monitor.wait(timeout)
+        else:
+            time.sleep(timeout)
+
     def update_ports(self, registered_ports):
-        ports = self.int_br.get_vif_port_set()
+        ports = self.get_vif_port_set()
         if ports == registered_ports:
             return
         added = ports - registered_ports
@@ -585,6 +621,22 @@ class OVSQuantumAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
                 'added': added,
                 'removed': removed}
 
+    def _get_bridges(self):
+        bridges = [self.int_br] + self.phys_brs.values()
+        if self.enable_tunneling:
+            bridges.append(self.tun_br)
+        return bridges
+
+    def defer_apply_on(self):
+        """Queue the DB edits and flow changes of the bridges."""
+        for br in self._get_bridges():
+            br.defer_apply_on()
+
+    def defer_apply_off(self):
+        """Apply the queued DB edits and flow changes of the bridges."""
+        for br in self._get_bridges():
+            br.defer_apply_off()
+
     def treat_vif_port(self, vif_port, port_id, network_id, network_type,
                        physical_network, segmentation_id, admin_state_up):
         if vif_port:
@@ -599,62 +651,70 @@ class OVSQuantumAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
     def treat_devices_added(self, devices):
         resync = False
         self.sg_agent.prepare_devices_filter(devices)
-        for device in devices:
-            LOG.info(_("Port %s added"), device)
+        vif_ports = self.int_br.get_vif_ports_by_ids(devices)
+        for chunk in agent_rpc.chunk_devices(devices):
             try:
-                details = self.plugin_rpc.get_device_details(self.context,
-                                                             device,
-                                                             self.agent_id)
+                devices_details = self.plugin_rpc.get_devices_details_list(
+                    self.context, chunk, self.agent_id)
             except Exception as e:
                 LOG.debug(_("Unable to get port details for "
-                            "%(device)s: %(e)s"), locals())
+                            "%(devices)s: %(e)s"),
+                          {'devices': chunk, 'e': e})
                 resync = True
                 continue
-            port = self.int_br.get_vif_port_by_id(details['device'])
-            if 'port_id' in details:
-                LOG.info(_("Port %(device)s updated. Details: %(details)s"),
-                         locals())
-                self.treat_vif_port(port, details['port_id'],
-                                    details['network_id'],
-                                    details['network_type'],
-                                    details['physical_network'],
-                                    details['segmentation_id'],
-                                    details['admin_state_up'])
-            else:
-                LOG.debug(_("Device %s not defined on plugin"), device)
-                if (port and int(port.ofport) != -1):
-                    self.port_dead(port)
+            for details in devices_details:
+                device = details['device']
+                LOG.info(_("Port %s added"), device)
+                port = vif_ports.get(device)
+                if 'port_id' in details:
+                    LOG.info(_("Port %(device)s updated. Details: "
+                               "%(details)s"), locals())
+                    self.treat_vif_port(port, details['port_id'],
+                                        details['network_id'],
+                                        details['network_type'],
+                                        details['physical_network'],
+                                        details['segmentation_id'],
+                                        details['admin_state_up'])
+                else:
+                    LOG.debug(_("Device %s not defined on plugin"), device)
+                    if (port and int(port.ofport) != -1):
+                        self.port_dead(port)
         return resync
 
     def treat_devices_removed(self, devices):
         resync = False
         self.sg_agent.remove_devices_filter(devices)
-        for device in devices:
-            LOG.info(_("Attachment %s removed"), device)
+        for chunk in agent_rpc.chunk_devices(devices):
             try:
-                details = self.plugin_rpc.update_device_down(self.context,
-                                                             device,
-                                                             self.agent_id)
+                devices_details = self.plugin_rpc.update_devices_down(
+                    self.context, chunk, self.agent_id)
             except Exception as e:
-                LOG.debug(_("port_removed failed for %(device)s: %(e)s"),
-                          locals())
+                LOG.debug(_("port_removed failed for %(devices)s: %(e)s"),
+                          {'devices': chunk, 'e': e})
                 resync = True
                 continue
-            if details['exists']:
-                LOG.info(_("Port %s updated."), device)
-                # Nothing to do regarding local networking
-            else:
-                LOG.debug(_("Device %s not defined on plugin"), device)
-                self.port_unbound(device)
+            for details in devices_details:
+                device = details['device']
+                LOG.info(_("Attachment %s removed"), device)
+                if details['exists']:
+                    LOG.info(_("Port %s updated."), device)
+                    # Nothing to do regarding local networking
+                else:
+                    LOG.debug(_("Device %s not defined on plugin"), device)
+                    self.port_unbound(device)
         return resync
 
     def process_network_ports(self, port_info):
         resync_a = False
         resync_b = False
-        if 'added' in port_info:
-            resync_a = self.treat_devices_added(port_info['added'])
-        if 'removed' in port_info:
-            resync_b = self.treat_devices_removed(port_info['removed'])
+        self.defer_apply_on()
+        try:
+            if 'added' in port_info:
+                resync_a = self.treat_devices_added(port_info['added'])
+            if 'removed' in port_info:
+                resync_b = self.treat_devices_removed(port_info['removed'])
+        finally:
+            self.defer_apply_off()
         # If one of the above opertaions fails => resync with plugin
         return (resync_a | resync_b)
 
@@ -705,10 +765,10 @@ class OVSQuantumAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
                 sync = True
                 tunnel_sync = True
 
-            # sleep till end of polling interval
+            # sleep till end of polling interval, or till ports change
             elapsed = (time.time() - start)
             if (elapsed < self.polling_interval):
-                time.sleep(self.polling_interval - elapsed)
+                self.wait_for_port_changes(self.polling_interval - elapsed)
             else:
                 LOG.debug(_("Loop iteration exceeded interval "
                             "(%(polling_interval)s vs. %(elapsed)s)!"),
@@ -738,6 +798,9 @@ def create_agent_config_map(config):
         root_helper=config.AGENT.root_helper,
         polling_interval=config.AGENT.polling_interval,
         enable_tunneling=config.OVS.enable_tunneling,
+        minimize_polling=config.AGENT.minimize_polling,
+        ovsdb_monitor_respawn_interval=(
+            config.AGENT.ovsdb_monitor_respawn_interval),
     )
 
     if kwargs['enable_tunneling'] and not kwargs['local_ip']:
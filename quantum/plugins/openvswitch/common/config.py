@@ -58,6 +58,12 @@ agent_opts = [
     cfg.IntOpt('polling_interval', default=2,
                help=_("The number of seconds the agent will wait between "
                       "polling for local device changes.")),
+    cfg.BoolOpt('minimize_polling', default=False,
+                help=_("Minimize polling by monitoring ovsdb for interface "
+                       "changes.")),
+    cfg.IntOpt('ovsdb_monitor_respawn_interval', default=30,
+               help=_("The number of seconds to wait before respawning the "
+                      "ovsdb monitor after losing communication with it.")),
 ]
 
 
@@ -311,6 +311,33 @@ def get_port(port_id):
     return port
 
 
+def get_ports(port_ids):
+    """Return the ports of the given ids, by id, read with one query."""
+    if not port_ids:
+        return {}
+    session = db.get_session()
+    query = session.query(models_v2.Port)
+    query = query.filter(models_v2.Port.id.in_(port_ids))
+    return dict((port.id, port) for port in query)
+
+
+def get_ports_and_bindings(port_ids):
+    """Return the ports of the given ids with their network bindings.
+
+    The (port, binding) tuples are returned by port id, and are read with
+    one query.
+    """
+    if not port_ids:
+        return {}
+    session = db.get_session()
+    query = session.query(models_v2.Port, ovs_models_v2.NetworkBinding)
+    query = query.join(ovs_models_v2.NetworkBinding,
+                       models_v2.Port.network_id ==
+                       ovs_models_v2.NetworkBinding.network_id)
+    query = query.filter(models_v2.Port.id.in_(port_ids))
+    return dict((port.id, (port, binding)) for port, binding in query)
+
+
 def get_port_from_device(port_id):
     """Get port from database"""
     LOG.debug(_("get_port_with_securitygroups() called:port_id=%s"), port_id)
@@ -348,6 +375,17 @@ def set_port_status(port_id, status):
         raise q_exc.PortNotFound(port_id=port_id)
 
 
+def set_ports_status(port_ids, status):
+    """Set the status of the given ports with one update."""
+    if not port_ids:
+        return
+    session = db.get_session()
+    with session.begin(subtransactions=True):
+        query = session.query(models_v2.Port)
+        query = query.filter(models_v2.Port.id.in_(port_ids))
+        query.update({'status': status}, synchronize_session=False)
+
+
 def get_tunnel_endpoints():
     session = db.get_session()
     try:
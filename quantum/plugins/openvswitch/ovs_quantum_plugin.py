@@ -64,8 +64,9 @@ class OVSRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
     # history
     #   1.0 Initial version
     #   1.1 Support Security Group RPC
+    #   1.2 Support get_devices_details_list and update_devices_down
 
-    RPC_API_VERSION = '1.1'
+    RPC_API_VERSION = '1.2'
 
     def __init__(self, notifier):
         self.notifier = notifier
@@ -86,30 +87,69 @@ class OVSRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
             port['device'] = device
         return port
 
+    def _get_devices_details(self, devices):
+        ports = ovs_db_v2.get_ports_and_bindings(devices)
+        entries = []
+        ports_by_status = {}
+        for device in devices:
+            if device in ports:
+                port, binding = ports[device]
+                entry = {'device': device,
+                         'network_id': port['network_id'],
+                         'port_id': port['id'],
+                         'admin_state_up': port['admin_state_up'],
+                         'network_type': binding.network_type,
+                         'segmentation_id': binding.segmentation_id,
+                         'physical_network': binding.physical_network}
+                new_status = (q_const.PORT_STATUS_ACTIVE
+                              if port['admin_state_up']
+                              else q_const.PORT_STATUS_DOWN)
+                if port['status'] != new_status:
+                    ports_by_status.setdefault(new_status, []).append(
+                        port['id'])
+            else:
+                entry = {'device': device}
+                LOG.debug(_("%s can not be found in database"), device)
+            entries.append(entry)
+        for status, port_ids in ports_by_status.iteritems():
+            ovs_db_v2.set_ports_status(port_ids, status)
+        return entries
+
+    def _update_devices_down(self, devices):
+        ports = ovs_db_v2.get_ports(devices)
+        entries = []
+        port_ids = []
+        for device in devices:
+            port = ports.get(device)
+            if port:
+                entry = {'device': device,
+                         'exists': True}
+                if port['status'] != q_const.PORT_STATUS_DOWN:
+                    port_ids.append(port['id'])
+            else:
+                entry = {'device': device,
+                         'exists': False}
+                LOG.debug(_("%s can not be found in database"), device)
+            entries.append(entry)
+        # Set port status to DOWN
+        ovs_db_v2.set_ports_status(port_ids, q_const.PORT_STATUS_DOWN)
+        return entries
+
     def get_device_details(self, rpc_context, **kwargs):
         """Agent requests device details"""
         agent_id = kwargs.get('agent_id')
         device = kwargs.get('device')
         LOG.debug(_("Device %(device)s details requested from %(agent_id)s"),
                   locals())
-        port = ovs_db_v2.get_port(device)
-        if port:
-            binding = ovs_db_v2.get_network_binding(None, port['network_id'])
-            entry = {'device': device,
-                     'network_id': port['network_id'],
-                     'port_id': port['id'],
-                     'admin_state_up': port['admin_state_up'],
-                     'network_type': binding.network_type,
-                     'segmentation_id': binding.segmentation_id,
-                     'physical_network': binding.physical_network}
-            new_status = (q_const.PORT_STATUS_ACTIVE if port['admin_state_up']
-                          else q_const.PORT_STATUS_DOWN)
-            if port['status'] != new_status:
-                ovs_db_v2.set_port_status(port['id'], new_status)
-        else:
-            entry = {'device': device}
-            LOG.debug(_("%s can not be found in database"), device)
-        return entry
+        return self._get_devices_details([device])[0]
+
+    def get_devices_details_list(self, rpc_context, **kwargs):
+        """Agent requests the details of several devices"""
+        agent_id = kwargs.get('agent_id')
+        devices = kwargs.get('devices')
+        LOG.debug(_("Devices %(devices)s details requested from "
+                    "%(agent_id)s"), locals())
+        return self._get_devices_details(devices)
 
     def update_device_down(self, rpc_context, **kwargs):
         """Device no longer exists on agent"""
@@ -118,18 +158,15 @@ class OVSRpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
         device = kwargs.get('device')
         LOG.debug(_("Device %(device)s no longer exists on %(agent_id)s"),
                   locals())
-        port = ovs_db_v2.get_port(device)
-        if port:
-            entry = {'device': device,
-                     'exists': True}
-            if port['status'] != q_const.PORT_STATUS_DOWN:
-                # Set port status to DOWN
-                ovs_db_v2.set_port_status(port['id'], q_const.PORT_STATUS_DOWN)
-        else:
-            entry = {'device': device,
-                     'exists': False}
-            LOG.debug(_("%s can not be found in database"), device)
-        return entry
+        return self._update_devices_down([device])[0]
+
+    def update_devices_down(self, rpc_context, **kwargs):
+        """Devices no longer exist on agent"""
+        agent_id = kwargs.get('agent_id')
+        devices = kwargs.get('devices')
+        LOG.debug(_("Devices %(devices)s no longer exist on %(agent_id)s"),
+                  locals())
+        return self._update_devices_down(devices)
 
     def update_device_up(self, rpc_context, **kwargs):
         """Device is up on agent"""
@@ -221,6 +221,9 @@ class LoadBalancerPlugin(loadbalancer_db.LoadBalancerPluginDb):
     """
     supported_extension_aliases = ["lbaas"]
 
+    __native_pagination_support = True
+    __native_sorting_support = True
+
     def __init__(self):
         """
         Do the initialization for the loadbalancer service plugin here.
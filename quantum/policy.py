@@ -19,6 +19,8 @@
 Policy engine for quantum.  Largely copied from nova.
 """
 
+import re
+
 from oslo.config import cfg
 
 from quantum.api.v2 import attributes
@@ -31,14 +33,22 @@ from quantum.openstack.common import policy
 LOG = logging.getLogger(__name__)
 _POLICY_PATH = None
 _POLICY_CACHE = {}
+# Compiled match rules, by action and enforced attributes
+_EVALUATORS = {}
+# The rules the match rules were compiled from
+_EVALUATOR_RULES = None
 cfg.CONF.import_opt('policy_file', 'quantum.common.config')
 
+# Matches of generic checks comparing a credential with a target field
+_TARGET_FIELD_RE = re.compile(r'^%\(([^)]+)\)s$')
+
 
 def reset():
     global _POLICY_PATH
     global _POLICY_CACHE
     _POLICY_PATH = None
     _POLICY_CACHE = {}
+    _EVALUATORS.clear()
     policy.reset()
 
 
@@ -51,7 +61,6 @@ def init():
             raise exceptions.PolicyNotFound(path=cfg.CONF.policy_file)
     # pass _set_brain to read_cached_file so that the policy brain
     # is reset only if the file has changed
-    LOG.debug(_("loading policy file at %s"), _POLICY_PATH)
     utils.read_cached_file(_POLICY_PATH, _POLICY_CACHE,
                            reload_func=_set_rules)
 
@@ -63,6 +72,7 @@ def get_resource_and_action(action):
 
 
 def _set_rules(data):
+    LOG.debug(_("loading policy file at %s"), _POLICY_PATH)
     default_rule = 'default'
     policy.set_rules(policy.Rules.load_json(data, default_rule))
 
@@ -88,15 +98,39 @@ def _build_target(action, original_target, plugin, context):
         # use the 'singular' version of the resource name
         parent_resource = hierarchy_info['parent'][:-1]
         parent_id = hierarchy_info['identified_by']
-        f = getattr(plugin, 'get_%s' % parent_resource)
-        # f *must* exist, if not found it is better to let quantum explode
-        # Note: we do not use admin context
-        data = f(context, target[parent_id], fields=['tenant_id'])
-        target['%s_tenant_id' % parent_resource] = data['tenant_id']
+        # The owners of parents are looked up once per request
+        if not hasattr(context, '_policy_parent_owners'):
+            context._policy_parent_owners = {}
+        key = (parent_resource, target[parent_id])
+        if key not in context._policy_parent_owners:
+            f = getattr(plugin, 'get_%s' % parent_resource)
+            # f *must* exist, if not found it is better to let quantum
+            # explode
+            # Note: we do not use admin context
+            data = f(context, target[parent_id], fields=['tenant_id'])
+            context._policy_parent_owners[key] = data['tenant_id']
+        target['%s_tenant_id' % parent_resource] = (
+            context._policy_parent_owners[key])
     return target
 
 
-def _build_match_rule(action, target):
+def _get_enforced_attributes(action, target):
+    """Return the attributes of the target whose setting is policed.
+
+    These are the attributes explicitly set by a write action which are
+    flagged with enforce_policy in the attribute map.
+    """
+    resource, is_write = get_resource_and_action(action)
+    res_map = attributes.RESOURCE_ATTRIBUTE_MAP.get(resource)
+    if not is_write or not res_map:
+        return frozenset()
+    return frozenset(name for name in target
+                     if name in res_map and
+                     'enforce_policy' in res_map[name] and
+                     _is_attribute_explicitly_set(name, res_map, target))
+
+
+def _build_match_rule(action, attribute_names):
     """Create the rule to match for a given action.
 
     The policy rule to be matched is built in the following way:
@@ -108,24 +142,115 @@ def _build_match_rule(action, target):
     """
 
     match_rule = policy.RuleCheck('rule', action)
-    resource, is_write = get_resource_and_action(action)
-    if is_write:
-        # assigning to variable with short name for improving readability
-        res_map = attributes.RESOURCE_ATTRIBUTE_MAP
-        if resource in res_map:
-            for attribute_name in res_map[resource]:
-                if _is_attribute_explicitly_set(attribute_name,
-                                                res_map[resource],
-                                                target):
-                    attribute = res_map[resource][attribute_name]
-                    if 'enforce_policy' in attribute and is_write:
-                        attr_rule = policy.RuleCheck('rule', '%s:%s' %
-                                                     (action, attribute_name))
-                        match_rule = policy.AndCheck([match_rule, attr_rule])
-
+    if attribute_names:
+        attr_rules = [policy.RuleCheck('rule', '%s:%s' % (action, name))
+                      for name in sorted(attribute_names)]
+        match_rule = policy.AndCheck([match_rule] + attr_rules)
     return match_rule
 
 
+def _compile_rule(check, seen=()):
+    """Flatten a check tree into a function of target and credentials.
+
+    The rules referenced by the tree are resolved once, so evaluating the
+    function goes neither through the rules store nor the check classes.
+    Checks which are not flattened are called as they are.
+    """
+    if isinstance(check, policy.TrueCheck):
+        return lambda target, creds: True
+    if isinstance(check, policy.FalseCheck):
+        return lambda target, creds: False
+    if isinstance(check, policy.RuleCheck):
+        if check.match in seen:
+            # Recursive rules are left to the policy engine
+            return check
+        try:
+            resolved = policy._rules[check.match]
+        except KeyError:
+            return lambda target, creds: False
+        evaluate = _compile_rule(resolved, seen + (check.match,))
+
+        def evaluate_rule(target, creds):
+            try:
+                return evaluate(target, creds)
+            except KeyError:
+                # A field of the target is missing; fail closed
+                return False
+        return evaluate_rule
+    if isinstance(check, policy.RoleCheck):
+        role = check.match.lower()
+        return lambda target, creds: role in creds.lowered_roles
+    if isinstance(check, policy.GenericCheck):
+        kind = check.kind
+        match = check.match
+
+        def evaluate_generic(target, creds):
+            value = match % target
+            if kind in creds:
+                return value == unicode(creds[kind])
+            return False
+        return evaluate_generic
+    if isinstance(check, policy.NotCheck):
+        evaluate = _compile_rule(check.rule, seen)
+        return lambda target, creds: not evaluate(target, creds)
+    if isinstance(check, policy.AndCheck):
+        rules = [_compile_rule(rule, seen) for rule in check.rules]
+
+        def evaluate_and(target, creds):
+            for rule in rules:
+                if not rule(target, creds):
+                    return False
+            return True
+        return evaluate_and
+    if isinstance(check, policy.OrCheck):
+        rules = [_compile_rule(rule, seen) for rule in check.rules]
+
+        def evaluate_or(target, creds):
+            for rule in rules:
+                if rule(target, creds):
+                    return True
+            return False
+        return evaluate_or
+    return check
+
+
+def _get_evaluator(action, attribute_names):
+    """Return the compiled match rule of an action.
+
+    Match rules are compiled once per action and set of enforced
+    attributes, until the rules are reloaded.
+    """
+    global _EVALUATOR_RULES
+    if policy._rules is not _EVALUATOR_RULES:
+        _EVALUATORS.clear()
+        _EVALUATOR_RULES = policy._rules
+    key = (action, attribute_names)
+    if key not in _EVALUATORS:
+        _EVALUATORS[key] = _compile_rule(
+            _build_match_rule(action, attribute_names))
+    return _EVALUATORS[key]
+
+
+class _Credentials(dict):
+    """Credentials of a context, with the lowered roles for role checks."""
+
+    def __init__(self, context):
+        super(_Credentials, self).__init__(context.to_dict())
+        self.lowered_roles = frozenset(role.lower()
+                                       for role in self.get('roles', []))
+
+
+def _get_credentials(context):
+    """Return the credentials of a context, derived once per context."""
+    key = (context.user_id, context.tenant_id, context.is_admin,
+           context.read_deleted, tuple(context.roles))
+    cached = getattr(context, '_policy_credentials', None)
+    if not cached or cached[0] != key:
+        # elevated() copies the cached credentials, hence the key
+        cached = context._policy_credentials = (key, _Credentials(context))
+    return cached[1]
+
+
 @policy.register('field')
 class FieldCheck(policy.Check):
     def __init__(self, kind, match):
@@ -159,6 +284,118 @@ class FieldCheck(policy.Check):
         return target_value == self.value
 
 
+def _and_conditions(first, second):
+    if first is False or second is False:
+        return False
+    if first is True:
+        return second
+    if second is True:
+        return first
+    conditions = []
+    for one in first:
+        for other in second:
+            if all(one[field] == value for field, value in other.iteritems()
+                   if field in one):
+                condition = one.copy()
+                condition.update(other)
+                conditions.append(condition)
+    return conditions or False
+
+
+def _or_conditions(first, second):
+    if first is True or second is True:
+        return True
+    if first is False:
+        return second
+    if second is False:
+        return first
+    return first + second
+
+
+def _compile_check(check, credentials):
+    """Evaluate a check against credentials, leaving out the target.
+
+    Returns True or False if the result does not depend on the target, a
+    list of alternative conditions on the target otherwise, or None if the
+    check cannot be evaluated this way.
+    """
+    if isinstance(check, policy.TrueCheck):
+        return True
+    if isinstance(check, policy.FalseCheck):
+        return False
+    if isinstance(check, policy.RuleCheck):
+        try:
+            return _compile_check(policy._rules[check.match], credentials)
+        except KeyError:
+            return False
+    if isinstance(check, policy.RoleCheck):
+        return check(None, credentials)
+    if isinstance(check, FieldCheck):
+        return [{check.field: check.value}]
+    if isinstance(check, policy.GenericCheck):
+        if check.kind not in credentials:
+            return False
+        value = unicode(credentials[check.kind])
+        match = _TARGET_FIELD_RE.match(check.match)
+        if match:
+            return [{match.group(1): value}]
+        if '%' not in check.match:
+            return check.match == value
+        return None
+    if isinstance(check, policy.NotCheck):
+        result = _compile_check(check.rule, credentials)
+        if result is True or result is False:
+            return not result
+        return None
+    if isinstance(check, (policy.AndCheck, policy.OrCheck)):
+        combine = (_and_conditions if isinstance(check, policy.AndCheck)
+                   else _or_conditions)
+        result = isinstance(check, policy.AndCheck)
+        for rule in check.rules:
+            compiled = _compile_check(rule, credentials)
+            if compiled is None:
+                return None
+            result = combine(result, compiled)
+        return result
+    return None
+
+
+def get_conditions(context, action):
+    """Return the conditions on targets for an action to be allowed.
+
+    The rule of the action is evaluated against the credentials of the
+    context ahead of the targets. The result is True or False if it does
+    not depend on the target, or a list of alternative conditions, each a
+    dict of values the fields of the target must all have.
+
+    None is returned when the rule cannot be evaluated this way, e.g. when
+    it uses the attributes of a parent resource or http checks; targets
+    must then go through check().
+    """
+    init()
+    resource, is_write = get_resource_and_action(action)
+    if is_write:
+        # Write rules depend on the attributes set in the target
+        return None
+    conditions = _compile_check(policy.RuleCheck('rule', action),
+                                _get_credentials(context))
+    hierarchy_info = attributes.RESOURCE_HIERARCHY_MAP.get(resource)
+    if hierarchy_info and isinstance(conditions, list):
+        parent_field = '%s_tenant_id' % hierarchy_info['parent'][:-1]
+        if any(parent_field in condition for condition in conditions):
+            return None
+    return conditions
+
+
+def match_conditions(conditions, target):
+    """Check a target against the result of get_conditions()."""
+    if conditions is True or conditions is False:
+        return conditions
+    return any(all(target.get(field) == value
+                   for field, value in condition.iteritems())
+               for condition in conditions)
+
+
 def check(context, action, target, plugin=None):
     """Verifies that the action is valid on the target in this context.
 
@@ -175,9 +412,9 @@ def check(context, action, target, plugin=None):
     """
     init()
     real_target = _build_target(action, target, plugin, context)
-    match_rule = _build_match_rule(action, real_target)
-    credentials = context.to_dict()
-    return policy.check(match_rule, real_target, credentials)
+    evaluate = _get_evaluator(action,
+                              _get_enforced_attributes(action, real_target))
+    return evaluate(real_target, _get_credentials(context))
 
 
 def enforce(context, action, target, plugin=None):
@@ -197,7 +434,9 @@ def enforce(context, action, target, plugin=None):
 
     init()
     real_target = _build_target(action, target, plugin, context)
-    match_rule = _build_match_rule(action, real_target)
-    credentials = context.to_dict()
-    return policy.check(match_rule, real_target, credentials,
-                        exceptions.PolicyNotAuthorized, action=action)
+    evaluate = _get_evaluator(action,
+                              _get_enforced_attributes(action, real_target))
+    result = evaluate(real_target, _get_credentials(context))
+    if result is False:
+        raise exceptions.PolicyNotAuthorized(action=action)
+    return result
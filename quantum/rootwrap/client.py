@@ -0,0 +1,124 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright (c) 2013 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import base64
+import json
+import shlex
+
+import eventlet
+from eventlet.green import socket
+from eventlet.green import subprocess
+from eventlet import semaphore
+
+from quantum.common import utils
+from quantum.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+# Seconds a reply is waited for beyond the command timeout of the daemon
+TIMEOUT_MARGIN = 5
+
+
+class Client(object):
+    """Run commands through a quantum-rootwrap-daemon.
+
+    The daemon is started on first use and restarted whenever it cannot
+    be reached anymore.  Every command uses its own connection, so any
+    number of greenthreads can run commands concurrently.
+    """
+
+    def __init__(self, daemon_cmd):
+        self.daemon_cmd = daemon_cmd
+        self._process = None
+        self._path = None
+        self._key = None
+        self._timeout = None
+        self._lock = semaphore.Semaphore()
+
+    def _start_daemon(self):
+        old_process = self._process
+        if old_process:
+            if old_process.poll() is None:
+                # Closing its stdin makes the old daemon exit
+                old_process.stdin.close()
+            # Reap it without holding up the commands
+            eventlet.spawn_n(old_process.wait)
+        cmd = shlex.split(self.daemon_cmd)
+        LOG.debug(_("Starting root helper daemon: %s"), cmd)
+        self._process = utils.subprocess_popen(cmd,
+                                               stdin=subprocess.PIPE,
+                                               stdout=subprocess.PIPE)
+        self._path = self._process.stdout.readline().strip()
+        self._key = self._process.stdout.readline().strip()
+        timeout = self._process.stdout.readline().strip()
+        if not (self._path and self._key and timeout):
+            raise RuntimeError(_("Root helper daemon %s failed to start") %
+                               cmd)
+        # The daemon kills commands running longer than its timeout, a
+        # reply still missing after that is never coming.
+        self._timeout = float(timeout) + TIMEOUT_MARGIN
+
+    def _ensure_daemon(self, restart=False):
+        with self._lock:
+            if (restart or not self._process or
+                    self._process.poll() is not None):
+                self._start_daemon()
+            return self._path, self._key, self._timeout
+
+    def _connect(self, path, timeout):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path)
+        except socket.error:
+            sock.close()
+            raise
+        return sock
+
+    def execute(self, cmd, process_input=None):
+        """Run cmd as root and return (returncode, stdout, stderr)."""
+        path, key, timeout = self._ensure_daemon()
+        try:
+            sock = self._connect(path, timeout)
+        except socket.error, e:
+            LOG.warn(_("Unable to reach root helper daemon, restarting it: "
+                       "%s"), e)
+            path, key, timeout = self._ensure_daemon(restart=True)
+            sock = self._connect(path, timeout)
+
+        request = {'key': key,
+                   'cmd': cmd,
+                   'stdin': base64.b64encode(process_input or '')}
+        try:
+            sock.sendall(json.dumps(request) + '\n')
+            response = sock.makefile('rb').readline()
+        except socket.timeout:
+            raise RuntimeError(_("Root helper daemon did not reply within "
+                                 "%(timeout)s seconds while running "
+                                 "%(cmd)s") % {'timeout': timeout,
+                                               'cmd': cmd})
+        finally:
+            sock.close()
+        if not response:
+            raise RuntimeError(_("Root helper daemon closed the connection "
+                                 "while running %s") % cmd)
+
+        response = json.loads(response)
+        return (response['returncode'],
+                base64.b64decode(response['stdout']),
+                base64.b64decode(response['stderr']))
@@ -0,0 +1,176 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright (c) 2013 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Long running root wrapper.
+
+The daemon loads the filter definitions once and then serves command
+requests on a UNIX socket living in a private directory.  Each request
+is a single JSON line carrying the authentication key handed out on
+startup, the command and its standard input; the reply is a single JSON
+line with the return code and the command output.  Command input and
+output are base64 encoded so that arbitrary bytes survive the trip.
+"""
+
+import base64
+import json
+import os
+import shutil
+import signal
+import SocketServer
+import subprocess
+import sys
+import tempfile
+import threading
+
+from quantum.rootwrap import wrapper
+
+
+RC_UNAUTHORIZED = 99
+RC_BADREQUEST = 96
+RC_NOEXEC = 127
+
+DEFAULT_TIMEOUT = 60
+SOCKET_NAME = 'rootwrap.sock'
+
+
+def _subprocess_setup():
+    # Python installs a SIGPIPE handler by default. This is usually not what
+    # non-Python subprocesses expect.
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+
+def _keys_match(expected, actual):
+    """Compare two keys in a time independent of the first mismatch."""
+    if len(expected) != len(actual):
+        return False
+    result = 0
+    for x, y in zip(expected, actual):
+        result |= ord(x) ^ ord(y)
+    return result == 0
+
+
+def _kill(obj):
+    try:
+        obj.kill()
+    except OSError:
+        # The process completed in the meantime
+        pass
+
+
+def _response(returncode, stdout='', stderr=''):
+    return {'returncode': returncode,
+            'stdout': base64.b64encode(stdout),
+            'stderr': base64.b64encode(stderr)}
+
+
+def execute_request(filters, key, request, timeout=DEFAULT_TIMEOUT):
+    """Run the command of a client request if a filter allows it.
+
+    Returns the response to send back to the client.  Commands still
+    running after timeout seconds are killed.
+    """
+    try:
+        request = json.loads(request)
+        request_key = str(request['key'])
+        userargs = map(str, request['cmd'])
+        process_input = base64.b64decode(request.get('stdin') or '')
+    except (ValueError, KeyError, TypeError):
+        return _response(RC_BADREQUEST, stderr='Malformed request')
+
+    if not _keys_match(key, request_key):
+        return _response(RC_UNAUTHORIZED, stderr='Authentication failed')
+
+    filtermatch = wrapper.match_filter(filters, userargs)
+    if not filtermatch:
+        return _response(RC_UNAUTHORIZED,
+                         stderr='Unauthorized command: %s' %
+                         ' '.join(userargs))
+
+    try:
+        obj = subprocess.Popen(filtermatch.get_command(userargs),
+                               stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE,
+                               preexec_fn=_subprocess_setup,
+                               close_fds=True,
+                               env=filtermatch.get_environment(userargs))
+    except OSError, e:
+        return _response(RC_NOEXEC, stderr=str(e))
+
+    timer = threading.Timer(timeout, _kill, [obj])
+    timer.start()
+    try:
+        stdout, stderr = obj.communicate(process_input)
+    finally:
+        timer.cancel()
+    return _response(obj.returncode, stdout, stderr)
+
+
+class RootwrapRequestHandler(SocketServer.StreamRequestHandler):
+
+    def handle(self):
+        request = self.rfile.readline()
+        response = execute_request(self.server.filters, self.server.key,
+                                   request, self.server.command_timeout)
+        self.wfile.write(json.dumps(response) + '\n')
+
+
+class RootwrapServer(SocketServer.ThreadingMixIn,
+                     SocketServer.UnixStreamServer):
+    """Serve each connection in its own thread."""
+
+    daemon_threads = True
+
+    def __init__(self, path, filters, key, command_timeout=DEFAULT_TIMEOUT):
+        SocketServer.UnixStreamServer.__init__(self, path,
+                                               RootwrapRequestHandler)
+        self.filters = filters
+        self.key = key
+        self.command_timeout = command_timeout
+
+
+def run(filters_path, timeout=DEFAULT_TIMEOUT):
+    """Serve requests until standard input is closed.
+
+    The socket path, the authentication key and the command timeout are
+    written on standard output, one per line.  The socket directory is
+    only accessible to the user who invoked the daemon through sudo.
+    """
+    filters = wrapper.load_filters(filters_path)
+    sockdir = tempfile.mkdtemp(prefix='quantum-rootwrap-')
+    try:
+        path = os.path.join(sockdir, SOCKET_NAME)
+        key = os.urandom(32).encode('hex')
+        server = RootwrapServer(path, filters, key, timeout)
+        if 'SUDO_UID' in os.environ:
+            uid = int(os.environ['SUDO_UID'])
+            gid = int(os.environ.get('SUDO_GID', -1))
+            os.chown(sockdir, uid, gid)
+            os.chown(path, uid, gid)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        sys.stdout.write('%s\n%s\n%s\n' % (path, key, timeout))
+        sys.stdout.flush()
+
+        # The agent holds the other end of our stdin, so reaching EOF
+        # means it went away and nobody can talk to us anymore.
+        sys.stdin.read()
+        server.shutdown()
+    finally:
+        shutil.rmtree(sockdir, ignore_errors=True)
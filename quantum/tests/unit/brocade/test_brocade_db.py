@@ -96,3 +96,26 @@ class TestBrocadeDb(test_plugin.QuantumDbPluginV2TestCase):
 
         # Delete Port
         brocade_db.delete_port(self.context, port_id)
+
+    def test_ports_by_ids(self):
+        """Test bulk lookups and updates of brocade specific ports."""
+
+        net_id = str(uuid.uuid4())
+        port_ids = [str(uuid.uuid4())[0:11] for i in range(2)]
+        tenant_id = str(uuid.uuid4())
+
+        self.context = context.get_admin_context()
+        brocade_db.create_network(self.context, net_id, TEST_VLAN)
+        for port_id in port_ids:
+            brocade_db.create_port(self.context, port_id, net_id, "em1",
+                                   TEST_VLAN, tenant_id, True)
+
+        ports = brocade_db.get_ports_by_ids(self.context,
+                                            port_ids + ['missing'])
+        self.assertEqual(set(port_ids), set(ports))
+
+        brocade_db.update_ports_state(self.context, port_ids, False)
+        for port_id in port_ids:
+            port = brocade_db.get_port(self.context, port_id)
+            self.assertFalse(port['admin_state_up'])
+            brocade_db.delete_port(self.context, port_id)
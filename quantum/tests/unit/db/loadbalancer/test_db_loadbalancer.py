@@ -168,6 +168,17 @@ class LoadBalancerPluginDbTestCase(test_db_plugin.QuantumDbPluginV2TestCase):
         else:
             return self.ext_api
 
+    def _emulate_sorting_and_pagination(self):
+        for helper, fake in (
+                ('_get_sorting_helper',
+                 test_db_plugin._fake_get_sorting_helper),
+                ('_get_pagination_helper',
+                 test_db_plugin._fake_get_pagination_helper)):
+            patcher = mock.patch(
+                'quantum.api.v2.base.Controller.%s' % helper, new=fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     @contextlib.contextmanager
     def vip(self, fmt=None, name='vip1', pool=None, subnet=None,
             protocol='HTTP', protocol_port=80, admin_state_up=True,
@@ -509,6 +520,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                 self.assertEqual(res['vips'][0][k], v)
 
     def test_list_vips_with_sort_emulated(self):
+        self._emulate_sorting_and_pagination()
         with self.subnet() as subnet:
             with contextlib.nested(
                 self.vip(name='vip1', subnet=subnet, protocol_port=81),
@@ -522,6 +534,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                 )
 
     def test_list_vips_with_pagination_emulated(self):
+        self._emulate_sorting_and_pagination()
         with self.subnet() as subnet:
             with contextlib.nested(self.vip(name='vip1', subnet=subnet),
                                    self.vip(name='vip2', subnet=subnet),
@@ -532,6 +545,40 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                                                 ('name', 'asc'), 2, 2)
 
     def test_list_vips_with_pagination_reverse_emulated(self):
+        self._emulate_sorting_and_pagination()
+        with self.subnet() as subnet:
+            with contextlib.nested(self.vip(name='vip1', subnet=subnet),
+                                   self.vip(name='vip2', subnet=subnet),
+                                   self.vip(name='vip3', subnet=subnet)
+                                   ) as (vip1, vip2, vip3):
+                self._test_list_with_pagination_reverse('vip',
+                                                        (vip1, vip2, vip3),
+                                                        ('name', 'asc'), 2, 2)
+
+    def test_list_vips_with_sort(self):
+        with self.subnet() as subnet:
+            with contextlib.nested(
+                self.vip(name='vip1', subnet=subnet, protocol_port=81),
+                self.vip(name='vip2', subnet=subnet, protocol_port=82),
+                self.vip(name='vip3', subnet=subnet, protocol_port=82)
+            ) as (vip1, vip2, vip3):
+                self._test_list_with_sort(
+                    'vip',
+                    (vip1, vip3, vip2),
+                    [('protocol_port', 'asc'), ('name', 'desc')]
+                )
+
+    def test_list_vips_with_pagination(self):
+        with self.subnet() as subnet:
+            with contextlib.nested(self.vip(name='vip1', subnet=subnet),
+                                   self.vip(name='vip2', subnet=subnet),
+                                   self.vip(name='vip3', subnet=subnet)
+                                   ) as (vip1, vip2, vip3):
+                self._test_list_with_pagination('vip',
+                                                (vip1, vip2, vip3),
+                                                ('name', 'asc'), 2, 2)
+
+    def test_list_vips_with_pagination_reverse(self):
         with self.subnet() as subnet:
             with contextlib.nested(self.vip(name='vip1', subnet=subnet),
                                    self.vip(name='vip2', subnet=subnet),
@@ -624,6 +671,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                 self.assertEqual(res['pool'][k], v)
 
     def test_list_pools_with_sort_emulated(self):
+        self._emulate_sorting_and_pagination()
         with contextlib.nested(self.pool(name='p1'),
                                self.pool(name='p2'),
                                self.pool(name='p3')
@@ -632,6 +680,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                                       [('name', 'desc')])
 
     def test_list_pools_with_pagination_emulated(self):
+        self._emulate_sorting_and_pagination()
         with contextlib.nested(self.pool(name='p1'),
                                self.pool(name='p2'),
                                self.pool(name='p3')
@@ -641,6 +690,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                                             ('name', 'asc'), 2, 2)
 
     def test_list_pools_with_pagination_reverse_emulated(self):
+        self._emulate_sorting_and_pagination()
         with contextlib.nested(self.pool(name='p1'),
                                self.pool(name='p2'),
                                self.pool(name='p3')
@@ -772,6 +822,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                     self.assertEqual(res['member'][k], v)
 
     def test_list_members_with_sort_emulated(self):
+        self._emulate_sorting_and_pagination()
         with self.pool() as pool:
             with contextlib.nested(self.member(pool_id=pool['pool']['id'],
                                                protocol_port=81),
@@ -784,6 +835,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                                           [('protocol_port', 'desc')])
 
     def test_list_members_with_pagination_emulated(self):
+        self._emulate_sorting_and_pagination()
         with self.pool() as pool:
             with contextlib.nested(self.member(pool_id=pool['pool']['id'],
                                                protocol_port=81),
@@ -797,6 +849,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                 )
 
     def test_list_members_with_pagination_reverse_emulated(self):
+        self._emulate_sorting_and_pagination()
         with self.pool() as pool:
             with contextlib.nested(self.member(pool_id=pool['pool']['id'],
                                                protocol_port=81),
@@ -865,6 +918,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                 self.assertEqual(res['health_monitor'][k], v)
 
     def test_list_healthmonitors_with_sort_emulated(self):
+        self._emulate_sorting_and_pagination()
         with contextlib.nested(self.health_monitor(delay=30),
                                self.health_monitor(delay=31),
                                self.health_monitor(delay=32)
@@ -873,6 +927,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                                       [('delay', 'desc')])
 
     def test_list_healthmonitors_with_pagination_emulated(self):
+        self._emulate_sorting_and_pagination()
         with contextlib.nested(self.health_monitor(delay=30),
                                self.health_monitor(delay=31),
                                self.health_monitor(delay=32)
@@ -882,6 +937,7 @@ class TestLoadBalancer(LoadBalancerPluginDbTestCase):
                                             ('delay', 'asc'), 2, 2)
 
     def test_list_healthmonitors_with_pagination_reverse_emulated(self):
+        self._emulate_sorting_and_pagination()
         with contextlib.nested(self.health_monitor(delay=30),
                                self.health_monitor(delay=31),
                                self.health_monitor(delay=32)
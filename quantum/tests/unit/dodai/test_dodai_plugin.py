@@ -0,0 +1,269 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+
+import mock
+from novaclient.v1_1 import servers
+from oslo.config import cfg
+from sqlalchemy.orm import session as sa_session
+
+from quantum import context
+from quantum.extensions import l3
+from quantum import manager
+# NOTE: this import is needed for config init
+from quantum.plugins.dodai import config as dodai_config
+from quantum.plugins.dodai import ofc_job_worker
+from quantum.tests.unit import test_db_plugin as test_plugin
+
+
+PLUGIN_NAME = 'quantum.plugins.dodai.dodai_plugin.DodaiL2EPlugin'
+FAKE_DRIVER = 'quantum.tests.unit.dodai.test_ofc_manager.FakeDriver'
+BM_INTERFACE = {'port_no': '3', 'datapath_id': 'dp1'}
+BM_INTERFACES = {'fa:16:3e:00:00:01': {'port_no': '1', 'datapath_id': 'dp1'},
+                 'fa:16:3e:00:00:02': {'port_no': '2', 'datapath_id': 'dp1'}}
+
+
+class DodaiPluginV2TestCase(test_plugin.QuantumDbPluginV2TestCase):
+
+    _ofc_async = False
+
+    def setUp(self):
+        cfg.CONF.set_override('ofc_driver', FAKE_DRIVER, group='OFC')
+        cfg.CONF.set_override('ofc_async', self._ofc_async, group='OFC')
+        # NOTE: the tests process the job queue themselves.
+        for name in ('start', 'wakeup'):
+            patcher = mock.patch.object(ofc_job_worker.OFCJobWorker, name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        super(DodaiPluginV2TestCase, self).setUp(PLUGIN_NAME)
+        self.plugin = manager.QuantumManager.get_plugin()
+        self.driver = self.plugin.ofc.ofc_driver
+        self.context = context.get_admin_context()
+
+    def _process_jobs(self):
+        self.plugin.ofc_worker.process_jobs()
+        self.plugin.ofc_worker.pool.waitall()
+
+    def _show_status(self, resource, id):
+        return self._show(resource, id)[resource[:-1]]['status']
+
+
+class TestDodaiAsyncStatus(DodaiPluginV2TestCase):
+
+    _ofc_async = True
+
+    def setUp(self):
+        super(TestDodaiAsyncStatus, self).setUp()
+        get_bm_interface = mock.patch.object(
+            self.plugin, '_get_bm_interface_by_port',
+            return_value=BM_INTERFACE)
+        self.get_bm_interface = get_bm_interface.start()
+        self.addCleanup(get_bm_interface.stop)
+
+    def test_network_active_after_job(self):
+        with self.network() as net:
+            net_id = net['network']['id']
+            self.assertEqual('BUILD', net['network']['status'])
+            self.assertEqual('BUILD', self._show_status('networks', net_id))
+            self.assertEqual([], self.driver.calls)
+            self._process_jobs()
+            self.assertEqual('ACTIVE', self._show_status('networks', net_id))
+            self.assertEqual([('create_region', net_id.replace('-', '')),
+                              ('save',)], self.driver.calls)
+
+    def test_network_error_after_failed_job(self):
+        cfg.CONF.set_override('ofc_job_max_retries', 1, group='OFC')
+        with self.network() as net:
+            net_id = net['network']['id']
+            self.driver.failing.add(('create_region',
+                                     net_id.replace('-', '')))
+            self._process_jobs()
+            self.assertEqual('ERROR', self._show_status('networks', net_id))
+
+    def test_port_active_after_job(self):
+        with self.network() as net:
+            self._process_jobs()
+            net_id = net['network']['id']
+            with self.subnet(network=net) as subnet:
+                with self.port(subnet=subnet, device_owner='compute:None',
+                               device_id='instance1') as port:
+                    port_id = port['port']['id']
+                    self.assertEqual('BUILD', port['port']['status'])
+                    self._process_jobs()
+                    self.assertEqual('ACTIVE',
+                                     self._show_status('ports', port_id))
+                    self.get_bm_interface.assert_called_once_with(
+                        port['port']['tenant_id'], 'instance1',
+                        port['port']['mac_address'])
+                    self.assertEqual(('set_server_port', 'dp1', '3',
+                                      net_id.replace('-', '')),
+                                     self.driver.calls[-2])
+
+    def test_port_of_uncontrolled_network_not_queued(self):
+        cfg.CONF.set_override('ofc_uncontrolled_network_names', ['net1'],
+                              group='OFC')
+        with self.port(device_owner='compute:None',
+                       device_id='instance1') as port:
+            self.assertEqual('ACTIVE', port['port']['status'])
+            self._process_jobs()
+            self.assertFalse(self.get_bm_interface.called)
+
+
+class TestDodaiBulk(DodaiPluginV2TestCase):
+
+    def setUp(self):
+        super(TestDodaiBulk, self).setUp()
+        instance = servers.Server(
+            None, {'OS-EXT-SRV-ATTR:hypervisor_hostname': 'node1'},
+            loaded=True)
+        get_instance = mock.patch.object(self.plugin, '_get_instance_by_uuid',
+                                         return_value=instance)
+        self.get_instance = get_instance.start()
+        self.addCleanup(get_instance.stop)
+        get_node = mock.patch.object(self.plugin, '_get_bm_node_by_uuid')
+        get_node.start()
+        self.addCleanup(get_node.stop)
+        get_interface = mock.patch.object(
+            self.plugin.bm_cache, 'get_interface',
+            side_effect=lambda node_uuid, mac: BM_INTERFACES[mac])
+        get_interface.start()
+        self.addCleanup(get_interface.stop)
+
+    @contextlib.contextmanager
+    def _transactions(self):
+        """Yield the list of the outermost DB transactions committed."""
+        transactions = []
+        commit = sa_session.SessionTransaction.commit
+
+        def record_commit(transaction):
+            if transaction._parent is None:
+                transactions.append(transaction)
+            return commit(transaction)
+        with mock.patch.object(sa_session.SessionTransaction, 'commit',
+                               autospec=True, side_effect=record_commit):
+            yield transactions
+
+    def _create_server_port_bulk(self, net_id):
+        overrides = dict((i, {'mac_address': mac,
+                              'device_owner': 'compute:None',
+                              'device_id': 'instance1'})
+                         for i, mac in enumerate(sorted(BM_INTERFACES)))
+        return self._create_port_bulk(self.fmt, len(overrides), net_id,
+                                      'port', True, override=overrides)
+
+    def test_create_network_bulk(self):
+        with self._transactions() as transactions:
+            res = self._create_network_bulk(self.fmt, 3, 'test', True)
+        self.assertEqual(201, res.status_int)
+        self.assertEqual(1, len(transactions))
+        nets = self.deserialize(self.fmt, res)['networks']
+        self.assertEqual(
+            sorted([('create_region', net['id'].replace('-', ''))
+                    for net in nets] + [('save',)]),
+            sorted(self.driver.calls))
+
+    def test_create_network_bulk_rolled_back_on_failure(self):
+        with mock.patch.object(self.driver, 'create_region',
+                               side_effect=[None, RuntimeError()]) as create:
+            res = self._create_network_bulk(self.fmt, 2, 'test', True)
+        self.assertEqual(500, res.status_int)
+        self.assertEqual([], self._list('networks')['networks'])
+        created = create.call_args_list[0][0][0]
+        self.assertEqual([('destroy_region', created), ('save',)],
+                         self.driver.calls)
+
+    def test_create_port_bulk(self):
+        with self.subnet() as subnet:
+            net_id = subnet['subnet']['network_id']
+            region_name = net_id.replace('-', '')
+            del self.driver.calls[:]
+            with self._transactions() as transactions:
+                res = self._create_server_port_bulk(net_id)
+            self.assertEqual(201, res.status_int)
+            self.assertEqual(1, len(transactions))
+            self.get_instance.assert_called_once_with(self._tenant_id,
+                                                      'instance1')
+            self.assertEqual([('set_server_port', 'dp1', '1', region_name),
+                              ('set_server_port', 'dp1', '2', region_name),
+                              ('save',)], self.driver.calls)
+            for port in self.deserialize(self.fmt, res)['ports']:
+                self._delete('ports', port['id'])
+
+    def test_create_port_bulk_rolled_back_on_failure(self):
+        with self.subnet() as subnet:
+            net_id = subnet['subnet']['network_id']
+            region_name = net_id.replace('-', '')
+            del self.driver.calls[:]
+            self.driver.failing.add(('set_server_port', 'dp1', '2',
+                                     region_name))
+            res = self._create_server_port_bulk(net_id)
+            self.assertEqual(500, res.status_int)
+            self.assertEqual([], self._list('ports')['ports'])
+            self.assertEqual([('set_server_port', 'dp1', '1', region_name),
+                              ('set_server_port', 'dp1', '2', region_name),
+                              ('clear_server_port', 'dp1', '1'),
+                              ('save',)], self.driver.calls)
+
+
+class TestDodaiNetworkList(DodaiPluginV2TestCase):
+
+    def _list_names(self, params):
+        req = self.new_list_request('networks', params=params)
+        res = self.deserialize(self.fmt, req.get_response(self.api))
+        return [net['name'] for net in res['networks']]
+
+    def test_list_networks_sorted(self):
+        with contextlib.nested(self.network(name='net1'),
+                               self.network(name='net3'),
+                               self.network(name='net2')):
+            self.assertEqual(['net3', 'net2', 'net1'],
+                             self._list_names('sort_key=name&sort_dir=desc'))
+            self.assertEqual(['net1', 'net2', 'net3'],
+                             self._list_names('sort_key=name&sort_dir=asc'))
+
+    def test_list_networks_paginated(self):
+        with contextlib.nested(self.network(name='net1'),
+                               self.network(name='net2'),
+                               self.network(name='net3')
+                               ) as (net1, net2, net3):
+            self._test_list_with_pagination('network', (net1, net2, net3),
+                                            ('name', 'asc'), 2, 2)
+            self._test_list_with_pagination_reverse(
+                'network', (net1, net2, net3), ('name', 'asc'), 2, 2)
+            self.assertEqual(
+                ['net2'],
+                self._list_names('limit=1&sort_key=name&sort_dir=asc&'
+                                 'marker=%s' % net1['network']['id']))
+            self.assertEqual(
+                ['net2', 'net1'],
+                self._list_names('limit=2&sort_key=name&sort_dir=desc&'
+                                 'marker=%s' % net3['network']['id']))
+
+    def test_list_networks_external_flag(self):
+        with contextlib.nested(self.network(name='external'),
+                               self.network(name='internal')
+                               ) as (external, internal):
+            self._update('networks', internal['network']['id'],
+                         {'network': {l3.EXTERNAL: False}})
+            nets = self._list('networks')['networks']
+            self.assertEqual({'external': True, 'internal': False},
+                             dict((net['name'], net[l3.EXTERNAL])
+                                  for net in nets))
+            self.assertEqual(['external'],
+                             self._list_names('%s=True' % l3.EXTERNAL))
+            self.assertEqual(['internal'],
+                             self._list_names('%s=False' % l3.EXTERNAL))
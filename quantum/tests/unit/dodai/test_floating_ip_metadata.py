@@ -0,0 +1,127 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import webob.exc
+
+from quantum.openstack.common import jsonutils
+from quantum.plugins.dodai import floating_ip_metadata
+from quantum.tests import base
+
+
+INSTANCE = 'instance1'
+
+
+def _meta_obj(ip_address):
+    return {'ip_address': ip_address, 'mac_address': 'mac1'}
+
+
+class FloatingIPMetadataTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(FloatingIPMetadataTestCase, self).setUp()
+        self.nc = mock.Mock()
+        self.instance = mock.Mock(spec=['status', 'metadata'])
+        self.instance.status = 'ACTIVE'
+        self.instance.metadata = {
+            'floating_ip_1': jsonutils.dumps(_meta_obj('10.0.0.1')),
+            'floating_ip_3': jsonutils.dumps(_meta_obj('10.0.0.3')),
+            'floating_ip_x': 'not a slot',
+            'other': 'value'}
+        self.nc.servers.get.return_value = self.instance
+
+    def _metadata(self):
+        return floating_ip_metadata.FloatingIPMetadata(self.nc, INSTANCE)
+
+    def test_slots_indexed_by_ip_address(self):
+        metadata = self._metadata()
+        self.assertEqual({'10.0.0.1': 'floating_ip_1',
+                          '10.0.0.3': 'floating_ip_3'}, metadata.keys)
+        self.assertEqual(3, metadata.max_num)
+
+    def test_set_new_ip_takes_next_slot(self):
+        metadata = self._metadata()
+        metadata.set(_meta_obj('10.0.0.4'))
+        metadata.apply()
+        self.nc.servers.set_meta.assert_called_once_with(
+            INSTANCE, {'floating_ip_4': jsonutils.dumps(
+                _meta_obj('10.0.0.4'))})
+        self.assertFalse(self.nc.servers.delete_meta.called)
+
+    def test_set_known_ip_reuses_its_slot(self):
+        meta_obj = dict(_meta_obj('10.0.0.1'), mac_address='mac2')
+        metadata = self._metadata()
+        metadata.set(meta_obj)
+        metadata.apply()
+        self.nc.servers.set_meta.assert_called_once_with(
+            INSTANCE, {'floating_ip_1': jsonutils.dumps(meta_obj)})
+
+    def test_delete(self):
+        metadata = self._metadata()
+        self.assertTrue(metadata.delete('10.0.0.3'))
+        self.assertFalse(metadata.delete('10.0.0.9'))
+        metadata.apply()
+        self.nc.servers.delete_meta.assert_called_once_with(
+            INSTANCE, ['floating_ip_3'])
+        self.assertFalse(self.nc.servers.set_meta.called)
+
+    def test_changes_applied_with_one_call_each(self):
+        metadata = self._metadata()
+        metadata.set(_meta_obj('10.0.0.4'))
+        metadata.set(_meta_obj('10.0.0.5'))
+        metadata.delete('10.0.0.1')
+        metadata.delete('10.0.0.3')
+        metadata.apply()
+        self.nc.servers.get.assert_called_once_with(INSTANCE)
+        expected = {'floating_ip_4': jsonutils.dumps(_meta_obj('10.0.0.4')),
+                    'floating_ip_5': jsonutils.dumps(_meta_obj('10.0.0.5'))}
+        self.nc.servers.set_meta.assert_called_once_with(INSTANCE, expected)
+        args, kwargs = self.nc.servers.delete_meta.call_args
+        self.assertEqual(INSTANCE, args[0])
+        self.assertEqual(['floating_ip_1', 'floating_ip_3'], sorted(args[1]))
+        self.assertEqual(1, self.nc.servers.delete_meta.call_count)
+
+    def test_set_then_delete_cancels(self):
+        metadata = self._metadata()
+        metadata.set(_meta_obj('10.0.0.4'))
+        metadata.delete('10.0.0.4')
+        metadata.apply()
+        self.assertFalse(self.nc.servers.set_meta.called)
+        self.nc.servers.delete_meta.assert_called_once_with(
+            INSTANCE, ['floating_ip_4'])
+
+    def test_nothing_to_apply(self):
+        metadata = self._metadata()
+        metadata.delete('10.0.0.9')
+        self.instance.status = 'SHUTOFF'
+        metadata.apply()
+        self.assertFalse(self.nc.servers.set_meta.called)
+        self.assertFalse(self.nc.servers.delete_meta.called)
+
+    def test_health_checked_before_write(self):
+        self.instance.status = 'SHUTOFF'
+        metadata = self._metadata()
+        metadata.set(_meta_obj('10.0.0.4'))
+        self.assertRaises(webob.exc.HTTPBadRequest, metadata.apply)
+        self.assertFalse(self.nc.servers.set_meta.called)
+        self.nc.servers.get.assert_called_once_with(INSTANCE)
+
+    def test_health_check_fails_on_task_state(self):
+        setattr(self.instance, 'OS-EXT-STS:task_state', 'rebooting')
+        metadata = self._metadata()
+        metadata.delete('10.0.0.1')
+        self.assertRaises(webob.exc.HTTPBadRequest, metadata.apply)
+        self.assertFalse(self.nc.servers.delete_meta.called)
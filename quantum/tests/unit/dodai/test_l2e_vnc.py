@@ -0,0 +1,185 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import fixtures
+import mock
+from oslo.config import cfg
+import suds
+from suds import cache as suds_cache
+
+# NOTE: this import is needed for config init
+from quantum.plugins.dodai import config as dodai_config
+from quantum.plugins.dodai.drivers import l2e_vnc
+from quantum.tests import base
+
+
+SERVICE_URL = 'http://ofc.example.com/l2e'
+WSDL_URL = SERVICE_URL + '?wsdl'
+
+
+class L2EVNCTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(L2EVNCTestCase, self).setUp()
+        cfg.CONF.set_override('ofc_service_url', SERVICE_URL, group='OFC')
+        http = mock.patch.object(l2e_vnc.httplib2, 'Http')
+        self.http = http.start().return_value
+        self.addCleanup(http.stop)
+        self.http.connections = {}
+        self.http.request.return_value = ({'etag': '"v1"'}, '')
+        client = mock.patch.object(l2e_vnc, 'Client')
+        self.client_class = client.start()
+        self.addCleanup(client.stop)
+        self.prototype = self.client_class.return_value
+        self.prototype.clone.side_effect = lambda: mock.Mock()
+        pools = mock.patch.dict(l2e_vnc._pools, clear=True)
+        pools.start()
+        self.addCleanup(pools.stop)
+
+
+class ClientPoolTestCase(L2EVNCTestCase):
+
+    def test_wsdl_loaded_once(self):
+        pool = l2e_vnc.ClientPool(WSDL_URL)
+        clients = [pool.get() for i in range(3)]
+        self.assertEqual(3, len(set(clients)))
+        self.client_class.assert_called_once_with(
+            WSDL_URL, cache=mock.ANY, cachingpolicy=1, transport=mock.ANY)
+        self.assertEqual(3, self.prototype.clone.call_count)
+
+    def test_empty_reloads_wsdl(self):
+        pool = l2e_vnc.ClientPool(WSDL_URL)
+        client = pool.get()
+        pool.put(client)
+        pool.empty()
+        client.options.transport.close.assert_called_once_with()
+        self.assertIsNot(client, pool.get())
+        self.assertEqual(2, self.client_class.call_count)
+
+    def test_pool_size(self):
+        cfg.CONF.set_override('ofc_client_pool_size', 2, group='OFC')
+        pool = l2e_vnc.ClientPool(WSDL_URL)
+        first = pool.get()
+        pool.get()
+        getter = eventlet.spawn(pool.get)
+        eventlet.sleep(0)
+        self.assertEqual(1, pool.waiting())
+        pool.put(first)
+        self.assertIs(first, getter.wait())
+        self.assertEqual(2, self.prototype.clone.call_count)
+
+    def test_client_reused(self):
+        pool = l2e_vnc.ClientPool(WSDL_URL)
+        client = pool.get()
+        pool.put(client)
+        self.assertIs(client, pool.get())
+        self.assertFalse(client.options.transport.close.called)
+
+    def test_idle_client_replaced(self):
+        cfg.CONF.set_override('ofc_client_idle_timeout', 60, group='OFC')
+        pool = l2e_vnc.ClientPool(WSDL_URL)
+        client = pool.get()
+        pool.put(client)
+        client.last_used -= 61
+        self.assertIsNot(client, pool.get())
+        client.options.transport.close.assert_called_once_with()
+        self.assertEqual(1, pool.current_size)
+
+    def test_idle_timeout_disabled(self):
+        cfg.CONF.set_override('ofc_client_idle_timeout', 0, group='OFC')
+        pool = l2e_vnc.ClientPool(WSDL_URL)
+        client = pool.get()
+        pool.put(client)
+        client.last_used -= 3600
+        self.assertIs(client, pool.get())
+
+
+class GetClientTestCase(L2EVNCTestCase):
+
+    def test_client_returned_to_pool(self):
+        with l2e_vnc.get_client() as client:
+            pass
+        with l2e_vnc.get_client() as other:
+            self.assertIs(client, other)
+
+    def test_client_dropped_after_error(self):
+        def use_client():
+            with l2e_vnc.get_client() as client:
+                clients.append(client)
+                raise RuntimeError()
+        clients = []
+        self.assertRaises(RuntimeError, use_client)
+        clients[0].options.transport.close.assert_called_once_with()
+        pool = l2e_vnc.get_client_pool()
+        self.assertEqual(1, pool.current_size)
+        self.assertEqual(1, len(pool.free_items))
+        with l2e_vnc.get_client() as client:
+            self.assertIsNot(clients[0], client)
+
+    def test_client_kept_after_soap_fault(self):
+        def use_client():
+            with l2e_vnc.get_client() as client:
+                clients.append(client)
+                raise suds.WebFault(mock.Mock(faultstring='fault'), None)
+        clients = []
+        self.assertRaises(suds.WebFault, use_client)
+        self.assertFalse(clients[0].options.transport.close.called)
+        with l2e_vnc.get_client() as client:
+            self.assertIs(clients[0], client)
+
+
+class WSDLCacheTestCase(L2EVNCTestCase):
+
+    def setUp(self):
+        super(WSDLCacheTestCase, self).setUp()
+        self.cache_dir = self.useFixture(fixtures.TempDir()).path
+        cfg.CONF.set_override('ofc_wsdl_cache_dir', self.cache_dir,
+                              group='OFC')
+
+    def test_no_cache_dir(self):
+        cfg.CONF.set_override('ofc_wsdl_cache_dir', None, group='OFC')
+        self.assertIsInstance(l2e_vnc._get_wsdl_cache(WSDL_URL),
+                              suds_cache.NoCache)
+        self.assertFalse(self.http.request.called)
+
+    def test_cache_keyed_by_etag(self):
+        cache = l2e_vnc._get_wsdl_cache(WSDL_URL)
+        self.assertIsInstance(cache, suds_cache.ObjectCache)
+        self.assertTrue(cache.location.startswith(self.cache_dir))
+        self.http.request.assert_called_once_with(WSDL_URL, 'HEAD')
+        self.assertEqual(cache.location,
+                         l2e_vnc._get_wsdl_cache(WSDL_URL).location)
+        self.http.request.return_value = ({'etag': '"v2"'}, '')
+        self.assertNotEqual(cache.location,
+                            l2e_vnc._get_wsdl_cache(WSDL_URL).location)
+
+    def test_cache_without_etag(self):
+        cache = l2e_vnc._get_wsdl_cache(WSDL_URL)
+        self.http.request.side_effect = IOError()
+        failed = l2e_vnc._get_wsdl_cache(WSDL_URL)
+        self.assertTrue(failed.location.startswith(self.cache_dir))
+        self.assertNotEqual(cache.location, failed.location)
+        self.http.request.side_effect = None
+        self.http.request.return_value = ({}, '')
+        self.assertEqual(failed.location,
+                         l2e_vnc._get_wsdl_cache(WSDL_URL).location)
+
+    def test_pool_uses_cache(self):
+        l2e_vnc.ClientPool(WSDL_URL).get()
+        cache = self.client_class.call_args[1]['cache']
+        self.assertEqual(l2e_vnc._get_wsdl_cache(WSDL_URL).location,
+                         cache.location)
@@ -0,0 +1,74 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from quantum.plugins.dodai import nova_cache
+from quantum.tests import base
+
+
+def _node(uuid, macs=('00:00:00:00:00:01',)):
+    node = mock.Mock()
+    node.uuid = uuid
+    node.id = uuid
+    node.interfaces = [{'address': mac} for mac in macs]
+    return node
+
+
+class BareMetalCacheTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(BareMetalCacheTestCase, self).setUp()
+        self.client = mock.Mock()
+        self.client.baremetal.list.return_value = [_node('node1')]
+        self.client.baremetal.get.side_effect = lambda node_id: _node(node_id)
+        get_client = mock.patch.object(nova_cache, 'get_client',
+                                       return_value=self.client)
+        get_client.start()
+        self.addCleanup(get_client.stop)
+        self.cache = nova_cache.BareMetalCache(60)
+
+    def test_get_node_cached(self):
+        self.assertEqual('node1', self.cache.get_node('node1').uuid)
+        self.assertEqual('node1', self.cache.get_node('node1').uuid)
+        self.assertEqual(1, self.client.baremetal.list.call_count)
+        self.assertFalse(self.client.baremetal.get.called)
+
+    def test_unknown_node_negatively_cached(self):
+        self.assertIsNone(self.cache.get_node('unknown'))
+        self.assertIsNone(self.cache.get_node('unknown'))
+        self.assertEqual(1, self.client.baremetal.list.call_count)
+
+    def test_invalidate_node_refetches_it(self):
+        self.cache.get_node('node1')
+        self.cache.invalidate('node1')
+        self.assertEqual('node1', self.cache.get_node('node1').uuid)
+        self.assertEqual(1, self.client.baremetal.list.call_count)
+        self.client.baremetal.get.assert_called_once_with('node1')
+
+    def test_invalidate_unknown_node_reloads(self):
+        self.cache.get_node('node2')
+        self.client.baremetal.list.return_value = [_node('node1'),
+                                                   _node('node2')]
+        self.cache.invalidate('node2')
+        self.assertEqual('node2', self.cache.get_node('node2').uuid)
+        self.assertEqual(2, self.client.baremetal.list.call_count)
+
+    def test_invalidate_all(self):
+        self.cache.get_node('node1')
+        self.cache.invalidate()
+        self.cache.get_node('node1')
+        self.assertEqual(2, self.client.baremetal.list.call_count)
@@ -0,0 +1,181 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import mock
+from oslo.config import cfg
+
+from quantum.db import api as db
+from quantum.openstack.common import timeutils
+from quantum.plugins.dodai.db import dodai_db
+from quantum.plugins.dodai import ofc_job_worker
+from quantum.tests.unit.dodai import test_dodai_plugin
+
+
+R1 = 'a' * 32
+R2 = 'b' * 32
+
+
+class OFCJobWorkerTestCase(test_dodai_plugin.DodaiPluginV2TestCase):
+
+    _ofc_async = True
+
+    def setUp(self):
+        super(OFCJobWorkerTestCase, self).setUp()
+        self.worker = self.plugin.ofc_worker
+        self.session = db.get_session()
+        timeutils.set_time_override(datetime.datetime(2013, 1, 1))
+        self.addCleanup(timeutils.clear_time_override)
+
+    def _enqueue(self, region_name, action='create_region', params=None):
+        return ofc_job_worker.enqueue(self.session, region_name, action,
+                                      params or {'vlan_id': None})
+
+    def _get_job(self, id):
+        self.session.expire_all()
+        jobs = dodai_db.get_ofc_jobs(
+            self.session, [ofc_job_worker.JOB_PENDING,
+                           ofc_job_worker.JOB_RUNNING,
+                           ofc_job_worker.JOB_FAILED])
+        return dict((job.id, job) for job in jobs).get(id)
+
+    def _process_region(self, region_name):
+        self.worker.regions_in_progress.add(region_name)
+        self.worker._process_region(region_name)
+
+    def test_claim_lost_to_updated_job(self):
+        job = self._enqueue(R1)
+        stale = self._get_job(job.id)
+        self.session.expunge(stale)
+        timeutils.advance_time_seconds(1)
+        dodai_db.update_ofc_job(None, job.id, attempts=1)
+        self.assertFalse(dodai_db.claim_ofc_job(
+            None, stale, ofc_job_worker.JOB_RUNNING))
+        self.assertEqual(ofc_job_worker.JOB_PENDING, stale.status)
+        self.assertEqual(ofc_job_worker.JOB_PENDING,
+                         self._get_job(job.id).status)
+
+    def test_claim_lost_to_claimed_job(self):
+        job = self._enqueue(R1)
+        stale = self._get_job(job.id)
+        self.session.expunge(stale)
+        self.assertTrue(dodai_db.claim_ofc_job(
+            None, self._get_job(job.id), ofc_job_worker.JOB_RUNNING))
+        self.assertFalse(dodai_db.claim_ofc_job(
+            None, stale, ofc_job_worker.JOB_RUNNING))
+
+    def test_lost_claim_skips_job(self):
+        job = self._enqueue(R1)
+        with mock.patch.object(dodai_db, 'claim_ofc_job',
+                               return_value=False):
+            self._process_region(R1)
+        self.assertEqual([], self.driver.calls)
+        self.assertEqual(ofc_job_worker.JOB_PENDING,
+                         self._get_job(job.id).status)
+        self.assertNotIn(R1, self.worker.regions_in_progress)
+
+    def test_failed_job_backs_off_then_fails(self):
+        cfg.CONF.set_override('ofc_job_max_retries', 3, group='OFC')
+        cfg.CONF.set_override('ofc_job_retry_interval', 2, group='OFC')
+        self.driver.failing.add(('create_region', R1))
+        job = self._enqueue(R1)
+        start = timeutils.utcnow()
+        self._process_region(R1)
+        job = self._get_job(job.id)
+        self.assertEqual(ofc_job_worker.JOB_PENDING, job.status)
+        self.assertEqual(1, job.attempts)
+        self.assertEqual(start + datetime.timedelta(seconds=2),
+                         job.next_attempt_at)
+
+        # not retried before its next attempt
+        timeutils.advance_time_seconds(1)
+        self._process_region(R1)
+        self.assertEqual(1, self._get_job(job.id).attempts)
+
+        timeutils.advance_time_seconds(1)
+        self._process_region(R1)
+        job = self._get_job(job.id)
+        self.assertEqual(2, job.attempts)
+        self.assertEqual(timeutils.utcnow() + datetime.timedelta(seconds=4),
+                         job.next_attempt_at)
+
+        timeutils.advance_time_seconds(4)
+        self._process_region(R1)
+        job = self._get_job(job.id)
+        self.assertEqual(ofc_job_worker.JOB_FAILED, job.status)
+        self.assertEqual(3, job.attempts)
+        self.assertEqual(3, self.driver.calls.count(('create_region', R1)))
+
+    def test_retry_interval_capped(self):
+        cfg.CONF.set_override('ofc_job_retry_interval', 2, group='OFC')
+        cfg.CONF.set_override('ofc_job_max_retry_interval', 3, group='OFC')
+        self.driver.failing.add(('create_region', R1))
+        job = self._enqueue(R1)
+        dodai_db.update_ofc_job(None, job.id, attempts=3)
+        self._process_region(R1)
+        self.assertEqual(timeutils.utcnow() + datetime.timedelta(seconds=3),
+                         self._get_job(job.id).next_attempt_at)
+
+    def test_region_jobs_run_in_queued_order(self):
+        self._enqueue(R1)
+        self._enqueue(R1, 'remove_region')
+        self._process_region(R1)
+        self.assertEqual([('create_region', R1), ('save',),
+                          ('destroy_region', R1), ('save',)],
+                         self.driver.calls)
+        self.assertEqual([], dodai_db.get_ofc_jobs(
+            None, [ofc_job_worker.JOB_PENDING]))
+
+    def test_failed_job_blocks_its_region_only(self):
+        self.driver.failing.add(('create_region', R1))
+        self._enqueue(R1)
+        self._enqueue(R1, 'remove_region')
+        self._enqueue(R2)
+        self._process_jobs()
+        self.assertEqual([('create_region', R1), ('create_region', R2),
+                          ('save',)], sorted(self.driver.calls))
+        self.assertEqual([R1, R1], [job.region_name for job in
+                                    dodai_db.get_ofc_jobs(
+                                        None, [ofc_job_worker.JOB_PENDING])])
+
+    def test_region_in_progress_not_scheduled_twice(self):
+        self._enqueue(R1)
+        self.worker.regions_in_progress.add(R1)
+        self._process_jobs()
+        self.assertEqual([], self.driver.calls)
+
+    def test_running_job_not_taken_over_before_timeout(self):
+        cfg.CONF.set_override('ofc_job_timeout', 300, group='OFC')
+        job = self._enqueue(R1)
+        dodai_db.claim_ofc_job(None, self._get_job(job.id),
+                               ofc_job_worker.JOB_RUNNING)
+        timeutils.advance_time_seconds(300)
+        self._process_jobs()
+        self.assertEqual([], self.driver.calls)
+        self.assertEqual(ofc_job_worker.JOB_RUNNING,
+                         self._get_job(job.id).status)
+
+    def test_timed_out_running_job_taken_over(self):
+        cfg.CONF.set_override('ofc_job_timeout', 300, group='OFC')
+        job = self._enqueue(R1)
+        dodai_db.claim_ofc_job(None, self._get_job(job.id),
+                               ofc_job_worker.JOB_RUNNING)
+        timeutils.advance_time_seconds(301)
+        self._process_jobs()
+        self.assertEqual([('create_region', R1), ('save',)],
+                         self.driver.calls)
+        self.assertIsNone(self._get_job(job.id))
@@ -0,0 +1,262 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+# NOTE: this import is needed for config init
+from quantum.plugins.dodai import config as dodai_config
+from quantum.plugins.dodai.db import dodai_db
+from quantum.plugins.dodai.drivers import ofc_driver_base
+from quantum.plugins.dodai import exceptions
+from quantum.plugins.dodai import ofc_manager
+from quantum.tests import base
+
+
+class FakeDriver(ofc_driver_base.OFCDriverBase):
+    """Records the calls made to the OFC and fails the ones in failing."""
+
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+        self.regions = []
+
+    def _call(self, *call):
+        self.calls.append(call)
+        if call in self.failing:
+            raise RuntimeError('%s failed' % (call,))
+
+    def create_region(self, region_name):
+        self._call('create_region', region_name)
+
+    def destroy_region(self, region_name):
+        self._call('destroy_region', region_name)
+
+    def show_region(self):
+        return [mock.Mock(regionName=name) for name in self.regions]
+
+    def set_server_port(self, dpid, server_port, region_name):
+        self._call('set_server_port', dpid, server_port, region_name)
+
+    def clear_server_port(self, dpid, server_port):
+        self._call('clear_server_port', dpid, server_port)
+
+    def show_switch_datapath_id(self):
+        return []
+
+    def show_ports(self, dpid):
+        return []
+
+    def set_outer_port_association_setting(self, dpid, outer_port,
+                                           outer_vlan_id, inner_vlan_id,
+                                           region_name):
+        self._call('set_outer_port_association_setting', dpid, outer_port,
+                   outer_vlan_id, inner_vlan_id, region_name)
+
+    def clear_outer_port_association_setting(self, dpid, outer_port,
+                                             outer_vlan_id):
+        self._call('clear_outer_port_association_setting', dpid, outer_port,
+                   outer_vlan_id)
+
+    def save(self):
+        self._call('save')
+
+
+class OFCTransactionTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(OFCTransactionTestCase, self).setUp()
+        self.driver = FakeDriver()
+        self.txn = ofc_manager.OFCTransaction(self.driver)
+
+    def _commit_failure(self):
+        return self.assertRaises(exceptions.OFCBatchFailed, self.txn.commit)
+
+    def test_commit_saves_once(self):
+        self.txn.create_region('r1')
+        self.txn.set_server_port('dp1', 1, 'r1')
+        self.txn.commit()
+        self.assertEqual([('create_region', 'r1'),
+                          ('set_server_port', 'dp1', 1, 'r1'),
+                          ('save',)], self.driver.calls)
+        self.assertEqual(['create_region', 'set_server_port'],
+                         [op.method for op in self.txn.applied])
+        self.assertEqual([], self.txn.failures)
+        self.assertEqual([], self.txn.operations)
+
+    def test_serial_failure_rolls_back_in_reverse_order(self):
+        self.driver.failing.add(('set_server_port', 'dp1', 2, 'r1'))
+        self.txn.create_region('r1')
+        self.txn.set_server_port('dp1', 1, 'r1')
+        self.txn.set_server_port('dp1', 2, 'r1')
+        e = self._commit_failure()
+        self.assertEqual(2, e.index)
+        self.assertEqual([('create_region', 'r1'),
+                          ('set_server_port', 'dp1', 1, 'r1'),
+                          ('set_server_port', 'dp1', 2, 'r1'),
+                          ('clear_server_port', 'dp1', 1),
+                          ('destroy_region', 'r1'),
+                          ('save',)], self.driver.calls)
+
+    def test_failure_index_after_parallel_segment(self):
+        self.driver.failing.add(('set_server_port', 'dp1', 1, 'r1'))
+        self.txn.create_region('r1')
+        self.txn.set_outer_port_association_setting('dp1', 1, 100, 65535,
+                                                    'r1')
+        self.txn.set_outer_port_association_setting('dp2', 1, 100, 65535,
+                                                    'r1')
+        self.txn.set_server_port('dp1', 1, 'r1')
+        e = self._commit_failure()
+        self.assertEqual(3, e.index)
+        self.assertEqual([('clear_outer_port_association_setting',
+                           'dp2', 1, 100),
+                          ('clear_outer_port_association_setting',
+                           'dp1', 1, 100),
+                          ('destroy_region', 'r1'),
+                          ('save',)], self.driver.calls[-4:])
+
+    def test_failure_index_in_parallel_segment(self):
+        self.driver.failing.add(('set_outer_port_association_setting',
+                                 'dp2', 1, 100, 65535, 'r1'))
+        self.txn.create_region('r1')
+        self.txn.set_outer_port_association_setting('dp1', 1, 100, 65535,
+                                                    'r1')
+        self.txn.set_outer_port_association_setting('dp2', 1, 100, 65535,
+                                                    'r1')
+        self.txn.set_server_port('dp1', 1, 'r1')
+        e = self._commit_failure()
+        self.assertEqual(2, e.index)
+        self.assertNotIn(('set_server_port', 'dp1', 1, 'r1'),
+                         self.driver.calls)
+        self.assertEqual([('clear_outer_port_association_setting',
+                           'dp1', 1, 100),
+                          ('destroy_region', 'r1'),
+                          ('save',)], self.driver.calls[-3:])
+
+    def test_rollback_continues_past_failed_undo(self):
+        self.driver.failing.add(('set_server_port', 'dp1', 2, 'r1'))
+        self.driver.failing.add(('clear_server_port', 'dp1', 1))
+        self.txn.create_region('r1')
+        self.txn.set_server_port('dp1', 1, 'r1')
+        self.txn.set_server_port('dp1', 2, 'r1')
+        e = self._commit_failure()
+        self.assertEqual(2, e.index)
+        self.assertEqual([('clear_server_port', 'dp1', 1),
+                          ('destroy_region', 'r1'),
+                          ('save',)], self.driver.calls[-3:])
+
+    def test_failed_save_rolls_back(self):
+        self.driver.failing.add(('save',))
+        self.txn.create_region('r1')
+        self.assertRaises(RuntimeError, self.txn.commit)
+        self.assertEqual([('create_region', 'r1'),
+                          ('save',),
+                          ('destroy_region', 'r1'),
+                          ('save',)], self.driver.calls)
+
+    def test_ignored_serial_failure_is_skipped(self):
+        self.driver.failing.add(('destroy_region', 'r0'))
+        self.txn.queue('destroy_region', ('r0',), ignore_errors=True)
+        self.txn.create_region('r1')
+        self.txn.commit()
+        self.assertEqual([('destroy_region', 'r0'),
+                          ('create_region', 'r1'),
+                          ('save',)], self.driver.calls)
+        self.assertEqual(['create_region'],
+                         [op.method for op in self.txn.applied])
+        self.assertEqual(['destroy_region'],
+                         [op.method for op, error in self.txn.failures])
+
+    def test_ignored_parallel_failure_is_skipped(self):
+        self.driver.failing.add(('clear_outer_port_association_setting',
+                                 'dp1', 1, 100))
+        self.txn.clear_outer_port_association_setting('dp1', 1, 100,
+                                                      ignore_errors=True)
+        self.txn.clear_outer_port_association_setting('dp2', 1, 100,
+                                                      ignore_errors=True)
+        self.txn.destroy_region('r1')
+        self.txn.commit()
+        self.assertEqual([('destroy_region', 'r1'), ('save',)],
+                         self.driver.calls[-2:])
+        self.assertEqual([('dp2', 1, 100), ('r1',)],
+                         [op.args for op in self.txn.applied])
+        self.assertEqual([('dp1', 1, 100)],
+                         [op.args for op, error in self.txn.failures])
+
+
+class OFCManagerTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(OFCManagerTestCase, self).setUp()
+        self.config(ofc_driver='quantum.tests.unit.dodai.test_ofc_manager.'
+                               'FakeDriver',
+                    group='OFC')
+        outer_ports = mock.patch.object(
+            dodai_db, 'get_all_dodai_outer_ports',
+            return_value=[{'dpid': 'dp1', 'outer_port': 1}])
+        outer_ports.start()
+        self.addCleanup(outer_ports.stop)
+        record = mock.patch.object(dodai_db, 'update_outer_port_associations')
+        self.record = record.start()
+        self.addCleanup(record.stop)
+        self.ofc = ofc_manager.OFCManager()
+        self.driver = self.ofc.ofc_driver
+
+    def test_create_regions_skips_existing(self):
+        self.driver.regions = ['r1']
+        self.ofc.create_regions([('r1', 100), ('r2', None)])
+        self.assertEqual([('create_region', 'r2'), ('save',)],
+                         self.driver.calls)
+        self.assertTrue(self.ofc.has_region('r2'))
+
+    def test_create_regions_failed_region(self):
+        self.driver.failing.add(('create_region', 'r2'))
+        e = self.assertRaises(exceptions.OFCRegionCreationFailed,
+                              self.ofc.create_regions,
+                              [('r1', 100), ('r2', 200)])
+        self.assertIn('r2', str(e))
+        self.assertNotIn('r1', str(e))
+        self.assertIn(('destroy_region', 'r1'), self.driver.calls)
+
+    def test_create_regions_failed_association(self):
+        self.driver.failing.add(('set_outer_port_association_setting',
+                                 'dp1', 1, 200, 65535, 'r2'))
+        e = self.assertRaises(
+            exceptions.OFCRegionSettingOuterPortAssocFailed,
+            self.ofc.create_regions, [('r1', 100), ('r2', 200)])
+        self.assertIn('r2', str(e))
+        self.assertIn('200', str(e))
+
+    def test_create_regions_failed_save(self):
+        self.driver.failing.add(('save',))
+        e = self.assertRaises(exceptions.OFCRegionCreationFailed,
+                              self.ofc.create_regions,
+                              [('r1', 100), ('r2', 200)])
+        self.assertIn('r1,r2', str(e))
+        self.assertFalse(self.record.called)
+
+    def test_commit_records_set_associations(self):
+        self.ofc.create_regions([('r1', 100)])
+        self.record.assert_called_once_with(None, [('dp1', 1, 100, 'r1')],
+                                            [])
+
+    def test_commit_records_cleared_associations(self):
+        self.ofc.remove_region('r1', 100)
+        self.record.assert_called_once_with(None, [], [('dp1', 1, 100)])
+
+    def test_commit_survives_failed_record(self):
+        self.record.side_effect = RuntimeError()
+        self.ofc.create_regions([('r1', 100)])
+        self.assertTrue(self.ofc.has_region('r1'))
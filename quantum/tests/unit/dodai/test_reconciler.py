@@ -0,0 +1,196 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from quantum.plugins.dodai.db import dodai_db
+from quantum.plugins.dodai import exceptions
+from quantum.plugins.dodai import reconciler
+from quantum.tests import base
+
+
+NET1 = 'aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa'
+R1 = 'a' * 32
+R2 = 'b' * 32
+R3 = 'c' * 32
+
+
+class OFCReconcilerTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(OFCReconcilerTestCase, self).setUp()
+        self.ofc = mock.Mock()
+        self.ofc.topology.get_regions.return_value = set()
+        self.ofc.topology.get_all_server_ports.return_value = {}
+        self.bm_cache = mock.Mock()
+        self.reconciler = reconciler.OFCReconciler(self.ofc, self.bm_cache)
+        self.jobs = self._patch(dodai_db, 'get_ofc_jobs', [])
+        self.associations = self._patch(dodai_db,
+                                        'get_outer_port_associations', {})
+        self._patch(dodai_db, 'get_all_dodai_outer_ports',
+                    [{'dpid': 'dp1', 'outer_port': 1}])
+        self.expected_regions = self._patch(self.reconciler,
+                                            '_get_expected_regions',
+                                            ({}, set()))
+        self.expected_ports = self._patch(self.reconciler,
+                                          '_get_expected_server_ports',
+                                          ({}, set()))
+
+    def _patch(self, obj, name, return_value):
+        patcher = mock.patch.object(obj, name, return_value=return_value)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _set_actual(self, regions, server_ports=None, associations=None):
+        self.ofc.topology.get_regions.return_value = set(regions)
+        self.ofc.topology.get_all_server_ports.return_value = (
+            server_ports or {})
+        self.associations.return_value = associations or {}
+
+    def _compute_diff(self):
+        return self.reconciler.compute_diff(mock.Mock())
+
+    def test_in_sync(self):
+        self.expected_regions.return_value = ({R1: 100}, set())
+        self.expected_ports.return_value = ({('dp1', 2): R1}, set())
+        self._set_actual([R1], {('dp1', R1): 1}, {('dp1', 1, 100): R1})
+        diff = self._compute_diff()
+        self.assertFalse(diff)
+        self.ofc.topology.invalidate.assert_called_once_with()
+
+    def test_missing_and_extra_regions(self):
+        self.expected_regions.return_value = ({R1: 100}, set())
+        self._set_actual([R2, 'default'])
+        diff = self._compute_diff()
+        self.assertEqual([(R1, 100)], diff.regions_to_create)
+        self.assertEqual([R2], diff.regions_to_remove)
+        self.assertEqual([('dp1', 1, 100, R1)], diff.associations_to_set)
+
+    def test_recreated_region_gets_recorded_associations(self):
+        self.expected_regions.return_value = ({R1: 100}, set())
+        self._set_actual([], associations={('dp1', 1, 100): R1})
+        diff = self._compute_diff()
+        self.assertEqual([(R1, 100)], diff.regions_to_create)
+        self.assertEqual([('dp1', 1, 100, R1)], diff.associations_to_set)
+        self.assertEqual([], diff.associations_to_clear)
+
+    def test_busy_regions_skipped(self):
+        self.jobs.return_value = [mock.Mock(region_name=R1),
+                                  mock.Mock(region_name=R2)]
+        self.expected_regions.return_value = ({R1: 100}, set())
+        self.expected_ports.return_value = ({('dp1', 3): R1}, set())
+        self._set_actual([R2], {('dp1', R2): 1}, {('dp1', 1, 200): R2})
+        self.assertFalse(self._compute_diff())
+
+    def test_server_ports(self):
+        self.expected_regions.return_value = ({R1: None, R2: None}, set())
+        self.expected_ports.return_value = ({('dp1', 1): R1,
+                                             ('dp1', 2): R1,
+                                             ('dp2', 1): R2,
+                                             ('dp2', 2): R2}, set())
+        self._set_actual([R1, R2], {('dp1', R1): 1, ('dp2', R2): 2,
+                                    ('dp3', R1): 1})
+        diff = self._compute_diff()
+        self.assertEqual([('dp1', 1, R1), ('dp1', 2, R1)],
+                         diff.server_ports_to_set)
+        self.assertEqual([('dp3', R1, 1)], diff.unexpected_server_ports)
+
+    def test_unresolved_region_ports_not_reported(self):
+        self.expected_regions.return_value = ({R1: None}, set())
+        self.expected_ports.return_value = ({('dp1', 2): R1}, set([R1]))
+        self._set_actual([R1], {('dp2', R1): 1})
+        diff = self._compute_diff()
+        self.assertEqual([], diff.unexpected_server_ports)
+        self.assertEqual([('dp1', 2, R1)], diff.server_ports_to_set)
+
+    def test_reconcile_only_reports_unexpected_server_ports(self):
+        diff = reconciler.OFCDiff()
+        diff.unexpected_server_ports = [('dp1', R1, 1)]
+        self.reconciler.compute_diff = mock.Mock(return_value=diff)
+        txn = self.ofc.begin.return_value
+        txn.operations = []
+        txn.failures = []
+        self.reconciler.reconcile()
+        self.assertEqual(diff.unexpected_server_ports,
+                         self.reconciler.reconcile().unexpected_server_ports)
+        self.assertFalse(txn.queue.called)
+
+    def test_stale_associations_cleared(self):
+        self.expected_regions.return_value = ({R1: 100}, set([R3]))
+        self._set_actual([R1], associations={('dp1', 1, 100): R1,
+                                             ('dp1', 1, 200): R2,
+                                             ('dp1', 1, 300): R3,
+                                             ('dp2', 1, 100): R1})
+        diff = self._compute_diff()
+        self.assertEqual([('dp1', 1, 200), ('dp2', 1, 100)],
+                         diff.associations_to_clear)
+        self.assertEqual([], diff.associations_to_set)
+
+    def test_get_expected_server_ports(self):
+        session = mock.Mock()
+        session.query.return_value.filter.return_value = [
+            (NET1, 'instance1', 'mac1'),
+            (NET1, 'instance2', 'mac2'),
+            ('bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb', 'instance3', 'mac3')]
+        self._patch(self.reconciler, '_get_instance_hosts',
+                    {'instance1': 'node1'})
+        self.bm_cache.get_interface.return_value = {'datapath_id': 'dp1',
+                                                    'port_no': '3'}
+        server_ports, unresolved = (
+            reconciler.OFCReconciler._get_expected_server_ports(
+                self.reconciler, session, {R1: None}))
+        self.assertEqual({('dp1', 3): R1}, server_ports)
+        self.assertEqual(set([R1]), unresolved)
+        self.bm_cache.get_interface.assert_called_once_with('node1', 'mac1')
+
+    def _prepare_reconcile(self, failures=()):
+        diff = reconciler.OFCDiff()
+        diff.regions_to_remove = [R2]
+        self.reconciler.compute_diff = mock.Mock(return_value=diff)
+        txn = self.ofc.begin.return_value
+        txn.operations = [mock.Mock()]
+        txn.failures = list(failures)
+        return txn
+
+    def test_reconcile_waits_for_second_scan(self):
+        txn = self._prepare_reconcile()
+        self.assertFalse(self.reconciler.reconcile())
+        self.assertFalse(self.ofc.commit.called)
+        self.assertEqual([R2], self.reconciler.reconcile().regions_to_remove)
+        txn.queue.assert_called_once_with('destroy_region', (R2,),
+                                          ignore_errors=True)
+        self.ofc.commit.assert_called_once_with(txn)
+
+    def test_reconcile_skips_unconfirmed_corrections(self):
+        self._prepare_reconcile()
+        self.reconciler.reconcile()
+        self.reconciler.compute_diff.return_value = reconciler.OFCDiff()
+        self.assertFalse(self.reconciler.reconcile())
+        self.assertFalse(self.ofc.commit.called)
+
+    def test_reconcile_dry_run(self):
+        self._prepare_reconcile()
+        self.reconciler.reconcile(dry_run=True)
+        self.assertTrue(self.reconciler.reconcile(dry_run=True))
+        self.assertFalse(self.ofc.begin.called)
+
+    def test_reconcile_reports_failures(self):
+        op = mock.Mock(method='destroy_region', args=(R2,))
+        self._prepare_reconcile([(op, RuntimeError('boom'))])
+        self.reconciler.reconcile()
+        e = self.assertRaises(exceptions.OFCReconcileFailed,
+                              self.reconciler.reconcile)
+        self.assertIn('boom', str(e))
@@ -0,0 +1,77 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 National Institute of Informatics.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from quantum.plugins.dodai import topology_cache
+from quantum.tests import base
+
+
+def _port(region_name, type=topology_cache.SERVER_PORT_TYPE):
+    port = mock.Mock(spec=['regionName', 'type'])
+    port.regionName = region_name
+    port.type = type
+    return port
+
+
+class TopologyCacheTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TopologyCacheTestCase, self).setUp()
+        self.driver = mock.Mock()
+        self.driver.show_region.return_value = [
+            mock.Mock(regionName='r1'), mock.Mock(regionName='r2')]
+        self.driver.show_switch_datapath_id.return_value = [
+            mock.Mock(dpid='dp1'), mock.Mock(dpid='dp2')]
+        self.driver.show_ports.side_effect = lambda dpid: {
+            'dp1': [_port('r1'), _port('r1'), _port('r2', 'OuterPort')],
+            'dp2': [_port('r2')]}[dpid]
+        self.cache = topology_cache.TopologyCache(self.driver, 60)
+
+    def test_regions_loaded_once(self):
+        self.assertTrue(self.cache.has_region('r1'))
+        self.assertFalse(self.cache.has_region('r3'))
+        self.assertEqual(1, self.driver.show_region.call_count)
+
+    def test_regions_written_through(self):
+        self.cache.add_region('r3')
+        self.cache.get_regions()
+        self.cache.add_region('r3')
+        self.cache.remove_region('r1')
+        self.assertEqual(set(['r2', 'r3']), self.cache.get_regions())
+        self.assertEqual(1, self.driver.show_region.call_count)
+
+    def test_server_ports_counted_per_datapath_and_region(self):
+        self.assertEqual({('dp1', 'r1'): 2, ('dp2', 'r2'): 1},
+                         self.cache.get_all_server_ports())
+        self.assertEqual({'dp1': 2}, self.cache.get_server_ports('r1'))
+        self.assertEqual({}, self.cache.get_server_ports('r3'))
+        self.assertEqual(2, self.driver.show_ports.call_count)
+
+    def test_invalidate_server_ports(self):
+        self.cache.get_regions()
+        self.cache.get_all_server_ports()
+        self.cache.invalidate_server_ports()
+        self.cache.get_all_server_ports()
+        self.cache.get_regions()
+        self.assertEqual(2, self.driver.show_switch_datapath_id.call_count)
+        self.assertEqual(1, self.driver.show_region.call_count)
+
+    def test_no_cache_without_ttl(self):
+        self.cache = topology_cache.TopologyCache(self.driver, 0)
+        self.cache.has_region('r1')
+        self.cache.has_region('r1')
+        self.assertEqual(2, self.driver.show_region.call_count)
@@ -126,3 +126,23 @@ class TestLinuxBridgeAgent(base.BaseTestCase):
             with testtools.ExpectedException(RuntimeError):
                 agent.daemon_loop()
             self.assertEqual(3, log.call_count)
+
+    def test_treat_devices_added_in_chunks(self):
+        agent = linuxbridge_quantum_agent.LinuxBridgeQuantumAgentRPC({},
+                                                                     0,
+                                                                     None)
+        details = {'device': 'tap1', 'port_id': 'port1',
+                   'network_id': 'net1', 'physical_network': 'physnet1',
+                   'vlan_id': 1, 'admin_state_up': True}
+        with contextlib.nested(
+            mock.patch.object(linuxbridge_quantum_agent.agent_rpc,
+                              'DEVICES_CHUNK_SIZE', new=1),
+            mock.patch.object(agent, 'prepare_devices_filter'),
+            mock.patch.object(agent.plugin_rpc, 'get_devices_details_list',
+                              side_effect=[[details], Exception()])
+        ) as (chunk_size, prepare_devices_filter, details_list):
+            # The failure of the second chunk requires a resync
+            self.assertTrue(agent.treat_devices_added(['tap1', 'tap2']))
+        self.assertEqual(2, details_list.call_count)
+        agent.br_mgr.add_interface.assert_called_once_with(
+            'net1', 'physnet1', 1, 'port1')
@@ -13,7 +13,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+
+from quantum import context
 from quantum.extensions import portbindings
+from quantum.plugins.linuxbridge import lb_quantum_plugin
 from quantum.tests.unit import _test_extension_portbindings as test_bindings
 from quantum.tests.unit import test_db_plugin as test_plugin
 from quantum.tests.unit import test_security_groups_rpc as test_sg_rpc
@@ -55,6 +59,48 @@ class TestLinuxBridgePortsV2(test_plugin.TestPortsV2,
             self.assertEqual(self.port_create_status, 'DOWN')
 
 
+class TestLinuxBridgeRpcCallbacks(LinuxBridgePluginV2TestCase):
+
+    def setUp(self):
+        super(TestLinuxBridgeRpcCallbacks, self).setUp()
+        self.callbacks = lb_quantum_plugin.LinuxBridgeRpcCallbacks()
+        self.ctx = context.get_admin_context()
+
+    def _get_status(self, port):
+        port = self._show('ports', port['port']['id'])
+        return port['port']['status']
+
+    def test_get_devices_details_list(self):
+        with self.subnet() as subnet:
+            with contextlib.nested(
+                self.port(subnet=subnet),
+                self.port(subnet=subnet, admin_state_up=False)) as (p1, p2):
+                devices = ['tap' + p1['port']['id'][:11],
+                           'tap' + p2['port']['id'][:11],
+                           'tapmissing']
+                entries = self.callbacks.get_devices_details_list(
+                    self.ctx, devices=devices, agent_id='fake_agent_id')
+                self.assertEqual(devices, [e['device'] for e in entries])
+                self.assertEqual(p1['port']['id'], entries[0]['port_id'])
+                self.assertEqual(p2['port']['id'], entries[1]['port_id'])
+                self.assertNotIn('port_id', entries[2])
+                self.assertEqual('ACTIVE', self._get_status(p1))
+                self.assertEqual('DOWN', self._get_status(p2))
+
+    def test_update_devices_down(self):
+        with self.port() as port:
+            device = 'tap' + port['port']['id'][:11]
+            self.callbacks.get_devices_details_list(
+                self.ctx, devices=[device], agent_id='fake_agent_id')
+            entries = self.callbacks.update_devices_down(
+                self.ctx, devices=[device, 'tapmissing'],
+                agent_id='fake_agent_id')
+            self.assertEqual([{'device': device, 'exists': True},
+                              {'device': 'tapmissing', 'exists': False}],
+                             entries)
+            self.assertEqual('DOWN', self._get_status(port))
+
+
 class TestLinuxBridgePortBinding(LinuxBridgePluginV2TestCase,
                                  test_bindings.PortBindingsTestCase):
     VIF_TYPE = portbindings.VIF_TYPE_BRIDGE
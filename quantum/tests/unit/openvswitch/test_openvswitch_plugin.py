@@ -13,7 +13,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+
+from quantum import context
 from quantum.extensions import portbindings
+from quantum.plugins.openvswitch import ovs_quantum_plugin
 from quantum.tests.unit import _test_extension_portbindings as test_bindings
 from quantum.tests.unit import test_db_plugin as test_plugin
 from quantum.tests.unit import test_security_groups_rpc as test_sg_rpc
@@ -48,6 +52,47 @@ class TestOpenvswitchPortsV2(test_plugin.TestPortsV2,
             self.assertEqual(self.port_create_status, 'DOWN')
 
 
+class TestOpenvswitchRpcCallbacks(OpenvswitchPluginV2TestCase):
+
+    def setUp(self):
+        super(TestOpenvswitchRpcCallbacks, self).setUp()
+        self.callbacks = ovs_quantum_plugin.OVSRpcCallbacks(None)
+        self.ctx = context.get_admin_context()
+
+    def _get_status(self, port):
+        port = self._show('ports', port['port']['id'])
+        return port['port']['status']
+
+    def test_get_devices_details_list(self):
+        with self.subnet() as subnet:
+            with contextlib.nested(
+                self.port(subnet=subnet),
+                self.port(subnet=subnet, admin_state_up=False)) as (p1, p2):
+                devices = [p1['port']['id'], p2['port']['id'], 'missing']
+                entries = self.callbacks.get_devices_details_list(
+                    self.ctx, devices=devices, agent_id='fake_agent_id')
+                self.assertEqual(devices, [e['device'] for e in entries])
+                self.assertEqual(p1['port']['id'], entries[0]['port_id'])
+                self.assertTrue(entries[0]['admin_state_up'])
+                self.assertFalse(entries[1]['admin_state_up'])
+                self.assertNotIn('port_id', entries[2])
+                self.assertEqual('ACTIVE', self._get_status(p1))
+                self.assertEqual('DOWN', self._get_status(p2))
+
+    def test_update_devices_down(self):
+        with self.port() as port:
+            device = port['port']['id']
+            self.callbacks.get_devices_details_list(
+                self.ctx, devices=[device], agent_id='fake_agent_id')
+            entries = self.callbacks.update_devices_down(
+                self.ctx, devices=[device, 'missing'],
+                agent_id='fake_agent_id')
+            self.assertEqual([{'device': device, 'exists': True},
+                              {'device': 'missing', 'exists': False}],
+                             entries)
+            self.assertEqual('DOWN', self._get_status(port))
+
+
 class TestOpenvswitchNetworksV2(test_plugin.TestNetworksV2,
                                 OpenvswitchPluginV2TestCase):
     pass
@@ -15,9 +15,12 @@
 #    under the License.
 # @author: Dan Wendlandt, Nicira, Inc.
 
+import threading
+
 import mox
 
 from quantum.agent.linux import ovs_lib, utils
+from quantum.openstack.common import jsonutils
 from quantum.openstack.common import uuidutils
 from quantum.tests import base
 
@@ -179,23 +182,116 @@ class OVS_Lib_Test(base.BaseTestCase):
         self.br.delete_flows(dl_vlan=vid)
         self.mox.VerifyAll()
 
+    def test_mod_flow(self):
+        utils.execute(["ovs-ofctl", "mod-flows", self.BR_NAME,
+                       "in_port=5,actions=drop"],
+                      root_helper=self.root_helper)
+        self.mox.ReplayAll()
+
+        self.br.mod_flow(in_port=5, actions="drop")
+        self.mox.VerifyAll()
+
+    def test_defer_apply(self):
+        utils.execute(["ovs-vsctl", self.TO, "--", "set", "Port", "tap1",
+                       "tag=1", "--", "clear", "Port", "tap2", "tag"],
+                      root_helper=self.root_helper)
+        utils.execute(["ovs-ofctl", "add-flows", self.BR_NAME, "-"],
+                      root_helper=self.root_helper,
+                      process_input="hard_timeout=0,idle_timeout=0,"
+                      "priority=2,in_port=1,actions=drop\n"
+                      "hard_timeout=0,idle_timeout=0,"
+                      "priority=2,in_port=2,actions=drop")
+        utils.execute(["ovs-ofctl", "del-flows", self.BR_NAME, "-"],
+                      root_helper=self.root_helper,
+                      process_input="in_port=3")
+        utils.execute(["ovs-ofctl", "mod-flows", self.BR_NAME, "-"],
+                      root_helper=self.root_helper,
+                      process_input="in_port=4,actions=normal")
+        self.mox.ReplayAll()
+
+        self.br.defer_apply_on()
+        self.br.set_db_attribute("Port", "tap1", "tag", "1")
+        self.br.add_flow(priority=2, in_port=1, actions="drop")
+        self.br.add_flow(priority=2, in_port=2, actions="drop")
+        self.br.delete_flows(in_port=3)
+        self.br.clear_db_attribute("Port", "tap2", "tag")
+        self.br.mod_flow(in_port=4, actions="normal")
+        self.br.defer_apply_off()
+        # Nothing is left to apply
+        self.br.defer_apply_off()
+        self.mox.VerifyAll()
+
+    def test_defer_apply_failed_batch_applied_one_by_one(self):
+        flow1 = ("hard_timeout=0,idle_timeout=0,"
+                 "priority=2,in_port=1,actions=drop")
+        flow2 = ("hard_timeout=0,idle_timeout=0,"
+                 "priority=2,in_port=2,actions=drop")
+        utils.execute(["ovs-ofctl", "add-flows", self.BR_NAME, "-"],
+                      root_helper=self.root_helper,
+                      process_input=flow1 + "\n" + flow2).AndRaise(
+                          RuntimeError())
+        utils.execute(["ovs-ofctl", "add-flow", self.BR_NAME, flow1],
+                      root_helper=self.root_helper)
+        utils.execute(["ovs-ofctl", "add-flow", self.BR_NAME, flow2],
+                      root_helper=self.root_helper).AndRaise(RuntimeError())
+        utils.execute(["ovs-ofctl", "del-flows", self.BR_NAME, "-"],
+                      root_helper=self.root_helper,
+                      process_input="in_port=3")
+        self.mox.ReplayAll()
+
+        self.br.defer_apply_on()
+        self.br.add_flow(priority=2, in_port=1, actions="drop")
+        self.br.add_flow(priority=2, in_port=2, actions="drop")
+        self.br.delete_flows(in_port=3)
+        self.br.defer_apply_off()
+        self.mox.VerifyAll()
+
+    def test_defer_apply_failed_vsctl_batch_applied_one_by_one(self):
+        utils.execute(["ovs-vsctl", self.TO, "--", "set", "Port", "tap1",
+                       "tag=1", "--", "set", "Port", "tap2", "tag=2"],
+                      root_helper=self.root_helper).AndRaise(RuntimeError())
+        utils.execute(["ovs-vsctl", self.TO, "set", "Port", "tap1", "tag=1"],
+                      root_helper=self.root_helper).AndRaise(RuntimeError())
+        utils.execute(["ovs-vsctl", self.TO, "set", "Port", "tap2", "tag=2"],
+                      root_helper=self.root_helper)
+        self.mox.ReplayAll()
+
+        self.br.defer_apply_on()
+        self.br.set_db_attribute("Port", "tap1", "tag", "1")
+        self.br.set_db_attribute("Port", "tap2", "tag", "2")
+        self.br.defer_apply_off()
+        self.mox.VerifyAll()
+
+    def test_defer_apply_per_thread(self):
+        utils.execute(["ovs-vsctl", self.TO, "set", "Port", "tap2", "tag=2"],
+                      root_helper=self.root_helper)
+        utils.execute(["ovs-vsctl", self.TO, "--", "set", "Port", "tap1",
+                       "tag=1"],
+                      root_helper=self.root_helper)
+        self.mox.ReplayAll()
+
+        def other_caller():
+            # Neither queued into nor flushing the batch of the main thread
+            self.br.set_db_attribute("Port", "tap2", "tag", "2")
+            self.br.defer_apply_off()
+
+        self.br.defer_apply_on()
+        self.br.set_db_attribute("Port", "tap1", "tag", "1")
+        thread = threading.Thread(target=other_caller)
+        thread.start()
+        thread.join()
+        self.br.defer_apply_off()
+        self.mox.VerifyAll()
+
     def test_add_tunnel_port(self):
         pname = "tap99"
         ip = "9.9.9.9"
         ofport = "6"
 
-        utils.execute(["ovs-vsctl", self.TO, "add-port",
-                       self.BR_NAME, pname], root_helper=self.root_helper)
-        utils.execute(["ovs-vsctl", self.TO, "set", "Interface",
-                       pname, "type=gre"], root_helper=self.root_helper)
-        utils.execute(["ovs-vsctl", self.TO, "set", "Interface",
-                       pname, "options:remote_ip=" + ip],
-                      root_helper=self.root_helper)
-        utils.execute(["ovs-vsctl", self.TO, "set", "Interface",
-                       pname, "options:in_key=flow"],
-                      root_helper=self.root_helper)
-        utils.execute(["ovs-vsctl", self.TO, "set", "Interface",
-                       pname, "options:out_key=flow"],
+        utils.execute(["ovs-vsctl", self.TO, "--", "--may-exist", "add-port",
+                       self.BR_NAME, pname, "--", "set", "Interface", pname,
+                       "type=gre", "options:remote_ip=" + ip,
+                       "options:in_key=flow", "options:out_key=flow"],
                       root_helper=self.root_helper)
         utils.execute(["ovs-vsctl", self.TO, "get",
                        "Interface", pname, "ofport"],
@@ -210,12 +306,9 @@ class OVS_Lib_Test(base.BaseTestCase):
         peer = "bar10"
         ofport = "6"
 
-        utils.execute(["ovs-vsctl", self.TO, "add-port",
-                       self.BR_NAME, pname], root_helper=self.root_helper)
-        utils.execute(["ovs-vsctl", self.TO, "set", "Interface",
-                       pname, "type=patch"], root_helper=self.root_helper)
-        utils.execute(["ovs-vsctl", self.TO, "set",
-                       "Interface", pname, "options:peer=" + peer],
+        utils.execute(["ovs-vsctl", self.TO, "--", "--may-exist", "add-port",
+                       self.BR_NAME, pname, "--", "set", "Interface", pname,
+                       "type=patch", "options:peer=" + peer],
                       root_helper=self.root_helper)
         utils.execute(["ovs-vsctl", self.TO, "get",
                        "Interface", pname, "ofport"],
@@ -225,9 +318,17 @@ class OVS_Lib_Test(base.BaseTestCase):
         self.assertEqual(self.br.add_patch_port(pname, peer), ofport)
         self.mox.VerifyAll()
 
+    def _list_interfaces(self, *rows):
+        return utils.execute(
+            ["ovs-vsctl", self.TO, "--format=json", "--",
+             "--columns=name,ofport,external_ids", "list", "Interface"],
+            root_helper=self.root_helper).AndReturn(jsonutils.dumps(
+                {'headings': ['name', 'ofport', 'external_ids'],
+                 'data': list(rows)}))
+
     def _test_get_vif_ports(self, is_xen=False):
         pname = "tap99"
-        ofport = "6"
+        ofport = 6
         vif_id = uuidutils.generate_uuid()
         mac = "ca:fe:de:ad:be:ef"
 
@@ -235,18 +336,15 @@ class OVS_Lib_Test(base.BaseTestCase):
                       root_helper=self.root_helper).AndReturn("%s\n" % pname)
 
         if is_xen:
-            external_ids = ('{xs-vif-uuid="%s", attached-mac="%s"}'
-                            % (vif_id, mac))
+            external_ids = ['map', [['attached-mac', mac],
+                                    ['xs-vif-uuid', vif_id]]]
         else:
-            external_ids = ('{iface-id="%s", attached-mac="%s"}'
-                            % (vif_id, mac))
+            external_ids = ['map', [['attached-mac', mac],
+                                    ['iface-id', vif_id]]]
 
-        utils.execute(["ovs-vsctl", self.TO, "get",
-                       "Interface", pname, "external_ids"],
-                      root_helper=self.root_helper).AndReturn(external_ids)
-        utils.execute(["ovs-vsctl", self.TO, "get",
-                       "Interface", pname, "ofport"],
-                      root_helper=self.root_helper).AndReturn(ofport)
+        self._list_interfaces([pname, ofport, external_ids],
+                              # Interface of another bridge
+                              ['tap98', 7, external_ids])
         if is_xen:
             utils.execute(["xe", "vif-param-get", "param-name=other-config",
                            "param-key=nicira-iface-id", "uuid=" + vif_id],
@@ -268,6 +366,53 @@ class OVS_Lib_Test(base.BaseTestCase):
     def test_get_vif_ports_xen(self):
         self._test_get_vif_ports(True)
 
+    def test_get_vif_port_set_from_interfaces(self):
+        vif_id = uuidutils.generate_uuid()
+        utils.execute(["ovs-vsctl", self.TO, "list-ports", self.BR_NAME],
+                      root_helper=self.root_helper).AndReturn("tap99\n")
+        self.mox.ReplayAll()
+
+        interfaces = [{'name': 'tap99', 'ofport': 6,
+                       'external_ids': {'iface-id': vif_id,
+                                        'attached-mac': 'ca:fe:de:ad:be:ef'}},
+                      {'name': 'patch-tun', 'ofport': 1, 'external_ids': {}},
+                      # Interface of another bridge
+                      {'name': 'tap98', 'ofport': 2,
+                       'external_ids': {'iface-id': 'other',
+                                        'attached-mac': 'ca:fe:de:ad:be:ee'}}]
+        self.assertEqual(set([vif_id]), self.br.get_vif_port_set(interfaces))
+        self.mox.VerifyAll()
+
+    def test_get_vif_port_set(self):
+        vif_id = uuidutils.generate_uuid()
+        utils.execute(["ovs-vsctl", self.TO, "list-ports", self.BR_NAME],
+                      root_helper=self.root_helper).AndReturn("tap99\n")
+        self._list_interfaces(
+            ['tap99', 6, ['map', [['attached-mac', 'ca:fe:de:ad:be:ef'],
+                                  ['iface-id', vif_id]]]],
+            ['br-int', 65534, ['map', []]])
+        self.mox.ReplayAll()
+
+        self.assertEqual(set([vif_id]), self.br.get_vif_port_set())
+        self.mox.VerifyAll()
+
+    def test_get_vif_ports_by_ids(self):
+        mac = 'ca:fe:de:ad:be:ef'
+        self._list_interfaces(
+            ['tap1', 1, ['map', [['attached-mac', mac], ['iface-id', 'a']]]],
+            ['tap2', 2, ['map', [['attached-mac', mac], ['iface-id', 'b']]]],
+            # Interface without an ofport yet
+            ['tap3', ['set', []],
+             ['map', [['attached-mac', mac], ['iface-id', 'c']]]])
+        self.mox.ReplayAll()
+
+        ports = self.br.get_vif_ports_by_ids(['a', 'c', 'd'])
+        self.assertEqual(['a'], ports.keys())
+        self.assertEqual('tap1', ports['a'].port_name)
+        self.assertEqual(1, ports['a'].ofport)
+        self.assertEqual(mac, ports['a'].vif_mac)
+        self.mox.VerifyAll()
+
     def test_clear_db_attribute(self):
         pname = "tap77"
         utils.execute(["ovs-vsctl", self.TO, "clear", "Port",
@@ -98,8 +98,58 @@ class TestOvsQuantumAgent(base.BaseTestCase):
         actual = self.mock_update_ports(vif_port_set, registered_ports)
         self.assertEqual(expected, actual)
 
+    def _start_monitoring(self):
+        self.agent.interface_monitor = mock.Mock()
+        self.agent.interface_monitor.interfaces = {'uuid-1': mock.sentinel.row}
+
+    def test_update_ports_from_monitored_interfaces(self):
+        self._start_monitoring()
+        self.agent.interface_monitor.has_changes.side_effect = [True, False]
+        with mock.patch.object(self.agent.int_br, 'get_vif_port_set',
+                               return_value=set([1])) as get_vif_port_set:
+            self.assertEqual(dict(current=set([1]), added=set([1]),
+                                  removed=set()),
+                             self.agent.update_ports(set()))
+            self.assertIsNone(self.agent.update_ports(set([1])))
+        # The ports are only listed again when the interfaces change
+        get_vif_port_set.assert_called_once_with([mock.sentinel.row])
+
+    def test_update_ports_polls_without_monitor(self):
+        self._start_monitoring()
+        self.agent.interface_monitor.is_active.return_value = False
+        with mock.patch.object(self.agent.int_br, 'get_vif_port_set',
+                               return_value=set([1])) as get_vif_port_set:
+            self.agent.update_ports(set())
+        get_vif_port_set.assert_called_once_with()
+
+    def test_wait_for_port_changes(self):
+        self._start_monitoring()
+        self.agent.wait_for_port_changes(2)
+        self.agent.interface_monitor.wait.assert_called_once_with(2)
+
+    def test_wait_for_port_changes_without_monitor(self):
+        with mock.patch.object(ovs_quantum_agent.time, 'sleep') as sleep:
+            self.agent.wait_for_port_changes(2)
+        sleep.assert_called_once_with(2)
+
+    def test_monitor_started(self):
+        cfg.CONF.set_override('minimize_polling', True, 'AGENT')
+        kwargs = ovs_quantum_agent.create_agent_config_map(cfg.CONF)
+        with mock.patch('quantum.plugins.openvswitch.agent.ovs_quantum_agent.'
+                        'OVSQuantumAgent.setup_integration_br',
+                        return_value=mock.Mock()):
+            with mock.patch('quantum.agent.linux.utils.get_interface_mac',
+                            return_value='000000000001'):
+                with mock.patch.object(ovs_quantum_agent.ovsdb_monitor,
+                                       'InterfaceMonitor') as monitor_cls:
+                    agent = ovs_quantum_agent.OVSQuantumAgent(**kwargs)
+        monitor_cls.assert_called_once_with(kwargs['root_helper'],
+                                            respawn_interval=30)
+        self.assertTrue(agent.interface_monitor.start.called)
+
     def test_treat_devices_added_returns_true_for_missing_device(self):
-        with mock.patch.object(self.agent.plugin_rpc, 'get_device_details',
+        with mock.patch.object(self.agent.plugin_rpc,
+                               'get_devices_details_list',
                                side_effect=Exception()):
             self.assertTrue(self.agent.treat_devices_added([{}]))
 
@@ -107,14 +157,17 @@ class TestOvsQuantumAgent(base.BaseTestCase):
         """
 
         :param details: the details to return for the device
-        :param port: the port that get_vif_port_by_id should return
+        :param port: the port that get_vif_ports_by_ids should return
         :param func_name: the function that should be called
         :returns: whether the named function was called
         """
-        with mock.patch.object(self.agent.plugin_rpc, 'get_device_details',
-                               return_value=details):
-            with mock.patch.object(self.agent.int_br, 'get_vif_port_by_id',
-                                   return_value=port):
+        vif_ports = mock.Mock()
+        vif_ports.get.return_value = port
+        with mock.patch.object(self.agent.plugin_rpc,
+                               'get_devices_details_list',
+                               return_value=[details]):
+            with mock.patch.object(self.agent.int_br, 'get_vif_ports_by_ids',
+                                   return_value=vif_ports):
                 with mock.patch.object(self.agent, func_name) as func:
                     self.assertFalse(self.agent.treat_devices_added([{}]))
         return func.called
@@ -138,15 +191,32 @@ class TestOvsQuantumAgent(base.BaseTestCase):
                                                       mock.Mock(),
                                                       'treat_vif_port'))
 
+    def test_treat_devices_added_in_chunks(self):
+        devices = ['tap%d' % i for i in range(3)]
+        with mock.patch.object(ovs_quantum_agent.agent_rpc,
+                               'DEVICES_CHUNK_SIZE', new=2):
+            with mock.patch.object(self.agent.plugin_rpc,
+                                   'get_devices_details_list',
+                                   return_value=[]) as details_list:
+                self.assertFalse(self.agent.treat_devices_added(devices))
+        self.assertEqual([mock.call(self.agent.context, devices[:2],
+                                    self.agent.agent_id),
+                          mock.call(self.agent.context, devices[2:],
+                                    self.agent.agent_id)],
+                         details_list.call_args_list)
+        # The VIF ports of all the devices are read at once
+        self.agent.int_br.get_vif_ports_by_ids.assert_called_once_with(
+            devices)
+
     def test_treat_devices_removed_returns_true_for_missing_device(self):
-        with mock.patch.object(self.agent.plugin_rpc, 'update_device_down',
+        with mock.patch.object(self.agent.plugin_rpc, 'update_devices_down',
                                side_effect=Exception()):
             self.assertTrue(self.agent.treat_devices_removed([{}]))
 
     def mock_treat_devices_removed(self, port_exists):
-        details = dict(exists=port_exists)
-        with mock.patch.object(self.agent.plugin_rpc, 'update_device_down',
-                               return_value=details):
+        details = dict(device='tap1', exists=port_exists)
+        with mock.patch.object(self.agent.plugin_rpc, 'update_devices_down',
+                               return_value=[details]):
             with mock.patch.object(self.agent, 'port_unbound') as port_unbound:
                 self.assertFalse(self.agent.treat_devices_removed([{}]))
         self.assertEqual(port_unbound.called, not port_exists)
@@ -188,3 +258,6 @@ class TestOvsQuantumAgent(base.BaseTestCase):
                 self.assertFalse(self.agent.process_network_ports(reply))
                 self.assertTrue(device_added.called)
                 self.assertTrue(device_removed.called)
+        # The flows of the ports are programmed in batches
+        self.agent.int_br.assert_has_calls([mock.call.defer_apply_on(),
+                                            mock.call.defer_apply_off()])
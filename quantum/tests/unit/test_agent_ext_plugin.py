@@ -62,6 +62,9 @@ class TestAgentPlugin(db_base_plugin_v2.QuantumDbPluginV2,
                       agents_db.AgentDbMixin):
     supported_extension_aliases = ["agent"]
 
+    __native_pagination_support = True
+    __native_sorting_support = True
+
 
 class AgentDBTestMixIn(object):
 
@@ -152,6 +155,11 @@ class AgentDBTestCase(AgentDBTestMixIn,
                 break
         self.assertEqual(len(agents), len(res['agents']))
 
+    def test_list_agents_with_pagination(self):
+        self._register_agent_states()
+        agents = [{'agent': agent} for agent in self._list('agents')['agents']]
+        self._test_list_with_pagination('agent', agents, ('host', 'asc'), 3, 2)
+
     def test_show_agent(self):
         self._register_agent_states()
         agents = self._list_agents(
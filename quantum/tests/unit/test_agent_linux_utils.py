@@ -15,9 +15,13 @@
 #    under the License.
 # @author: Dan Wendlandt, Nicira, Inc.
 
+import os
+
 import fixtures
 import mock
+from oslo.config import cfg
 
+from quantum.agent.common import config
 from quantum.agent.linux import utils
 from quantum.tests import base
 
@@ -62,6 +66,75 @@ class AgentUtilsExecuteTest(base.BaseTestCase):
                                addl_env={'foo': 'bar'})
         self.assertEqual(result, "%s\n" % self.test_file)
 
+    def test_create_process(self):
+        process, cmd = utils.create_process(["ls", self.test_file],
+                                            self.root_helper)
+        self.assertEqual(["echo", "ls", self.test_file], cmd)
+        stdout, stderr = process.communicate()
+        self.assertEqual("ls %s\n" % self.test_file, stdout)
+
+
+class AgentUtilsExecuteDaemonTest(base.BaseTestCase):
+    def setUp(self):
+        super(AgentUtilsExecuteDaemonTest, self).setUp()
+        self.client = mock.Mock()
+        get_client = mock.patch.object(utils, 'get_daemon_client',
+                                       return_value=self.client)
+        self.get_client = get_client.start()
+        self.addCleanup(get_client.stop)
+        create_process = mock.patch.object(utils, 'create_process')
+        self.create_process = create_process.start()
+        self.addCleanup(create_process.stop)
+
+    def test_with_helper(self):
+        self.client.execute.return_value = (0, 'out', 'err')
+        result = utils.execute(['ip', 'link'], 'sudo', process_input='in',
+                               return_stderr=True)
+        self.assertEqual(('out', 'err'), result)
+        self.client.execute.assert_called_once_with(['ip', 'link'], 'in')
+        self.assertFalse(self.create_process.called)
+
+    def test_check_exit_code(self):
+        self.client.execute.return_value = (1, '', 'err')
+        self.assertRaises(RuntimeError, utils.execute, ['ip', 'link'],
+                          'sudo')
+        self.assertEqual('', utils.execute(['ip', 'link'], 'sudo',
+                                           check_exit_code=False))
+
+    def test_without_helper(self):
+        process = mock.Mock()
+        process.communicate.return_value = ('out', '')
+        process.returncode = 0
+        self.create_process.return_value = (process, ['ls'])
+        self.assertEqual('out', utils.execute(['ls']))
+        self.assertFalse(self.client.execute.called)
+
+    def test_with_addl_env(self):
+        process = mock.Mock()
+        process.communicate.return_value = ('out', '')
+        process.returncode = 0
+        self.create_process.return_value = (process, ['ls'])
+        self.assertEqual('out', utils.execute(['ls'], 'sudo',
+                                              addl_env={'foo': 'bar'}))
+        self.assertFalse(self.client.execute.called)
+
+
+class AgentUtilsGetDaemonClient(base.BaseTestCase):
+    def setUp(self):
+        super(AgentUtilsGetDaemonClient, self).setUp()
+        config.register_root_helper(cfg.CONF)
+        self.addCleanup(cfg.CONF.reset)
+        self.addCleanup(utils._daemon_clients.clear)
+
+    def test_not_configured(self):
+        self.assertIsNone(utils.get_daemon_client())
+
+    def test_configured(self):
+        cfg.CONF.set_override('root_helper_daemon', 'sudo daemon', 'AGENT')
+        daemon_client = utils.get_daemon_client()
+        self.assertEqual('sudo daemon', daemon_client.daemon_cmd)
+        self.assertIs(daemon_client, utils.get_daemon_client())
+
 
 class AgentUtilsGetInterfaceMAC(base.BaseTestCase):
     def test_get_interface_mac(self):
@@ -90,3 +163,20 @@ class AgentUtilsReplaceFile(base.BaseTestCase):
                     ntf.assert_has_calls(expected)
                     chmod.assert_called_once_with('/baz', 0644)
                     rename.assert_called_once_with('/baz', '/foo')
+
+
+class AgentUtilsFindChildPidsTest(base.BaseTestCase):
+    def test_find_child_pids(self):
+        with mock.patch.object(utils, 'execute',
+                               return_value='  123\n  456\n') as execute:
+            self.assertEqual(['123', '456'], utils.find_child_pids('1'))
+        execute.assert_called_once_with(['ps', '--ppid', '1', '-o', 'pid='],
+                                        check_exit_code=False)
+
+    def test_find_child_pids_none(self):
+        with mock.patch.object(utils, 'execute', return_value=''):
+            self.assertEqual([], utils.find_child_pids('1'))
+
+    def test_find_child_pids_of_process(self):
+        pids = utils.find_child_pids(str(os.getppid()))
+        self.assertIn(str(os.getpid()), pids)
@@ -43,10 +43,24 @@ class AgentRPCPluginApi(base.BaseTestCase):
     def test_update_device_down(self):
         self._test_rpc_call('update_device_down')
 
+    def test_get_devices_details_list(self):
+        self._test_rpc_call('get_devices_details_list')
+
+    def test_update_devices_down(self):
+        self._test_rpc_call('update_devices_down')
+
     def test_tunnel_sync(self):
         self._test_rpc_call('tunnel_sync')
 
 
+class AgentRPCChunkDevices(base.BaseTestCase):
+    def test_chunk_devices(self):
+        with mock.patch.object(rpc, 'DEVICES_CHUNK_SIZE', new=2):
+            self.assertEqual([['a', 'b'], ['c']],
+                             rpc.chunk_devices(['a', 'b', 'c']))
+            self.assertEqual([], rpc.chunk_devices(set()))
+
+
 class AgentPluginReportState(base.BaseTestCase):
     def test_plugin_report_state(self):
         topic = 'test'
@@ -18,7 +18,9 @@
 # @author: Zhongyue Luo, Intel Corporation.
 #
 
+from oslo.config import cfg
 from testtools import matchers
+import webob
 from webob import exc
 
 from quantum.api import api_common as common
@@ -97,3 +99,40 @@ class APICommonTestCase(base.BaseTestCase):
                           self.controller._prepare_request_body,
                           body,
                           params)
+
+
+class PaginationEmulatedHelperTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(PaginationEmulatedHelperTestCase, self).setUp()
+        cfg.CONF.import_opt('pagination_max_limit', 'quantum.common.config')
+
+    def _paginate(self, query_string, ids):
+        request = webob.Request.blank('/fakes?' + query_string)
+        helper = common.PaginationEmulatedHelper(request)
+        self.items = iter([{'id': id} for id in ids])
+        return [item['id'] for item in helper.paginate(self.items)]
+
+    def test_paginate(self):
+        self.assertEqual(['a', 'b'], self._paginate('limit=2', 'abcd'))
+        # The items after the page are not read
+        self.assertEqual(['c', 'd'], [item['id'] for item in self.items])
+
+    def test_paginate_with_marker(self):
+        self.assertEqual(['c', 'd'], self._paginate('limit=2&marker=b',
+                                                    'abcde'))
+        self.assertEqual(['e'], [item['id'] for item in self.items])
+
+    def test_paginate_with_unknown_marker(self):
+        self.assertEqual([], self._paginate('limit=2&marker=x', 'abc'))
+
+    def test_paginate_reverse(self):
+        self.assertEqual(['b', 'c'], self._paginate(
+            'limit=2&marker=d&page_reverse=True', 'abcde'))
+        self.assertEqual(['e'], [item['id'] for item in self.items])
+        self.assertEqual(['a'], self._paginate(
+            'limit=2&marker=b&page_reverse=True', 'abc'))
+
+    def test_paginate_reverse_without_marker(self):
+        self.assertEqual(['b', 'c'], self._paginate(
+            'limit=2&page_reverse=True', 'abc'))
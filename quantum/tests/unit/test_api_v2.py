@@ -566,6 +566,56 @@ class JSONV2TestCase(APIv2TestBase, testlib_api.WebTestCase):
         tenant_id = _uuid()
         self._test_list(tenant_id + "bad", tenant_id)
 
+    def test_list_ports_filtered_on_owner(self):
+        tenant_id = _uuid()
+        env = {'quantum.context': context.Context('', tenant_id)}
+        instance = self.plugin.return_value
+        instance.get_ports.return_value = [{'id': _uuid(),
+                                            'network_id': _uuid(),
+                                            'tenant_id': tenant_id},
+                                           {'id': _uuid(),
+                                            'network_id': _uuid(),
+                                            'tenant_id': _uuid()}]
+
+        res = self.api.get(_get_path('ports', fmt=self.fmt),
+                           extra_environ=env)
+        self.assertEqual({'tenant_id': [tenant_id]},
+                         instance.get_ports.call_args[1]['filters'])
+        self.assertFalse(instance.get_network.called)
+        ports = self.deserialize(res)['ports']
+        self.assertEqual([tenant_id], [port['tenant_id'] for port in ports])
+
+    def test_list_ports_filtered_on_other_owner(self):
+        env = {'quantum.context': context.Context('', _uuid())}
+        instance = self.plugin.return_value
+
+        res = self.api.get(_get_path('ports', fmt=self.fmt),
+                           {'tenant_id': _uuid()}, extra_environ=env)
+        self.assertFalse(instance.get_ports.called)
+        self.assertEqual([], self.deserialize(res)['ports'])
+
+    def test_list_subnets_without_parent_lookup(self):
+        tenant_id = _uuid()
+        env = {'quantum.context': context.Context('', tenant_id)}
+        instance = self.plugin.return_value
+        instance.get_subnets.return_value = [{'id': _uuid(),
+                                              'network_id': _uuid(),
+                                              'tenant_id': tenant_id,
+                                              'shared': False},
+                                             {'id': _uuid(),
+                                              'network_id': _uuid(),
+                                              'tenant_id': _uuid(),
+                                              'shared': True},
+                                             {'id': _uuid(),
+                                              'network_id': _uuid(),
+                                              'tenant_id': _uuid(),
+                                              'shared': False}]
+
+        res = self.api.get(_get_path('subnets', fmt=self.fmt),
+                           extra_environ=env)
+        self.assertFalse(instance.get_network.called)
+        self.assertEqual(2, len(self.deserialize(res)['subnets']))
+
     def test_list_pagination(self):
         id1 = str(_uuid())
         id2 = str(_uuid())
@@ -1485,3 +1535,64 @@ class CreateResourceTestCase(base.BaseTestCase):
     def test_resource_creation(self):
         resource = v2_base.create_resource('fakes', 'fake', None, {})
         self.assertIsInstance(resource, webob.dec.wsgify)
+
+
+class PrepareRequestBodyTestCase(base.BaseTestCase):
+    def setUp(self):
+        super(PrepareRequestBodyTestCase, self).setUp()
+        self.context = context.Context('', 'tenant')
+        self.attr_info = {
+            'tenant_id': {'allow_post': True, 'allow_put': False},
+            'name': {'allow_post': True, 'allow_put': True, 'default': '',
+                     'validate': {'type:string': None}},
+            'network_id': {'allow_post': True, 'allow_put': False,
+                           'validate': {'type:uuid': None}},
+            'admin_state_up': {'allow_post': True, 'allow_put': True,
+                               'default': True,
+                               'convert_to': attributes.convert_to_boolean}}
+
+    def _prepare(self, body, is_create=True):
+        return v2_base.Controller.prepare_request_body(
+            self.context, body, is_create, 'port', self.attr_info,
+            allow_bulk=True)
+
+    def test_create_bulk(self):
+        net_id = _uuid()
+        items = [{'network_id': net_id},
+                 {'port': {'network_id': net_id, 'admin_state_up': 'false'}}]
+        body = self._prepare({'ports': items})
+        self.assertEqual(
+            {'ports': [{'port': {'tenant_id': 'tenant', 'name': '',
+                                 'network_id': net_id,
+                                 'admin_state_up': True}},
+                       {'port': {'tenant_id': 'tenant', 'name': '',
+                                 'network_id': net_id,
+                                 'admin_state_up': False}}]},
+            body)
+
+    def test_create_bulk_validates_repeated_values_once(self):
+        net_id = _uuid()
+        validate = mock.Mock(return_value=None)
+        with mock.patch.dict(attributes.validators, {'type:uuid': validate}):
+            self._prepare({'ports': [{'network_id': net_id}
+                                     for i in range(3)]})
+        validate.assert_called_once_with(net_id, None)
+
+    def test_create_bulk_invalid_item(self):
+        body = {'ports': [{'network_id': _uuid()},
+                          {'network_id': 'garbage'}]}
+        self.assertRaises(webob.exc.HTTPBadRequest, self._prepare, body)
+
+    def test_update_read_only_attribute(self):
+        body = {'port': {'network_id': _uuid()}}
+        self.assertRaises(webob.exc.HTTPBadRequest, self._prepare, body,
+                          False)
+
+    def test_validator_registered_after_plan(self):
+        self.attr_info['name']['validate'] = {'type:fake': None}
+        plan = v2_base._RequestBodyPlan(self.attr_info)
+        validate = mock.Mock(return_value='invalid')
+        with mock.patch.dict(attributes.validators, {'type:fake': validate}):
+            self.assertRaises(webob.exc.HTTPBadRequest,
+                              plan.convert_and_validate, [{'name': 'x'}])
+        validate.assert_called_once_with('x', None)
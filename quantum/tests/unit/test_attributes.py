@@ -139,6 +139,10 @@ class TestAttributes(base.BaseTestCase):
         msg = attributes._validate_mac_address(mac_addr)
         self.assertEqual(msg, "'%s' is not a valid MAC address" % mac_addr)
 
+        mac_addr = "FF-16-3E-4F-00-00"
+        msg = attributes._validate_mac_address(mac_addr)
+        self.assertIsNone(msg)
+
     def test_validate_ip_address(self):
         ip_addr = '1.1.1.1'
         msg = attributes._validate_ip_address(ip_addr)
@@ -148,6 +152,14 @@ class TestAttributes(base.BaseTestCase):
         msg = attributes._validate_ip_address(ip_addr)
         self.assertEqual(msg, "'%s' is not a valid IP address" % ip_addr)
 
+        ip_addr = '256.1.1.1'
+        msg = attributes._validate_ip_address(ip_addr)
+        self.assertEqual(msg, "'%s' is not a valid IP address" % ip_addr)
+
+        for ip_addr in ['fe80::1', '010.1.1.1']:
+            msg = attributes._validate_ip_address(ip_addr)
+            self.assertIsNone(msg)
+
         ip_addr = '1.1.1.1 has whitespace'
         msg = attributes._validate_ip_address(ip_addr)
         self.assertEqual(msg, "'%s' is not a valid IP address" % ip_addr)
@@ -430,6 +442,12 @@ class TestAttributes(base.BaseTestCase):
         msg = attributes._validate_uuid('00000000-ffff-ffff-ffff-000000000000')
         self.assertIsNone(msg)
 
+        for data in ['00000000-FFFF-FFFF-FFFF-000000000000',
+                     '00000000-ffff-ffff-ffff-000000000000\n',
+                     '{00000000-ffff-ffff-ffff-000000000000}', None]:
+            msg = attributes._validate_uuid(data)
+            self.assertEqual(msg, "'%s' is not a valid UUID" % data)
+
     def test_validate_uuid_list(self):
         # check not a list
         uuids = [None,
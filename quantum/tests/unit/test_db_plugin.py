@@ -840,6 +840,64 @@ class TestPortsV2(QuantumDbPluginV2TestCase):
             for p in self.deserialize(self.fmt, res)['ports']:
                 self._delete('ports', p['id'])
 
+    def test_create_ports_bulk_native_allocates_addresses(self):
+        if self._skip_native_bulk:
+            self.skipTest("Plugin does not support native bulk port create")
+        with self.subnet() as subnet:
+            fixed_ips = [{'subnet_id': subnet['subnet']['id'],
+                          'ip_address': '10.0.0.2'}]
+            overrides = {0: {'fixed_ips': fixed_ips}}
+            res = self._create_port_bulk(self.fmt, 3,
+                                         subnet['subnet']['network_id'],
+                                         'test', True, override=overrides)
+            self.assertEqual(res.status_int, 201)
+            ports = self.deserialize(self.fmt, res)['ports']
+            ips = [p['fixed_ips'][0]['ip_address'] for p in ports]
+            self.assertEqual(['10.0.0.2', '10.0.0.3', '10.0.0.4'], ips)
+            self.assertEqual(3, len(set(p['mac_address'] for p in ports)))
+            for p in ports:
+                self._delete('ports', p['id'])
+
+    def test_create_ports_bulk_native_duplicate_mac(self):
+        if self._skip_native_bulk:
+            self.skipTest("Plugin does not support native bulk port create")
+        with self.network() as net:
+            overrides = {0: {'mac_address': '00:11:22:33:44:55'},
+                         1: {'mac_address': '00:11:22:33:44:55'}}
+            res = self._create_port_bulk(self.fmt, 2, net['network']['id'],
+                                         'test', True, override=overrides)
+            self._validate_behavior_on_bulk_failure(res, 'ports', 409)
+
+    def test_create_ports_bulk_native_duplicate_ip(self):
+        if self._skip_native_bulk:
+            self.skipTest("Plugin does not support native bulk port create")
+        with self.subnet() as subnet:
+            fixed_ips = [{'subnet_id': subnet['subnet']['id'],
+                          'ip_address': '10.0.0.5'}]
+            overrides = {0: {'fixed_ips': fixed_ips},
+                         1: {'fixed_ips': fixed_ips}}
+            res = self._create_port_bulk(self.fmt, 2,
+                                         subnet['subnet']['network_id'],
+                                         'test', True, override=overrides)
+            self._validate_behavior_on_bulk_failure(res, 'ports', 409)
+
+    def test_create_ports_bulk_native_ip_exhausted(self):
+        if self._skip_native_bulk:
+            self.skipTest("Plugin does not support native bulk port create")
+        pools = [{'start': '10.0.0.2', 'end': '10.0.0.3'}]
+        with self.subnet(allocation_pools=pools) as subnet:
+            res = self._create_port_bulk(self.fmt, 3,
+                                         subnet['subnet']['network_id'],
+                                         'test', True)
+            self._validate_behavior_on_bulk_failure(res, 'ports', 409)
+            # The addresses taken by the failed request are available
+            res = self._create_port_bulk(self.fmt, 2,
+                                         subnet['subnet']['network_id'],
+                                         'test', True)
+            self._validate_behavior_on_bulk_success(res, 'ports')
+            for p in self.deserialize(self.fmt, res)['ports']:
+                self._delete('ports', p['id'])
+
     def test_create_ports_bulk_emulated(self):
         real_has_attr = hasattr
 
@@ -2422,6 +2480,18 @@ class TestSubnetsV2(QuantumDbPluginV2TestCase):
                                            'test')
             self._validate_behavior_on_bulk_success(res, 'subnets')
 
+    def test_create_subnets_bulk_native_overlapping_cidrs(self):
+        if self._skip_native_bulk:
+            self.skipTest("Plugin does not support native bulk subnet create")
+        with self.network() as net:
+            subnets = [{'subnet': {'network_id': net['network']['id'],
+                                   'ip_version': 4,
+                                   'cidr': cidr,
+                                   'tenant_id': self._tenant_id}}
+                       for cidr in ('10.0.0.0/24', '10.0.0.0/23')]
+            res = self._create_bulk_from_list(self.fmt, 'subnet', subnets)
+            self._validate_behavior_on_bulk_failure(res, 'subnets')
+
     def test_create_subnets_bulk_emulated(self):
         real_has_attr = hasattr
 
@@ -3463,6 +3533,71 @@ class TestSubnetsV2(QuantumDbPluginV2TestCase):
         self.assertEqual(res.status_int, 204)
 
 
+class TestListQueryCount(QuantumDbPluginV2TestCase):
+
+    def setUp(self):
+        super(TestListQueryCount, self).setUp(plugin=DB_PLUGIN_KLASS)
+        self.plugin = QuantumManager.get_plugin()
+        self.context = context.get_admin_context()
+        self.statements = []
+        sa.event.listen(db.get_session().bind, 'before_cursor_execute',
+                        self._count_statement)
+
+    def _count_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def _count_statements(self, func, *args, **kwargs):
+        del self.statements[:]
+        func(self.context, *args, **kwargs)
+        return len(self.statements)
+
+    def _make_resources(self, start, count):
+        for i in range(start, start + count):
+            network = self._make_network(self.fmt, 'net%d' % i, True)
+            self._make_subnet(self.fmt, network, '10.0.%d.1' % i,
+                              '10.0.%d.0/24' % i)
+            self._make_port(self.fmt, network['network']['id'])
+
+    def _test_list_query_count(self, func):
+        self._make_resources(0, 2)
+        count = self._count_statements(func)
+        self._make_resources(2, 2)
+        self.assertEqual(count, self._count_statements(func))
+
+    def test_get_networks_query_count(self):
+        self._test_list_query_count(self.plugin.get_networks)
+
+    def test_get_subnets_query_count(self):
+        self._test_list_query_count(self.plugin.get_subnets)
+
+    def test_get_ports_query_count(self):
+        self._test_list_query_count(self.plugin.get_ports)
+
+    def test_get_ports_fields_without_relationships(self):
+        self._make_resources(0, 2)
+        self.assertEqual(1, self._count_statements(self.plugin.get_ports,
+                                                   fields=['id', 'status']))
+
+    def test_get_ports_fields_reads_rows(self):
+        self._make_resources(0, 2)
+        ports = self.plugin.get_ports(self.context, fields=['id', 'status'])
+        self.assertEqual(0, len(self.context.session.identity_map))
+        expected = [{'id': port['id'], 'status': port['status']}
+                    for port in self.plugin.get_ports(self.context)]
+        self.assertEqual(sorted(expected), sorted(ports))
+
+    def test_get_ports_fields_filtered_by_fixed_ips(self):
+        with self.subnet() as subnet:
+            fixed_ips = [{'subnet_id': subnet['subnet']['id']},
+                         {'subnet_id': subnet['subnet']['id']}]
+            with self.port(subnet=subnet, fixed_ips=fixed_ips) as port:
+                subnet_ids = [subnet['subnet']['id']]
+                filters = {'fixed_ips': {'subnet_id': subnet_ids}}
+                ports = self.plugin.get_ports(self.context, filters=filters,
+                                              fields=['id'])
+                self.assertEqual([{'id': port['port']['id']}], ports)
+
+
 class DbModelTestCase(base.BaseTestCase):
     """ DB model tests """
     def test_repr(self):
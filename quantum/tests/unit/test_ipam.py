@@ -0,0 +1,177 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo.config import cfg
+
+from quantum import context
+from quantum.db import ipam
+from quantum.db import models_v2
+from quantum.manager import QuantumManager
+from quantum.tests import base
+from quantum.tests.unit import test_db_plugin
+
+
+RANGE_BACKEND = 'quantum.db.ipam.RangeIpamBackend'
+
+
+class TestRangeIpamPortsV2(test_db_plugin.TestPortsV2):
+
+    def setUp(self):
+        super(TestRangeIpamPortsV2, self).setUp()
+        cfg.CONF.set_override('ipam_backend', RANGE_BACKEND)
+
+
+class TestLowestBit(base.BaseTestCase):
+
+    def test_lowest_bit(self):
+        self.assertEqual(0, ipam._lowest_bit(1))
+        self.assertEqual(1, ipam._lowest_bit(0b110))
+        self.assertEqual(4, ipam._lowest_bit(0b10000))
+        self.assertEqual(255, ipam._lowest_bit(1 << 255))
+        self.assertEqual(3, ipam._lowest_bit(~0b111 & ipam.FULL_CHUNK))
+
+
+class TestBitmapIpam(test_db_plugin.QuantumDbPluginV2TestCase):
+
+    def setUp(self):
+        super(TestBitmapIpam, self).setUp()
+        self.context = context.get_admin_context()
+
+    def _get_chunks(self, subnet):
+        query = self.context.session.query(models_v2.IPAvailabilityChunk)
+        query = query.join(models_v2.IPAllocationPool)
+        query = query.filter(models_v2.IPAllocationPool.subnet_id ==
+                             subnet['subnet']['id'])
+        return query.order_by(models_v2.IPAvailabilityChunk.chunk).all()
+
+    def _get_ranges(self, subnet):
+        query = self.context.session.query(models_v2.IPAvailabilityRange)
+        query = query.join(models_v2.IPAllocationPool)
+        return query.filter(models_v2.IPAllocationPool.subnet_id ==
+                            subnet['subnet']['id']).all()
+
+    def test_create_subnet_creates_chunks(self):
+        with self.subnet(cidr='10.0.0.0/23') as subnet:
+            chunks = self._get_chunks(subnet)
+            self.assertEqual([0, 1], [chunk.chunk for chunk in chunks])
+            # 10.0.0.2 - 10.0.1.254
+            self.assertEqual([256, 253], [chunk.free for chunk in chunks])
+            self.assertEqual('0' * 64, chunks[0].bitmap)
+            self.assertEqual(int(chunks[1].bitmap, 16),
+                             ipam.FULL_CHUNK & ~((1 << 253) - 1))
+            self.assertEqual([], self._get_ranges(subnet))
+
+    def test_create_large_subnet_creates_ranges(self):
+        with self.subnet(cidr='fe80::/64', gateway_ip='fe80::1',
+                         ip_version=6) as subnet:
+            self.assertEqual([], self._get_chunks(subnet))
+            self.assertEqual(1, len(self._get_ranges(subnet)))
+            with self.port(subnet=subnet) as port:
+                ips = port['port']['fixed_ips']
+                self.assertEqual('fe80::2', ips[0]['ip_address'])
+
+    def test_generate_ip_takes_lowest_ip_of_chunk(self):
+        with self.subnet() as subnet:
+            with self.port(subnet=subnet) as port1:
+                with self.port(subnet=subnet) as port2:
+                    ips1 = port1['port']['fixed_ips']
+                    ips2 = port2['port']['fixed_ips']
+                    self.assertEqual('10.0.0.2', ips1[0]['ip_address'])
+                    self.assertEqual('10.0.0.3', ips2[0]['ip_address'])
+                    chunk = self._get_chunks(subnet)[0]
+                    self.assertEqual(251, chunk.free)
+                    self.assertEqual(2, chunk.version)
+                    self.assertEqual(0x3, int(chunk.bitmap, 16) & 0xff)
+
+    def test_generate_ip_exhausted(self):
+        pools = [{'start': '10.0.0.2', 'end': '10.0.0.2'}]
+        with self.subnet(allocation_pools=pools) as subnet:
+            with self.port(subnet=subnet):
+                res = self._create_port(self.fmt,
+                                        subnet['subnet']['network_id'])
+                self.assertEqual(409, res.status_int)
+
+    def test_release_ip(self):
+        plugin = QuantumManager.get_plugin()
+        with self.subnet() as subnet:
+            with self.port(subnet=subnet) as port:
+                ip_address = port['port']['fixed_ips'][0]['ip_address']
+                plugin._recycle_ip(self.context,
+                                   subnet['subnet']['network_id'],
+                                   subnet['subnet']['id'], ip_address)
+                chunk = self._get_chunks(subnet)[0]
+                self.assertEqual(253, chunk.free)
+                self.assertEqual(0, int(chunk.bitmap, 16) & 0xff)
+
+    def test_allocate_specific_ip(self):
+        with self.subnet() as subnet:
+            fixed_ips = [{'subnet_id': subnet['subnet']['id'],
+                          'ip_address': '10.0.0.5'}]
+            with self.port(subnet=subnet, fixed_ips=fixed_ips):
+                chunk = self._get_chunks(subnet)[0]
+                self.assertEqual(252, chunk.free)
+                # 10.0.0.5 is the fourth address of the pool
+                self.assertEqual(0x8, int(chunk.bitmap, 16) & 0xff)
+
+    def test_generate_ip_retries_on_conflict(self):
+        backend = ipam.BitmapIpamBackend()
+        update_chunk = backend._update_chunk
+        with self.subnet(cidr='10.0.0.0/23') as subnet:
+            with mock.patch.object(backend, '_update_chunk') as update:
+                update.side_effect = lambda *args: (
+                    0 if update.call_count <= 2 else update_chunk(*args))
+                with self.context.session.begin(subtransactions=True):
+                    ip_address = backend.generate_ip(self.context,
+                                                     subnet['subnet'])
+            self.assertEqual(3, update.call_count)
+            # Both chunks conflicted, so the last update held a lock
+            self.assertEqual([True, True, False],
+                             [call[0][4] for call in update.call_args_list])
+            self.assertIn(ip_address, ['10.0.0.2', '10.0.1.2'])
+            self.assertEqual(508, sum(chunk.free
+                                      for chunk in self._get_chunks(subnet)))
+
+    def test_range_pools_are_used_by_bitmap_backend(self):
+        cfg.CONF.set_override('ipam_backend', RANGE_BACKEND)
+        with self.subnet() as subnet:
+            cfg.CONF.clear_override('ipam_backend')
+            self.assertEqual([], self._get_chunks(subnet))
+            with self.port(subnet=subnet) as port:
+                self.assertEqual('10.0.0.2',
+                                 port['port']['fixed_ips'][0]['ip_address'])
+                self.assertEqual('10.0.0.3',
+                                 self._get_ranges(subnet)[0].first_ip)
+
+    def _test_generate_ips(self, cidr):
+        backend = ipam.get_backend()
+        pools = [{'start': '10.0.0.2', 'end': '10.0.0.4'},
+                 {'start': '10.0.0.6', 'end': '10.0.0.7'}]
+        with self.subnet(cidr=cidr, allocation_pools=pools) as subnet:
+            with self.context.session.begin(subtransactions=True):
+                ips = backend.generate_ips(self.context, subnet['subnet'], 4)
+                self.assertEqual(['10.0.0.2', '10.0.0.3', '10.0.0.4',
+                                  '10.0.0.6'], ips)
+                ips = backend.generate_ips(self.context, subnet['subnet'], 4)
+                self.assertEqual(['10.0.0.7'], ips)
+
+    def test_generate_ips(self):
+        self._test_generate_ips('10.0.0.0/24')
+
+    def test_generate_ips_from_ranges(self):
+        cfg.CONF.set_override('ipam_backend', RANGE_BACKEND)
+        self._test_generate_ips('10.0.0.0/24')
@@ -83,25 +83,10 @@ class IptablesManagerStateFulTestCase(base.BaseTestCase):
                               process_input=nat_dump,
                               root_helper=self.root_helper).AndReturn(None)
 
-        self.iptables.execute(['iptables-save', '-t', 'filter'],
-                              root_helper=self.root_helper).AndReturn('')
-
-        self.iptables.execute(['iptables-restore'],
-                              process_input=(':%s-FORWARD - [0:0]\n:%s-INPUT'
-                              ' - [0:0]\n:%s-local - [0:0]\n:%s-OUTPUT - [0:'
-                              '0]\n:quantum-filter-top - [0:0]\n-A FORWARD -'
-                              'j quantum-filter-top\n-A OUTPUT -j quantum-fi'
-                              'lter-top\n-A quantum-filter-top -j %s-local\n'
-                              '-A INPUT -j %s-INPUT\n-A OUTPUT -j %s-OUTPUT'
-                              '\n-A FORWARD -j %s-FORWARD\n' % (bn, bn, bn, bn,
-                              bn, bn, bn, bn)), root_helper=self.root_helper
-                              ).AndReturn(None)
-
-        self.iptables.execute(['iptables-save', '-t', 'nat'],
-                              root_helper=self.root_helper).AndReturn('')
-
-        self.iptables.execute(['iptables-restore'],
-                              process_input=nat_dump,
+        self.iptables.execute(['iptables-restore', '--noflush'],
+                              process_input=('*filter\n:%s-filter - [0:0]\n'
+                                             '-X %s-filter\nCOMMIT\n' %
+                                             (bn, bn)),
                               root_helper=self.root_helper).AndReturn(None)
 
         self.mox.ReplayAll()
@@ -148,25 +133,11 @@ class IptablesManagerStateFulTestCase(base.BaseTestCase):
                               process_input=nat_dump,
                               root_helper=self.root_helper).AndReturn(None)
 
-        self.iptables.execute(['iptables-save', '-t', 'filter'],
-                              root_helper=self.root_helper).AndReturn('')
-
-        self.iptables.execute(['iptables-restore'],
-                              process_input=(':%s-FORWARD - [0:0]\n:%s-INPUT -'
-                              ' [0:0]\n:%s-local - [0:0]\n:%s-OUTPUT - [0:0]\n'
-                              ':quantum-filter-top - [0:0]\n-A FORWARD -j quan'
-                              'tum-filter-top\n-A OUTPUT -j quantum-filter-top'
-                              '\n-A quantum-filter-top -j %s-local\n-A INPUT -'
-                              'j %s-INPUT\n-A OUTPUT -j %s-OUTPUT\n-A FORWARD '
-                              '-j %s-FORWARD\n' % (bn, bn, bn, bn, bn, bn, bn,
-                              bn)), root_helper=self.root_helper
-                              ).AndReturn(None)
-
-        self.iptables.execute(['iptables-save', '-t', 'nat'],
-                              root_helper=self.root_helper).AndReturn('')
-
-        self.iptables.execute(['iptables-restore'],
-                              process_input=nat_dump,
+        self.iptables.execute(['iptables-restore', '--noflush'],
+                              process_input=('*filter\n:%s-INPUT - [0:0]\n'
+                                             ':%s-filter - [0:0]\n'
+                                             '-X %s-filter\nCOMMIT\n' %
+                                             (bn, bn, bn)),
                               root_helper=self.root_helper).AndReturn(None)
 
         self.mox.ReplayAll()
@@ -226,28 +197,13 @@ class IptablesManagerStateFulTestCase(base.BaseTestCase):
                               bn, bn, bn, bn, bn, bn, bn, bn, bn, bn, bn)),
                               root_helper=self.root_helper).AndReturn(None)
 
-        self.iptables.execute(['iptables-save', '-t', 'filter'],
-                              root_helper=self.root_helper).AndReturn('')
-
-        self.iptables.execute(['iptables-restore'],
-                              process_input=filter_dump,
+        self.iptables.execute(['iptables-restore', '--noflush'],
+                              process_input=('*nat\n:%s-PREROUTING - [0:0]\n'
+                                             ':%s-nat - [0:0]\n'
+                                             '-X %s-nat\nCOMMIT\n' %
+                                             (bn, bn, bn)),
                               root_helper=self.root_helper).AndReturn(None)
 
-        self.iptables.execute(['iptables-save', '-t', 'nat'],
-                              root_helper=self.root_helper).AndReturn('')
-
-        self.iptables.execute(['iptables-restore'],
-                              process_input=(':%s-float-snat - [0:0]\n:%s-POST'
-                              'ROUTING - [0:0]\n:%s-PREROUTING - [0:0]\n:%s-OU'
-                              'TPUT - [0:0]\n:%s-snat - [0:0]\n:quantum-postro'
-                              'uting-bottom - [0:0]\n-A PREROUTING -j %s-PRERO'
-                              'UTING\n-A OUTPUT -j %s-OUTPUT\n-A POSTROUTING -'
-                              'j %s-POSTROUTING\n-A POSTROUTING -j quantum-pos'
-                              'trouting-bottom\n-A quantum-postrouting-bottom '
-                              '-j %s-snat\n-A %s-snat -j %s-float-snat\n' % (
-                              bn, bn, bn, bn, bn, bn, bn, bn, bn, bn, bn)
-                              ), root_helper=self.root_helper).AndReturn(None)
-
         self.mox.ReplayAll()
         self.iptables.ipv4['nat'].add_chain('nat')
         self.iptables.ipv4['nat'].add_rule('PREROUTING',
@@ -270,6 +226,65 @@ class IptablesManagerStateFulTestCase(base.BaseTestCase):
         self.iptables.apply()
         self.mox.VerifyAll()
 
+    def _expect_apply(self):
+        for table in ('filter', 'nat'):
+            self.iptables.execute(['iptables-save', '-t', table],
+                                  root_helper=self.root_helper).AndReturn('')
+            self.iptables.execute(['iptables-restore'],
+                                  process_input=mox.IgnoreArg(),
+                                  root_helper=self.root_helper
+                                  ).AndReturn(None)
+
+    def test_apply_unchanged(self):
+        self._expect_apply()
+        self.mox.ReplayAll()
+
+        self.iptables.apply()
+        self.iptables.apply()
+        self.mox.VerifyAll()
+
+    def test_add_and_remove_unwrapped_rule(self):
+        # Shared chains are applied with the whole table
+        self._expect_apply()
+        for i in range(2):
+            self.iptables.execute(['iptables-save', '-t', 'filter'],
+                                  root_helper=self.root_helper).AndReturn('')
+            self.iptables.execute(['iptables-restore'],
+                                  process_input=mox.IgnoreArg(),
+                                  root_helper=self.root_helper
+                                  ).AndReturn(None)
+        self.mox.ReplayAll()
+
+        self.iptables.apply()
+        self.iptables.ipv4['filter'].add_rule('OUTPUT', '-d 10.0.0.1 -j DROP',
+                                              wrap=False)
+        self.iptables.apply()
+        self.iptables.ipv4['filter'].remove_rule('OUTPUT',
+                                                 '-d 10.0.0.1 -j DROP',
+                                                 wrap=False)
+        self.iptables.apply()
+        self.mox.VerifyAll()
+
+    def test_apply_changes_failure(self):
+        bn = iptables_manager.binary_name
+        self._expect_apply()
+        self.iptables.execute(['iptables-restore', '--noflush'],
+                              process_input=('*filter\n:%s-filter - [0:0]\n'
+                                             'COMMIT\n' % bn),
+                              root_helper=self.root_helper
+                              ).AndRaise(RuntimeError())
+        self.iptables.execute(['iptables-save', '-t', 'filter'],
+                              root_helper=self.root_helper).AndReturn('')
+        self.iptables.execute(['iptables-restore'],
+                              process_input=mox.IgnoreArg(),
+                              root_helper=self.root_helper).AndReturn(None)
+        self.mox.ReplayAll()
+
+        self.iptables.apply()
+        self.iptables.ipv4['filter'].add_chain('filter')
+        self.iptables.apply()
+        self.mox.VerifyAll()
+
     def test_add_rule_to_a_nonexistent_chain(self):
         self.assertRaises(LookupError, self.iptables.ipv4['filter'].add_rule,
                           'nonexistent', '-j DROP')
@@ -0,0 +1,172 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import StringIO
+
+import mock
+
+from quantum.agent.linux import ovsdb_monitor
+from quantum.openstack.common import jsonutils
+from quantum.tests import base
+
+
+HEADINGS = ['row', 'action', 'name', 'ofport', 'external_ids']
+
+
+def _update(*rows):
+    return jsonutils.dumps({'caption': 'Interface table',
+                            'headings': HEADINGS,
+                            'data': list(rows)}) + '\n'
+
+
+INITIAL = _update(
+    ['uuid-1', 'initial', 'br-int', 65534, ['map', []]],
+    ['uuid-2', 'initial', 'tap1', 1,
+     ['map', [['attached-mac', 'fa:16:3e:00:00:01'], ['iface-id', 'vif-1']]]])
+
+
+class TestValToPy(base.BaseTestCase):
+
+    def test_map(self):
+        self.assertEqual({'iface-id': 'vif-1'},
+                         ovsdb_monitor.val_to_py(['map',
+                                                  [['iface-id', 'vif-1']]]))
+
+    def test_empty_set(self):
+        self.assertEqual([], ovsdb_monitor.val_to_py(['set', []]))
+
+    def test_uuid(self):
+        self.assertEqual('uuid-1', ovsdb_monitor.val_to_py(['uuid', 'uuid-1']))
+
+    def test_atom(self):
+        self.assertEqual(1, ovsdb_monitor.val_to_py(1))
+
+
+class TestInterfaceMonitor(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestInterfaceMonitor, self).setUp()
+        self.monitor = ovsdb_monitor.InterfaceMonitor('sudo')
+
+    def test_initial_rows(self):
+        self.assertFalse(self.monitor.is_active())
+        self.monitor._apply_update(INITIAL)
+        self.assertTrue(self.monitor.is_active())
+        self.assertTrue(self.monitor.has_changes())
+        self.assertFalse(self.monitor.has_changes())
+        self.assertEqual({'name': 'tap1', 'ofport': 1,
+                          'external_ids': {'attached-mac': 'fa:16:3e:00:00:01',
+                                           'iface-id': 'vif-1'}},
+                         self.monitor.interfaces['uuid-2'])
+
+    def test_insert_and_delete(self):
+        self.monitor._apply_update(INITIAL)
+        self.monitor._apply_update(_update(
+            ['uuid-3', 'insert', 'tap2', ['set', []], ['map', []]]))
+        self.assertEqual([], self.monitor.interfaces['uuid-3']['ofport'])
+        self.monitor._apply_update(_update(
+            ['uuid-2', 'delete', 'tap1', 1, ['map', []]]))
+        self.assertEqual(set(['uuid-1', 'uuid-3']),
+                         set(self.monitor.interfaces))
+
+    def test_modify(self):
+        self.monitor._apply_update(INITIAL)
+        self.monitor._apply_update(_update(
+            ['uuid-2', 'old', '', ['set', []], ''],
+            ['', 'new', 'tap1', 7,
+             ['map', [['attached-mac', 'fa:16:3e:00:00:01'],
+                      ['iface-id', 'vif-1']]]]))
+        self.assertEqual(7, self.monitor.interfaces['uuid-2']['ofport'])
+        self.assertEqual(set(['uuid-1', 'uuid-2']),
+                         set(self.monitor.interfaces))
+
+    def test_wait_returns_on_change(self):
+        self.monitor._apply_update(INITIAL)
+        with mock.patch.object(self.monitor._changes, 'get',
+                               wraps=self.monitor._changes.get) as get:
+            self.monitor.wait(10)
+        get.assert_called_once_with(timeout=10)
+        self.assertTrue(self.monitor.has_changes())
+
+    def test_wait_times_out(self):
+        self.monitor.wait(0.01)
+        self.assertFalse(self.monitor.has_changes())
+
+    def test_run_respawns_process(self):
+        process = mock.Mock()
+        process.poll.return_value = 1
+        process.stdout = StringIO.StringIO(INITIAL)
+        process.stderr = StringIO.StringIO('connection lost')
+        interfaces = []
+
+        def stop(interval):
+            interfaces.append(dict(self.monitor.interfaces))
+            raise StopIteration()
+
+        with mock.patch.object(ovsdb_monitor.utils, 'create_process',
+                               return_value=(process, ['cmd'])) as create:
+            with mock.patch.object(ovsdb_monitor.eventlet, 'sleep',
+                                   side_effect=stop) as sleep:
+                self.assertRaises(StopIteration, self.monitor._run)
+        create.assert_called_once_with(
+            ['ovsdb-client', 'monitor', 'Interface',
+             'name,ofport,external_ids', '--format=json'],
+            root_helper='sudo')
+        sleep.assert_called_once_with(30)
+        # The process exited, it is only reaped
+        self.assertFalse(process.kill.called)
+        process.wait.assert_called_once_with()
+        # The table is dropped when the process exits
+        self.assertEqual([{}], interfaces)
+        self.assertFalse(self.monitor.is_active())
+        self.assertTrue(self.monitor.has_changes())
+
+    def _set_process(self):
+        process = self.monitor._process = mock.Mock(pid=10)
+        process.poll.return_value = None
+        return process
+
+    def test_kill_process_through_root_helper(self):
+        process = self._set_process()
+        children = {'10': ['11'], '11': ['12'], '12': []}
+        with mock.patch.object(ovsdb_monitor.utils, 'find_child_pids',
+                               side_effect=children.get):
+            with mock.patch.object(ovsdb_monitor.utils,
+                                   'execute') as execute:
+                self.monitor.stop()
+        execute.assert_called_once_with(['kill', '-9', '12'],
+                                        root_helper='sudo')
+        self.assertFalse(process.kill.called)
+        process.wait.assert_called_once_with()
+        self.assertIsNone(self.monitor._process)
+
+    def test_kill_process_without_root_helper(self):
+        self.monitor.root_helper = None
+        process = self._set_process()
+        self.monitor.stop()
+        process.kill.assert_called_once_with()
+        process.wait.assert_called_once_with()
+
+    def test_kill_process_failure_is_logged(self):
+        process = self._set_process()
+        with mock.patch.object(ovsdb_monitor.utils, 'find_child_pids',
+                               return_value=[]):
+            with mock.patch.object(ovsdb_monitor.utils, 'execute',
+                                   side_effect=RuntimeError()):
+                self.monitor.stop()
+        self.assertFalse(process.wait.called)
+        self.assertIsNone(self.monitor._process)
@@ -0,0 +1,209 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import mock
+from oslo.config import cfg
+from sqlalchemy import exc as sql_exc
+
+from quantum.common import exceptions as q_exc
+from quantum import context
+from quantum.db import mac_allocator
+from quantum.openstack.common import timeutils
+from quantum.tests.unit import test_db_plugin
+
+
+class TestMacAllocator(test_db_plugin.QuantumDbPluginV2TestCase):
+
+    def setUp(self):
+        super(TestMacAllocator, self).setUp(
+            plugin=test_db_plugin.DB_PLUGIN_KLASS)
+        cfg.CONF.set_override('base_mac', '12:34:56:78:00:00')
+        self.context = context.get_admin_context()
+        mac_allocator._allocators.clear()
+        self.addCleanup(mac_allocator._allocators.clear)
+        self.addCleanup(timeutils.clear_time_override)
+        self.allocator = mac_allocator.get_allocator()
+        self.getrandbits = mock.patch.object(mac_allocator.random,
+                                             'getrandbits').start()
+        self.getrandbits.return_value = 5
+        self.addCleanup(mock.patch.stopall)
+
+    def _get_leases(self):
+        query = self.context.session.query(mac_allocator.MacAddressBlock)
+        return dict((lease.first_mac, lease) for lease in query)
+
+    def _allocate(self):
+        return self.allocator.allocate(self.context, 'net-id')
+
+    def test_allocate_from_leased_block(self):
+        self.assertEqual(['12:34:56:78:05:00', '12:34:56:78:05:01'],
+                         [self._allocate(), self._allocate()])
+        leases = self._get_leases()
+        self.assertEqual(['12:34:56:78:05:00'], leases.keys())
+        self.assertEqual(self.allocator.holder,
+                         leases['12:34:56:78:05:00'].holder)
+
+    def test_allocate_three_octet_base_mac(self):
+        cfg.CONF.set_override('base_mac', 'fa:16:3e:00:00:00')
+        self.getrandbits.return_value = 0x0102
+        self.assertEqual('fa:16:3e:01:02:00', self._allocate())
+        self.getrandbits.assert_called_once_with(16)
+
+    def test_allocate_skips_macs_in_use(self):
+        with self.subnet() as subnet:
+            with self.port(subnet=subnet, arg_list=('mac_address',),
+                           mac_address='12:34:56:78:05:00'):
+                with self.port(subnet=subnet, arg_list=('mac_address',),
+                               mac_address='12:34:56:78:05:02'):
+                    mac_allocator._allocators.clear()
+                    allocator = mac_allocator.get_allocator()
+                    self.assertEqual(
+                        ['12:34:56:78:05:01', '12:34:56:78:05:03'],
+                        [allocator.allocate(self.context, 'net-id')
+                         for i in range(2)])
+
+    def test_allocate_skips_block_leased_by_other(self):
+        self._allocate()
+        self.getrandbits.side_effect = [5, 6]
+        mac_allocator._allocators.clear()
+        allocator = mac_allocator.get_allocator()
+        self.assertEqual('12:34:56:78:06:00',
+                         allocator.allocate(self.context, 'net-id'))
+
+    def test_allocate_takes_over_expired_lease(self):
+        self._allocate()
+        timeutils.set_time_override(timeutils.utcnow() +
+                                    datetime.timedelta(seconds=601))
+        mac_allocator._allocators.clear()
+        allocator = mac_allocator.get_allocator()
+        self.assertEqual('12:34:56:78:05:00',
+                         allocator.allocate(self.context, 'net-id'))
+        self.assertEqual(allocator.holder,
+                         self._get_leases()['12:34:56:78:05:00'].holder)
+
+    def test_allocate_stops_using_block_after_half_lease(self):
+        now = timeutils.utcnow()
+        timeutils.set_time_override(now)
+        self._allocate()
+        timeutils.set_time_override(now + datetime.timedelta(seconds=301))
+        self.getrandbits.return_value = 6
+        self.assertEqual('12:34:56:78:06:00', self._allocate())
+
+    def test_allocate_no_block_available(self):
+        self._allocate()
+        self.getrandbits.reset_mock()
+        mac_allocator._allocators.clear()
+        allocator = mac_allocator.get_allocator()
+        self.assertRaises(q_exc.MacAddressGenerationFailure,
+                          allocator.allocate, self.context, 'net-id')
+        self.assertEqual(cfg.CONF.mac_generation_retries,
+                         self.getrandbits.call_count)
+
+    def test_allocate_drops_blocks_on_base_mac_change(self):
+        self._allocate()
+        cfg.CONF.set_override('base_mac', '12:34:56:79:00:00')
+        self.assertEqual('12:34:56:79:05:00', self._allocate())
+
+    def test_reserve_leases_enough_blocks(self):
+        self.getrandbits.side_effect = [5, 6]
+        self.allocator.reserve(self.context, 'net-id', 300)
+        self.assertEqual(2, len(self.allocator.blocks))
+        self.assertEqual(['12:34:56:78:05:00', '12:34:56:78:06:00'],
+                         sorted(self._get_leases().keys()))
+
+    def test_discard(self):
+        self._allocate()
+        self.allocator.discard('12:34:56:78:05:01')
+        self.assertEqual('12:34:56:78:05:02', self._allocate())
+
+    def test_get_allocator_per_process(self):
+        with mock.patch.object(mac_allocator.os, 'getpid', return_value=-1):
+            allocator = mac_allocator.get_allocator()
+        self.assertIsNot(self.allocator, allocator)
+        self.assertNotEqual(self.allocator.holder, allocator.holder)
+
+    def test_create_ports_bulk_reserves_macs(self):
+        with self.network() as network:
+            with mock.patch.object(mac_allocator.MacAllocator,
+                                   'reserve') as reserve:
+                res = self._create_port_bulk(self.fmt, 3,
+                                             network['network']['id'],
+                                             'test', True)
+                self.assertEqual(201, res.status_int)
+            reserve.assert_called_once_with(mock.ANY,
+                                            network['network']['id'], 3)
+            for port in self.deserialize(self.fmt, res)['ports']:
+                self._delete('ports', port['id'])
+
+    def test_create_ports_bulk_skips_specified_macs(self):
+        with self.network() as network:
+            # 12:34:56:78:05:00 is the first address the allocator generates
+            res = self._create_port_bulk(
+                self.fmt, 2, network['network']['id'], 'test', True,
+                override={1: {'mac_address': '12:34:56:78:05:00'}})
+            self.assertEqual(201, res.status_int)
+            ports = self.deserialize(self.fmt, res)['ports']
+            self.assertEqual('12:34:56:78:05:01', ports[0]['mac_address'])
+            self.assertEqual('12:34:56:78:05:00', ports[1]['mac_address'])
+            for port in ports:
+                self._delete('ports', port['id'])
+
+    def _create_port_specified_by_other(self, subnet, mac_address):
+        # Created by another process, the allocator of this one does not
+        # discard its MAC address
+        with mock.patch.object(mac_allocator.MacAllocator, 'discard'):
+            return self._make_port(self.fmt, subnet['subnet']['network_id'],
+                                   arg_list=('mac_address',),
+                                   mac_address=mac_address)
+
+    def test_create_port_mac_specified_by_other(self):
+        with self.subnet() as subnet:
+            with self.port(subnet=subnet) as port1:
+                self.assertEqual('12:34:56:78:05:00',
+                                 port1['port']['mac_address'])
+                port2 = self._create_port_specified_by_other(
+                    subnet, '12:34:56:78:05:01')
+                # The generated MAC address is in use, the port is not
+                # created and the next one is generated on retry
+                res = self._create_port(self.fmt,
+                                        subnet['subnet']['network_id'])
+                self.assertEqual(503, res.status_int)
+                with self.port(subnet=subnet) as port3:
+                    self.assertEqual('12:34:56:78:05:02',
+                                     port3['port']['mac_address'])
+                self._delete('ports', port2['port']['id'])
+
+    def test_create_ports_bulk_mac_specified_by_other(self):
+        with self.subnet() as subnet:
+            with self.port(subnet=subnet):
+                port2 = self._create_port_specified_by_other(
+                    subnet, '12:34:56:78:05:02')
+                res = self._create_port_bulk(
+                    self.fmt, 2, subnet['subnet']['network_id'], 'test',
+                    True)
+                self.assertEqual(503, res.status_int)
+                self._delete('ports', port2['port']['id'])
+
+    def test_lease_failure_in_caller_transaction_raises(self):
+        # On SQLite the lease is written in the transaction of the caller,
+        # which is rolled back on failure
+        with mock.patch.object(self.context.session, 'add',
+                               side_effect=sql_exc.IntegrityError(
+                                   None, None, None)):
+            self.assertRaises(sql_exc.IntegrityError, self._allocate)
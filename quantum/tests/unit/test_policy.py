@@ -79,6 +79,10 @@ class PolicyTestCase(base.BaseTestCase):
             "example:denied": '!',
             "example:get_http": "http:http://www.example.com",
             "example:my_file": "role:compute_admin or tenant_id:%(tenant_id)s",
+            "example:owner": "tenant_id:%(tenant_id)s",
+            "example:shared": "field:networks:shared=True",
+            "example:owner_or_shared": ("rule:example:owner or "
+                                        "rule:example:shared"),
             "example:early_and_fail": "! and @",
             "example:early_or_success": "@ or !",
             "example:lowercase_admin": "role:admin or role:sysadmin",
@@ -159,6 +163,45 @@ class PolicyTestCase(base.BaseTestCase):
         policy.enforce(admin_context, lowercase_action, self.target)
         policy.enforce(admin_context, uppercase_action, self.target)
 
+    def test_match_rule_compiled_once(self):
+        with mock.patch.object(policy, '_build_match_rule',
+                               wraps=policy._build_match_rule) as build:
+            for i in range(2):
+                policy.enforce(self.context, "example:allowed", self.target)
+        build.assert_called_once_with("example:allowed", frozenset())
+
+    def test_match_rule_recompiled_on_new_rules(self):
+        action = "example:allowed"
+        policy.enforce(self.context, action, self.target)
+        common_policy.set_rules(common_policy.Rules(
+            {action: common_policy.parse_rule('!')}))
+        self.assertRaises(exceptions.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, self.target)
+
+    def test_enforce_missing_target_field_fails(self):
+        self.assertRaises(exceptions.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:my_file", {})
+
+    def test_enforce_missing_target_field_fails_its_rule_only(self):
+        action = "example:owner_or_shared"
+        policy.enforce(self.context, action, {'shared': True})
+        self.assertRaises(exceptions.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, {'shared': False})
+
+    def test_credentials_derived_once(self):
+        with mock.patch.object(self.context, 'to_dict',
+                               wraps=self.context.to_dict) as to_dict:
+            for i in range(2):
+                policy.enforce(self.context, "example:my_file",
+                               {'tenant_id': 'fake'})
+        to_dict.assert_called_once_with()
+
+    def test_credentials_of_elevated_context(self):
+        action = "example:lowercase_admin"
+        self.assertFalse(policy.check(self.context, action, self.target))
+        self.assertTrue(policy.check(self.context.elevated(), action,
+                                     self.target))
+
 
 class DefaultPolicyTestCase(base.BaseTestCase):
 
@@ -222,6 +265,11 @@ class QuantumPolicyTestCase(base.BaseTestCase):
                            "rule:shared or "
                            "rule:external",
             "create_port:mac": "rule:admin_or_network_owner",
+            "get_port": "rule:admin_or_owner",
+            "get_subnet": "rule:admin_or_network_owner",
+            "get_agent": "rule:admin_only",
+            "get_router": "not rule:admin_only",
+            "get_floatingip": "http:%(target)s",
         }.items())
 
         def fakepolicyinit():
@@ -303,3 +351,68 @@ class QuantumPolicyTestCase(base.BaseTestCase):
             target = {'network_id': 'whatever'}
             result = policy.enforce(self.context, action, target, self.plugin)
             self.assertTrue(result)
+
+    def test_enforced_attributes(self):
+        target = {'tenant_id': 'fake', 'name': 'net', 'shared': True}
+        self.assertEqual(frozenset(['shared']),
+                         policy._get_enforced_attributes('create_network',
+                                                         target))
+        self.assertEqual(frozenset(),
+                         policy._get_enforced_attributes('get_network',
+                                                         target))
+
+    def test_enforced_attributes_default_value(self):
+        target = {'tenant_id': 'fake', 'shared': False}
+        self.assertEqual(frozenset(),
+                         policy._get_enforced_attributes('create_network',
+                                                         target))
+
+    def test_get_conditions_admin(self):
+        admin_context = context.get_admin_context()
+        self.assertTrue(policy.get_conditions(admin_context, 'get_network'))
+
+    def test_get_conditions_owner(self):
+        self.assertEqual([{'tenant_id': 'fake'}],
+                         policy.get_conditions(self.context, 'get_port'))
+
+    def test_get_conditions_alternatives(self):
+        conditions = policy.get_conditions(self.context, 'get_network')
+        self.assertEqual([{'tenant_id': 'fake'}, {'shared': True}],
+                         conditions[:2])
+        self.assertEqual(['router:external'], conditions[2].keys())
+
+    def test_get_conditions_not_allowed(self):
+        self.assertFalse(policy.get_conditions(self.context, 'get_agent'))
+
+    def test_get_conditions_not(self):
+        self.assertTrue(policy.get_conditions(self.context, 'get_router'))
+
+    def test_get_conditions_parent_owner(self):
+        self.assertIsNone(policy.get_conditions(self.context, 'get_subnet'))
+
+    def test_get_conditions_http(self):
+        self.assertIsNone(policy.get_conditions(self.context,
+                                                'get_floatingip'))
+
+    def test_get_conditions_write(self):
+        self.assertIsNone(policy.get_conditions(self.context,
+                                                'update_network'))
+
+    def test_match_conditions(self):
+        conditions = policy.get_conditions(self.context, 'get_network')
+        self.assertTrue(policy.match_conditions(
+            conditions, {'tenant_id': 'fake', 'shared': False}))
+        self.assertTrue(policy.match_conditions(
+            conditions, {'tenant_id': 'other', 'shared': True}))
+        self.assertFalse(policy.match_conditions(
+            conditions, {'tenant_id': 'other', 'shared': False}))
+
+    def test_parent_owner_looked_up_once(self):
+        with mock.patch.object(self.plugin, 'get_network',
+                               return_value={'tenant_id': 'fake'}) as get:
+            for i in range(2):
+                self.assertTrue(policy.check(self.context, 'create_port:mac',
+                                             {'network_id': 'whatever'},
+                                             self.plugin))
+        get.assert_called_once_with(self.context, 'whatever',
+                                    fields=['tenant_id'])
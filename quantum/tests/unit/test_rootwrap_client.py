@@ -0,0 +1,81 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright (c) 2013 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import base64
+import json
+
+import mock
+
+from quantum.rootwrap import client
+from quantum.tests import base
+
+
+RESPONSE = json.dumps({'returncode': 0,
+                       'stdout': base64.b64encode('foo'),
+                       'stderr': ''}) + '\n'
+
+
+class RootwrapClientTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(RootwrapClientTestCase, self).setUp()
+        self.processes = []
+        self.startup_lines = ['/tmp/sock\n', 'key\n', '60\n']
+        popen = mock.patch('quantum.common.utils.subprocess_popen',
+                           side_effect=self._popen)
+        popen.start()
+        self.addCleanup(popen.stop)
+        socket = mock.patch.object(client.socket, 'socket')
+        self.sock = socket.start().return_value
+        self.addCleanup(socket.stop)
+        self.sock.makefile.return_value.readline.return_value = RESPONSE
+        spawn_n = mock.patch('eventlet.spawn_n')
+        self.spawn_n = spawn_n.start()
+        self.addCleanup(spawn_n.stop)
+        self.client = client.Client('sudo quantum-rootwrap-daemon')
+
+    def _popen(self, cmd, **kwargs):
+        process = mock.Mock()
+        process.poll.return_value = None
+        process.stdout.readline.side_effect = self.startup_lines + ['']
+        self.processes.append(process)
+        return process
+
+    def test_execute(self):
+        self.assertEqual((0, 'foo', ''), self.client.execute(['ls']))
+        self.sock.settimeout.assert_called_once_with(
+            60 + client.TIMEOUT_MARGIN)
+        self.sock.connect.assert_called_once_with('/tmp/sock')
+        self.assertEqual(1, len(self.processes))
+
+    def test_execute_reply_timeout(self):
+        self.sock.makefile.return_value.readline.side_effect = (
+            client.socket.timeout())
+        self.assertRaises(RuntimeError, self.client.execute, ['ls'])
+        self.sock.close.assert_called_once_with()
+
+    def test_execute_restarts_unreachable_daemon(self):
+        self.sock.connect.side_effect = [client.socket.error(), None]
+        self.assertEqual((0, 'foo', ''), self.client.execute(['ls']))
+        self.assertEqual(2, len(self.processes))
+        old_process = self.processes[0]
+        old_process.stdin.close.assert_called_once_with()
+        self.spawn_n.assert_called_once_with(old_process.wait)
+
+    def test_daemon_failed_to_start(self):
+        self.startup_lines = ['/tmp/sock\n', 'key\n']
+        self.assertRaises(RuntimeError, self.client.execute, ['ls'])
@@ -0,0 +1,75 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright (c) 2013 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import base64
+import json
+
+from quantum.rootwrap import daemon
+from quantum.rootwrap import filters
+from quantum.tests import base
+
+
+KEY = 'secret'
+
+
+class RootwrapDaemonTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(RootwrapDaemonTestCase, self).setUp()
+        self.filters = [
+            filters.RegExpFilter("/bin/ls", "root", 'ls', '/[a-z]+'),
+            filters.CommandFilter("/bin/cat", "root"),
+            filters.CommandFilter("/bin/sleep", "root")]
+
+    def _execute(self, cmd, key=KEY, stdin='', timeout=5):
+        request = json.dumps({'key': key, 'cmd': cmd,
+                              'stdin': base64.b64encode(stdin)})
+        response = daemon.execute_request(self.filters, KEY, request,
+                                          timeout)
+        return (response['returncode'],
+                base64.b64decode(response['stdout']),
+                base64.b64decode(response['stderr']))
+
+    def test_execute(self):
+        returncode, stdout, stderr = self._execute(['cat'], stdin='foo\n')
+        self.assertEqual(0, returncode)
+        self.assertEqual('foo\n', stdout)
+        self.assertEqual('', stderr)
+
+    def test_execute_wrong_key(self):
+        returncode, stdout, stderr = self._execute(['cat'], key='wrong')
+        self.assertEqual(daemon.RC_UNAUTHORIZED, returncode)
+        self.assertEqual('', stdout)
+
+    def test_execute_unauthorized(self):
+        returncode, stdout, stderr = self._execute(['ls', 'root'])
+        self.assertEqual(daemon.RC_UNAUTHORIZED, returncode)
+        self.assertEqual('Unauthorized command: ls root', stderr)
+
+    def test_execute_malformed_request(self):
+        response = daemon.execute_request(self.filters, KEY, 'garbage\n')
+        self.assertEqual(daemon.RC_BADREQUEST, response['returncode'])
+
+    def test_execute_timeout(self):
+        returncode, stdout, stderr = self._execute(['sleep', '10'],
+                                                   timeout=0.1)
+        self.assertEqual(-9, returncode)
+
+    def test_keys_match(self):
+        self.assertTrue(daemon._keys_match('abc', 'abc'))
+        self.assertFalse(daemon._keys_match('abc', 'abd'))
+        self.assertFalse(daemon._keys_match('abc', 'ab'))
@@ -15,8 +15,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
+import signal
 import socket
 
+import eventlet
+from eventlet import event
 import mock
 import testtools
 import webob
@@ -59,7 +63,7 @@ class TestWSGIServer(base.BaseTestCase):
                      '',
                      ('fe80::204:acff:fe96:da87%eth0', 1234, 0, 2))
                 ]
-                with mock.patch.object(server, 'pool') as mock_pool:
+                with mock.patch.object(wsgi.eventlet, 'spawn') as mock_spawn:
                     server.start(None,
                                  1234,
                                  host="fe80::204:acff:fe96:da87%eth0")
@@ -77,13 +81,160 @@ class TestWSGIServer(base.BaseTestCase):
                         backlog=128
                     )
 
-                    mock_pool.spawn.assert_has_calls([
+                    mock_spawn.assert_has_calls([
                         mock.call(
                             server._run,
                             None,
                             mock_listen.return_value)
                     ])
 
+    def test_start_with_workers(self):
+        server = wsgi.Server("test_workers")
+        with mock.patch.object(wsgi, 'WorkerLauncher') as launcher_cls:
+            server.start(None, 0, host="127.0.0.1", workers=2)
+            launcher = launcher_cls.return_value
+            self.assertEqual(1, launcher.launch_service.call_count)
+            args, kwargs = launcher.launch_service.call_args
+            self.assertIsInstance(args[0], wsgi.WorkerService)
+            self.assertEqual({'workers': 2}, kwargs)
+            self.assertIsNone(server._server)
+            server.stop()
+            self.assertFalse(launcher.running)
+            server.wait()
+            launcher.wait.assert_called_once_with()
+        server._socket.close()
+
+
+class TestWorkerService(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestWorkerService, self).setUp()
+        self.server = mock.Mock(graceful_timeout=5)
+        self.worker = wsgi.WorkerService(self.server, 'app')
+
+    def test_start(self):
+        with mock.patch.object(wsgi.signal, 'signal') as signal:
+            self.worker.start()
+        signal.assert_called_once_with(wsgi.signal.SIGHUP,
+                                       self.worker._handle_sighup)
+        self.server._serve.assert_called_once_with('app')
+        self.assertIsNone(self.server._launcher)
+
+    def test_wait_stops_gracefully_on_sighup(self):
+        self.server.wait.side_effect = [
+            wsgi.service.SignalExit(wsgi.signal.SIGHUP, exccode=0), None]
+        with mock.patch.object(wsgi.signal, 'signal') as signal:
+            self.worker.wait()
+        signal.assert_called_once_with(wsgi.signal.SIGHUP,
+                                       wsgi.signal.SIG_IGN)
+        self.server.stop.assert_called_once_with()
+        self.assertEqual([mock.call(), mock.call(timeout=5)],
+                         self.server.wait.call_args_list)
+
+    def test_wait_reraises_other_signals(self):
+        self.server.wait.side_effect = wsgi.service.SignalExit(
+            wsgi.signal.SIGTERM)
+        self.assertRaises(wsgi.service.SignalExit, self.worker.wait)
+        self.assertFalse(self.server.stop.called)
+
+    def _get(self, port):
+        sock = eventlet.connect(('127.0.0.1', port))
+        try:
+            sock.sendall('GET / HTTP/1.0\r\n\r\n')
+            response = ''
+            data = sock.recv(4096)
+            while data:
+                response += data
+                data = sock.recv(4096)
+            return response
+        finally:
+            sock.close()
+
+    def test_sighup_finishes_requests_in_progress(self):
+        started = event.Event()
+        finish = event.Event()
+
+        def application(environ, start_response):
+            started.send()
+            finish.wait()
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return ['done']
+
+        server = wsgi.Server('test_sighup', graceful_timeout=5)
+        server._socket = eventlet.listen(('127.0.0.1', 0))
+        port = server.port
+        # As inherited by a worker from the process supervising it
+        launcher = server._launcher = mock.Mock()
+        self.addCleanup(signal.signal, signal.SIGHUP,
+                        signal.getsignal(signal.SIGHUP))
+        worker = wsgi.WorkerService(server, application)
+        worker.start()
+        request = eventlet.spawn(self._get, port)
+        started.wait()
+        eventlet.spawn_n(os.kill, os.getpid(), signal.SIGHUP)
+        eventlet.spawn_after(0.1, finish.send)
+        worker.wait()
+        self.assertTrue(request.wait().endswith('done'))
+        self.assertTrue(server._server.dead)
+        self.assertRaises(socket.error, self._get, port)
+        self.assertEqual([], launcher.mock_calls)
+
+
+class TestWorkerLauncher(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestWorkerLauncher, self).setUp()
+        self.signal = mock.patch.object(wsgi.signal, 'signal').start()
+        self.addCleanup(mock.patch.stopall)
+        self.launcher = wsgi.WorkerLauncher()
+
+    def test_start_child_drops_connections_before_fork(self):
+        parent = mock.Mock()
+        with mock.patch.object(wsgi.db_api, 'dispose') as dispose:
+            with mock.patch.object(wsgi.rpc, 'cleanup') as cleanup:
+                with mock.patch.object(wsgi.os, 'fork') as fork:
+                    parent.attach_mock(dispose, 'dispose')
+                    parent.attach_mock(cleanup, 'cleanup')
+                    parent.attach_mock(fork, 'fork')
+                    fork.return_value = 1234
+                    self.launcher.launch_service(mock.Mock(), workers=1)
+        self.assertEqual([mock.call.dispose(), mock.call.cleanup(),
+                          mock.call.fork()], parent.mock_calls)
+        self.assertEqual([1234], self.launcher.children.keys())
+
+    def test_sighup_replaces_children(self):
+        pids = iter([1, 2, 3, 4])
+
+        def start_child(wrap):
+            pid = pids.next()
+            wrap.children.add(pid)
+            self.launcher.children[pid] = wrap
+            return pid
+
+        with mock.patch.object(self.launcher, '_start_child',
+                               side_effect=start_child):
+            self.launcher.launch_service(mock.Mock(), workers=2)
+            wrap = self.launcher.children[1]
+            self.launcher._handle_sighup(wsgi.signal.SIGHUP, None)
+            with mock.patch.object(wsgi.os, 'kill') as kill:
+                with mock.patch.object(wsgi.os, 'waitpid',
+                                       return_value=(0, 0)):
+                    self.launcher._wait_child()
+        self.assertEqual(set([3, 4]), wrap.children)
+        self.assertEqual(set([1, 2]), self.launcher.retiring.children)
+        self.assertEqual(sorted([mock.call(1, wsgi.signal.SIGHUP),
+                                 mock.call(2, wsgi.signal.SIGHUP)]),
+                         sorted(kill.mock_calls))
+
+    def test_retired_children_are_not_respawned(self):
+        self.launcher.retiring.children.add(1)
+        self.launcher.children[1] = self.launcher.retiring
+        with mock.patch.object(wsgi.os, 'waitpid', return_value=(1, 0)):
+            wrap = self.launcher._wait_child()
+        self.assertIs(self.launcher.retiring, wrap)
+        self.assertEqual(0, len(wrap.children))
+        self.assertEqual({}, self.launcher.children)
+
 
 class SerializerTest(base.BaseTestCase):
     def test_serialize_unknown_content_type(self):
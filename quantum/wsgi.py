@@ -18,6 +18,9 @@
 """
 Utility methods for working with WSGI servers
 """
+import errno
+import os
+import signal
 import socket
 import sys
 from xml.etree import ElementTree as etree
@@ -25,6 +28,7 @@ from xml.parsers import expat
 
 import eventlet.wsgi
 eventlet.patcher.monkey_patch(all=False, socket=True)
+import greenlet
 import routes.middleware
 import webob.dec
 import webob.exc
@@ -32,8 +36,11 @@ import webob.exc
 from quantum.common import constants
 from quantum.common import exceptions as exception
 from quantum import context
+from quantum.db import api as db_api
 from quantum.openstack.common import jsonutils
 from quantum.openstack.common import log as logging
+from quantum.openstack.common import rpc
+from quantum.openstack.common import service
 
 LOG = logging.getLogger(__name__)
 
@@ -44,15 +51,118 @@ def run_server(application, port):
     eventlet.wsgi.server(sock, application)
 
 
+class WorkerService(object):
+    """Serves the application of a Server in a forked worker process.
+
+    A worker stops accepting connections on SIGHUP, finishes the requests
+    in progress and exits, so that its parent can replace it without
+    dropping any request.
+    """
+
+    def __init__(self, server, application):
+        self._server = server
+        self._application = application
+
+    def start(self):
+        # NOTE: the server comes with the launcher of the parent process,
+        # which supervises the workers and must not be used by them.
+        self._server._launcher = None
+        signal.signal(signal.SIGHUP, self._handle_sighup)
+        self._server._serve(self._application)
+
+    def _handle_sighup(self, signo, frame):
+        # NOTE: raised like SIGTERM is by the launcher, so that it ends
+        # up in wait() whichever green thread the signal interrupted.
+        raise service.SignalExit(signo, exccode=0)
+
+    def wait(self):
+        try:
+            self._server.wait()
+        except service.SignalExit as exc:
+            if exc.signo != signal.SIGHUP:
+                raise
+            # Another SIGHUP must not interrupt the requests in progress
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            LOG.info(_('Caught SIGHUP, finishing the requests in progress'))
+            self._server.stop()
+            self._server.wait(timeout=self._server.graceful_timeout)
+
+    def stop(self):
+        self._server.stop()
+
+
+class WorkerLauncher(service.ProcessLauncher):
+    """Supervises the worker processes of a Server.
+
+    Workers that die are respawned. On SIGHUP, a replacement is forked for
+    each worker before the old ones are asked to stop gracefully, so that
+    the listening socket is served all along.
+    """
+
+    def __init__(self):
+        super(WorkerLauncher, self).__init__()
+        self.sighup = False
+        # NOTE: workers being restarted are moved to a wrapper expecting
+        # no workers, so that they are not respawned when they exit.
+        self.retiring = service.ServiceWrapper(None, 0)
+        signal.signal(signal.SIGHUP, self._handle_sighup)
+
+    def _handle_sighup(self, signo, frame):
+        self.sighup = True
+
+    def _start_child(self, wrap):
+        # NOTE: the database and RPC connections open in this process
+        # must not be inherited by the child, or both would talk over the
+        # same sockets. Dropping them lets the child open its own.
+        db_api.dispose()
+        rpc.cleanup()
+        return super(WorkerLauncher, self)._start_child(wrap)
+
+    def _restart_children(self):
+        LOG.info(_('Caught SIGHUP, restarting children'))
+        old_pids = []
+        for wrap in set(self.children.values()):
+            if wrap is self.retiring:
+                continue
+            for pid in list(wrap.children):
+                wrap.children.remove(pid)
+                self.retiring.children.add(pid)
+                self.children[pid] = self.retiring
+                old_pids.append(pid)
+            while self.running and len(wrap.children) < wrap.workers:
+                self._start_child(wrap)
+        for pid in old_pids:
+            try:
+                os.kill(pid, signal.SIGHUP)
+            except OSError as exc:
+                if exc.errno != errno.ESRCH:
+                    raise
+
+    def _wait_child(self):
+        if self.sighup:
+            self.sighup = False
+            self._restart_children()
+        return super(WorkerLauncher, self)._wait_child()
+
+
 class Server(object):
     """Server class to manage multiple WSGI sockets and applications."""
 
-    def __init__(self, name, threads=1000):
+    def __init__(self, name, threads=1000, graceful_timeout=60):
         self.pool = eventlet.GreenPool(threads)
         self.name = name
+        self.graceful_timeout = graceful_timeout
+        self._server = None
+        self._launcher = None
+
+    def start(self, application, port, host='0.0.0.0', backlog=128,
+              workers=0):
+        """Run a WSGI server with the given application.
 
-    def start(self, application, port, host='0.0.0.0', backlog=128):
-        """Run a WSGI server with the given application."""
+        :param workers: number of processes to fork to serve the
+                        application. The application is served by green
+                        threads of this process if it is less than 1.
+        """
         self._host = host
         self._port = port
 
@@ -75,7 +185,19 @@ class Server(object):
                           {'host': host, 'port': port})
             sys.exit(1)
 
-        self._server = self.pool.spawn(self._run, application, self._socket)
+        if workers < 1:
+            self._serve(application)
+        else:
+            # The workers inherit the listening socket and accept from it
+            # concurrently, this process only supervises them.
+            self._launcher = WorkerLauncher()
+            self._launcher.launch_service(WorkerService(self, application),
+                                          workers=workers)
+
+    def _serve(self, application):
+        # NOTE: the server runs outside of the pool of the requests, which
+        # it waits for when it is stopped.
+        self._server = eventlet.spawn(self._run, application, self._socket)
 
     @property
     def host(self):
@@ -86,12 +208,29 @@ class Server(object):
         return self._socket.getsockname()[1] if self._socket else self._port
 
     def stop(self):
-        self._server.kill()
+        if self._launcher:
+            # Makes the launcher leave its wait loop and stop the workers
+            self._launcher.running = False
+        elif self._server is not None:
+            self._server.kill()
 
-    def wait(self):
-        """Wait until all servers have completed running."""
+    def wait(self, timeout=None):
+        """Wait until all servers have completed running.
+
+        :param timeout: seconds after which to give up waiting for the
+                        requests in progress, or None to wait for them.
+        """
+        if self._launcher:
+            self._launcher.wait()
+            return
         try:
-            self.pool.waitall()
+            with eventlet.Timeout(timeout, False):
+                if self._server is not None:
+                    try:
+                        self._server.wait()
+                    except greenlet.GreenletExit:
+                        pass
+                self.pool.waitall()
         except KeyboardInterrupt:
             pass
 
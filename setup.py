@@ -143,10 +143,13 @@ else:
          'quantum.plugins.services.agent_loadbalancer.agent:main'),
         ('quantum-check-nvp-config = '
          'quantum.plugins.nicira.nicira_nvp_plugin.check_nvp_config:main'),
+        ('quantum-dodai-reconcile = '
+         'quantum.plugins.dodai.reconciler:main'),
     ]
 
     ProjectScripts = [
         'bin/quantum-rootwrap',
+        'bin/quantum-rootwrap-daemon',
     ]
 
 